@@ -23,7 +23,8 @@ import platform
 import logging
 
 from llmware.exceptions import HomePathDoesNotExistException, UnsupportedEmbeddingDatabaseException, \
-    UnsupportedCollectionDatabaseException, UnsupportedTableDatabaseException, ConfigKeyException
+    UnsupportedCollectionDatabaseException, UnsupportedTableDatabaseException, ConfigKeyException, \
+    LLMWareException
 
 try:
     from colorama import Fore
@@ -84,7 +85,7 @@ class LLMWareConfig:
            "tmp_path_name": "tmp" + os.sep}
 
     # note: two alias for postgres vector db - "postgres" and "pg_vector" are the same
-    _supported = {"vector_db": ["chromadb", "neo4j", "milvus", "pg_vector", "postgres", "redis", "pinecone", "faiss", "qdrant", "mongo_atlas","lancedb"],
+    _supported = {"vector_db": ["chromadb", "neo4j", "milvus", "pg_vector", "postgres", "redis", "pinecone", "faiss", "qdrant", "mongo_atlas","lancedb", "numpy_mmap"],
                   "collection_db": ["mongo", "postgres", "sqlite"],
                   "table_db": ["postgres", "sqlite"]}
 
@@ -102,7 +103,9 @@ class LLMWareConfig:
              "agent_writer_mode": "screen",
              "agent_log_file": "agent_log.txt",
              "model_register": {"module": "llmware.models", "class": "register"},
-             "model_post_init": {"module": "llmware.models", "class": "post_init"}
+             "model_post_init": {"module": "llmware.models", "class": "post_init"},
+             # number of loaded vector indexes kept in memory and shared across Query instances (0 = off)
+             "vector_index_cache_size": 8
              }
 
     @classmethod
@@ -477,7 +480,8 @@ class VectorDBRegistry:
                       "lancedb": {"module": "llmware.embeddings", "class": "EmbeddingLanceDB"},
                       "faiss": {"module": "llmware.embeddings", "class": "EmbeddingFAISS"},
                       "pinecone": {"module": "llmware.embeddings", "class": "EmbeddingPinecone"},
-                      "mongo_atlas": {"module": "llmware.embeddings", "class": "EmbeddingMongoAtlas"}
+                      "mongo_atlas": {"module": "llmware.embeddings", "class": "EmbeddingMongoAtlas"},
+                      "numpy_mmap": {"module": "llmware.embeddings", "class": "EmbeddingNumpyMMap"}
                       }
     @classmethod
     def get_vector_db_list(cls):
@@ -666,6 +670,193 @@ class LanceDBConfig:
         cls._conf[name] = value
 
 
+class EmbeddingConfig:
+
+    """Configuration object for embedding jobs - sets the defaults for the pipelined embedding mode, in which
+    EmbeddingHandler.create_new_embedding overlaps reading blocks from the text collection, running the
+    embedding model, and writing the vectors + embedding flags, connected by bounded queues - for running
+    the embedding model across multiple worker processes - and for the persistent embedding cache."""
+
+    _conf = {"pipeline": False,
+
+             # max number of batches held between each stage
+             "pipeline_queue_depth": 4,
+
+             # number of threads running model batches - each calls model.embedding on a separate batch
+             "pipeline_model_workers": 1,
+
+             # number of rows read from the text collection cursor in each fetch
+             "pipeline_prefetch_size": 1000,
+
+             # number of worker processes for data-parallel cpu embedding with HF + sentence transformer
+             # models - each worker holds a copy of the model, pinned to its own set of cores (1 = off)
+             "embedding_workers": 1,
+             "embedding_worker_start_method": "spawn",
+
+             # max padded tokens (sequences x longest sequence) in each forward pass of HF + sentence transformer
+             # embedding models - texts are sorted by token length and bucketed within the budget (None = off),
+             # e.g., 16384
+             "embedding_token_budget": None,
+
+             # persistent cache of embedding vectors, keyed by (model_name, hash of normalized text), used by
+             # create_new_embedding and semantic queries - saved in sqlite db file in the llmware_data path
+             "embedding_cache": False,
+             "embedding_cache_file": "embedding_cache.db",
+             "embedding_cache_max_entries": 1000000}
+
+    @classmethod
+    def get_config(cls, name):
+        if name in cls._conf:
+            return cls._conf[name]
+        raise ConfigKeyException(name)
+
+    @classmethod
+    def set_config(cls, name, value):
+        cls._conf[name] = value
+
+
+class QueryConfig:
+
+    """Configuration object for the Query result cache - an opt-in cache of packaged query results, keyed by
+    library, query type, query text, filters, result_count and output keys, and invalidated by the library
+    version counter, which is incremented on each change to the blocks or embeddings of the library."""
+
+    _conf = {"query_cache": False,
+
+             # max number of query results held in memory, evicted in least-recently-used order
+             "query_cache_max_entries": 1000,
+
+             # seconds before a cached result expires (0 = no expiry)
+             "query_cache_ttl": 300,
+
+             # optional on-disk tier - sqlite db file in the llmware_data path, shared across processes
+             "query_cache_disk": False,
+             "query_cache_file": "query_cache.db",
+             "query_cache_disk_max_entries": 100000}
+
+    @classmethod
+    def get_config(cls, name):
+        if name in cls._conf:
+            return cls._conf[name]
+        raise ConfigKeyException(name)
+
+    @classmethod
+    def set_config(cls, name, value):
+        cls._conf[name] = value
+
+
+class OCRConfig:
+
+    """Configuration object for OCR jobs - sets the defaults for the streaming OCR pipeline used by ImageParser
+    for scanned PDFs and image files, in which pages are rendered in chunks, and tesseract is run on the pages
+    across a pool of worker threads, with the results returned in page order as they complete."""
+
+    _conf = {
+
+             # number of pages or images OCR'd concurrently - each runs in a separate tesseract process
+             # (None = number of cores)
+             "ocr_workers": None,
+
+             # number of pdf pages rendered into memory at a time - page images held are bounded by one chunk,
+             # plus the pages pending OCR (2 x ocr_workers)
+             "ocr_page_chunk_size": 8,
+
+             # resolution of the rendered pdf page images
+             "ocr_dpi": 200}
+
+    @classmethod
+    def get_config(cls, name):
+        if name in cls._conf:
+            return cls._conf[name]
+        raise ConfigKeyException(name)
+
+    @classmethod
+    def set_config(cls, name, value):
+        cls._conf[name] = value
+
+
+class FAISSConfig:
+
+    """Configuration object for FAISS - selects the index type built for a new embedding, and its build and
+    search parameters.   Supported index types are 'flat' (exact search), 'hnsw', 'ivf_flat' and 'ivf_pq'.
+
+    The settings are applied when a new index is created, and are saved in the library card embedding record,
+    so that later searches on the index apply the same search parameters (nprobe, efSearch)."""
+
+    _conf = {"index_type": "flat",
+
+             # ivf_flat + ivf_pq
+             "nlist": 1024,
+             "nprobe": 16,
+             "train_sample_size": 50000,
+
+             # ivf_pq - number of sub-quantizers and bits per code
+             "pq_m": 48,
+             "pq_nbits": 8,
+
+             # hnsw
+             "M": 32,
+             "efConstruction": 40,
+             "efSearch": 64}
+
+    _supported_index_types = ["flat", "hnsw", "ivf_flat", "ivf_pq"]
+
+    @classmethod
+    def get_config(cls, name):
+        if name in cls._conf:
+            return cls._conf[name]
+        raise ConfigKeyException(name)
+
+    @classmethod
+    def set_config(cls, name, value):
+        if name == "index_type" and value not in cls._supported_index_types:
+            raise LLMWareException(message=f"Exception: FAISS index_type '{value}' not supported - "
+                                           f"select one of {cls._supported_index_types}")
+        cls._conf[name] = value
+
+    @classmethod
+    def get_index_config(cls):
+        """ Returns the index settings in the form saved in the library card embedding record """
+        return {"index_type": cls._conf["index_type"],
+                "nlist": cls._conf["nlist"],
+                "nprobe": cls._conf["nprobe"],
+                "pq_m": cls._conf["pq_m"],
+                "pq_nbits": cls._conf["pq_nbits"],
+                "M": cls._conf["M"],
+                "efConstruction": cls._conf["efConstruction"],
+                "efSearch": cls._conf["efSearch"]}
+
+
+class NumpyMMapConfig:
+
+    """Configuration object for the built-in numpy vector store - exact search over normalized vectors in an
+    append-only memory-mapped file, with no additional dependencies.   Vectors are stored as 'float32', 'float16'
+    or 'int8' - the dtype is selected when a new index is created, and is kept by the index when appended.
+
+    float16 halves and int8 quarters the file size - int8 search is about as fast as float32, with a small loss
+    in recall, while float16 search is slower, as numpy converts half floats to float32 without simd."""
+
+    _conf = {"dtype": "float32",
+
+             # number of vectors scored in each block of the search - caps the size of the score matrix
+             "search_block_size": 65536}
+
+    _supported_dtypes = ["float32", "float16", "int8"]
+
+    @classmethod
+    def get_config(cls, name):
+        if name in cls._conf:
+            return cls._conf[name]
+        raise ConfigKeyException(name)
+
+    @classmethod
+    def set_config(cls, name, value):
+        if name == "dtype" and value not in cls._supported_dtypes:
+            raise LLMWareException(message=f"Exception: numpy_mmap dtype '{value}' not supported - "
+                                           f"select one of {cls._supported_dtypes}")
+        cls._conf[name] = value
+
+
 class SQLiteConfig:
 
     """Configuration object for SQLite"""
@@ -677,7 +868,18 @@ class SQLiteConfig:
              "pw": "",
              "db_name": "sqlite_llmware.db",
              # add new parameter for SQLTables
-             "db_experimental": "sqlite_experimental.db"}
+             "db_experimental": "sqlite_experimental.db",
+             # connections are re-used per thread, up to pool_size idle connections per thread and db file
+             "connection_pool": True,
+             "pool_size": 4,
+             # pragmas applied on each new connection - set to None to keep the SQLite default
+             # journal_mode is persistent - an existing db file is converted to wal the first time it is opened,
+             # and has -wal and -shm files alongside while connections are open - set to "delete" to convert back
+             "journal_mode": "wal",
+             "synchronous": "normal",
+             "mmap_size": 268435456,
+             "cache_size": -65536,
+             "busy_timeout": 30000}
 
     @classmethod
     def get_config(cls, name):
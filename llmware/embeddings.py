@@ -20,17 +20,25 @@ _EmbeddingUtils class, which provides a set of functions used by all vector data
 """
 
 import os
+import inspect
+import json
 import logging
 import numpy as np
 import re
 import time
 import uuid
 import itertools
+import threading
+import hashlib
+import sqlite3
+import queue
+from collections import OrderedDict
 from importlib import util
 import importlib
 
 from llmware.configs import LLMWareConfig, MongoConfig, MilvusConfig, PostgresConfig, RedisConfig, \
-    PineconeConfig, QdrantConfig, Neo4jConfig, LanceDBConfig, ChromaDBConfig, VectorDBRegistry
+    PineconeConfig, QdrantConfig, Neo4jConfig, LanceDBConfig, ChromaDBConfig, VectorDBRegistry, FAISSConfig, \
+    EmbeddingConfig, NumpyMMapConfig
 from llmware.exceptions import (UnsupportedEmbeddingDatabaseException, EmbeddingModelNotFoundException,
                                 DependencyNotInstalledException, LLMWareException)
 from llmware.resources import CollectionRetrieval, CollectionWriter
@@ -81,367 +89,1144 @@ log_level = LLMWareConfig().get_logging_level_by_module("llmware.embeddings")
 logger.setLevel(level=log_level)
 
 
-class EmbeddingHandler:
+class _VectorIndexCache:
 
-    """Provides an interface to all supported vector databases, which is used by the ``Library`` class.
+    """Process-wide LRU cache of loaded vector db handlers, shared by all EmbeddingHandler instances, e.g., each
+    new Query on the same library reuses the index already loaded in memory, rather than re-loading from disk.
 
-    ``EmbeddingHandler`` is responsible for embedding-related interactions between a library and a vector
-    store. This includes creating, reading, updating, and deleting (CRUD) embeddings. The ``EmbeddingHandler``,
-    in addition, synchronizes the vector store with the text collection database, this includes incremental
-    updates to the embeddings. Finally, it also allows one library to have multiple embeddings.
+    Only handlers with an in-process index loaded from a local file are cached (faiss, numpy_mmap), as the file
+    mtime is used to detect writes from other processes - handlers for vector db servers hold a connection that is
+    closed after each call, and lancedb tables have no single index file, so these are created per call, as before.
 
-    Parameters
-    ----------
-    library : Library
-        The library with which the ``EmbeddingHandler`` interacts.
+    Entries are keyed by (account_name, library_name, model_name, vector_db).  The index file mtime is saved at
+    load, and a changed mtime invalidates the entry.  Each entry has a lock, held by the caller while searching, so
+    that a shared handler is used by one thread at a time.  The number of entries is capped by LLMWareConfig
+    'vector_index_cache_size'."""
 
-    Returns
-    -------
-    embedding_handler : EmbeddingHandler
-        A new ``EmbeddingHandler`` object.
-    """
+    cacheable_dbs = ("faiss", "numpy_mmap")
 
-    def __init__(self, library):
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
 
-        # self.supported_embedding_dbs = LLMWareConfig().get_supported_vector_db()
-        self.supported_embedding_dbs = VectorDBRegistry().get_vector_db_list()
+    @staticmethod
+    def _index_mtime(embedding_class):
 
-        self.library = library
-   
-    def create_new_embedding(self, embedding_db, model, doc_ids=None, batch_size=500):
+        """ Returns mtime of the index file, for vector db handlers that keep the index in a local file """
 
-        """ Creates new embedding - routes to correct vector db and loads the model and text collection """
+        fp = getattr(embedding_class, "embedding_file_path", None)
 
-        embedding_class = self._load_embedding_db(embedding_db, model=model)
-        embedding_status = embedding_class.create_new_embedding(doc_ids, batch_size)
+        if fp and os.path.exists(fp):
+            return os.path.getmtime(fp)
 
-        if embedding_status:
-            if "embeddings_created" in embedding_status:
-                if embedding_status["embeddings_created"] > 0:
-                    # only update if non-zero embeddings created
-                    if "embedded_blocks" in embedding_status:
-                        embedded_blocks = embedding_status["embedded_blocks"]
-                    else:
-                        embedded_blocks = -1
-                        logger.warning("update: embedding_handler - unable to determine if embeddings have "
-                                        "been properly counted and captured.   Please check if databases connected.")
+        return None
 
-                    self.library.update_embedding_status("yes", model.model_name, embedding_db,
-                                                         embedded_blocks=embedded_blocks,
-                                                         embedding_dims=embedding_status["embedding_dims"],
-                                                         time_stamp=embedding_status["time_stamp"])
+    def get(self, key):
 
-        return embedding_status
-   
-    def search_index(self, query_vector, embedding_db, model, sample_count=10):
+        """ Returns (cached vector db handler, handler lock), or (None, None) if not found or if the index file
+        has changed """
 
-        """ Main entry point to vector search query """
+        with self._lock:
 
-        # Need to normalize the query_vector.
-        # Sometimes it comes in as [[1.1,2.1,3.1]] (from Transformers) and sometimes as [1.1,2.1,3.1]
-        # We'll make sure it's the latter and then each Embedding Class will deal with it how it needs to
+            entry = self._cache.get(key)
 
-        if len(query_vector) == 1:
-            query_vector = query_vector[0]
+            if entry is not None:
+                embedding_class, mtime, handler_lock = entry
 
-        embedding_class = self._load_embedding_db(embedding_db, model=model)
-        return embedding_class.search_index(query_vector,sample_count=sample_count)
+                if self._index_mtime(embedding_class) == mtime:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return embedding_class, handler_lock
 
-    def delete_index(self, embedding_db, model_name, embedding_dims):
+                del self._cache[key]
 
-        """ Deletes vector embedding - note:  does not delete the underlying text collection """
+            self.misses += 1
 
-        embedding_class = self._load_embedding_db(embedding_db, model_name=model_name,
-                                                  embedding_dims=embedding_dims)
-        embedding_class.delete_index()
-        self.library.update_embedding_status("delete", model_name, embedding_db,
-                                             embedded_blocks=0, delete_record=True)
+        return None, None
 
-        return 0
+    def put(self, key, embedding_class):
 
-    def _load_embedding_db(self, embedding_db, model=None, model_name=None, embedding_dims=None):
+        """ Adds loaded vector db handler to cache, and evicts least recently used entries over the size cap """
 
-        """ Looks up and loads the selected vector database """
+        max_size = LLMWareConfig().get_config("vector_index_cache_size")
 
-        if not embedding_db in self.supported_embedding_dbs:
-            raise UnsupportedEmbeddingDatabaseException(embedding_db)
+        if not max_size or max_size <= 0 or key[3] not in self.cacheable_dbs:
+            return False
 
-        vdb = self.supported_embedding_dbs[embedding_db]
+        with self._lock:
+            self._cache[key] = (embedding_class, self._index_mtime(embedding_class), threading.Lock())
+            self._cache.move_to_end(key)
 
-        #   dynamically load the module/class for the specific embedding handler
-        vdb_module = vdb["module"]
-        vdb_class = vdb["class"]
-        vdb_module = importlib.import_module(vdb_module)
+            while len(self._cache) > max_size:
+                self._cache.popitem(last=False)
 
-        if hasattr(vdb_module, vdb_class):
-            model_class = getattr(vdb_module, vdb_class)
+        return True
 
-            return model_class(self.library, model=model, model_name=model_name,embedding_dims=embedding_dims)
+    def invalidate(self, account_name, library_name, model_name=None, vector_db=None):
 
-        else:
-            raise LLMWareException(message=f"Exception: could not find class implementation for {embedding_db}, which "
-                                           f"is expected at: {vdb_module} - {vdb_class}.")
+        """ Removes all entries for the library that match model_name and vector_db, if provided """
 
-    def generate_index_name(self, account_name, library_name, model_name, max_component_length=19):
+        with self._lock:
+            for key in list(self._cache.keys()):
+                if key[0] == account_name and key[1] == library_name:
+                    if (model_name is None or key[2] == model_name) and (vector_db is None or key[3] == vector_db):
+                        del self._cache[key]
 
-        """ Creates a unique name for the vector index that concats library_name + model_name + account_name """
+        return True
 
-        index_name = account_name
+    def clear(self):
 
-        # Remove non-alphanumerics from the remaining components and if still longer than the max, remove middle chars
-        for s in [library_name, model_name]:
-            s = re.sub(r'\W+', '', s)
-            if len(s) > max_component_length:
-                excess_length = len(s) - max_component_length
-                left_length = (len(s) - excess_length) // 2
-                right_start = left_length + excess_length
-                index_name += s[:left_length] + s[right_start:]
+        """ Removes all entries """
 
-        # Return the lowercase name:
-        return index_name.lower()
+        with self._lock:
+            self._cache.clear()
 
+        return True
 
-class _EmbeddingUtils:
 
-    """Provides functions to vector stores, such as creating names for the text collection database as well
-    as creating names for vector such, and creating a summary of an embedding process.
+_vector_index_cache = _VectorIndexCache()
 
-    ``_EmbeddingUTils`` provides utilities used by all vector stores, especially in interaction and
-    synchronization with the underlying text collection database. In short, it has functions for
-    creating names, the text index, the embedding flag, the block curser, and the embedding summary.
 
-    Parameters
-    ----------
-    library_name : str, default=None
-        Name of the library.
+class _EmbeddingPipeline:
 
-    model_name : str, default=None
-        Name of the model.
+    """Runs an embedding job as three overlapping stages, connected by bounded queues:
 
-    account_name : str, default=None
-        Name of the account.
+        1.  reader - pulls blocks off the text collection cursor in bulk (DBCursor.pull_many), skips blocks
+            with no text, and groups the rest into batches of batch_size
+        2.  model workers - one or more threads, each running model.embedding on the next batch
+        3.  writer - the create_new_embedding loop of the vector db class, which writes the vectors and the
+            embedding flags, and increments the embedding status
 
-    db_name : str, default=None
-        Name of the vector store.
+    The vector db classes run unchanged on top of the pipeline:  the pipeline is returned in place of the
+    blocks cursor by _EmbeddingUtils.get_blocks_cursor, and its model_stage replaces the model on the vector db
+    class, so that model.embedding returns the vectors already created for the batch just pulled.   Batches are
+    handed to the writer in cursor order, irrespective of the number of model workers."""
 
-    embedding_dims : int, default=None
-        Dimension of the embedding.
+    _done = object()
 
-    Returns
-    -------
-    embedding_utils : _EmbeddingUtils
-        A new ``_EmbeddingUtils`` object.
-    """
+    def __init__(self, model, batch_size=500, queue_depth=4, model_workers=1, prefetch_size=1000):
 
-    def __init__(self, library_name=None, model_name=None, account_name=None,db_name=None,
-                 embedding_dims=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.queue_depth = max(1, queue_depth)
+        self.model_workers = max(1, model_workers)
+        self.prefetch_size = max(1, prefetch_size)
 
-        self.library_name = library_name
-        self.account_name = account_name
-        self.model_name = model_name
-        self.db_name = db_name
-        self.embedding_dims = embedding_dims
-        self.collection_key= None
-        self.collection_name= None
+        self.model_stage = _PipelinedModel(model, self)
 
-    def create_safe_collection_name(self):
+        self._batch_queue = queue.Queue(maxsize=self.queue_depth)
+        self._vector_queue = queue.Queue(maxsize=self.queue_depth)
+        self._stop = threading.Event()
+        self._threads = []
+        self._cursor = None
+        self.error = None
 
-        """ Creates concatenated safe name for collection """
+        # writer stage state - batches received out of order are held until their turn
+        self._pending = {}
+        self._next_seq = 0
+        self._workers_done = 0
+        self._current = None
+        self._position = 0
+        self._exhausted = False
 
-        converted_library_name = re.sub(r"[-@_.\/ ]", "", self.library_name).lower()
-        if len(converted_library_name) > 18:
-            converted_library_name = converted_library_name[0:18]
+    def start(self, cursor):
 
-        converted_model_name = re.sub(r"[-@_.\/ ]", "", self.model_name).lower()
-        if len(converted_model_name) > 18:
-            # chops off the start of the model name if longer than 18 chars
-            starter = len(converted_model_name) - 18
-            converted_model_name = converted_model_name[starter:]
+        """ Starts the reader and model worker threads on the blocks cursor - returns self, which is used by
+        the vector db class in place of the cursor """
 
-        converted_account_name = re.sub(r"[-@_.\/ ]", "", self.account_name).lower()
-        if len(converted_model_name) > 7:
-            converted_account_name = converted_account_name[0:7]
+        self._cursor = cursor
 
-        # create collection name here - based on account + library + model_name
-        self.collection_name = f"{converted_account_name}_{converted_library_name}_{converted_model_name}"
+        # cursor is closed by the calling thread in close() - sqlite connections are bound to their thread
+        self._cursor.close_when_exhausted = False
 
-        return self.collection_name
+        self._threads = [threading.Thread(target=self._reader, daemon=True)]
+        for i in range(self.model_workers):
+            self._threads.append(threading.Thread(target=self._model_worker, daemon=True))
 
-    def create_db_specific_key(self):
+        for t in self._threads:
+            t.start()
 
-        """ Creates db_specific key """
+        return self
 
-        # will leave "-" and "_" in file path, but remove "@" and " "
-        model_safe_path = re.sub(r"[@ ]", "", self.model_name).lower()
-        self.collection_key = f"embedding_{self.db_name}_" + model_safe_path
+    def close(self):
 
-        return self.collection_key
+        """ Stops any running threads, e.g., if the writer stopped on an exception, and closes the cursor """
 
-    def get_blocks_cursor(self, doc_ids = None):
+        self._stop.set()
 
-        """ Retrieves a cursor from the text collection database that will define the scope of text chunks
-            to be embedded """
+        for t in self._threads:
+            t.join()
 
-        if not self.collection_key:
-            self.create_db_specific_key()
+        if self._cursor is not None:
+            self._cursor.collection_retriever.close()
+            self._cursor = None
 
-        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
-        num_of_blocks, all_blocks_cursor = cr.embedding_job_cursor(self.collection_key,doc_id=doc_ids)
+        return True
 
-        return all_blocks_cursor, num_of_blocks
+    def _put(self, q, item):
 
-    def generate_embedding_summary(self, embeddings_created):
+        """ Blocks while the queue is full - returns False if the pipeline is stopped """
 
-        """ Common summary dictionary at end of embedding job """
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
 
-        if not self.collection_key:
-            self.create_db_specific_key()
+        return False
 
-        cr = CollectionRetrieval(self.library_name,account_name=self.account_name)
-        embedded_blocks = cr.count_embedded_blocks(self.collection_key)
+    def _reader(self):
 
-        embedding_summary = {"embeddings_created": embeddings_created,
-                             "embedded_blocks": embedded_blocks,
-                             "embedding_dims": self.embedding_dims,
-                             "time_stamp": Utilities().get_current_time_now()}
+        seq = 0
+        blocks, sentences = [], []
 
-        return embedding_summary
+        try:
+            while not self._stop.is_set():
 
-    def update_text_index(self, block_ids, current_index):
+                rows = self._cursor.pull_many(self.prefetch_size)
 
-        """ Update main text collection db """
+                if not rows:
+                    break
 
-        for block_id in block_ids:
+                for block in rows:
 
-            cw = CollectionWriter(self.library_name, account_name=self.account_name)
-            cw.add_new_embedding_flag(block_id,self.collection_key,current_index)
+                    text_search = block["text_search"].strip()
 
-            current_index += 1
+                    if not text_search:
+                        continue
 
-        return current_index
+                    blocks.append(block)
+                    sentences.append(text_search)
 
-    def lookup_text_index(self, _id, key="_id"):
+                    if len(blocks) >= self.batch_size:
+                        if not self._put(self._batch_queue, (seq, blocks, sentences)):
+                            return
+                        seq += 1
+                        blocks, sentences = [], []
 
-        """Returns a single block entry from text index collection with lookup by _id - returns a list, not a cursor"""
+            if blocks:
+                self._put(self._batch_queue, (seq, blocks, sentences))
 
-        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
-        block_cursor = cr.lookup(key, _id)
+        except Exception as e:
+            self.error = e
+            self._stop.set()
 
-        return block_cursor
+        for i in range(self.model_workers):
+            self._put(self._batch_queue, self._done)
 
-    def lookup_embedding_flag(self, key, value):
+    def _model_worker(self):
 
-        """ Used to look up an embedding flag in text collection index """
+        while not self._stop.is_set():
 
-        # used specifically by FAISS index - which uses the embedding flag value as lookup
-        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
-        block_cursor = cr.embedding_key_lookup(key,value)
+            try:
+                item = self._batch_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
 
-        return block_cursor
+            if item is self._done:
+                break
 
-    def unset_text_index(self):
+            seq, blocks, sentences = item
 
-        """Removes embedding key flag for library, e.g., 'unsets' a group of blocks in text index """
+            try:
+                vectors = self.model.embedding(sentences)
+            except Exception as e:
+                self.error = e
+                self._stop.set()
+                return
 
-        cw = CollectionWriter(self.library_name, account_name=self.account_name)
-        cw.unset_embedding_flag(self.collection_key)
+            if not self._put(self._vector_queue, (seq, blocks, sentences, vectors)):
+                return
 
-        return 0
+        self._put(self._vector_queue, self._done)
 
+    def _next_batch(self):
 
-class EmbeddingMilvus:
+        """ Returns the next batch (blocks, sentences, vectors) in cursor order, or None when complete """
 
-    """
-    ``EmbeddingMilvus`` implements the interface to the ``Milvus`` vector store. It is used by the
-    ``EmbeddingHandler``.
+        while self._next_seq not in self._pending:
 
-    Parameters
-    ----------
-    library : object
-        A ``Library`` object.
+            if self.error:
+                raise self.error
 
-    model : object
-        A model object. See :mod:`models` for available models.
+            if self._workers_done >= self.model_workers:
+                return None
 
-    model_name : str, default=None
-        Name of the model.
+            try:
+                item = self._vector_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
 
-    embedding_dims : int, default=None
-        Dimension of the embedding.
+            if item is self._done:
+                self._workers_done += 1
+            else:
+                self._pending[item[0]] = item[1:]
 
-    Returns
-    -------
-    embedding_milvus : EmbeddingMilvus
-        A new ``EmbeddingMilvus`` object.
-    """
+        self._next_seq += 1
 
-    def __init__(self, library, model=None, model_name=None, embedding_dims=None):
+        return self._pending.pop(self._next_seq - 1)
 
-        self.library = library
-        self.library_name = library.library_name
-        self.account_name = library.account_name
-        self.milvus_alias = "default"
+    def pull_one(self):
 
-        self.use_milvus_lite = MilvusConfig().get_config("lite")
+        """ Cursor interface for the writer stage - returns the next block, or None when complete """
 
-        #   confirm that pymilvus installed
+        if self._current is None or self._position >= len(self._current[0]):
 
-        global GLOBAL_PYMILVUS_IMPORT
-        if not GLOBAL_PYMILVUS_IMPORT:
-            if util.find_spec("pymilvus"):
+            if self._exhausted:
+                return None
 
-                try:
-                    global pymilvus
-                    pymilvus = importlib.import_module("pymilvus")
-                    GLOBAL_PYMILVUS_IMPORT = True
-                except:
-                    raise LLMWareException(message="Exception: could not load pymilvus module.")
+            batch = self._next_batch()
 
-            else:
-                raise LLMWareException(message="Exception: need to import pymilvus to use this class.")
+            if batch is None:
+                self._exhausted = True
+                return None
 
-        # end dynamic import here
+            self._current = batch
+            self._position = 0
 
-        # look up model card
-        if not model and not model_name:
-            raise EmbeddingModelNotFoundException("no-model-or-model-name-provided")
+        block = self._current[0][self._position]
+        self._position += 1
 
-        self.model=model
-        self.model_name=model_name
-        self.embedding_dims = embedding_dims
+        return block
 
-        # if model passed (not None), then use model name
-        if self.model:
-            self.model_name = self.model.model_name
-            self.embedding_dims = self.model.embedding_dims
 
-        self.utils = _EmbeddingUtils(library_name=self.library_name,
-                                     model_name=self.model_name,
-                                     account_name=self.account_name,
-                                     db_name="milvus",
-                                     embedding_dims=self.embedding_dims)
+class _PipelinedModel:
 
-        self.collection_name = self.utils.create_safe_collection_name()
-        self.collection_key = self.utils.create_db_specific_key()
+    """Model stage of the _EmbeddingPipeline, which is passed to the vector db class in place of the model -
+    returns the vectors created by the model workers for the batch just pulled by the writer, and otherwise
+    falls back to running the model directly.   All other attributes are read from the underlying model."""
 
-        if self.use_milvus_lite:
+    def __init__(self, model, pipeline):
+        self.model = model
+        self.pipeline = pipeline
 
-            logger.info(f"update: EmbeddingHandler - Milvus - selecting 'lite' version.  If you intend to use "
-                        f"a server-based version of Milvus, please set: MilvusConfig().set_config('lite', False).")
+    def __getattr__(self, name):
+        return getattr(self.model, name)
 
-            lite_path = MilvusConfig().get_config("lite_folder_path")
-            lite_db_name = MilvusConfig().get_config("lite_name")
+    def embedding(self, sentences):
 
-            self.collection = pymilvus.MilvusClient(os.path.join(lite_path, lite_db_name))
+        current = self.pipeline._current
 
-            #   check if collection_name found in list of collections - load, if exists, else create new
-            if self.collection_name in self.collection.list_collections():
-                self.collection.load_collection(self.collection_name)
-            else:
-                schema = self.collection.create_schema(
-                    auto_id=False,
-                    enable_dynamic_field=True,
-                )
+        if current is not None and sentences == current[1]:
+            return current[2]
+
+        return self.model.embedding(sentences)
+
+
+class _EmbeddingCache:
+
+    """Persistent cache of embedding vectors, keyed by (model_name, hash of normalized text), e.g., to skip
+    re-embedding boilerplate text shared across libraries, unchanged text in re-ingested documents, and
+    repeated query strings.
+
+    The cache is a sqlite db file in the llmware_data path, with entries evicted in least-recently-used order
+    once over EmbeddingConfig 'embedding_cache_max_entries'.   Hit/miss counts are kept for the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_hash(text):
+
+        """ Hash of the text, with whitespace normalized """
+
+        return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_cache_fp():
+        return os.path.join(LLMWareConfig.get_llmware_path(), EmbeddingConfig.get_config("embedding_cache_file"))
+
+    def _connect(self):
+
+        fp = self.get_cache_fp()
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+
+        conn = sqlite3.connect(fp, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS embedding_cache (model_name TEXT, text_hash TEXT, vector BLOB, "
+                     "last_used REAL, PRIMARY KEY (model_name, text_hash))")
+        conn.execute("CREATE INDEX IF NOT EXISTS embedding_cache_last_used ON embedding_cache (last_used)")
+
+        return conn
+
+    def lookup(self, model_name, hash_list):
+
+        """ Returns dict of text_hash -> vector for entries found in the cache, and marks them as used """
+
+        found = {}
+
+        conn = self._connect()
+
+        for i in range(0, len(hash_list), 500):
+
+            chunk = hash_list[i:i+500]
+            placeholders = ", ".join(["?"] * len(chunk))
+
+            rows = conn.execute(f"SELECT text_hash, vector FROM embedding_cache WHERE model_name = ? AND "
+                                f"text_hash IN ({placeholders})", [model_name] + chunk).fetchall()
+
+            for text_hash, vector in rows:
+                found[text_hash] = np.frombuffer(vector, dtype=np.float32)
+
+        if found:
+            now = time.time()
+            conn.executemany("UPDATE embedding_cache SET last_used = ? WHERE model_name = ? AND text_hash = ?",
+                             [(now, model_name, h) for h in found])
+            conn.commit()
+
+        conn.close()
+
+        return found
+
+    def add(self, model_name, hash_list, vectors):
+
+        """ Adds new vectors to the cache, and evicts least recently used entries over the size cap """
+
+        now = time.time()
+
+        conn = self._connect()
+        conn.executemany("INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?)",
+                         [(model_name, h, np.asarray(v, dtype=np.float32).tobytes(), now)
+                          for h, v in zip(hash_list, vectors)])
+
+        max_entries = EmbeddingConfig.get_config("embedding_cache_max_entries")
+        entries = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+
+        if max_entries and entries > max_entries:
+            conn.execute("DELETE FROM embedding_cache WHERE rowid IN (SELECT rowid FROM embedding_cache "
+                         "ORDER BY last_used LIMIT ?)", (entries - max_entries,))
+
+        conn.commit()
+        conn.close()
+
+        return True
+
+    def embedding(self, model, text_sample):
+
+        """ Returns embeddings for text_sample (str or list) - looks up each text in the cache, and runs the model
+        only on the texts not found, with each unique text embedded once """
+
+        if isinstance(text_sample, list):
+            sequence = text_sample
+        else:
+            sequence = [text_sample]
+
+        if not sequence:
+            return model.embedding(text_sample)
+
+        hash_list = [self.text_hash(text) for text in sequence]
+
+        found = self.lookup(model.model_name, list(set(hash_list)))
+
+        new_texts = {}
+        for text, h in zip(sequence, hash_list):
+            if h not in found and h not in new_texts:
+                new_texts[h] = text
+
+        # repeats of the same new text within the call are counted as hits - only embedded once
+        with self._lock:
+            self.hits += len(sequence) - len(new_texts)
+            self.misses += len(new_texts)
+
+        if new_texts:
+            new_vectors = np.array(model.embedding(list(new_texts.values())), dtype=np.float32)
+            self.add(model.model_name, list(new_texts.keys()), new_vectors)
+            found.update(zip(new_texts.keys(), new_vectors))
+
+        return np.stack([found[h] for h in hash_list])
+
+    def clear(self, model_name=None):
+
+        """ Removes all entries, or only the entries for model_name, if provided """
+
+        conn = self._connect()
+
+        if model_name:
+            conn.execute("DELETE FROM embedding_cache WHERE model_name = ?", (model_name,))
+        else:
+            conn.execute("DELETE FROM embedding_cache")
+
+        conn.commit()
+        conn.close()
+
+        return True
+
+    def get_stats(self):
+
+        """ Returns hit/miss counts for the process, and number of entries in the cache """
+
+        conn = self._connect()
+        entries = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        conn.close()
+
+        lookups = self.hits + self.misses
+
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": entries}
+
+
+_embedding_cache = _EmbeddingCache()
+
+
+class _CachedEmbeddingModel:
+
+    """Wraps the model passed to the vector db class, so that model.embedding is run through the embedding
+    cache - all other attributes are read from the underlying model."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def embedding(self, text_sample, api_key=None):
+        return _embedding_cache.embedding(self.model, text_sample)
+
+
+class EmbeddingHandler:
+
+    """Provides an interface to all supported vector databases, which is used by the ``Library`` class.
+
+    ``EmbeddingHandler`` is responsible for embedding-related interactions between a library and a vector
+    store. This includes creating, reading, updating, and deleting (CRUD) embeddings. The ``EmbeddingHandler``,
+    in addition, synchronizes the vector store with the text collection database, this includes incremental
+    updates to the embeddings. Finally, it also allows one library to have multiple embeddings.
+
+    Parameters
+    ----------
+    library : Library
+        The library with which the ``EmbeddingHandler`` interacts.
+
+    Returns
+    -------
+    embedding_handler : EmbeddingHandler
+        A new ``EmbeddingHandler`` object.
+    """
+
+    def __init__(self, library):
+
+        # self.supported_embedding_dbs = LLMWareConfig().get_supported_vector_db()
+        self.supported_embedding_dbs = VectorDBRegistry().get_vector_db_list()
+
+        self.library = library
+   
+    def create_new_embedding(self, embedding_db, model, doc_ids=None, batch_size=500, pipeline=None,
+                             queue_depth=None, model_workers=None, embedding_workers=None):
+
+        """ Creates new embedding - routes to correct vector db and loads the model and text collection.
+
+        If pipeline is True, reading blocks, running the model and writing to the vector db are overlapped,
+        with up to queue_depth batches held between stages, and model_workers threads running the model.
+
+        If embedding_workers > 1, HF and sentence transformer models run each batch sharded across that
+        number of worker processes.   If EmbeddingConfig 'embedding_cache' is set, texts found in the embedding
+        cache are not re-embedded.   Defaults for all options are set in EmbeddingConfig """
+
+        if embedding_workers is None:
+            embedding_workers = EmbeddingConfig.get_config("embedding_workers")
+
+        worker_pool = None
+
+        if embedding_workers and embedding_workers > 1:
+
+            from llmware.models import EmbeddingWorkerPool
+
+            if type(model).__name__ in EmbeddingWorkerPool.supported_model_classes:
+                worker_pool = EmbeddingWorkerPool(model, workers=embedding_workers,
+                                                  start_method=EmbeddingConfig.get_config(
+                                                      "embedding_worker_start_method"))
+                model = worker_pool
+            else:
+                logger.warning(f"update: embedding_handler - embedding_workers not supported for "
+                               f"{type(model).__name__} - running embedding in the current process")
+
+        if EmbeddingConfig.get_config("embedding_cache"):
+            model = _CachedEmbeddingModel(model)
+
+        try:
+            embedding_status = self._run_embedding_job(embedding_db, model, doc_ids, batch_size, pipeline,
+                                                       queue_depth, model_workers)
+        finally:
+            if worker_pool:
+                worker_pool.close()
+
+        # any index for this library + model loaded in memory is now stale
+        _vector_index_cache.invalidate(self.library.account_name, self.library.library_name,
+                                       model_name=model.model_name, vector_db=embedding_db)
+
+        if embedding_status:
+            if "embeddings_created" in embedding_status:
+                if embedding_status["embeddings_created"] > 0:
+                    # only update if non-zero embeddings created
+                    if "embedded_blocks" in embedding_status:
+                        embedded_blocks = embedding_status["embedded_blocks"]
+                    else:
+                        embedded_blocks = -1
+                        logger.warning("update: embedding_handler - unable to determine if embeddings have "
+                                        "been properly counted and captured.   Please check if databases connected.")
+
+                    self.library.update_embedding_status("yes", model.model_name, embedding_db,
+                                                         embedded_blocks=embedded_blocks,
+                                                         embedding_dims=embedding_status["embedding_dims"],
+                                                         time_stamp=embedding_status["time_stamp"],
+                                                         index_config=embedding_status.get("index_config"))
+
+        return embedding_status
+   
+    def _run_embedding_job(self, embedding_db, model, doc_ids, batch_size, pipeline, queue_depth, model_workers):
+
+        """ Loads the vector db class and runs the embedding job, through an _EmbeddingPipeline if selected """
+
+        embedding_class = self._load_embedding_db(embedding_db, model=model)
+
+        if pipeline is None:
+            pipeline = EmbeddingConfig.get_config("pipeline")
+
+        if pipeline:
+
+            if queue_depth is None:
+                queue_depth = EmbeddingConfig.get_config("pipeline_queue_depth")
+
+            if model_workers is None:
+                model_workers = EmbeddingConfig.get_config("pipeline_model_workers")
+
+            embedding_pipeline = _EmbeddingPipeline(model, batch_size=batch_size, queue_depth=queue_depth,
+                                                    model_workers=model_workers,
+                                                    prefetch_size=EmbeddingConfig.get_config("pipeline_prefetch_size"))
+
+            embedding_class.utils.pipeline = embedding_pipeline
+            embedding_class.model = embedding_pipeline.model_stage
+
+            try:
+                embedding_status = embedding_class.create_new_embedding(doc_ids, batch_size)
+            finally:
+                embedding_pipeline.close()
+
+        else:
+            embedding_status = embedding_class.create_new_embedding(doc_ids, batch_size)
+
+        return embedding_status
+
+    def search_index(self, query_vector, embedding_db, model, sample_count=10, filter_dict=None):
+
+        """ Main entry point to vector search query - optional filter_dict of text collection key:value pairs
+        (list values match any value in the list) is pushed down into the vector search, for vector dbs that
+        support filtered search, so that sample_count results are returned from the matching blocks only """
+
+        # Need to normalize the query_vector.
+        # Sometimes it comes in as [[1.1,2.1,3.1]] (from Transformers) and sometimes as [1.1,2.1,3.1]
+        # We'll make sure it's the latter and then each Embedding Class will deal with it how it needs to
+
+        if len(query_vector) == 1:
+            query_vector = query_vector[0]
+
+        #   reuse vector db handler (with index already loaded) from process-wide cache, if available
+        cache_key = (self.library.account_name, self.library.library_name, model.model_name, embedding_db)
+        embedding_class, handler_lock = _vector_index_cache.get(cache_key)
+
+        if embedding_class is None:
+            embedding_class = self._load_embedding_db(embedding_db, model=model)
+            output = self._search(embedding_class, query_vector, sample_count, filter_dict)
+
+            # cache after the first search, which loads the index for file-based vector dbs
+            _vector_index_cache.put(cache_key, embedding_class)
+
+            return output
+
+        with handler_lock:
+            return self._search(embedding_class, query_vector, sample_count, filter_dict)
+
+    def search_index_batch(self, query_vectors, embedding_db, model, sample_count=10):
+
+        """ Vector search for a batch of query vectors - uses the multi-vector search of the vector db, if
+        available, and otherwise searches one query at a time - returns a list of (block, distance) lists,
+        one per query """
+
+        cache_key = (self.library.account_name, self.library.library_name, model.model_name, embedding_db)
+        embedding_class, handler_lock = _vector_index_cache.get(cache_key)
+
+        cache_on_search = embedding_class is None
+        if cache_on_search:
+            embedding_class = self._load_embedding_db(embedding_db, model=model)
+            handler_lock = threading.Lock()
+
+        query_vectors = [np.asarray(v).reshape(-1) for v in query_vectors]
+
+        with handler_lock:
+            if hasattr(embedding_class, "search_index_batch"):
+                output = embedding_class.search_index_batch(query_vectors, sample_count=sample_count)
+            else:
+                output = [embedding_class.search_index(v, sample_count=sample_count) for v in query_vectors]
+
+        if cache_on_search:
+            _vector_index_cache.put(cache_key, embedding_class)
+
+        return output
+
+    @staticmethod
+    def _search(embedding_class, query_vector, sample_count, filter_dict):
+
+        """ Runs search on the vector db class, passing filter_dict if the class supports filtered search - if
+        not, the search is run without the filter, and the filter is applied by the caller on the results """
+
+        if filter_dict:
+            if "filter_dict" in inspect.signature(embedding_class.search_index).parameters:
+                return embedding_class.search_index(query_vector, sample_count=sample_count, filter_dict=filter_dict)
+
+            logger.debug(f"update: EmbeddingHandler - {embedding_class.__class__.__name__} does not support "
+                         f"filtered search - running search without filter")
+
+        return embedding_class.search_index(query_vector, sample_count=sample_count)
+
+    def delete_index(self, embedding_db, model_name, embedding_dims):
+
+        """ Deletes vector embedding - note:  does not delete the underlying text collection """
+
+        embedding_class = self._load_embedding_db(embedding_db, model_name=model_name,
+                                                  embedding_dims=embedding_dims)
+        embedding_class.delete_index()
+
+        _vector_index_cache.invalidate(self.library.account_name, self.library.library_name,
+                                       model_name=model_name, vector_db=embedding_db)
+        self.library.update_embedding_status("delete", model_name, embedding_db,
+                                             embedded_blocks=0, delete_record=True)
+
+        return 0
+
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids, e.g., blocks deleted from the text collection, from each embedding
+        installed on the library, and updates the embedded block count in the library card - returns the list of
+        (embedding_db, model_name) embeddings from which the vectors could not be deleted """
+
+        not_deleted = []
+
+        if not block_ids:
+            return not_deleted
+
+        block_ids = [str(_id) for _id in block_ids]
+
+        for emb in self.library.get_embedding_status() or []:
+
+            if emb.get("embedding_status") != "yes":
+                continue
+
+            embedding_db, model_name = emb["embedding_db"], emb["embedding_model"]
+
+            try:
+                embedding_class = self._load_embedding_db(embedding_db, model_name=model_name,
+                                                          embedding_dims=emb.get("embedding_dims"))
+                vectors_deleted = embedding_class.delete_vectors(block_ids)
+            except Exception as e:
+                logger.warning(f"warning: EmbeddingHandler - could not delete vectors from {embedding_db} - "
+                               f"{model_name} - {e}")
+                not_deleted.append((embedding_db, model_name))
+                continue
+
+            _vector_index_cache.invalidate(self.library.account_name, self.library.library_name,
+                                           model_name=model_name, vector_db=embedding_db)
+
+            embedding_summary = embedding_class.utils.generate_embedding_summary(0)
+
+            self.library.update_embedding_status("yes", model_name, embedding_db,
+                                                 embedded_blocks=embedding_summary["embedded_blocks"],
+                                                 embedding_dims=emb.get("embedding_dims"),
+                                                 time_stamp=embedding_summary["time_stamp"],
+                                                 index_config=emb.get("index_config"))
+
+            logger.info(f"update: EmbeddingHandler - deleted vectors - {embedding_db} - {model_name} - "
+                        f"{vectors_deleted}")
+
+        return not_deleted
+
+    @staticmethod
+    def clear_index_cache():
+
+        """ Releases all vector indexes held in the process-wide index cache """
+
+        return _vector_index_cache.clear()
+
+    @staticmethod
+    def get_index_cache_stats():
+
+        """ Returns hit/miss counts and number of vector indexes held in the process-wide index cache """
+
+        return {"hits": _vector_index_cache.hits, "misses": _vector_index_cache.misses,
+                "entries": len(_vector_index_cache._cache)}
+
+    @staticmethod
+    def cached_embedding(model, text_sample):
+
+        """ Returns model embedding of text_sample, looking up each text in the embedding cache first """
+
+        return _embedding_cache.embedding(model, text_sample)
+
+    @staticmethod
+    def clear_embedding_cache(model_name=None):
+
+        """ Removes all entries in the embedding cache, or only the entries for model_name, if provided """
+
+        return _embedding_cache.clear(model_name=model_name)
+
+    @staticmethod
+    def get_embedding_cache_stats():
+
+        """ Returns hit/miss counts and hit rate for the process, and number of entries in the embedding cache """
+
+        return _embedding_cache.get_stats()
+
+    def _load_embedding_db(self, embedding_db, model=None, model_name=None, embedding_dims=None):
+
+        """ Looks up and loads the selected vector database """
+
+        if not embedding_db in self.supported_embedding_dbs:
+            raise UnsupportedEmbeddingDatabaseException(embedding_db)
+
+        vdb = self.supported_embedding_dbs[embedding_db]
+
+        #   dynamically load the module/class for the specific embedding handler
+        vdb_module = vdb["module"]
+        vdb_class = vdb["class"]
+        vdb_module = importlib.import_module(vdb_module)
+
+        if hasattr(vdb_module, vdb_class):
+            model_class = getattr(vdb_module, vdb_class)
+
+            return model_class(self.library, model=model, model_name=model_name,embedding_dims=embedding_dims)
+
+        else:
+            raise LLMWareException(message=f"Exception: could not find class implementation for {embedding_db}, which "
+                                           f"is expected at: {vdb_module} - {vdb_class}.")
+
+    def generate_index_name(self, account_name, library_name, model_name, max_component_length=19):
+
+        """ Creates a unique name for the vector index that concats library_name + model_name + account_name """
+
+        index_name = account_name
+
+        # Remove non-alphanumerics from the remaining components and if still longer than the max, remove middle chars
+        for s in [library_name, model_name]:
+            s = re.sub(r'\W+', '', s)
+            if len(s) > max_component_length:
+                excess_length = len(s) - max_component_length
+                left_length = (len(s) - excess_length) // 2
+                right_start = left_length + excess_length
+                index_name += s[:left_length] + s[right_start:]
+
+        # Return the lowercase name:
+        return index_name.lower()
+
+
+class _EmbeddingUtils:
+
+    """Provides functions to vector stores, such as creating names for the text collection database as well
+    as creating names for vector such, and creating a summary of an embedding process.
+
+    ``_EmbeddingUTils`` provides utilities used by all vector stores, especially in interaction and
+    synchronization with the underlying text collection database. In short, it has functions for
+    creating names, the text index, the embedding flag, the block curser, and the embedding summary.
+
+    Parameters
+    ----------
+    library_name : str, default=None
+        Name of the library.
+
+    model_name : str, default=None
+        Name of the model.
+
+    account_name : str, default=None
+        Name of the account.
+
+    db_name : str, default=None
+        Name of the vector store.
+
+    embedding_dims : int, default=None
+        Dimension of the embedding.
+
+    Returns
+    -------
+    embedding_utils : _EmbeddingUtils
+        A new ``_EmbeddingUtils`` object.
+    """
+
+    def __init__(self, library_name=None, model_name=None, account_name=None,db_name=None,
+                 embedding_dims=None):
+
+        self.library_name = library_name
+        self.account_name = account_name
+        self.model_name = model_name
+        self.db_name = db_name
+        self.embedding_dims = embedding_dims
+        self.collection_key= None
+        self.collection_name= None
+
+        # set by EmbeddingHandler to run the embedding job through an _EmbeddingPipeline
+        self.pipeline = None
+
+    def create_safe_collection_name(self):
+
+        """ Creates concatenated safe name for collection """
+
+        converted_library_name = re.sub(r"[-@_.\/ ]", "", self.library_name).lower()
+        if len(converted_library_name) > 18:
+            converted_library_name = converted_library_name[0:18]
+
+        converted_model_name = re.sub(r"[-@_.\/ ]", "", self.model_name).lower()
+        if len(converted_model_name) > 18:
+            # chops off the start of the model name if longer than 18 chars
+            starter = len(converted_model_name) - 18
+            converted_model_name = converted_model_name[starter:]
+
+        converted_account_name = re.sub(r"[-@_.\/ ]", "", self.account_name).lower()
+        if len(converted_model_name) > 7:
+            converted_account_name = converted_account_name[0:7]
+
+        # create collection name here - based on account + library + model_name
+        self.collection_name = f"{converted_account_name}_{converted_library_name}_{converted_model_name}"
+
+        return self.collection_name
+
+    def create_db_specific_key(self):
+
+        """ Creates db_specific key """
+
+        # will leave "-" and "_" in file path, but remove "@" and " "
+        model_safe_path = re.sub(r"[@ ]", "", self.model_name).lower()
+        self.collection_key = f"embedding_{self.db_name}_" + model_safe_path
+
+        return self.collection_key
+
+    def get_blocks_cursor(self, doc_ids = None):
+
+        """ Retrieves a cursor from the text collection database that will define the scope of text chunks
+            to be embedded """
+
+        if not self.collection_key:
+            self.create_db_specific_key()
+
+        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
+        num_of_blocks, all_blocks_cursor = cr.embedding_job_cursor(self.collection_key,doc_id=doc_ids)
+
+        if self.pipeline is not None:
+            all_blocks_cursor = self.pipeline.start(all_blocks_cursor)
+
+        return all_blocks_cursor, num_of_blocks
+
+    def generate_embedding_summary(self, embeddings_created):
+
+        """ Common summary dictionary at end of embedding job """
+
+        if not self.collection_key:
+            self.create_db_specific_key()
+
+        cr = CollectionRetrieval(self.library_name,account_name=self.account_name)
+        embedded_blocks = cr.count_embedded_blocks(self.collection_key)
+
+        embedding_summary = {"embeddings_created": embeddings_created,
+                             "embedded_blocks": embedded_blocks,
+                             "embedding_dims": self.embedding_dims,
+                             "time_stamp": Utilities().get_current_time_now()}
+
+        return embedding_summary
+
+    def update_text_index(self, block_ids, current_index):
+
+        """ Update main text collection db - writes the embedding flags for the full batch in a single
+        bulk update, rather than one write (and one connection) per block """
+
+        id_value_list = []
+
+        for block_id in block_ids:
+            id_value_list.append((block_id, current_index))
+            current_index += 1
+
+        if id_value_list:
+            cw = CollectionWriter(self.library_name, account_name=self.account_name)
+            cw.add_new_embedding_flag_bulk(id_value_list, self.collection_key)
+
+        return current_index
+
+    def lookup_text_index(self, _id, key="_id"):
+
+        """Returns a single block entry from text index collection with lookup by _id - returns a list, not a cursor"""
+
+        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
+        block_cursor = cr.lookup(key, _id)
+
+        return block_cursor
+
+    def lookup_text_index_list(self, id_list):
+
+        """ Returns the block entries for a list of _ids from the text index collection in a single batch
+        lookup - returns a list, in no particular order """
+
+        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
+        block_list = cr.lookup_id_list(id_list)
+
+        return block_list
+
+    def lookup_hits_batch(self, hit_lists):
+
+        """ Resolves lists of (block _id, distance) hits, one list per query, into lists of (block, distance) with a
+        single batch lookup in the text collection - each hit gets its own copy of the block entry """
+
+        all_ids = list(set(str(_id) for _id, distance in itertools.chain.from_iterable(hit_lists)))
+
+        blocks_by_id = {}
+        for block in self.lookup_text_index_list(all_ids):
+            blocks_by_id[str(block["_id"])] = block
+
+        output = []
+        for hits in hit_lists:
+            output.append([(dict(blocks_by_id[str(_id)]), distance) for _id, distance in hits
+                           if str(_id) in blocks_by_id])
+
+        return output
+
+    def lookup_filter_ids(self, filter_dict):
+
+        """ Returns the list of block _ids in the text collection matching filter_dict - used to build the
+        id selector for filtered vector search """
+
+        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
+
+        return cr.lookup_ids_by_filter(filter_dict)
+
+    @staticmethod
+    def filter_doc_ids(filter_dict):
+
+        """ Returns list of int doc_IDs if filter_dict is a doc_ID filter only, which can be applied directly
+        on the block_doc_id stored with each vector in some vector dbs - otherwise returns None """
+
+        if filter_dict and list(filter_dict.keys()) == ["doc_ID"]:
+            doc_ids = filter_dict["doc_ID"]
+            if not isinstance(doc_ids, list):
+                doc_ids = [doc_ids]
+            try:
+                return [int(d) for d in doc_ids]
+            except (TypeError, ValueError):
+                return None
+
+        return None
+
+    def lookup_embedding_flag(self, key, value):
+
+        """ Used to look up an embedding flag in text collection index """
+
+        # used specifically by FAISS index - which uses the embedding flag value as lookup
+        cr = CollectionRetrieval(self.library_name, account_name=self.account_name)
+        block_cursor = cr.embedding_key_lookup(key,value)
+
+        return block_cursor
+
+    def unset_text_index(self):
+
+        """Removes embedding key flag for library, e.g., 'unsets' a group of blocks in text index """
+
+        cw = CollectionWriter(self.library_name, account_name=self.account_name)
+        cw.unset_embedding_flag(self.collection_key)
+
+        return 0
+
+
+class EmbeddingMilvus:
+
+    """
+    ``EmbeddingMilvus`` implements the interface to the ``Milvus`` vector store. It is used by the
+    ``EmbeddingHandler``.
+
+    Parameters
+    ----------
+    library : object
+        A ``Library`` object.
+
+    model : object
+        A model object. See :mod:`models` for available models.
+
+    model_name : str, default=None
+        Name of the model.
+
+    embedding_dims : int, default=None
+        Dimension of the embedding.
+
+    Returns
+    -------
+    embedding_milvus : EmbeddingMilvus
+        A new ``EmbeddingMilvus`` object.
+    """
+
+    def __init__(self, library, model=None, model_name=None, embedding_dims=None):
+
+        self.library = library
+        self.library_name = library.library_name
+        self.account_name = library.account_name
+        self.milvus_alias = "default"
+
+        self.use_milvus_lite = MilvusConfig().get_config("lite")
+
+        #   confirm that pymilvus installed
+
+        global GLOBAL_PYMILVUS_IMPORT
+        if not GLOBAL_PYMILVUS_IMPORT:
+            if util.find_spec("pymilvus"):
+
+                try:
+                    global pymilvus
+                    pymilvus = importlib.import_module("pymilvus")
+                    GLOBAL_PYMILVUS_IMPORT = True
+                except:
+                    raise LLMWareException(message="Exception: could not load pymilvus module.")
+
+            else:
+                raise LLMWareException(message="Exception: need to import pymilvus to use this class.")
+
+        # end dynamic import here
+
+        # look up model card
+        if not model and not model_name:
+            raise EmbeddingModelNotFoundException("no-model-or-model-name-provided")
+
+        self.model=model
+        self.model_name=model_name
+        self.embedding_dims = embedding_dims
+
+        # if model passed (not None), then use model name
+        if self.model:
+            self.model_name = self.model.model_name
+            self.embedding_dims = self.model.embedding_dims
+
+        self.utils = _EmbeddingUtils(library_name=self.library_name,
+                                     model_name=self.model_name,
+                                     account_name=self.account_name,
+                                     db_name="milvus",
+                                     embedding_dims=self.embedding_dims)
+
+        self.collection_name = self.utils.create_safe_collection_name()
+        self.collection_key = self.utils.create_db_specific_key()
+
+        if self.use_milvus_lite:
+
+            logger.info(f"update: EmbeddingHandler - Milvus - selecting 'lite' version.  If you intend to use "
+                        f"a server-based version of Milvus, please set: MilvusConfig().set_config('lite', False).")
+
+            lite_path = MilvusConfig().get_config("lite_folder_path")
+            lite_db_name = MilvusConfig().get_config("lite_name")
+
+            self.collection = pymilvus.MilvusClient(os.path.join(lite_path, lite_db_name))
+
+            #   check if collection_name found in list of collections - load, if exists, else create new
+            if self.collection_name in self.collection.list_collections():
+                self.collection.load_collection(self.collection_name)
+            else:
+                schema = self.collection.create_schema(
+                    auto_id=False,
+                    enable_dynamic_field=True,
+                )
 
                 # add fields to schema
                 schema.add_field(field_name="block_mongo_id", datatype=pymilvus.DataType.VARCHAR, is_primary=True,
@@ -449,54 +1234,524 @@ class EmbeddingMilvus:
                 schema.add_field(field_name="block_doc_id", datatype=pymilvus.DataType.INT64)
                 schema.add_field(field_name="embedding_vector", datatype=pymilvus.DataType.FLOAT_VECTOR, dim=self.embedding_dims)
 
-                index_params = self.collection.prepare_index_params()
+                index_params = self.collection.prepare_index_params()
+
+                # add index
+                index_params.add_index(
+                    field_name="embedding_vector",
+                    metric_type="L2",
+                )
+
+                self.collection.create_collection(collection_name=self.collection_name,
+                                                  dimension=self.embedding_dims,
+                                                  schema=schema,
+                                                  index_params=index_params)
+
+        else:
+
+            #   connect to Milvus server
+
+            logger.info(f"update: EmbeddingHandler - Milvus - connecting to Milvus server instance.  To use "
+                        f"Milvus 'lite', set MilvusConfig().set_config('lite', True).")
+
+            pymilvus.connections.connect(self.milvus_alias,
+                                host=MilvusConfig.get_config("host"),
+                                port=MilvusConfig.get_config("port"),
+                                db_name=MilvusConfig.get_config("db_name"))
+
+            if not pymilvus.utility.has_collection(self.collection_name):
+                fields = [
+                    pymilvus.FieldSchema(name="block_mongo_id",
+                                         dtype=pymilvus.DataType.VARCHAR, is_primary=True, max_length=30,auto_id=False),
+                    pymilvus.FieldSchema(name="block_doc_id", dtype=pymilvus.DataType.INT64),
+                    pymilvus.FieldSchema(name="embedding_vector", dtype=pymilvus.DataType.FLOAT_VECTOR,
+                                         dim=self.embedding_dims)
+                ]
+
+                collection = pymilvus.Collection(self.collection_name, pymilvus.CollectionSchema(fields))
+                index_params = {
+                    "metric_type": "L2",
+                    "index_type": "IVF_FLAT",
+                    "params": {"nlist": 1024}
+                }
+                collection.create_index("embedding_vector", index_params)
+
+            self.collection = pymilvus.Collection(self.collection_name)
+
+    def create_new_embedding(self, doc_ids = None, batch_size=500):
+
+        """ Create new embedding """
+
+        all_blocks_cursor, num_of_blocks = self.utils.get_blocks_cursor(doc_ids=doc_ids)
+
+        # Initialize a new status
+        status = Status(self.account_name)
+        status.new_embedding_status(self.library_name, self.model_name, num_of_blocks)
+
+        embeddings_created = 0
+        current_index = 0
+        finished = False
+
+        while not finished:
+
+            block_ids, doc_ids, sentences = [], [], []
+
+            # Build the next batch
+            for i in range(batch_size):
+
+                block = all_blocks_cursor.pull_one()
+
+                if not block:
+                    finished = True
+                    break
+
+                text_search = block["text_search"].strip()
+                if not text_search or len(text_search) < 1:
+                    continue
+
+                # data model
+                block_ids.append(str(block["_id"]))
+                doc_ids.append(int(block["doc_ID"]))
+                sentences.append(text_search)
+
+            if len(sentences) > 0:
+
+                # Process the batch
+                vectors = self.model.embedding(sentences)
+                data = [block_ids, doc_ids, vectors]
+
+                if self.use_milvus_lite:
+
+                    d=[]
+                    for i, vec in enumerate(vectors):
+                        new_row = {"block_mongo_id": block_ids[i], "block_doc_id": doc_ids[i], "embedding_vector": vec}
+                        d.append(new_row)
+
+                    self.collection.insert(data=d, collection_name=self.collection_name)
+
+                else:
+                    self.collection.insert(data)
+
+                current_index = self.utils.update_text_index(block_ids,current_index)
+
+                embeddings_created += len(sentences)
+
+                status.increment_embedding_status(self.library_name, self.model_name, len(sentences))
+
+                # will add configuration options to show/display
+                logger.info(f"update: embedding_handler - Milvus - Embeddings Created: {embeddings_created} of {num_of_blocks}")
+
+        if not self.use_milvus_lite:
+            self.collection.flush()
+
+        embedding_summary = self.utils.generate_embedding_summary(embeddings_created)
+
+        logger.info(f"update: EmbeddingHandler - Milvus - embedding_summary - {embedding_summary}")
+
+        return embedding_summary
+
+    def _filter_expr(self, filter_dict):
+
+        """ Milvus boolean expression for filter_dict - on block_doc_id, for a doc_ID filter, and otherwise on the
+        block _ids matching the filter in the text collection """
+
+        doc_ids = self.utils.filter_doc_ids(filter_dict)
+
+        if doc_ids is not None:
+            return f"block_doc_id in {doc_ids}"
+
+        return f"block_mongo_id in {json.dumps(self.utils.lookup_filter_ids(filter_dict))}"
+
+    def search_index(self, query_embedding_vector, sample_count=10, filter_dict=None):
+
+        return self.search_index_batch([query_embedding_vector], sample_count=sample_count,
+                                       filter_dict=filter_dict)[0]
+
+    def search_index_batch(self, query_embedding_vectors, sample_count=10, filter_dict=None):
+
+        """ Searches all query vectors in a single Milvus search request, and resolves the hits with a single
+        batch lookup in the text collection - returns a list of (block, distance) lists, one per query """
+
+        expr = self._filter_expr(filter_dict) if filter_dict else None
+
+        if not self.use_milvus_lite:
+            self.collection.load()
+
+            search_params = {
+                "field_name": "embedding_vector",
+                "metric_type": "L2",
+                "params": {"nprobe": 10}
+            }
+
+            # TODO: add optional / configurable partitions
+
+            result = self.collection.search(
+                data=list(query_embedding_vectors),
+                anns_field="embedding_vector",
+                param=search_params,
+                limit=sample_count,
+                expr=expr,
+                output_fields=["block_mongo_id"]
+            )
+
+        else:
+
+            search_params = {
+                "field_name": "embedding_vector",
+                "metric_type": "L2",
+                # "params": {"nprobe": 10}
+            }
+
+            result = self.collection.search(collection_name=self.collection_name,
+                data=list(query_embedding_vectors),
+                anns_field="embedding_vector",
+                search_params=search_params,
+                limit=sample_count,
+                filter=expr or "",
+                output_fields=["block_mongo_id"]
+            )
+
+        hit_lists = []
+        for hits in result:
+
+            hit_list = []
+            for hit in hits:
+
+                if self.use_milvus_lite:
+
+                    try:
+                        # _id = int(hit["entity"]["block_mongo_id"])
+                        _id = hit["entity"]["block_mongo_id"]
+                    except:
+                        logger.warning(f"update: EmbeddingHandler - Milvus - search - unexpected - "
+                                       f"could not convert to number - {hit}")
+                        continue
+
+                    distance = hit["distance"]
+                else:
+                    _id = hit.entity.get('block_mongo_id')
+                    distance = hit.distance
+
+                hit_list.append((_id, distance))
+
+            hit_lists.append(hit_list)
+
+        return self.utils.lookup_hits_batch(hit_lists)
+   
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids from the Milvus collection """
+
+        expr = f"block_mongo_id in {json.dumps([str(_id) for _id in block_ids])}"
+
+        if self.use_milvus_lite:
+            self.collection.delete(collection_name=self.collection_name, filter=expr)
+        else:
+            self.collection.delete(expr)
+            self.collection.flush()
+
+        return len(block_ids)
+
+    def delete_index(self):
+
+        if not self.use_milvus_lite:
+
+            collection = pymilvus.Collection(self.collection_name)
+            collection.release()
+            pymilvus.utility.drop_collection(self.collection_name)
+            pymilvus.connections.disconnect(self.milvus_alias)
+
+        else:
+            # delete
+            res = self.collection.delete(collection_name=self.collection_name)
+
+        # Synchronize and remove embedding flag from collection db
+        self.utils.unset_text_index()
+
+        return 1
+
+
+def _import_faiss():
+
+    """ Dynamic import of faiss - shared by EmbeddingFAISS and EmbeddingFAISS.build_faiss_index """
+
+    global GLOBAL_FAISS_IMPORT
+    if not GLOBAL_FAISS_IMPORT:
+        if util.find_spec("faiss"):
+
+            try:
+                global faiss
+                faiss = importlib.import_module("faiss")
+                GLOBAL_FAISS_IMPORT = True
+            except:
+                raise LLMWareException(message="Exception: could not load faiss module.")
+
+        else:
+            raise LLMWareException(message="Exception: need to import faiss to use this class.")
+
+    return faiss
+
+
+class EmbeddingFAISS:
+
+    """Implements the vector database FAISS.
+
+    ``EmbeddingFAISS`` implements the interface to the ``FAISS`` vector database. It is used by the
+    ``EmbeddingHandler``.
+
+    Parameters
+    ----------
+    library : object
+        A ``Library`` object.
+
+    model : object
+        A model object. See :mod:`models` for available models.
+
+    model_name : str, default=None
+        Name of the model.
+
+    embedding_dims : int, default=None
+        Dimension of the embedding.
+
+    Returns
+    -------
+    embedding_faiss : EmbeddingFAISS
+        A new ``EmbeddingFAISS`` object.
+    """
+
+    def __init__(self, library, model=None, model_name=None, embedding_dims=None):
+
+        _import_faiss()
+
+        self.library = library
+        self.library_name = library.library_name
+        self.account_name = library.account_name
+        self.index = None
+
+        # look up model card
+        if not model and not model_name:
+            raise EmbeddingModelNotFoundException("no-model-or-model-name-provided")
+
+        self.model=model
+        self.model_name=model_name
+        self.embedding_dims=embedding_dims
+
+        # if model passed (not None), then use model name and embedding dims
+        if self.model:
+            self.model_name = self.model.model_name
+            self.embedding_dims = self.model.embedding_dims
+
+        # embedding file name here
+        self.utils = _EmbeddingUtils(library_name=self.library_name,
+                                     model_name=self.model_name,
+                                     account_name=self.account_name,
+                                     db_name="faiss",
+                                     embedding_dims=self.embedding_dims)
+
+        self.collection_name = self.utils.create_safe_collection_name()
+        self.collection_key = self.utils.create_db_specific_key()
 
-                # add index
-                index_params.add_index(
-                    field_name="embedding_vector",
-                    metric_type="L2",
-                )
+        # will leave "-" and "_" in file path, but remove "@" and " "
+        model_safe_path = re.sub(r"[@\/. ]", "", self.model_name).lower()
+        self.embedding_file_path = os.path.join(self.library.embedding_path, model_safe_path, "embedding_file_faiss")
+        # self.collection_key = "embedding_faiss_" + model_safe_path
 
-                self.collection.create_collection(collection_name=self.collection_name,
-                                                  dimension=self.embedding_dims,
-                                                  schema=schema,
-                                                  index_params=index_params)
+        #   reverse lookup of FAISS index position -> block _id in the text collection, saved as a .npy array
+        #   next to the FAISS index and memory-mapped on load
+        self.id_map_file_path = self.embedding_file_path + "_ids.npy"
+        self.id_map = None
 
-        else:
+        #   positions of deleted vectors, marked in the id map, which are excluded from search
+        self.deleted_positions = None
 
-            #   connect to Milvus server
+        #   index type and build/search parameters - saved in the library card embedding record
+        self.index_config = self._get_index_config()
 
-            logger.info(f"update: EmbeddingHandler - Milvus - connecting to Milvus server instance.  To use "
-                        f"Milvus 'lite', set MilvusConfig().set_config('lite', True).")
+    def _get_index_config(self):
 
-            pymilvus.connections.connect(self.milvus_alias,
-                                host=MilvusConfig.get_config("host"),
-                                port=MilvusConfig.get_config("port"),
-                                db_name=MilvusConfig.get_config("db_name"))
+        """ Looks up the index config saved with this embedding in the library card - if not found, e.g., new
+        embedding, then uses the current FAISSConfig settings """
 
-            if not pymilvus.utility.has_collection(self.collection_name):
-                fields = [
-                    pymilvus.FieldSchema(name="block_mongo_id",
-                                         dtype=pymilvus.DataType.VARCHAR, is_primary=True, max_length=30,auto_id=False),
-                    pymilvus.FieldSchema(name="block_doc_id", dtype=pymilvus.DataType.INT64),
-                    pymilvus.FieldSchema(name="embedding_vector", dtype=pymilvus.DataType.FLOAT_VECTOR,
-                                         dim=self.embedding_dims)
-                ]
+        try:
+            embedding_record = self.library.get_embedding_status()
+        except:
+            embedding_record = None
 
-                collection = pymilvus.Collection(self.collection_name, pymilvus.CollectionSchema(fields))
-                index_params = {
-                    "metric_type": "L2",
-                    "index_type": "IVF_FLAT",
-                    "params": {"nlist": 1024}
-                }
-                collection.create_index("embedding_vector", index_params)
+        if embedding_record:
+            for emb in embedding_record:
+                if emb.get("embedding_model") == self.model_name and emb.get("embedding_db") == "faiss":
+                    if emb.get("index_config"):
+                        return dict(emb["index_config"])
 
-            self.collection = pymilvus.Collection(self.collection_name)
+        return FAISSConfig.get_index_config()
 
-    def create_new_embedding(self, doc_ids = None, batch_size=500):
+    @staticmethod
+    def build_faiss_index(embedding_dims, index_config, training_vectors=None):
 
-        """ Create new embedding """
+        """ Creates a new FAISS index for the index_config - ivf_flat and ivf_pq indexes are trained on
+        training_vectors, and the parameters are capped to fit the size of the training sample.
+
+        Returns the index and the index_config with the parameters actually applied. """
+
+        _import_faiss()
+
+        index_config = dict(index_config)
+        index_type = index_config.get("index_type", "flat")
+        d = int(embedding_dims)
+
+        if index_type == "flat":
+            return faiss.IndexFlatL2(d), index_config
+
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(d, int(index_config["M"]))
+            index.hnsw.efConstruction = int(index_config["efConstruction"])
+            return index, index_config
+
+        if index_type in ["ivf_flat", "ivf_pq"]:
+
+            if training_vectors is None or len(training_vectors) == 0:
+                raise LLMWareException(message=f"Exception: FAISS {index_type} index requires training vectors.")
+
+            training_vectors = np.ascontiguousarray(training_vectors, dtype=np.float32)
+            n_train = len(training_vectors)
+
+            nlist = max(1, min(int(index_config["nlist"]), n_train))
+            index_config.update({"nlist": nlist})
+
+            quantizer = faiss.IndexFlatL2(d)
+
+            if index_type == "ivf_flat":
+                index = faiss.IndexIVFFlat(quantizer, d, nlist)
+            else:
+                # number of sub-quantizers must divide the embedding dims
+                pq_m = max(1, min(int(index_config["pq_m"]), d))
+                while d % pq_m != 0:
+                    pq_m -= 1
+
+                # each sub-quantizer trains 2^nbits centroids - needs at least as many training points
+                pq_nbits = max(1, min(int(index_config["pq_nbits"]), int(np.log2(n_train))))
+
+                index_config.update({"pq_m": pq_m, "pq_nbits": pq_nbits})
+                index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, pq_nbits)
+
+            # note: faiss python wrapper holds a reference to the quantizer in the ivf constructor
+            index.train(training_vectors)
+
+            return index, index_config
+
+        raise LLMWareException(message=f"Exception: FAISS index_type not supported - {index_type}")
+
+    @staticmethod
+    def _get_index_type(index):
 
+        """ Returns the index_type name for a loaded FAISS index """
+
+        if isinstance(index, faiss.IndexHNSW):
+            return "hnsw"
+
+        if isinstance(index, faiss.IndexIVFPQ):
+            return "ivf_pq"
+
+        if isinstance(index, faiss.IndexIVF):
+            return "ivf_flat"
+
+        return "flat"
+
+    def _apply_search_params(self):
+
+        """ Sets search-time parameters on the loaded index from the index config """
+
+        if hasattr(self.index, "nprobe") and "nprobe" in self.index_config:
+            self.index.nprobe = int(self.index_config["nprobe"])
+
+        if hasattr(self.index, "hnsw") and "efSearch" in self.index_config:
+            self.index.hnsw.efSearch = int(self.index_config["efSearch"])
+
+        return True
+
+    def _id_map_dtype(self):
+
+        """ Block _ids are integers on SQL text collections, and 24-char ObjectId strings on Mongo """
+
+        if LLMWareConfig().get_active_db() == "mongo":
+            return np.dtype("S24")
+
+        return np.dtype(np.int64)
+
+    @staticmethod
+    def _deleted_id(dtype):
+
+        """ Marks the id map position of a deleted vector - not a valid block _id in the text collection """
+
+        return np.array(b"" if dtype.kind == "S" else -1, dtype=dtype)
+
+    def _load_id_map(self):
+
+        """ Memory-maps the FAISS id -> block _id array, if found - returns None if not found """
+
+        if os.path.exists(self.id_map_file_path):
+            try:
+                return np.load(self.id_map_file_path, mmap_mode="r")
+            except:
+                logger.warning(f"update: EmbeddingHandler - FAISS - could not load id map file - "
+                               f"{self.id_map_file_path} - will use per-result lookups in text collection.")
+
+        return None
+
+    def _save_id_map(self, id_map):
+
+        """ Writes the id map to a temp file and swaps into place """
+
+        tmp_path = self.embedding_file_path + "_ids_tmp.npy"
+        np.save(tmp_path, id_map)
+        os.replace(tmp_path, self.id_map_file_path)
+
+        return True
+
+    def create_new_embedding(self, doc_ids=None, batch_size=100):
+
+        """ Load or create index - ivf indexes are created and trained once the first train_sample_size
+        vectors have been embedded """
+
+        index_type = self.index_config.get("index_type", "flat")
+
+        if not self.index:
+            if os.path.exists(self.embedding_file_path):
+
+                #   shifted faiss to optional dependency
+                #   note: there may be an edge case where this faiss command would fail even with
+                #   library installed, but we throw dependency not installed error as most likely cause
+
+                try:
+                    self.index = faiss.read_index(self.embedding_file_path)
+                except:
+                    raise DependencyNotInstalledException("faiss-cpu")
+
+                # existing index keeps its type - e.g., if created before index_config saved in library card
+                self.index_config.update({"index_type": self._get_index_type(self.index)})
+
+            elif index_type not in ["ivf_flat", "ivf_pq"]:
+                try:
+                    self.index, self.index_config = self.build_faiss_index(self.embedding_dims, self.index_config)
+                except LLMWareException:
+                    raise
+                except:
+                    raise DependencyNotInstalledException("faiss-cpu")
+
+        # reverse lookup map - only extended if it is in sync with the index loaded
+        starting_index = self.index.ntotal if self.index else 0
+        existing_id_map = self._load_id_map() if self.index else None
+
+        if existing_id_map is not None and len(existing_id_map) != starting_index:
+            existing_id_map = None
+
+        new_block_ids = []
+
+        # vectors held until the ivf training sample is complete
+        train_sample_size = FAISSConfig.get_config("train_sample_size")
+        pending_vectors, pending_block_ids = [], []
+
+        # get cursor for text collection with blocks requiring embedding
         all_blocks_cursor, num_of_blocks = self.utils.get_blocks_cursor(doc_ids=doc_ids)
 
         # Initialize a new status
@@ -504,12 +1759,15 @@ class EmbeddingMilvus:
         status.new_embedding_status(self.library_name, self.model_name, num_of_blocks)
 
         embeddings_created = 0
-        current_index = 0
         finished = False
 
+        # batch_size = 50
+
+        # all_blocks_iter = iter(all_blocks_cursor)
+
         while not finished:
 
-            block_ids, doc_ids, sentences = [], [], []
+            block_ids, sentences = [], []
 
             # Build the next batch
             for i in range(batch_size):
@@ -521,150 +1779,261 @@ class EmbeddingMilvus:
                     break
 
                 text_search = block["text_search"].strip()
+
                 if not text_search or len(text_search) < 1:
                     continue
-
-                # data model
                 block_ids.append(str(block["_id"]))
-                doc_ids.append(int(block["doc_ID"]))
-                sentences.append(text_search)
 
+                sentences.append(text_search)
+            
             if len(sentences) > 0:
-
                 # Process the batch
-                vectors = self.model.embedding(sentences)
-                data = [block_ids, doc_ids, vectors]
+                vectors = np.array(self.model.embedding(sentences), dtype=np.float32)
 
-                if self.use_milvus_lite:
+                if self.index is None:
+                    pending_vectors.append(vectors)
+                    pending_block_ids += block_ids
+                else:
+                    self.index.add(vectors)
+                    self.utils.update_text_index(block_ids, self.index.ntotal - len(block_ids))
+                    new_block_ids += block_ids
 
-                    d=[]
-                    for i, vec in enumerate(vectors):
-                        new_row = {"block_mongo_id": block_ids[i], "block_doc_id": doc_ids[i], "embedding_vector": vec}
-                        d.append(new_row)
+                embeddings_created += len(sentences)
+                status.increment_embedding_status(self.library.library_name, self.model_name, len(sentences))
 
-                    self.collection.insert(data=d, collection_name=self.collection_name)
+                # will add options to display/hide
+                logger.info(f"update: embedding_handler - FAISS - Embeddings Created: {embeddings_created} of {num_of_blocks}")
 
-                else:
-                    self.collection.insert(data)
+            #   once training sample is collected (or no more blocks), train the ivf index and add held vectors
+            if self.index is None and pending_vectors:
+                if finished or len(pending_block_ids) >= train_sample_size:
 
-                current_index = self.utils.update_text_index(block_ids,current_index)
+                    training_vectors = np.concatenate(pending_vectors)
 
-                embeddings_created += len(sentences)
+                    logger.info(f"update: embedding_handler - FAISS - training {index_type} index on "
+                                f"{len(training_vectors)} vectors")
 
-                status.increment_embedding_status(self.library_name, self.model_name, len(sentences))
+                    self.index, self.index_config = self.build_faiss_index(self.embedding_dims, self.index_config,
+                                                                           training_vectors=training_vectors)
+                    self.index.add(training_vectors)
+                    self.utils.update_text_index(pending_block_ids, 0)
+                    new_block_ids += pending_block_ids
 
-                # will add configuration options to show/display
-                logger.info(f"update: embedding_handler - Milvus - Embeddings Created: {embeddings_created} of {num_of_blocks}")
+                    pending_vectors, pending_block_ids = [], []
 
-        if not self.use_milvus_lite:
-            self.collection.flush()
+        if self.index is None:
+            # no blocks found to train a new ivf index - nothing to save
+            return self.utils.generate_embedding_summary(embeddings_created)
+
+        # Ensure any existing file is removed before saving
+        if os.path.exists(self.embedding_file_path):
+            os.remove(self.embedding_file_path)
+        os.makedirs(os.path.dirname(self.embedding_file_path), exist_ok=True)
+        faiss.write_index(self.index, self.embedding_file_path)
+
+        #   save reverse lookup map - if the index pre-dates the map, then it can not be rebuilt from the new
+        #   blocks only, and search_index will fall back to lookups by embedding flag
+        if existing_id_map is not None or starting_index == 0:
+
+            id_map = np.array(new_block_ids, dtype=self._id_map_dtype())
+
+            if existing_id_map is not None and len(existing_id_map) > 0:
+                id_map = np.concatenate([np.array(existing_id_map), id_map])
+
+            # release the memory-map on the existing file before it is replaced
+            existing_id_map = None
+            self._save_id_map(id_map)
+
+        elif os.path.exists(self.id_map_file_path):
+            os.remove(self.id_map_file_path)
+
+        self.id_map = None
 
         embedding_summary = self.utils.generate_embedding_summary(embeddings_created)
+        embedding_summary.update({"index_config": self.index_config})
 
-        logger.info(f"update: EmbeddingHandler - Milvus - embedding_summary - {embedding_summary}")
+        logger.info(f"update: EmbeddingHandler - FAISS - embedding_summary - {embedding_summary}")
 
         return embedding_summary
 
-    def search_index(self, query_embedding_vector, sample_count=10):
+    def _search_parameters(self, positions, exclude=False):
 
-        if not self.use_milvus_lite:
-            self.collection.load()
+        """ FAISS search parameters with an id selector over the index positions, or over all other positions
+        if exclude is True - the index search-time parameters are passed as well, as they are not read from the
+        index when parameters are provided """
 
-            search_params = {
-                "field_name": "embedding_vector",
-                "metric_type": "L2",
-                "params": {"nprobe": 10}
-            }
+        selector = faiss.IDSelectorBatch(np.ascontiguousarray(positions, dtype=np.int64))
 
-            # TODO: add optional / configurable partitions
+        if exclude:
+            selector = faiss.IDSelectorNot(selector)
 
-            result = self.collection.search(
-                data=[query_embedding_vector],
-                anns_field="embedding_vector",
-                param=search_params,
-                limit=sample_count,
-                output_fields=["block_mongo_id"]
-            )
+        if isinstance(self.index, faiss.IndexIVF):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=int(self.index.nprobe))
 
-        else:
+        if isinstance(self.index, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=int(self.index.hnsw.efSearch))
 
-            search_params = {
-                "field_name": "embedding_vector",
-                "metric_type": "L2",
-                # "params": {"nprobe": 10}
-            }
+        return faiss.SearchParameters(sel=selector)
 
-            result = self.collection.search(collection_name=self.collection_name,
-                data=[query_embedding_vector],
-                anns_field="embedding_vector",
-                search_params=search_params,
-                limit=sample_count,
-                output_fields=["block_mongo_id"]
-            )
+    def search_index (self, query_embedding_vector, sample_count=10, filter_dict=None):
 
-        block_list = []
-        for hits in result:
-            for hit in hits:
+        """ Search FAISS index - with filter_dict, the search is restricted to the index positions of the blocks
+        matching the filter in the text collection, with an id selector """
 
-                if self.use_milvus_lite:
+        return self.search_index_batch([query_embedding_vector], sample_count=sample_count,
+                                       filter_dict=filter_dict)[0]
 
-                    try:
-                        # _id = int(hit["entity"]["block_mongo_id"])
-                        _id = hit["entity"]["block_mongo_id"]
-                    except:
-                        logger.warning(f"update: EmbeddingHandler - Milvus - search - unexpected - "
-                                       f"could not convert to number - {hit}")
-                        _id = -1
-                else:
-                    _id = hit.entity.get('block_mongo_id')
+    def search_index_batch(self, query_embedding_vectors, sample_count=10, filter_dict=None):
 
-                block_result_list = self.utils.lookup_text_index(_id)
+        """ Searches the FAISS index with the matrix of query vectors in one call - returns a list of
+        (block, distance) lists, one per query """
+
+        if not self.index:
+            self.index = faiss.read_index(self.embedding_file_path)
+
+        self._apply_search_params()
+
+        if self.id_map is None:
+            self.id_map = self._load_id_map()
+
+            if self.id_map is not None:
+                self.deleted_positions = np.flatnonzero(self.id_map == self._deleted_id(self.id_map.dtype))
+
+        search_params = None
+
+        #   id selector requires the id map - otherwise, search is run without the filter
+        if filter_dict and self.id_map is not None and len(self.id_map) == self.index.ntotal:
+
+            filter_ids = np.array(self.utils.lookup_filter_ids(filter_dict), dtype=self.id_map.dtype)
+            positions = np.flatnonzero(np.isin(self.id_map, filter_ids))
+
+            if len(positions) == 0:
+                return [[] for q in query_embedding_vectors]
+
+            search_params = self._search_parameters(positions)
+
+        elif self.id_map is not None and len(self.id_map) == self.index.ntotal and len(self.deleted_positions) > 0:
+            search_params = self._search_parameters(self.deleted_positions, exclude=True)
+
+        queries = np.array(query_embedding_vectors, dtype=np.float32).reshape(len(query_embedding_vectors), -1)
+
+        distance_list, index_list = self.index.search(queries, sample_count, params=search_params)
+
+        #   resolve all hits with a single batch lookup in the text collection, if id map in sync with index
+        if self.id_map is not None and len(self.id_map) == self.index.ntotal:
+
+            hit_lists = []
+            for q in range(len(queries)):
+
+                hits = []
+                for i, index in enumerate(index_list[q]):
+                    index_int = int(index.item())
+                    # faiss returns -1 if fewer than sample_count results found
+                    if 0 <= index_int < len(self.id_map):
+                        _id = self.id_map[index_int]
+                        if isinstance(_id, bytes):
+                            _id = _id.decode("utf-8")
+                        hits.append((str(_id), distance_list[q][i]))
+
+                hit_lists.append(hits)
+
+            return self.utils.lookup_hits_batch(hit_lists)
+
+        output = []
+        for q in range(len(queries)):
+
+            block_list = []
+            for i, index in enumerate(index_list[q]):
+
+                index_int = int(index.item())
+
+                #   FAISS is unique in that it requires a 'reverse lookup' to match the FAISS index in the
+                #   text collection
+
+                block_result_list = self.utils.lookup_embedding_flag(self.collection_key,index_int)
+
+                # block_result_list = self.utils.lookup_text_index(index_int, key=self.collection_key)
 
                 for block in block_result_list:
+                    block_list.append((block, distance_list[q][i]))
 
-                    if self.use_milvus_lite:
-                        distance = hit["distance"]
-                    else:
-                        distance = hit.distance
+            output.append(block_list)
 
-                    block_list.append((block, distance))
+        return output
 
-                """
-                try:
-                    block = block_cursor.next()
-                    block_list.append((block, hit.distance))
-                except StopIteration:
-                    # The cursor is empty (no blocks found)
-                    continue 
-                """
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids, found by their positions in the id map - from a flat index, the
+        vectors are removed, and the id map and the embedding flags of the blocks after them are shifted down.
+        Other index types do not renumber on remove, so the positions are marked as deleted in the id map, and
+        excluded from search.   Returns the count of vectors deleted. """
+
+        if not os.path.exists(self.embedding_file_path):
+            return 0
+
+        self.index = faiss.read_index(self.embedding_file_path)
+        id_map = self._load_id_map()
+
+        if id_map is None or len(id_map) != self.index.ntotal:
+            raise LLMWareException(message=f"Exception: FAISS id map not found or not in sync with the index - "
+                                           f"{self.id_map_file_path} - to remove the vectors, delete and re-install "
+                                           f"the embedding")
+
+        id_map = np.array(id_map)
+        positions = np.flatnonzero(np.isin(id_map, np.array(block_ids, dtype=id_map.dtype)))
+
+        if len(positions) == 0:
+            return 0
+
+        if isinstance(self.index, faiss.IndexFlat):
+
+            self.index.remove_ids(faiss.IDSelectorBatch(positions.astype(np.int64)))
+            id_map = np.delete(id_map, positions)
+
+            shifted_ids = [_id.decode("utf-8") if isinstance(_id, bytes) else str(_id)
+                           for _id in id_map[positions[0]:].tolist()]
+            self.utils.update_text_index(shifted_ids, int(positions[0]))
+
+        else:
+            id_map[positions] = self._deleted_id(id_map.dtype)
+
+        os.remove(self.embedding_file_path)
+        faiss.write_index(self.index, self.embedding_file_path)
+        self._save_id_map(id_map)
+
+        self.id_map = None
+        self.deleted_positions = None
+
+        return len(positions)
 
-        return block_list
-   
     def delete_index(self):
 
-        if not self.use_milvus_lite:
+        """ Delete FAISS index """
+
+        if os.path.exists(self.embedding_file_path):
+            os.remove(self.embedding_file_path)
 
-            collection = pymilvus.Collection(self.collection_name)
-            collection.release()
-            pymilvus.utility.drop_collection(self.collection_name)
-            pymilvus.connections.disconnect(self.milvus_alias)
+            # remove emb key - 'unset' the blocks in the text collection
+            self.utils.unset_text_index()
 
-        else:
-            # delete
-            res = self.collection.delete(collection_name=self.collection_name)
+        if os.path.exists(self.id_map_file_path):
+            os.remove(self.id_map_file_path)
 
-        # Synchronize and remove embedding flag from collection db
-        self.utils.unset_text_index()
+        self.index = None
+        self.id_map = None
+        self.deleted_positions = None
 
         return 1
 
 
-class EmbeddingFAISS:
+class EmbeddingNumpyMMap:
 
-    """Implements the vector database FAISS.
+    """Implements a built-in vector store with numpy, with no additional dependencies.
 
-    ``EmbeddingFAISS`` implements the interface to the ``FAISS`` vector database. It is used by the
-    ``EmbeddingHandler``.
+    ``EmbeddingNumpyMMap`` stores normalized embedding vectors in an append-only file, with a parallel file of
+    block _ids, and memory-maps both on search.   Search is exact, with a blocked matrix-vector product over the
+    stored vectors and an argpartition top-k.   It is intended for small to medium-sized libraries, and is used
+    by the ``EmbeddingHandler``.
 
     Parameters
     ----------
@@ -682,32 +2051,15 @@ class EmbeddingFAISS:
 
     Returns
     -------
-    embedding_faiss : EmbeddingFAISS
-        A new ``EmbeddingFAISS`` object.
+    embedding_numpy_mmap : EmbeddingNumpyMMap
+        A new ``EmbeddingNumpyMMap`` object.
     """
 
     def __init__(self, library, model=None, model_name=None, embedding_dims=None):
 
-        global GLOBAL_FAISS_IMPORT
-        if not GLOBAL_FAISS_IMPORT:
-            if util.find_spec("faiss"):
-
-                try:
-                    global faiss
-                    faiss = importlib.import_module("faiss")
-                    GLOBAL_FAISS_IMPORT = True
-                except:
-                    raise LLMWareException(message="Exception: could not load faiss module.")
-
-            else:
-                raise LLMWareException(message="Exception: need to import faiss to use this class.")
-
-        # end dynamic import here
-
         self.library = library
         self.library_name = library.library_name
         self.account_name = library.account_name
-        self.index = None
 
         # look up model card
         if not model and not model_name:
@@ -722,43 +2074,120 @@ class EmbeddingFAISS:
             self.model_name = self.model.model_name
             self.embedding_dims = self.model.embedding_dims
 
-        # embedding file name here
         self.utils = _EmbeddingUtils(library_name=self.library_name,
                                      model_name=self.model_name,
                                      account_name=self.account_name,
-                                     db_name="faiss",
+                                     db_name="numpy_mmap",
                                      embedding_dims=self.embedding_dims)
 
         self.collection_name = self.utils.create_safe_collection_name()
         self.collection_key = self.utils.create_db_specific_key()
 
-        # will leave "-" and "_" in file path, but remove "@" and " "
         model_safe_path = re.sub(r"[@\/. ]", "", self.model_name).lower()
-        self.embedding_file_path = os.path.join(self.library.embedding_path, model_safe_path, "embedding_file_faiss")
-        # self.collection_key = "embedding_faiss_" + model_safe_path
+        base_path = os.path.join(self.library.embedding_path, model_safe_path, "embedding_file_numpy_mmap")
 
-    def create_new_embedding(self, doc_ids=None, batch_size=100):
+        self.vector_file_path = base_path + ".vec"
+        self.id_file_path = base_path + "_ids.vec"
 
-        """ Load or create index """
+        #   header with dtype, dims and the count of vectors committed - rewritten after each appended batch,
+        #   so its mtime also marks the index as changed for the vector index cache
+        self.embedding_file_path = base_path + ".json"
 
-        if not self.index:
-            if os.path.exists(self.embedding_file_path):
+        self.header = None
+        self.vectors = None
+        self.ids = None
 
-                #   shifted faiss to optional dependency
-                #   note: there may be an edge case where this faiss command would fail even with
-                #   library installed, but we throw dependency not installed error as most likely cause
+    def _load_header(self):
 
-                try:
-                    self.index = faiss.read_index(self.embedding_file_path)
-                except:
-                    raise DependencyNotInstalledException("faiss-cpu")
-            else:
-                try:
-                    self.index = faiss.IndexFlatL2(self.embedding_dims)
-                except:
-                    raise DependencyNotInstalledException("faiss-cpu")
+        if os.path.exists(self.embedding_file_path):
+            with open(self.embedding_file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        return None
+
+    def _save_header(self, header):
+
+        """ Writes the header to a temp file and swaps into place - the commit point for each appended batch """
+
+        tmp_path = self.embedding_file_path + "_tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(header, f)
+
+        os.replace(tmp_path, self.embedding_file_path)
+
+        return True
+
+    def _id_dtype(self):
+
+        """ Block _ids are integers on SQL text collections, and 24-char ObjectId strings on Mongo """
+
+        if LLMWareConfig().get_active_db() == "mongo":
+            return np.dtype("S24")
+
+        return np.dtype(np.int64)
+
+    @staticmethod
+    def _normalize(vectors):
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        return vectors / norms
+
+    @staticmethod
+    def _encode(vectors, dtype):
+
+        """ Converts normalized float32 vectors to the storage dtype - int8 is scaled by 127 """
+
+        if dtype == "int8":
+            return np.clip(np.rint(vectors * 127), -127, 127).astype(np.int8)
+
+        return vectors.astype(dtype)
+
+    def _load(self):
+
+        """ Memory-maps the committed vectors and block _ids """
+
+        self.header = self._load_header()
+
+        if not self.header or self.header["count"] == 0:
+            self.vectors, self.ids = None, None
+            return False
+
+        count, dims = self.header["count"], self.header["dims"]
+
+        self.vectors = np.memmap(self.vector_file_path, dtype=np.dtype(self.header["dtype"]), mode="r",
+                                 shape=(count, dims))
+        self.ids = np.memmap(self.id_file_path, dtype=np.dtype(self.header["id_dtype"]), mode="r", shape=(count,))
+
+        return True
+
+    def create_new_embedding(self, doc_ids=None, batch_size=500):
+
+        """ Appends new vectors and block _ids to the index files, and commits the count after each batch """
+
+        header = self._load_header()
+
+        if not header:
+            header = {"dtype": NumpyMMapConfig.get_config("dtype"), "dims": int(self.embedding_dims),
+                      "id_dtype": self._id_dtype().str, "count": 0}
+
+        dtype = np.dtype(header["dtype"])
+        id_dtype = np.dtype(header["id_dtype"])
+
+        # release any memory-map held on the files before appending
+        self.vectors, self.ids = None, None
+
+        os.makedirs(os.path.dirname(self.vector_file_path), exist_ok=True)
+
+        #   drop anything past the committed count, e.g., from an interrupted job
+        for fp, row_size in [(self.vector_file_path, dtype.itemsize * header["dims"]),
+                             (self.id_file_path, id_dtype.itemsize)]:
+            if os.path.exists(fp) and os.path.getsize(fp) > header["count"] * row_size:
+                os.truncate(fp, header["count"] * row_size)
 
-        # get cursor for text collection with blocks requiring embedding
         all_blocks_cursor, num_of_blocks = self.utils.get_blocks_cursor(doc_ids=doc_ids)
 
         # Initialize a new status
@@ -768,86 +2197,219 @@ class EmbeddingFAISS:
         embeddings_created = 0
         finished = False
 
-        # batch_size = 50
+        vector_file = open(self.vector_file_path, "ab")
+        id_file = open(self.id_file_path, "ab")
 
-        # all_blocks_iter = iter(all_blocks_cursor)
+        try:
+            while not finished:
 
-        while not finished:
+                block_ids, sentences = [], []
 
-            block_ids, sentences = [], []
-            current_index = self.index.ntotal
+                # Build the next batch
+                for i in range(batch_size):
 
-            # Build the next batch
-            for i in range(batch_size):
+                    block = all_blocks_cursor.pull_one()
 
-                block = all_blocks_cursor.pull_one()
+                    if not block:
+                        finished = True
+                        break
 
-                if not block:
-                    finished = True
-                    break
+                    text_search = block["text_search"].strip()
 
-                text_search = block["text_search"].strip()
+                    if not text_search or len(text_search) < 1:
+                        continue
 
-                if not text_search or len(text_search) < 1:
-                    continue
-                block_ids.append(str(block["_id"]))
+                    block_ids.append(str(block["_id"]))
+                    sentences.append(text_search)
 
-                sentences.append(text_search)
-            
-            if len(sentences) > 0:
-                # Process the batch
-                vectors = self.model.embedding(sentences)
-                self.index.add(np.array(vectors))
+                if len(sentences) > 0:
 
-                current_index = self.utils.update_text_index(block_ids,current_index)
+                    vectors = self._encode(self._normalize(self.model.embedding(sentences)), dtype)
 
-                embeddings_created += len(sentences)
-                status.increment_embedding_status(self.library.library_name, self.model_name, len(sentences))
+                    vector_file.write(vectors.tobytes())
+                    id_file.write(np.array(block_ids, dtype=id_dtype).tobytes())
+                    vector_file.flush()
+                    id_file.flush()
 
-                # will add options to display/hide
-                logger.info(f"update: embedding_handler - FAISS - Embeddings Created: {embeddings_created} of {num_of_blocks}")
-        
-        # Ensure any existing file is removed before saving
-        if os.path.exists(self.embedding_file_path):
-            os.remove(self.embedding_file_path)
-        os.makedirs(os.path.dirname(self.embedding_file_path), exist_ok=True)
-        faiss.write_index(self.index, self.embedding_file_path)
+                    self.utils.update_text_index(block_ids, header["count"])
+
+                    header["count"] += len(block_ids)
+                    self._save_header(header)
+
+                    embeddings_created += len(sentences)
+                    status.increment_embedding_status(self.library_name, self.model_name, len(sentences))
+
+                    logger.info(f"update: embedding_handler - NumpyMMap - Embeddings Created: "
+                                f"{embeddings_created} of {num_of_blocks}")
+
+        finally:
+            vector_file.close()
+            id_file.close()
 
         embedding_summary = self.utils.generate_embedding_summary(embeddings_created)
 
-        logger.info(f"update: EmbeddingHandler - FAISS - embedding_summary - {embedding_summary}")
+        logger.info(f"update: EmbeddingHandler - NumpyMMap - embedding_summary - {embedding_summary}")
 
         return embedding_summary
 
-    def search_index (self, query_embedding_vector, sample_count=10):
+    @staticmethod
+    def top_k_search(vectors, queries, k, block_size=65536, positions=None):
 
-        """ Search FAISS index """
+        """ Exact top-k by inner product of queries (m x d, float32) over vectors (n x d, any dtype, e.g.,
+        memory-mapped), scored in blocks of block_size vectors - returns (scores, indexes), each m x k, sorted
+        by descending score.   If positions (sorted array of row indexes) is provided, only those rows are
+        scored. """
 
-        if not self.index:
-            self.index = faiss.read_index(self.embedding_file_path)
+        count = len(vectors) if positions is None else len(positions)
+        k = min(k, count)
 
-        distance_list, index_list = self.index.search(np.array([query_embedding_vector]), sample_count)
+        #   float16 + int8 blocks are converted to float32 for the matmul - smaller blocks keep the converted
+        #   copy (~16MB) in cache
+        if vectors.dtype != np.float32 and vectors.ndim == 2:
+            block_size = min(block_size, max(1024, (1 << 24) // (4 * vectors.shape[1])))
 
-        block_list = []
-        for i, index in enumerate(index_list[0]):
+        top_scores, top_index = None, None
 
-            index_int = int(index.item())
+        for start in range(0, count, block_size):
 
-            #   FAISS is unique in that it requires a 'reverse lookup' to match the FAISS index in the
-            #   text collection
+            if positions is None:
+                block = vectors[start:start+block_size]
+            else:
+                block = vectors[positions[start:start+block_size]]
 
-            block_result_list = self.utils.lookup_embedding_flag(self.collection_key,index_int)
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
 
-            # block_result_list = self.utils.lookup_text_index(index_int, key=self.collection_key)
+            scores = queries @ block.T
 
-            for block in block_result_list:
-                block_list.append((block, distance_list[0][i]))
+            #   keep top-k of the block, and merge with top-k so far
+            block_k = min(k, scores.shape[1])
+            candidates = np.argpartition(-scores, block_k - 1, axis=1)[:, :block_k]
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
 
-        return block_list
+            if positions is None:
+                candidates = candidates + start
+            else:
+                candidates = positions[candidates + start]
+
+            if top_scores is None:
+                top_scores, top_index = candidate_scores, candidates
+            else:
+                top_scores = np.concatenate([top_scores, candidate_scores], axis=1)
+                top_index = np.concatenate([top_index, candidates], axis=1)
+
+                keep = np.argpartition(-top_scores, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(top_scores, keep, axis=1)
+                top_index = np.take_along_axis(top_index, keep, axis=1)
+
+        order = np.argsort(-top_scores, axis=1)
+
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top_index, order, axis=1)
+
+    def search_index(self, query_embedding_vector, sample_count=10, filter_dict=None):
+
+        """ Search numpy_mmap index """
+
+        return self.search_index_batch([query_embedding_vector], sample_count=sample_count,
+                                       filter_dict=filter_dict)[0]
+
+    def search_index_batch(self, query_embedding_vectors, sample_count=10, filter_dict=None):
+
+        """ Searches the index for a list of query vectors in a single pass over the stored vectors - returns a
+        list of (block, distance) lists, one per query, with distance as squared L2 between normalized vectors.
+        With filter_dict, only the vectors of blocks matching the filter in the text collection are scored. """
+
+        if self.vectors is None:
+            self._load()
+
+        if self.vectors is None or sample_count < 1:
+            return [[] for q in query_embedding_vectors]
+
+        positions = None
+
+        if filter_dict:
+
+            filter_ids = np.array(self.utils.lookup_filter_ids(filter_dict), dtype=self.ids.dtype)
+            positions = np.flatnonzero(np.isin(self.ids, filter_ids))
+
+            if len(positions) == 0:
+                return [[] for q in query_embedding_vectors]
+
+        queries = self._normalize(np.array(query_embedding_vectors, dtype=np.float32)
+                                  .reshape(len(query_embedding_vectors), -1))
+
+        scale = 127.0 if self.header["dtype"] == "int8" else 1.0
+
+        top_scores, top_index = self.top_k_search(self.vectors, queries, sample_count,
+                                                  block_size=NumpyMMapConfig.get_config("search_block_size"),
+                                                  positions=positions)
+        top_scores = top_scores / scale
+
+        distances = np.maximum(2.0 - 2.0 * top_scores, 0.0)
+
+        #   resolve hits for all queries with a single batch lookup in the text collection
+        hit_lists = []
+        for q, row in enumerate(top_index):
+            hits = []
+            for j, index in enumerate(row):
+                _id = self.ids[index]
+                if isinstance(_id, bytes):
+                    _id = _id.decode("utf-8")
+                hits.append((str(_id), float(distances[q][j])))
+            hit_lists.append(hits)
+
+        return self.utils.lookup_hits_batch(hit_lists)
+
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids - the vector and id files are rewritten without them, and the
+        positions of the blocks after them are updated in the text collection.   Returns the count of vectors
+        deleted. """
+
+        if not self._load():
+            return 0
+
+        keep = ~np.isin(self.ids, np.array(block_ids, dtype=self.ids.dtype))
+        vectors_deleted = int(len(keep) - np.count_nonzero(keep))
+
+        if vectors_deleted == 0:
+            self.vectors, self.ids = None, None
+            return 0
+
+        header = dict(self.header)
+        kept_ids = np.array(self.ids[keep])
+        block_size = NumpyMMapConfig.get_config("search_block_size")
+
+        with open(self.vector_file_path + "_tmp", "wb") as vector_file:
+            for start in range(0, len(keep), block_size):
+                vector_file.write(np.ascontiguousarray(self.vectors[start:start+block_size]
+                                                       [keep[start:start+block_size]]).tobytes())
+
+        with open(self.id_file_path + "_tmp", "wb") as id_file:
+            id_file.write(kept_ids.tobytes())
+
+        # release the memory-maps on the files before they are replaced
+        self.vectors, self.ids = None, None
+
+        os.replace(self.vector_file_path + "_tmp", self.vector_file_path)
+        os.replace(self.id_file_path + "_tmp", self.id_file_path)
+
+        header["count"] = len(kept_ids)
+        self._save_header(header)
+        self.header = None
+
+        first_deleted = int(np.argmin(keep))
+        shifted_ids = [_id.decode("utf-8") if isinstance(_id, bytes) else str(_id)
+                       for _id in kept_ids[first_deleted:].tolist()]
+        self.utils.update_text_index(shifted_ids, first_deleted)
+
+        return vectors_deleted
 
     def delete_index(self):
 
-        """ Delete FAISS index """
+        """ Delete numpy_mmap index """
+
+        self.vectors, self.ids = None, None
 
         if os.path.exists(self.embedding_file_path):
             os.remove(self.embedding_file_path)
@@ -855,8 +2417,15 @@ class EmbeddingFAISS:
             # remove emb key - 'unset' the blocks in the text collection
             self.utils.unset_text_index()
 
+        for fp in [self.vector_file_path, self.id_file_path]:
+            if os.path.exists(fp):
+                os.remove(fp)
+
+        self.header = None
+
         return 1
 
+
 class EmbeddingLanceDB:
 
     """Implements the vector database LanceDB.
@@ -1030,11 +2599,20 @@ class EmbeddingLanceDB:
 
             return embedding_summary
     
-    def search_index(self, query_embedding_vector, sample_count=10):
+    def search_index(self, query_embedding_vector, sample_count=10, filter_dict=None):
+
         try:
-            result = self.index.search(query=query_embedding_vector.tolist())\
-                .select(["id", "vector"])\
-                .limit(sample_count).to_pandas()
+            search = self.index.search(query=query_embedding_vector.tolist())
+
+            #   only the block _id is stored with each vector - filter is applied on the matching block _ids
+            if filter_dict:
+                filter_ids = self.utils.lookup_filter_ids(filter_dict)
+                if not filter_ids:
+                    return []
+                id_list = ", ".join(["'" + str(_id) + "'" for _id in filter_ids])
+                search = search.where(f"id IN ({id_list})", prefilter=True)
+
+            result = search.select(["id", "vector"]).limit(sample_count).to_pandas()
 
             block_list = []
 
@@ -1057,6 +2635,32 @@ class EmbeddingLanceDB:
 
         return block_list
 
+    def search_index_batch(self, query_embedding_vectors, sample_count=10):
+
+        """ Runs the LanceDB search for each query vector, and resolves the hits for all queries with a single
+        batch lookup in the text collection - returns a list of (block, distance) lists, one per query """
+
+        try:
+            hit_lists = []
+            for v in query_embedding_vectors:
+                result = self.index.search(query=np.asarray(v).tolist()).select(["id", "vector"])\
+                    .limit(sample_count).to_pandas()
+                hit_lists.append([(_id, score) for (_, _id, vec, score) in result.itertuples(name=None)])
+
+        except Exception as e:
+            raise LLMWareException(message=f"Exception: LanceDB - {e}")
+
+        return self.utils.lookup_hits_batch(hit_lists)
+
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids from the LanceDB table """
+
+        id_list = ", ".join(["'" + str(_id) + "'" for _id in block_ids])
+        self.index.delete(f"id IN ({id_list})")
+
+        return len(block_ids)
+
     def delete_index(self):
 
         self.db.drop_table(self.collection_name)
@@ -1268,6 +2872,17 @@ class EmbeddingPinecone:
 
         return block_list
 
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids from the Pinecone index """
+
+        block_ids = [str(_id) for _id in block_ids]
+
+        for start in range(0, len(block_ids), 1000):
+            self.index.delete(ids=block_ids[start:start+1000])
+
+        return len(block_ids)
+
     def delete_index(self, index_name):
 
         pinecone.delete_index(index_name)
@@ -1544,6 +3159,14 @@ class EmbeddingMongoAtlas:
 
         return block_list
 
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids from the Mongo Atlas embedding collection """
+
+        result = self.embedding_collection.delete_many({"id": {"$in": [str(_id) for _id in block_ids]}})
+
+        return result.deleted_count
+
     def delete_index(self, index_name):
 
         self.embedding_db.drop_collection(index_name)
@@ -1791,6 +3414,17 @@ class EmbeddingRedis:
 
         return block_list
 
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids from Redis - one hash per block, keyed by block _id """
+
+        pipe = self.r.pipeline()
+
+        for _id in block_ids:
+            pipe.delete(f"{self.DOC_PREFIX}:{_id}")
+
+        return sum(pipe.execute())
+
     def delete_index(self):
 
         # delete index
@@ -1981,10 +3615,47 @@ class EmbeddingQdrant:
 
         return embedding_summary
 
-    def search_index(self, query_embedding_vector, sample_count=10):
+    def _payload_filter(self, filter_dict):
+
+        """ Qdrant payload filter for filter_dict - on block_doc_id, for a doc_ID filter, and otherwise on the
+        block _ids matching the filter in the text collection """
+
+        models = qdrant_client.http.models
+
+        doc_ids = self.utils.filter_doc_ids(filter_dict)
+
+        if doc_ids is not None:
+            condition = models.FieldCondition(key="block_doc_id", match=models.MatchAny(any=doc_ids))
+        else:
+            condition = models.FieldCondition(key="block_mongo_id",
+                                              match=models.MatchAny(any=self.utils.lookup_filter_ids(filter_dict)))
+
+        return models.Filter(must=[condition])
+
+    def search_index_batch(self, query_embedding_vectors, sample_count=10):
+
+        """ Searches all query vectors in a single Qdrant batch search request, and resolves the hits with a
+        single batch lookup in the text collection - returns a list of (block, score) lists, one per query """
+
+        requests = [qdrant_client.http.models.SearchRequest(vector=np.asarray(v).tolist(), limit=sample_count,
+                                                            with_payload=True)
+                    for v in query_embedding_vectors]
+
+        search_results = self.qclient.search_batch(collection_name=self.collection_name, requests=requests)
+
+        hit_lists = []
+        for results in search_results:
+            hit_lists.append([(res.payload["block_mongo_id"], res.score) for res in results])
+
+        return self.utils.lookup_hits_batch(hit_lists)
+
+    def search_index(self, query_embedding_vector, sample_count=10, filter_dict=None):
+
+        query_filter = self._payload_filter(filter_dict) if filter_dict else None
 
         search_results = self.qclient.search(collection_name=self.collection_name,
-                                             query_vector=query_embedding_vector, limit=sample_count)
+                                             query_vector=query_embedding_vector, limit=sample_count,
+                                             query_filter=query_filter)
 
         block_list = []
         for j, res in enumerate(search_results):
@@ -1998,6 +3669,20 @@ class EmbeddingQdrant:
 
         return block_list
 
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the points of block_ids from the Qdrant collection, with a payload filter on block_mongo_id """
+
+        models = qdrant_client.http.models
+
+        condition = models.FieldCondition(key="block_mongo_id",
+                                          match=models.MatchAny(any=[str(_id) for _id in block_ids]))
+
+        self.qclient.delete(collection_name=self.collection_name,
+                            points_selector=models.FilterSelector(filter=models.Filter(must=[condition])), wait=True)
+
+        return len(block_ids)
+
     def delete_index(self):
 
         # delete index - need to add
@@ -2321,13 +4006,26 @@ class EmbeddingPGVector:
 
         return embedding_summary
 
-    def search_index(self, query_embedding_vector, sample_count=10):
+    def search_index(self, query_embedding_vector, sample_count=10, filter_dict=None):
 
         #   note: converting to np.array is 'safety' for postgres vector type
         query_embedding_vector = np.array(query_embedding_vector)
 
+        where_clause = ""
+        filter_values = ()
+
+        #   filter on block_doc_id, for a doc_ID filter, and otherwise on the block _ids matching the filter
+        if filter_dict:
+            doc_ids = self.utils.filter_doc_ids(filter_dict)
+            if doc_ids is not None:
+                where_clause = "WHERE block_doc_id = ANY(%s) "
+                filter_values = (doc_ids,)
+            else:
+                where_clause = "WHERE block_mongo_id = ANY(%s) "
+                filter_values = (self.utils.lookup_filter_ids(filter_dict),)
+
         q = (f"SELECT id, block_mongo_id, embedding <-> %s AS distance, text "
-             f"FROM {self.collection_name} ORDER BY distance LIMIT %s")
+             f"FROM {self.collection_name} {where_clause}ORDER BY distance LIMIT %s")
 
         """
         # look to generalize the query
@@ -2336,7 +4034,7 @@ class EmbeddingPGVector:
         """
 
         cursor = self.conn.cursor()
-        results = cursor.execute(q, (query_embedding_vector,sample_count))
+        results = cursor.execute(q, (query_embedding_vector,) + filter_values + (sample_count,))
 
         block_list = []
         for j, res in enumerate(results):
@@ -2356,6 +4054,21 @@ class EmbeddingPGVector:
 
         return block_list
 
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the rows of block_ids from the PG Vector table """
+
+        cursor = self.conn.cursor()
+        cursor.execute(f"DELETE FROM {self.collection_name} WHERE block_mongo_id = ANY(%s)",
+                       ([str(_id) for _id in block_ids],))
+
+        vectors_deleted = cursor.rowcount
+
+        self.conn.commit()
+        self.conn.close()
+
+        return vectors_deleted
+
     def delete_index(self, collection_name=None):
 
         # delete index - drop table
@@ -2615,6 +4328,15 @@ class EmbeddingNeo4j:
 
         return block_list
 
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the chunk nodes of block_ids from Neo4j """
+
+        self._query("MATCH (c:Chunk) WHERE c.block_id IN $block_ids DETACH DELETE c",
+                    {"block_ids": [str(_id) for _id in block_ids]})
+
+        return len(block_ids)
+
     def delete_index(self, index_name):
 
         try:
@@ -2804,14 +4526,27 @@ class EmbeddingChromaDB:
 
         return embedding_summary
 
-    def search_index(self, query_embedding_vector, sample_count=10):
+    def search_index(self, query_embedding_vector, sample_count=10, filter_dict=None):
 
         block_list = []
 
         # add one dimension because chroma expects two dimensions - a list of lists
         query_embedding_vector = query_embedding_vector.reshape(1, -1)
 
-        results = self._collection.query(query_embeddings=query_embedding_vector, n_results=sample_count)
+        #   metadata filter on doc_id, for a doc_ID filter, and otherwise on the block _ids matching the filter
+        where = None
+        if filter_dict:
+            doc_ids = self.utils.filter_doc_ids(filter_dict)
+            if doc_ids is not None:
+                where = {"doc_id": {"$in": doc_ids}}
+            else:
+                filter_ids = self.utils.lookup_filter_ids(filter_dict)
+                if not filter_ids:
+                    return block_list
+                where = {"block_id": {"$in": filter_ids}}
+
+        results = self._collection.query(query_embeddings=query_embedding_vector, n_results=sample_count,
+                                         where=where)
 
         for idx_result, _ in enumerate(results['ids'][0]):
             block_id = results['metadatas'][0][idx_result]['block_id']
@@ -2822,6 +4557,14 @@ class EmbeddingChromaDB:
 
         return block_list
 
+    def delete_vectors(self, block_ids):
+
+        """ Deletes the vectors of block_ids from the ChromaDB collection, with a metadata filter on block_id """
+
+        self._collection.delete(where={"block_id": {"$in": [str(_id) for _id in block_ids]}})
+
+        return len(block_ids)
+
     def delete_index(self):
 
         self.client.delete_collection(self._collection.name)
@@ -22,7 +22,12 @@ updating, and other tasks pertaining to Libraries via the Library Card.
 
 import shutil
 import os
+import time
 import json
+import gzip
+import io
+import importlib
+from importlib import util
 import logging
 
 from llmware.configs import LLMWareConfig, LLMWareTableSchema
@@ -30,11 +35,11 @@ from llmware.util import Utilities
 from llmware.graph import Graph
 from llmware.parsers import Parser
 from llmware.models import ModelCatalog
-from llmware.resources import CollectionRetrieval, CollectionWriter, CloudBucketManager
+from llmware.resources import CollectionRetrieval, CollectionWriter, CloudBucketManager, _SQLiteConnect
 from llmware.embeddings import EmbeddingHandler
 from llmware.exceptions import LibraryNotFoundException, SetUpLLMWareWorkspaceException, \
     CollectionDatabaseNotFoundException, ImportingSentenceTransformerRequiresModelNameException, \
-    UnsupportedEmbeddingDatabaseException, InvalidNameException
+    UnsupportedEmbeddingDatabaseException, InvalidNameException, LLMWareException
 
 logger = logging.getLogger(__name__)
 
@@ -209,6 +214,8 @@ class Library:
             os.chmod(self.tmp_path, 0o777)
             os.chmod(self.embedding_path, 0o777)
 
+        self.increment_library_version()
+
         new_library_entry = {"library_name": self.library_name,
 
                              #  track embedding status - each embedding tracked as new dict in list
@@ -369,7 +376,8 @@ class Library:
         return library_card
 
     def update_embedding_status (self, status_message, embedding_model, embedding_db,
-                                 embedded_blocks=0, embedding_dims=0,time_stamp="NA",delete_record=False):
+                                 embedded_blocks=0, embedding_dims=0,time_stamp="NA",delete_record=False,
+                                 index_config=None):
         """Invoked at the end of the embedding job to update the library card and embedding record -- generally,
         this method does not need to be invoked directly.
         
@@ -396,6 +404,10 @@ class Library:
             delete_record : bool, default=False
                 If True, marks the record for deletion.
 
+            index_config : dict, default=None
+                Vector index type and parameters used to build the embedding, e.g., FAISS index type, nlist
+                and nprobe - saved in the embedding record and applied when the index is re-loaded.
+
             Returns
             -------
             bool
@@ -415,9 +427,14 @@ class Library:
                                      "embedded_blocks": embedded_blocks,
                                      "time_stamp": time_stamp}}
 
+        if index_config:
+            update_dict["embedding"].update({"index_config": index_config})
+
         updater = LibraryCatalog(self).update_library_card(self.library_name, update_dict,
                                                            delete_record=delete_record, account_name=self.account_name)
 
+        self.increment_library_version()
+
         return True
 
     def get_embedding_status (self):
@@ -499,6 +516,24 @@ class Library:
         unique_doc_id = LibraryCatalog(self).get_and_increment_doc_id(self.library_name)
         return unique_doc_id
 
+    def reserve_doc_ids(self, count):
+        """Reserves a block of count unique doc ids for the library in a single update - used by parallel
+        ingestion, rather than get_and_increment_doc_id for each file.
+
+            Parameters
+            ----------
+            count : int
+                The number of doc ids to reserve.
+
+            Returns
+            -------
+            first_doc_id : int
+                The first doc id in the reserved block - the block runs from first_doc_id to first_doc_id + count - 1.
+        """
+
+        first_doc_id = LibraryCatalog(self).reserve_doc_ids(self.library_name, count)
+        return first_doc_id
+
     def set_incremental_docs_blocks_images(self, added_docs=0, added_blocks=0, added_images=0, added_pages=0,
                                            added_tables=0):
         """Updates the library card with incremental counters after completing a parsing job.
@@ -533,8 +568,58 @@ class Library:
                                                                           added_pages=added_pages,
                                                                           added_tables=added_tables)
 
+        self.increment_library_version()
+
         return True
 
+    def get_library_version(self):
+        """Returns the library version counter, which is incremented on each change to the blocks or embeddings
+        of the library, and used to invalidate cached query results.
+
+            Returns
+            -------
+            version : int
+                The current library version, or 0 if not set.
+        """
+
+        if not self.library_main_path:
+            return 0
+
+        fp = os.path.join(self.library_main_path, "library_version")
+
+        try:
+            with open(fp, "r") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def increment_library_version(self):
+        """Increments the library version counter - saved in the library main path.   The counter of a new
+        library starts from the creation time in ms, so that a library deleted and re-created with the same name
+        does not re-use the versions of the prior library.
+
+            Returns
+            -------
+            version : int
+                The new library version.
+        """
+
+        if not self.library_main_path or not os.path.exists(self.library_main_path):
+            return 0
+
+        current = self.get_library_version()
+        version = current + 1 if current else int(time.time() * 1000)
+
+        fp = os.path.join(self.library_main_path, "library_version")
+        tmp_fp = fp + f".{os.getpid()}.tmp"
+
+        with open(tmp_fp, "w") as f:
+            f.write(str(version))
+
+        os.replace(tmp_fp, fp)
+
+        return version
+
     def add_file(self, file_path):
         """Ingests, parses, text chunks and indexes a single selected file to a library -
         provide the full path to file.
@@ -562,7 +647,7 @@ class Library:
     def add_files (self, input_folder_path=None, encoding="utf-8",chunk_size=400,
                    get_images=True,get_tables=True, smart_chunking=1, max_chunk_size=600,
                    table_grid=True, get_header_text=True, table_strategy=1, strip_header=False,
-                   verbose_level=2, copy_files_to_library=True):
+                   verbose_level=2, copy_files_to_library=True, workers=None, type_workers=None, staging="copy"):
         """Main method to integrate documents into a Library - pass a local filepath folder and all files will be
         routed to appropriate parser by file type extension.
         
@@ -607,11 +692,29 @@ class Library:
             copy_files_to_library : bool, default=True
                 Whether to copy the files to the library.
 
+            workers : int, default=None
+                If > 1, the files are parsed in parallel in a pool of worker processes, one file per task.  Calling
+                scripts should be run under if __name__ == "__main__".
+
+            type_workers : dict, default=None
+                Caps the number of files of a type parsed at the same time with workers > 1, e.g., {"ocr": 2} -
+                by default, voice files are parsed one at a time.
+
+            staging : str, default="copy"
+                How input files are staged for parsing, and in the library copy - "copy", "reflink", "hardlink",
+                "symlink" (parsers read from the original location, library copy is a copy), or "auto" - falls
+                back to a copy if not supported. With "hardlink", the library copy shares data with the input file.
+
             Returns
             -------
             output_results : dict or None
                 A dictionary containing the results of the document integration process, including counts of added documents,
-                blocks, images, pages, tables, and rejected files. If the library card could not be identified, returns None.
+                blocks, images, pages, tables, and rejected files - and the files skipped as duplicates (unchanged, or
+                identical in content to a file already in the library), and the modified files that were parsed again,
+                replacing the blocks of their prior version (a modified file that could not be parsed is listed in
+                rejected files, and its prior version is kept) - the vectors of replaced blocks are deleted from the
+                installed embeddings, and stale_vectors counts any that could not be deleted. If the library card
+                could not be identified, returns None.
                 """
 
         if not input_folder_path:
@@ -632,7 +735,10 @@ class Library:
                                  strip_header=strip_header,
                                  table_grid=table_grid,
                                  verbose_level=verbose_level,
-                                 copy_files_to_library=copy_files_to_library).ingest(input_folder_path,dupe_check=True)
+                                 copy_files_to_library=copy_files_to_library,
+                                 staging=staging).ingest(input_folder_path,dupe_check=True,
+                                                         workers=workers,
+                                                         type_workers=type_workers)
 
         logger.debug(f"update: parsing results - {parsing_results}")
 
@@ -648,7 +754,10 @@ class Library:
                               "images_added": lib_counters_after["images"] - lib_counters_before["images"],
                               "pages_added": lib_counters_after["pages"] - lib_counters_before["pages"],
                               "tables_added": lib_counters_after["tables"] - lib_counters_before["tables"],
-                              "rejected_files": parsing_results["rejected_files"]}
+                              "rejected_files": parsing_results["rejected_files"],
+                              "duplicate_files": parsing_results["duplicate_files"],
+                              "modified_files": parsing_results["modified_files"],
+                              "stale_vectors": parsing_results["stale_vectors"]}
         else:
             logger.error("error: unexpected - could not identify the library_card correctly")
 
@@ -658,6 +767,8 @@ class Library:
         # LibraryCollection(self).create_index()
         CollectionWriter(self.library_name,account_name=self.account_name).build_text_index()
 
+        self.increment_library_version()
+
         return output_results
 
     def export_library_to_txt_file(self, output_fp=None, output_fn=None, include_text=True, include_tables=True,
@@ -717,8 +828,10 @@ class Library:
         return file_location
 
     def export_library_to_jsonl_file(self, output_fp, output_fn, include_text=True, include_tables=True,
-                                     include_images=False, dict_keys=None):
-        """Exports collection of text chunks to a jsonl file.
+                                     include_images=False, dict_keys=None, compression=None, shard_size=None,
+                                     fetch_size=1000):
+        """Exports collection of text chunks to a jsonl file - the blocks are streamed off a server-side db cursor
+        and written incrementally, so memory use does not grow with the size of the library.
         
             Parameters
             ----------
@@ -740,10 +853,22 @@ class Library:
             dict_keys : list of str, default=None
                 The keys to include in the JSONL entries. If not provided, defaults to None.
 
+            compression : str, default=None
+                Optional compression of the output file - 'gzip' (.jsonl.gz) or 'zstd' (.jsonl.zst, requires
+                the zstandard package).
+
+            shard_size : int, default=None
+                If set, the output is split into shards of up to shard_size entries, with the shard number
+                appended to the file name, e.g., {output_fn}_00000.jsonl.
+
+            fetch_size : int, default=1000
+                Number of blocks read from the db cursor in each fetch.
+
             Returns
             -------
-            file_location : str
-                The location of the exported JSONL file.
+            file_location : str or list of str
+                The location of the exported JSONL file - or the list of shard file locations, if shard_size
+                is set.
         """
 
         if not output_fp:
@@ -766,27 +891,86 @@ class Library:
             filter_list = ["text"]
 
         results = CollectionRetrieval(self.library_name,
-                                      account_name=self.account_name).filter_by_key_value_range("content_type", filter_list)
+                                      account_name=self.account_name).stream_collection({"content_type": filter_list},
+                                                                                        fetch_size=fetch_size)
 
-        file_location = os.path.join(output_fp, output_fn + ".jsonl")
-        output_file = open(file_location, "w", encoding='utf-8')
+        file_locations = []
+        output_file = None
+        shard_count = 0
 
-        for elements in results:
+        try:
+            for elements in results:
+
+                # package up each jsonl entry as dict with selected keys to extract
+                new_dict_entry = {}
+                for keys in dict_keys:
+                    if keys in elements:
+                        new_dict_entry.update({keys:elements[keys]})
 
-            # package up each jsonl entry as dict with selected keys to extract
-            new_dict_entry = {}
-            for keys in dict_keys:
-                if keys in elements:
-                    new_dict_entry.update({keys:elements[keys]})
+                if not new_dict_entry:
+                    continue
+
+                # start new file - at first entry, and at each shard_size entries if sharded
+                if output_file is None or (shard_size and shard_count >= shard_size):
+
+                    if output_file:
+                        output_file.close()
+
+                    shard_fn = output_fn + (f"_{len(file_locations):05d}" if shard_size else "")
+                    output_file, file_location = self._open_export_file(output_fp, shard_fn, compression)
+
+                    file_locations.append(file_location)
+                    shard_count = 0
 
-            if new_dict_entry:
                 jsonl_row = json.dumps(new_dict_entry)
                 output_file.write(jsonl_row)
                 output_file.write("\n")
+                shard_count += 1
 
-        output_file.close()
+            # no entries - create empty export file
+            if output_file is None:
+                shard_fn = output_fn + ("_00000" if shard_size else "")
+                output_file, file_location = self._open_export_file(output_fp, shard_fn, compression)
+                file_locations.append(file_location)
 
-        return file_location
+        finally:
+            if output_file:
+                output_file.close()
+
+        if shard_size:
+            return file_locations
+
+        return file_locations[0]
+
+    @staticmethod
+    def _open_export_file(output_fp, output_fn, compression=None):
+
+        """ Opens a jsonl export file for writing in text mode, with optional gzip or zstd compression - returns
+        the file object and file location. """
+
+        if not compression:
+            file_location = os.path.join(output_fp, output_fn + ".jsonl")
+            return open(file_location, "w", encoding='utf-8'), file_location
+
+        if compression == "gzip":
+            file_location = os.path.join(output_fp, output_fn + ".jsonl.gz")
+            return gzip.open(file_location, "wt", encoding="utf-8"), file_location
+
+        if compression == "zstd":
+
+            if not util.find_spec("zstandard"):
+                raise LLMWareException(message="Exception: need to install zstandard to write zstd compressed "
+                                               "output - `pip3 install zstandard`.")
+
+            zstandard = importlib.import_module("zstandard")
+
+            file_location = os.path.join(output_fp, output_fn + ".jsonl.zst")
+            writer = zstandard.ZstdCompressor().stream_writer(open(file_location, "wb"), closefd=True)
+
+            return io.TextIOWrapper(writer, encoding="utf-8"), file_location
+
+        raise LLMWareException(message=f"Exception: compression '{compression}' not supported - expected "
+                                       f"'gzip' or 'zstd'.")
 
     def pull_files_from_cloud_bucket (self, aws_access_key=None, aws_secret_key=None, bucket_name=None):
         """Pull files from private S3 bucket into local cache for further processing.
@@ -829,7 +1013,8 @@ class Library:
 
     def install_new_embedding (self, embedding_model_name=None, vector_db=None,
                                from_hf= False, from_sentence_transformer=False, model=None, tokenizer=None, model_api_key=None,
-                               vector_db_api_key=None, batch_size=500, max_len=None, use_gpu=True):
+                               vector_db_api_key=None, batch_size=500, max_len=None, use_gpu=True, pipeline=None,
+                               embedding_workers=None):
         """Main method for installing a new embedding on a library.
         
             Parameters
@@ -867,6 +1052,15 @@ class Library:
             use_gpu : bool, default=True
                 Whether to use GPU for embedding.
 
+            pipeline : bool, default=None
+                Whether to overlap reading blocks, running the model and writing vectors - if None, then
+                set by EmbeddingConfig 'pipeline'.
+
+            embedding_workers : int, default=None
+                Number of worker processes for cpu embedding with HF and sentence transformer models - each
+                worker holds a copy of the model pinned to its own set of cores.  If None, then set by
+                EmbeddingConfig 'embedding_workers'.
+
             Returns
             -------
             embeddings : dict or None
@@ -912,11 +1106,15 @@ class Library:
             my_model.max_len = max_len
 
         # step 2 - pass loaded embedding model to EmbeddingHandler, which will route to the appropriate resource
-        embeddings = EmbeddingHandler(self).create_new_embedding(vector_db, my_model, batch_size=batch_size)
+        embeddings = EmbeddingHandler(self).create_new_embedding(vector_db, my_model, batch_size=batch_size,
+                                                                 pipeline=pipeline,
+                                                                 embedding_workers=embedding_workers)
 
         if not embeddings:
             logger.warning("warning: no embeddings created")
 
+        self.increment_library_version()
+
         return embeddings
 
     def delete_library(self, library_name=None, confirm_delete=False, account_name="llmware"):
@@ -959,6 +1157,9 @@ class Library:
                 # 3rd - remove record in LibraryCatalog
                 LibraryCatalog(self).delete_library_card(self.library_name)
 
+                # 4th - close the pooled SQLite connections of this thread
+                _SQLiteConnect.close_all()
+
                 logger.info("update:  deleted all library file artifacts + folders")
 
         except:
@@ -994,6 +1195,8 @@ class Library:
         completed = (CollectionWriter(self.library_name, account_name=self.account_name).
                      update_block(doc_id, block_id,key,new_value,self.default_keys))
 
+        self.increment_library_version()
+
         return completed
 
     def add_website (self, url, get_links=True, max_links=5):
@@ -1085,7 +1288,7 @@ class Library:
 
         return self
 
-    def add_pdf_by_ocr(self, input_folder=None):
+    def add_pdf_by_ocr(self, input_folder=None, workers=None, page_chunk_size=None):
         """Alternative method to ingest PDFs that are scanned, or can not be otherwise parsed.
         
             Parameters
@@ -1093,6 +1296,13 @@ class Library:
             input_folder : str, default=None
                 The path to the folder containing the PDFs. If not provided, defaults to None
 
+            workers : int, default=None
+                The number of pages OCR'd concurrently. If not provided, defaults to OCRConfig, or the number of
+                cores.
+
+            page_chunk_size : int, default=None
+                The number of pages rendered into memory at a time. If not provided, defaults to OCRConfig.
+
             Returns
             -------
             self : Library
@@ -1102,7 +1312,8 @@ class Library:
         if not input_folder:
             input_folder = LLMWareConfig.get_input_path()
 
-        output = Parser(library=self).parse_pdf_by_ocr_images(input_folder)
+        output = Parser(library=self).parse_pdf_by_ocr_images(input_folder, workers=workers,
+                                                              page_chunk_size=page_chunk_size)
 
         return self
 
@@ -1206,9 +1417,12 @@ class Library:
             # update exception
             raise LibraryNotFoundException(embedding_model_name, vector_db)
 
+        self.increment_library_version()
+
         return 1
 
-    def run_ocr_on_images(self, add_to_library=False,chunk_size=400,min_size=10, realtime_progress=True):
+    def run_ocr_on_images(self, add_to_library=False,chunk_size=400,min_size=10, realtime_progress=True,
+                          workers=None):
         """Convenience method in Library class to pass Library to Parser to run OCR on all of the images
         found in the Library, and OCR-extracted text from the images directly into the Library as additional
         blocks. 
@@ -1227,6 +1441,10 @@ class Library:
             realtime_progress : bool, default=True
                 Whether to display real-time progress during OCR processing.
 
+            workers : int, default=None
+                The number of images OCR'd concurrently. If not provided, defaults to OCRConfig, or the number of
+                cores.
+
             Returns
             -------
             output : int
@@ -1235,7 +1453,8 @@ class Library:
 
         output = Parser(library=self).ocr_images_in_library(add_to_library=add_to_library,
                                                             chunk_size=chunk_size,min_size=min_size,
-                                                            realtime_progress=realtime_progress)
+                                                            realtime_progress=realtime_progress,
+                                                            workers=workers)
 
         return output
 
@@ -1376,6 +1595,18 @@ class LibraryCatalog:
 
         return unique_doc_id
 
+    def reserve_doc_ids(self, library_name, count, account_name="llmware"):
+
+        """ Reserves a block of unique doc ids for library - returns the first doc id in the block """
+
+        if account_name != "llmware":
+           self.account_name = account_name
+
+        cw = CollectionWriter("library", account_name=self.account_name)
+        first_doc_id = cw.reserve_doc_ids(library_name, count)
+
+        return first_doc_id
+
     def set_incremental_docs_blocks_images(self, added_docs=0, added_blocks=0, added_images=0, added_pages=0,
                                            added_tables=0):
 
@@ -24,10 +24,12 @@ import time
 from collections import deque
 import shutil
 import importlib
+import multiprocessing
+import queue
 from importlib import util
 
 from llmware.util import Utilities, AgentWriter
-from llmware.configs import LLMWareConfig
+from llmware.configs import LLMWareConfig, EmbeddingConfig
 from llmware.resources import CloudBucketManager
 from llmware.exceptions import (DependencyNotInstalledException, ModuleNotFoundException,
                                 ModelCardNotRegisteredException, GGUFLibNotLoadedException, LLMWareException)
@@ -4713,6 +4715,31 @@ class HFReRankerModel(BaseModel):
         return final_output
 
 
+def _token_budget_buckets(lengths, token_budget):
+
+    """ Sorts sequences by token length, and groups them into buckets in which the padded size (number of
+    sequences x longest sequence) is within the token_budget - returns a list of lists of the original indexes """
+
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    buckets = []
+    current = []
+
+    for i in order:
+
+        # sorted by length - so the new sequence is the longest in the bucket
+        if current and lengths[i] * (len(current) + 1) > token_budget:
+            buckets.append(current)
+            current = []
+
+        current.append(i)
+
+    if current:
+        buckets.append(current)
+
+    return buckets
+
+
 class HFEmbeddingModel(BaseModel):
 
     """HFEmbeddingModel class implements the API for HuggingFace embedding models. """
@@ -4739,6 +4766,9 @@ class HFEmbeddingModel(BaseModel):
         # default for HF embedding model -> will be over-ridden by model card / configs, if available
         self.context_window = 512
 
+        # max padded tokens per forward pass - texts in each call to embedding are bucketed by length
+        self.token_budget = EmbeddingConfig.get_config("embedding_token_budget")
+
         if self.model_card:
             if "embedding_dims" in self.model_card:
                 self.embedding_dims = self.model_card["embedding_dims"]
@@ -4873,14 +4903,49 @@ class HFEmbeddingModel(BaseModel):
         else:
             sequence = [text_sample]
 
-        model_inputs = self.tokenizer(sequence, truncation=True, max_length=self.max_len, return_tensors="pt",padding=True)
+        if self.token_budget and len(sequence) > 1:
+
+            #   tokenize without padding, then run length-sorted buckets, each padded only to its own
+            #   longest sequence, and restore the original order
+            model_inputs = self.tokenizer(sequence, truncation=True, max_length=self.max_len)
+            lengths = [len(x) for x in model_inputs["input_ids"]]
+
+            embeddings_normalized = [None] * len(sequence)
+
+            for bucket in _token_budget_buckets(lengths, self.token_budget):
+
+                bucket_inputs = self.tokenizer.pad({"input_ids": [model_inputs["input_ids"][i] for i in bucket],
+                                                    "attention_mask": [model_inputs["attention_mask"][i]
+                                                                       for i in bucket]},
+                                                   return_tensors="pt")
+
+                vectors = self._embedding_forward(bucket_inputs.input_ids, bucket_inputs.attention_mask)
+
+                for j, i in enumerate(bucket):
+                    embeddings_normalized[i] = vectors[j]
+
+            embeddings_normalized = np.stack(embeddings_normalized)
+
+        else:
+            model_inputs = self.tokenizer(sequence, truncation=True, max_length=self.max_len, return_tensors="pt",
+                                          padding=True)
+
+            embeddings_normalized = self._embedding_forward(model_inputs.input_ids, model_inputs.attention_mask)
+
+        self.register()
+
+        return embeddings_normalized
+
+    def _embedding_forward(self, input_ids, attn_mask):
+
+        """ Runs forward pass on a padded batch - returns normalized embeddings as numpy array """
 
         if self.use_gpu:
-            input_ids = model_inputs.input_ids.to('cuda')
-            attn_mask = model_inputs.attention_mask.to('cuda')
+            input_ids = input_ids.to('cuda')
+            attn_mask = attn_mask.to('cuda')
         else:
-            input_ids = model_inputs.input_ids.to('cpu')
-            attn_mask = model_inputs.attention_mask.to('cpu')
+            input_ids = input_ids.to('cpu')
+            attn_mask = attn_mask.to('cpu')
 
         #   context manager to run inference without saving/calculating grads
         with torch.no_grad():
@@ -4896,8 +4961,6 @@ class HFEmbeddingModel(BaseModel):
         else:
             embeddings_normalized = embeddings_normalized.detach().numpy()
 
-        self.register()
-
         return embeddings_normalized
 
 
@@ -7520,20 +7583,72 @@ class WhisperCPPModel(BaseModel):
             if "remove_segment_markers" in inference_dict:
                 self.remove_segment_markers = inference_dict["remove_segment_markers"]
 
+        data = self._load_audio(prompt)
+
+        if data is None:
+            null_output = {"llm_response": "", "segments": []}
+            return null_output
+
+        self.duration = len(data) / self.WHISPER_SR
+
+        data.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+        self.params.language = self.language.encode('utf-8')
+        if prompt:
+            self.params.initial_prompt = prompt.encode('utf-8')
+
+        self.params.temperature = self.temperature
+
+        self.params.translate = self.translate
+
+        result = self._generate(data)
+
+        #   output format options
+
+        output = result["text"]
+
+        if self.format == "srt":
+            output = '\n'.join([f'{i + 1}\n{self._format_time(s["start"])} --> '
+                                f'{self._format_time(s["end"])}\n{s["text"]}\n'
+                                for i, s in enumerate(result["segments"])])
+
+        if self.format == "vtt":
+            output = '\n'.join([f'{i + 1}\n{self._format_time(s["start"])} --> '
+                                f'{self._format_time(s["end"])} align:middle\n{s["text"]}\n'
+                                for i, s in enumerate(result["segments"])])
+
+        usage_dict = {"duration-seconds": self.duration, "segments": len(result["segments"]),
+                      "language": self.language}
+
+        response = {"llm_response": output, "usage": usage_dict, "segments": result["segments"]}
+
+        #   update linked to BaseModel
+        self.prompt = ""
+        self.final_prompt = ""
+        self.usage = response["usage"]
+        self.llm_response = response["llm_response"]
+
+        self.register()
+        #   end - update
+
+        return response
+
+    def _load_audio(self, file):
+
+        """ Loads audio file as array of float samples at the whisper sample rate - files that are not .wav are
+        converted first - returns None if the conversion is not successful. """
+
         #   note: inference on wav file requires librosa library
         try:
             import librosa
         except:
             raise DependencyNotInstalledException("librosa")
 
-        file = prompt
-
         if not file.endswith(".wav"):
 
             logger.info("update: WhisperCPPModel - inference - input file needs to be converted to .wav - "
                          "will try to do right now.")
 
-            new_file_path = Utilities().convert_media_file_to_wav(prompt,
+            new_file_path = Utilities().convert_media_file_to_wav(file,
                                                                   save_path=LLMWareConfig().get_tmp_path(),
                                                                   file_out="converted_file_tmp.wav")
 
@@ -7548,8 +7663,7 @@ class WhisperCPPModel(BaseModel):
                                 "--to install on Linux: sudo apt install ffmpeg \n"
                                 "--to install on Windows: see ffmpeg.org/download.html for download/install \n")
 
-                null_output = {"llm_response": "", "segments": []}
-                return null_output
+                return None
 
             else:
                 logger.info(f"update: WhisperCPPModel - inference - file conversion to .wav successful - "
@@ -7559,48 +7673,176 @@ class WhisperCPPModel(BaseModel):
 
         data, sr = librosa.load(file, sr=self.WHISPER_SR)
 
-        self.duration = librosa.get_duration(y=data, sr=self.WHISPER_SR)
+        return data
 
-        data.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-        self.params.language = self.language.encode('utf-8')
-        if prompt:
-            self.params.initial_prompt = prompt.encode('utf-8')
+    def inference_batch(self, file_list, inference_dict=None, gap_seconds=1.0):
 
-        self.params.temperature = self.temperature
+        """ Batched transcription of a list of audio files in a single pass through the model context - the audio
+        of the files is joined, separated by gap_seconds of silence, transcribed with a single whisper_full call,
+        and the segments are split back by file, with the start/end times relative to the start of each file.
+        Fewer, longer calls keep the model busy on short recordings.
+
+        The call is run with no_context, so that the text of one file is not used as the decoder prompt for the
+        next, and with token timestamps, so that a segment that runs across the start of the next file is split
+        between the files by the start time of each token.   An optional initial_prompt for the decoder can be
+        passed in inference_dict.
+
+        Returns a list with one response per file, in the same format as inference. """
 
+        initial_prompt = None
+
+        if inference_dict:
+            if "translate" in inference_dict:
+                self.translate=inference_dict["translate"]
+
+            if "remove_segment_markers" in inference_dict:
+                self.remove_segment_markers = inference_dict["remove_segment_markers"]
+
+            if "initial_prompt" in inference_dict:
+                initial_prompt = inference_dict["initial_prompt"]
+
+        gap = np.zeros(int(gap_seconds * self.WHISPER_SR), dtype=np.float32)
+
+        batch = []
+        offsets = []
+        durations = []
+        position = 0
+
+        for file in file_list:
+
+            data = self._load_audio(file)
+
+            if data is None:
+                data = np.zeros(0, dtype=np.float32)
+
+            offsets.append(position / self.WHISPER_SR)
+            durations.append(len(data) / self.WHISPER_SR)
+
+            batch += [data, gap]
+            position += len(data) + len(gap)
+
+        if not file_list:
+            return []
+
+        audio = np.ascontiguousarray(np.concatenate(batch), dtype=np.float32)
+
+        self.duration = sum(durations)
+
+        self.params.language = self.language.encode('utf-8')
+        self.params.initial_prompt = initial_prompt.encode('utf-8') if initial_prompt else None
+        self.params.temperature = self.temperature
         self.params.translate = self.translate
 
-        result = self._generate(data)
+        no_context = self.params.no_context
+        token_timestamps = self.params.token_timestamps
 
-        #   output format options
+        self.params.no_context = True
+        self.params.token_timestamps = True
 
-        output = result["text"]
+        try:
+            result = self._generate(audio)
+        finally:
+            self.params.no_context = no_context
+            self.params.token_timestamps = token_timestamps
 
-        if self.format == "srt":
-            output = '\n'.join([f'{i + 1}\n{self._format_time(s["start"])} --> '
-                                f'{self._format_time(s["end"])}\n{s["text"]}\n'
-                                for i, s in enumerate(result["segments"])])
+        file_segments = [[] for _ in file_list]
 
-        if self.format == "vtt":
-            output = '\n'.join([f'{i + 1}\n{self._format_time(s["start"])} --> '
-                                f'{self._format_time(s["end"])} align:middle\n{s["text"]}\n'
-                                for i, s in enumerate(result["segments"])])
+        for i, segment in self._split_batch_segments(result["segments"], offsets):
 
-        usage_dict = {"duration-seconds": self.duration, "segments": len(result["segments"]),
-                      "language": self.language}
+            if durations[i] == 0:
+                continue
 
-        response = {"llm_response": output, "usage": usage_dict, "segments": result["segments"]}
+            file_segment = dict(segment)
+            file_segment["start"] = max(0.0, round(segment["start"] - offsets[i], 2))
+            file_segment["end"] = min(durations[i], round(segment["end"] - offsets[i], 2))
+
+            file_segments[i].append(file_segment)
+
+        responses = []
+
+        for segments, duration in zip(file_segments, durations):
+
+            text = "".join(s["text"] for s in segments).strip()
+
+            output = text
+
+            if self.format == "srt":
+                output = '\n'.join([f'{i + 1}\n{self._format_time(s["start"])} --> '
+                                    f'{self._format_time(s["end"])}\n{s["text"]}\n'
+                                    for i, s in enumerate(segments)])
+
+            if self.format == "vtt":
+                output = '\n'.join([f'{i + 1}\n{self._format_time(s["start"])} --> '
+                                    f'{self._format_time(s["end"])} align:middle\n{s["text"]}\n'
+                                    for i, s in enumerate(segments)])
+
+            usage_dict = {"duration-seconds": duration, "segments": len(segments), "language": self.language}
+
+            responses.append({"llm_response": output, "usage": usage_dict, "segments": segments})
 
-        #   update linked to BaseModel
         self.prompt = ""
         self.final_prompt = ""
-        self.usage = response["usage"]
-        self.llm_response = response["llm_response"]
+        self.usage = {"duration-seconds": self.duration, "segments": len(result["segments"]),
+                      "language": self.language, "files": len(file_list)}
+        self.llm_response = result["text"]
 
         self.register()
-        #   end - update
 
-        return response
+        return responses
+
+    @staticmethod
+    def _split_batch_segments(segments, offsets):
+
+        """ Assigns the segments of a batched transcription to the files, by the start offset of each file in the
+        batch - a segment that runs across the start of a file is split by the start time of its text tokens, with
+        each part holding the tokens (and their text) that start in that file, and clipped to the file.
+
+        Returns a list of (file index, segment) tuples, with times relative to the start of the batch. """
+
+        def file_index(t):
+            return max(0, int(np.searchsorted(offsets, t, side="right")) - 1)
+
+        output = []
+
+        for segment in segments:
+
+            first = file_index(segment["start"])
+            last = file_index(max(segment["start"], segment["end"] - 0.01))
+
+            if first == last:
+                output.append((first, segment))
+                continue
+
+            parts = {}
+
+            for token in segment.get("tokens", []):
+
+                text = token.get("text", "")
+
+                #   special tokens, e.g., [_BEG_] and timestamp tokens [_TT_150], are not part of the text
+                if not text or (text.startswith("[_") and text.endswith("]")):
+                    continue
+
+                i = file_index(token["t0"]) if token.get("t0", -1) >= 0 else first
+                parts.setdefault(i, []).append(token)
+
+            if len(parts) <= 1:
+                output.append((next(iter(parts), first), segment))
+                continue
+
+            for i in sorted(parts):
+
+                part = dict(segment)
+                part["tokens"] = parts[i]
+                part["text"] = "".join(token["text"] for token in parts[i])
+                part["start"] = max(segment["start"], offsets[i])
+
+                if i + 1 < len(offsets):
+                    part["end"] = min(segment["end"], offsets[i + 1])
+
+                output.append((i, part))
+
+        return output
 
     def _generate(self, data):
 
@@ -7650,6 +7892,7 @@ class WhisperCPPModel(BaseModel):
 
             for j in range(n_tokens):
                 token_data = self._lib.whisper_full_get_token_data(ctypes.c_void_p(self.context), i, j)
+                token_text = self._lib.whisper_full_get_token_text(ctypes.c_void_p(self.context), i, j)
 
                 tokens.append({
                     "id": token_data.id,
@@ -7657,6 +7900,9 @@ class WhisperCPPModel(BaseModel):
                     "logprob": token_data.plog,
                     "pt": token_data.pt,
                     "pt_sum": token_data.ptsum,
+                    "t0": token_data.t0/100.0,
+                    "t1": token_data.t1/100.0,
+                    "text": token_text.decode('utf-8', errors='ignore'),
                 })
 
             segments.append({
@@ -7746,6 +7992,9 @@ class WhisperCPPModel(BaseModel):
         self._lib.whisper_full_get_token_data.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int]
         self._lib.whisper_full_get_token_data.restype = whisper_token_data
 
+        self._lib.whisper_full_get_token_text.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int]
+        self._lib.whisper_full_get_token_text.restype = ctypes.c_char_p
+
         self._lib.whisper_free.argtypes = [ctypes.c_void_p]
         self._lib.whisper_free.restype = None
 
@@ -7776,6 +8025,9 @@ class LLMWareSemanticModel(BaseModel):
         self.normalize_embeddings = True
         self.received_loaded_model = False
 
+        # max padded tokens per forward pass - texts in each call to embedding are bucketed by length
+        self.token_budget = EmbeddingConfig.get_config("embedding_token_budget")
+
         # need to parameterize the embedding dims based on model config
         if not embedding_dims:
             self.embedding_dims = 768
@@ -7855,6 +8107,10 @@ class LLMWareSemanticModel(BaseModel):
 
     def embedding(self, sentence):
 
+        if self.token_budget and isinstance(sentence, list) and len(sentence) > 1 \
+                and hasattr(self.model, "tokenizer"):
+            return self._bucketed_embedding(sentence)
+
         # embedding = self.model.encode(sentence, convert_to_tensor=True)
         embedding = self.model.encode(sentence)
 
@@ -7870,6 +8126,25 @@ class LLMWareSemanticModel(BaseModel):
         # embedding_2d = embedding.unsqueeze(0)
         return embedding
 
+    def _bucketed_embedding(self, sentences):
+
+        """ Encodes length-sorted buckets of sentences, each within the token budget, in a single batch per
+        bucket - sentence transformers sort by length internally, but with a fixed batch size """
+
+        lengths = [len(x) for x in self.model.tokenizer(sentences, truncation=True,
+                                                         max_length=self.model.max_seq_length)["input_ids"]]
+
+        embedding = [None] * len(sentences)
+
+        for bucket in _token_budget_buckets(lengths, self.token_budget):
+
+            vectors = self.model.encode([sentences[i] for i in bucket], batch_size=len(bucket))
+
+            for j, i in enumerate(bucket):
+                embedding[i] = vectors[j]
+
+        return np.stack(embedding)
+
     def cosine_similarity(self, a, b):
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
@@ -7878,6 +8153,153 @@ class LLMWareSemanticModel(BaseModel):
         return np.linalg.norm(a - b) * np.linalg.norm(a-b)
 
 
+#   state held by each EmbeddingWorkerPool worker process
+_worker_embedding_model = None
+
+
+def _embedding_worker_init(model, core_sets):
+
+    """ Runs once in each worker process - pins the process to the next available core set, sets the torch
+    intra-op threads to the size of the core set, and holds the worker copy of the model """
+
+    global _worker_embedding_model, torch, GLOBAL_TORCH_IMPORT
+
+    #   a worker re-started by the pool, e.g., after a crash, runs unpinned
+    try:
+        core_set = core_sets.get(timeout=1)
+    except queue.Empty:
+        core_set = None
+
+    if core_set and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, core_set)
+        except OSError:
+            logger.warning(f"warning: EmbeddingWorkerPool - could not pin worker {os.getpid()} to "
+                           f"cores {core_set}")
+
+    #   model is unpickled without running __init__, so torch is loaded here for the model classes
+    if util.find_spec("torch"):
+        torch = importlib.import_module("torch")
+        GLOBAL_TORCH_IMPORT = True
+
+        if core_set:
+            torch.set_num_threads(len(core_set))
+
+    #   worker copies run on cpu
+    if hasattr(model, "use_gpu"):
+        model.use_gpu = False
+
+    if torch is not None and hasattr(getattr(model, "model", None), "to"):
+        model.model.to("cpu")
+
+    _worker_embedding_model = model
+
+
+def _embedding_worker_run(sentences):
+    return np.array(_worker_embedding_model.embedding(sentences))
+
+
+class EmbeddingWorkerPool:
+
+    """ EmbeddingWorkerPool runs data-parallel embedding on CPU, for HFEmbeddingModel and LLMWareSemanticModel
+    (sentence transformer) models.  Each worker process holds its own copy of the model and is pinned to its own
+    set of cores - each call to embedding shards the list of sentences across the workers, and returns the
+    vectors in the original order.
+
+    The pool is a drop-in replacement for the model, e.g., passed to EmbeddingHandler.create_new_embedding - all
+    other attributes (model_name, embedding_dims, etc.) are read from the underlying model.  Worker processes are
+    started on first use, and should be released with close() (or by using the pool as a context manager).
+
+    Note: with the default 'spawn' start method, calling scripts should be run under if __name__ == "__main__". """
+
+    supported_model_classes = ["HFEmbeddingModel", "LLMWareSemanticModel"]
+
+    def __init__(self, model, workers=None, start_method="spawn"):
+
+        self.model = model
+
+        if hasattr(os, "sched_getaffinity"):
+            self.cores = sorted(os.sched_getaffinity(0))
+        else:
+            self.cores = list(range(os.cpu_count() or 1))
+
+        if not workers:
+            workers = len(self.cores)
+
+        self.workers = max(1, workers)
+        self.start_method = start_method
+
+        #   split available cores into contiguous sets, one per worker - if more workers than cores, the
+        #   workers are not pinned
+        if self.workers <= len(self.cores):
+            self.core_sets = [[int(c) for c in s] for s in np.array_split(self.cores, self.workers)]
+        else:
+            self.core_sets = [None] * self.workers
+
+        self._pool = None
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+
+        """ Starts the worker processes - each receives a copy of the model """
+
+        if self._pool is None:
+
+            ctx = multiprocessing.get_context(self.start_method)
+
+            core_sets = ctx.Queue()
+            for core_set in self.core_sets:
+                core_sets.put(core_set)
+
+            self._pool = ctx.Pool(processes=self.workers, initializer=_embedding_worker_init,
+                                  initargs=(self.model, core_sets))
+
+            logger.info(f"update: EmbeddingWorkerPool - started {self.workers} workers - "
+                        f"core sets - {self.core_sets}")
+
+        return self
+
+    def close(self):
+
+        """ Stops the worker processes and releases the worker copies of the model """
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+        return True
+
+    def embedding(self, text_sample, api_key=None):
+
+        """ Shards text_sample across the workers and returns the embeddings in the original order """
+
+        if isinstance(text_sample, list):
+            sequence = text_sample
+        else:
+            sequence = [text_sample]
+
+        if not sequence:
+            return np.array([])
+
+        self.start()
+
+        shard_size = -(-len(sequence) // self.workers)
+        shards = [sequence[i:i+shard_size] for i in range(0, len(sequence), shard_size)]
+
+        results = self._pool.map(_embedding_worker_run, shards)
+
+        return np.concatenate(results)
+
+
 class LocalTokenizer:
 
     """ LocalTokenizer class manages and caches tokenizer.json files for common base models used in
@@ -40,6 +40,11 @@ set of text chunks, e.g., blocks, indexed with metadata, in a database.
 import time
 import json
 import os
+import copy
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
 from zipfile import ZipFile, ZIP_DEFLATED
 import shutil
 
@@ -48,10 +53,12 @@ import random
 from ctypes import *
 import platform
 
-from llmware.configs import LLMWareConfig, LLMWareTableSchema
-from llmware.util import Utilities, TextChunker
+from llmware.configs import LLMWareConfig, LLMWareTableSchema, OCRConfig
+from llmware.util import Utilities, TextChunker, BM25Index
 from llmware.web_services import WikiKnowledgeBase, WebSiteParser
-from llmware.resources import CollectionRetrieval, CollectionWriter, ParserState
+from llmware.embeddings import EmbeddingHandler
+from llmware.resources import CollectionRetrieval, CollectionWriter, ParserState, BufferedCollectionWriter, \
+    FileManifest
 
 from llmware.exceptions import DependencyNotInstalledException, FilePathDoesNotExistException, \
     OCRDependenciesNotFoundException, LLMWareException
@@ -59,16 +66,139 @@ from llmware.exceptions import DependencyNotInstalledException, FilePathDoesNotE
 logger = logging.getLogger(__name__)
 
 
+def _flush_write_buffer_on_exit(parse_method):
+
+    """ Decorator for the parse methods that buffer new records - writes the records already buffered in a finally
+    clause, so that the blocks of the files parsed before an exception are not lost """
+
+    @functools.wraps(parse_method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return parse_method(self, *args, **kwargs)
+        finally:
+            self.flush_write_buffer()
+
+    return wrapper
+
+
+def _reflink(src, dst):
+
+    """ Creates dst as a copy-on-write clone of src, sharing the same data blocks, on file systems that support it
+    (e.g., btrfs, xfs, apfs) - raises OSError if not supported. """
+
+    system = platform.system().lower()
+
+    if system == "linux":
+
+        import fcntl
+
+        #   FICLONE ioctl
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), 0x40049409, s.fileno())
+            except OSError:
+                d.close()
+                os.remove(dst)
+                raise
+
+        shutil.copystat(src, dst)
+
+        return True
+
+    if system == "darwin":
+
+        libc = CDLL("libc.dylib", use_errno=True)
+
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = get_errno()
+            raise OSError(err, os.strerror(err), dst)
+
+        return True
+
+    raise OSError(f"reflink not supported on {system}")
+
+
+#   worker process state for Parser.ingest with workers > 1 - each worker holds a copy of the Parser, and the
+#   speech model, once loaded, stays resident in the worker for all of its voice files
+_worker_parser = None
+_worker_speech_model = None
+
+
+def _ingest_worker_init(parser):
+    global _worker_parser
+    _worker_parser = parser
+
+
+def _ingest_worker_run(parser_type, input_fp, fn, doc_id, task_fp):
+
+    """ Parses a single file in a worker process, in its own work folder, and returns the parsing output as a
+    list of dicts - nothing is written to the db by the worker.   Images extracted by the pdf and office parsers
+    are moved into the library image folder. """
+
+    parser = copy.copy(_worker_parser)
+    parser.parser_output = []
+    parser.write_buffer = None
+    parser.file_counter = doc_id
+
+    task_input_fp = os.path.join(task_fp, "input" + os.sep)
+    task_image_fp = os.path.join(task_fp, "images" + os.sep)
+
+    os.makedirs(task_input_fp, exist_ok=True)
+    os.makedirs(task_image_fp, exist_ok=True)
+
+    parser._stage_file(os.path.join(input_fp, fn), os.path.join(task_input_fp, fn))
+
+    parser.parser_tmp_folder = task_fp
+    parser.parser_image_folder = task_image_fp
+
+    output = []
+
+    if parser_type == "office":
+        output = parser.parse_office(task_input_fp, write_to_db=False, save_history=False)
+
+    if parser_type == "pdf":
+        output = parser.parse_pdf(task_input_fp, write_to_db=False, save_history=False)
+
+    if parser_type == "text":
+        output = parser.parse_text(task_input_fp, write_to_db=False, save_history=False)
+
+    if parser_type == "ocr":
+        output = parser.parse_image(task_input_fp, write_to_db=False, save_history=False)
+
+    if parser_type == "voice":
+        global _worker_speech_model
+        if _worker_speech_model is None:
+            _worker_speech_model = VoiceParser(parser).load_speech_model()
+        parser.speech_model = _worker_speech_model
+        output = parser.parse_voice(task_input_fp, write_to_db=False, save_history=False)
+
+    for block in output:
+        img_name = block.get("external_files")
+        if img_name and os.path.isfile(os.path.join(task_image_fp, img_name)):
+            shutil.move(os.path.join(task_image_fp, img_name), os.path.join(parser.library.image_path, img_name))
+
+    shutil.rmtree(task_fp, ignore_errors=True)
+
+    return output
+
+
 class Parser:
 
     def __init__(self, library=None, account_name="llmware", parse_to_db=False, file_counter=1,
                  encoding="utf-8", chunk_size=400, max_chunk_size=600, smart_chunking=1,
                  get_images=True, get_tables=True, strip_header=False, table_grid=True,
-                 get_header_text=True, table_strategy=1, verbose_level=2, copy_files_to_library=True):
+                 get_header_text=True, table_strategy=1, verbose_level=2, copy_files_to_library=True,
+                 db_write_batch_size=500, staging="copy"):
 
         """ Main class for handling parsing, e.g., conversion of documents and other unstructured files
         into indexed text collection of 'blocks' in database.   For most use cases, Parser does not need
-        to be invoked directly - as Library and Prompt are more natural client interfaces. """
+        to be invoked directly - as Library and Prompt are more natural client interfaces.
+
+        staging selects how ingest stages the input files in the work folders, and in the library uploads
+        folder - "copy" (default), "reflink" (copy-on-write clone), "hardlink", "symlink" (work folders only -
+        the parsers read the files from their original location), or "auto" (reflink, then hardlink, then
+        symlink) - each falls back to a copy if not supported, e.g., across file systems.   Note: with
+        "hardlink", the library copy of a file shares its data with the input file. """
 
         # as of 0.2.7, expanded configuration options offered
 
@@ -150,6 +280,16 @@ class Parser:
         # 'active' output state tracker
         self.parser_output = []
 
+        # in-memory search index over parser_output - built on first query_parser_state with use_index=True
+        self.parser_index = None
+
+        # file manifest state for ingest - entries for the files to be parsed, and prior doc_IDs of modified files
+        self.manifest_entries = {}
+        self.replaced_docs = {}
+
+        # optional loaded speech model, borrowed by parse_voice for all voice files - released by the caller
+        self.speech_model = None
+
         self.ACCEPTED_FILE_FORMATS = ["pptx","xlsx","docx","pdf","txt","csv","html","jsonl",
                                       "jpg","jpeg","png","wav","zip", "md", "tsv"]
         self.office_types = ["PPTX", "pptx", "XLSX", "xlsx", "DOCX", "docx"]
@@ -200,11 +340,20 @@ class Parser:
         self.verbose_level = verbose_level
         self.copy_files_to_library = copy_files_to_library
 
+        # staging method for input files in ingest work folders + library uploads, and count of files by method
+        self.staging = staging
+        self.staging_counts = {}
+
+        # python-based parsers buffer new records and write to the db in batches of db_write_batch_size
+        self.db_write_batch_size = db_write_batch_size
+        self.write_buffer = None
+
     def clear_state(self):
 
         """Clears parser state. """
 
         self.parser_output = []
+        self.parser_index = None
         return self
 
     def save_state(self):
@@ -214,6 +363,74 @@ class Parser:
         ParserState().save_parser_output(self.parser_job_id, self.parser_output)
         return self
 
+    def flush_write_buffer(self):
+
+        """ Writes any buffered parsing records to the library collection db - called at the end of each
+        parse job (also if the parse job raises an exception), and can be called directly after using
+        add_create_new_record. """
+
+        records_written = 0
+
+        if self.write_buffer:
+            records_written = self.write_buffer.flush()
+
+        return records_written
+
+    def _stage_file(self, src, dst, to_library=False, extracted=False):
+
+        """ Internal method - stages the file src at dst with the staging method selected in the constructor,
+        falling back to the next method, and finally to a copy, if not supported.   Files staged into the library
+        (to_library) are never symlinked, and files extracted from a zip archive into a temporary folder are
+        moved, unless staging is "copy".   Returns the method used. """
+
+        if self.staging == "copy" or not self.staging:
+            methods = ["copy"]
+        elif extracted:
+            methods = ["move", "copy"]
+        elif self.staging == "auto":
+            methods = ["reflink", "hardlink", "symlink", "copy"]
+        else:
+            methods = [self.staging, "copy"]
+
+        if to_library and "symlink" in methods:
+            methods.remove("symlink")
+
+        if methods != ["copy"]:
+
+            #   links are made to the original file, e.g., if src is itself a symlink in a work folder
+            src = os.path.realpath(src)
+
+            if os.path.lexists(dst):
+                if os.path.exists(dst) and os.path.samefile(src, dst):
+                    return "none"
+                os.remove(dst)
+
+        for method in methods:
+
+            try:
+                if method == "reflink":
+                    _reflink(src, dst)
+                elif method == "hardlink":
+                    os.link(src, dst)
+                elif method == "symlink":
+                    os.symlink(os.path.abspath(src), dst)
+                elif method == "move":
+                    shutil.move(src, dst)
+                else:
+                    shutil.copy(src, dst)
+
+            except (OSError, NotImplementedError) as e:
+                if method == "copy":
+                    raise
+                logger.debug(f"update: Parser - staging - {method} not supported - {src} - {e}")
+                continue
+
+            self.staging_counts[method] = self.staging_counts.get(method, 0) + 1
+
+            return method
+
+        return "none"
+
     def _setup_workspace(self, local_work_path):
 
         """ Internal method to setup workspace for parsing job. """
@@ -277,16 +494,28 @@ class Parser:
 
     def _collator(self, input_folder_path, dupe_check=False):
 
-        """ Internal utility method to prepare and organize files for parsing. """
+        """ Internal utility method to prepare and organize files for parsing.
+
+        With a library loaded, each file is checked against the library file manifest - if dupe_check set True,
+        files that are unchanged (same name, size and modification time, or same content hash), or identical in
+        content to a file already in the library under another name, are skipped, and modified files (same name,
+        new content) are parsed again, replacing the blocks of their prior version. """
 
         # run comparison for existing files if dupe_check set True
         # default case - no checking for dupes
-        existing_files = []
+        existing_files = set()
+        manifest = None
+
+        # manifest entries for the files to be parsed, and the prior doc_ID of modified files
+        self.manifest_entries = {}
+        self.replaced_docs = {}
 
         # run comparison for existing files if dupe_check set True
         if self.library:
             if dupe_check and os.path.exists(self.library.file_copy_path):
-                existing_files = os.listdir(self.library.file_copy_path)
+                existing_files = set(os.listdir(self.library.file_copy_path))
+
+            manifest = FileManifest(self.library.library_main_path)
 
         # counters
         dup_counter = 0
@@ -301,19 +530,43 @@ class Parser:
         input_file_names = os.listdir(input_folder_path)
         files_to_be_processed = []
         duplicate_files = []
+        modified_files = []
+        identical_files = {}
 
+        if manifest:
 
-        if dupe_check:
+            new_file_names = []
+            seen_hashes = {}
+
+            try:
+                for filename in input_file_names:
+
+                    status, match = self._check_file_manifest(manifest, input_folder_path, filename,
+                                                              existing_files, seen_hashes, dupe_check)
+
+                    if status == "duplicate":
+                        duplicate_files.append(filename)
+                        if match != filename:
+                            identical_files[filename] = match
+                        continue
+
+                    if status == "modified":
+                        modified_files.append(filename)
+                        self.replaced_docs[filename] = match
+
+                    new_file_names.append(filename)
+            finally:
+                manifest.close()
+
+            input_file_names = new_file_names
+
+        elif dupe_check:
             # we get a reduced list of input_file_names if in existing_files is files we try to process
-            duplicate_files_tmp = list(set(input_file_names) - set(existing_files))
-            # the duplicates are those that where not in duplicate_files_tmp so we take out the tmp from the input_file_names
-            # what's left is the duplicates
-            duplicate_files =  list(set(input_file_names) - set(duplicate_files_tmp))
-            # the counter is the length of the array
-            dup_counter = len(duplicate_files)
-            # We are done with this and we don't need to n times loop as before
-            # we set the imput_file_names to be the reduced list to not to process dupe files
-            input_file_names = duplicate_files_tmp
+            duplicate_files = [fn for fn in input_file_names if fn in existing_files]
+            input_file_names = [fn for fn in input_file_names if fn not in existing_files]
+
+        # the counter is the length of the array
+        dup_counter = len(duplicate_files)
 
         for filename in input_file_names:
 
@@ -321,30 +574,36 @@ class Parser:
 
             files_to_be_processed.append(filename)
 
-            # copy file into specific channel for targeted parser
+            # stage file into specific channel for targeted parser
 
             if filetype.lower() in self.office_types:
-                shutil.copy(os.path.join(input_folder_path,filename), os.path.join(self.office_work_folder,filename))
+                self._stage_file(os.path.join(input_folder_path,filename),
+                                 os.path.join(self.office_work_folder,filename))
                 office_found += 1
 
             if filetype.lower() in self.pdf_types:
-                shutil.copy(os.path.join(input_folder_path,filename), os.path.join(self.pdf_work_folder, filename))
+                self._stage_file(os.path.join(input_folder_path,filename),
+                                 os.path.join(self.pdf_work_folder,filename))
                 pdf_found += 1
 
             if filetype.lower() in self.text_types:
-                shutil.copy(os.path.join(input_folder_path,filename), os.path.join(self.text_work_folder,filename))
+                self._stage_file(os.path.join(input_folder_path,filename),
+                                 os.path.join(self.text_work_folder,filename))
                 text_found += 1
 
             if filetype.lower() in self.ocr_types:
-                shutil.copy(os.path.join(input_folder_path,filename), os.path.join(self.ocr_work_folder,filename))
+                self._stage_file(os.path.join(input_folder_path,filename),
+                                 os.path.join(self.ocr_work_folder,filename))
                 ocr_found += 1
 
             if filetype.lower() in self.voice_types:
-                shutil.copy(os.path.join(input_folder_path,filename), os.path.join(self.voice_work_folder,filename))
+                self._stage_file(os.path.join(input_folder_path,filename),
+                                 os.path.join(self.voice_work_folder,filename))
                 voice_found += 1
 
             if filetype.lower() in self.zip_types:
-                shutil.copy(os.path.join(input_folder_path,filename), os.path.join(self.zip_work_folder,filename))
+                self._stage_file(os.path.join(input_folder_path,filename),
+                                 os.path.join(self.zip_work_folder,filename))
                 zip_found += 1
 
         logger.info(f"update:  Duplicate files (skipped): {dup_counter}")
@@ -369,20 +628,215 @@ class Parser:
                       "ocr": ocr_found,
                       "voice": voice_found,
                       "duplicate_files": duplicate_files,
+                      "modified_files": modified_files,
+                      "identical_files": identical_files,
                       "file_list": files_to_be_processed}
 
         return work_order
 
-    def ingest (self, input_folder_path, dupe_check=True):
+    def _check_file_manifest(self, manifest, input_folder_path, filename, existing_files, seen_hashes, dupe_check):
+
+        """ Internal method - checks an input file against the library file manifest, and returns a tuple of
+        (status, match) - status is one of "new", "modified" (match = prior doc_ID) or "duplicate" (match = the
+        name of the file in the library with the same content).   Files to be parsed are added to
+        self.manifest_entries. """
+
+        fp = os.path.join(input_folder_path, filename)
+
+        if not os.path.isfile(fp):
+            return "new", None
+
+        stat = os.stat(fp)
+        entry = {"file_name": filename, "content_hash": None, "size": stat.st_size, "mtime": stat.st_mtime,
+                 "doc_ID": None}
+
+        prior = manifest.lookup_file(filename) if dupe_check else None
+
+        #   fast path - same name, size and modification time - no need to read the file
+        if prior and prior["size"] == entry["size"] and prior["mtime"] == entry["mtime"]:
+            return "duplicate", filename
+
+        entry["content_hash"] = manifest.file_hash(fp)
+
+        if prior:
+
+            if prior["content_hash"] == entry["content_hash"]:
+                #   same content - only the modification time changed - saved for the fast path next time
+                entry["doc_ID"] = prior["doc_ID"]
+                manifest.update([entry])
+                return "duplicate", filename
+
+            self.manifest_entries[filename] = entry
+            return "modified", prior["doc_ID"]
+
+        if dupe_check:
+
+            #   files added to the library before the manifest was in place are matched by name only
+            if filename in existing_files:
+                return "duplicate", filename
+
+            match = seen_hashes.get(entry["content_hash"])
+
+            if not match:
+                same_content = manifest.lookup_hash(entry["content_hash"])
+                if same_content:
+                    match = same_content["file_name"]
+
+            if match:
+                return "duplicate", match
+
+        seen_hashes[entry["content_hash"]] = filename
+        self.manifest_entries[filename] = entry
+
+        return "new", None
+
+    def _new_doc_ids(self, min_doc_id):
+
+        """ Internal method - returns {file name: doc_ID} for the documents added to the library in this job, i.e.,
+        with doc_ID greater than min_doc_id """
+
+        doc_ids = {}
+        for file_source, doc_id in CollectionRetrieval(self.library_name,
+                                                       account_name=self.account_name).get_file_source_doc_ids(
+                min_doc_id=min_doc_id).items():
+            doc_ids[str(file_source).split(os.sep)[-1]] = doc_id
+
+        return doc_ids
+
+    def _replace_documents(self, input_folder_path, new_doc_ids):
+
+        """ Internal method - called after the files are parsed - for each modified file found by _collator that was
+        parsed into a new document in this job, deletes the blocks of its prior version, decrements the library card
+        counters, and replaces the library copy with the new version.   If the new version was not parsed, the prior
+        version is kept - library copy, blocks and file manifest entry.
+
+        Vectors of the deleted blocks are deleted from each embedding installed on the library - if not possible
+        for an embedding, e.g., vector db not reachable, they are skipped in search, as their blocks are no longer
+        found in the text collection, and are flagged with a warning and counted in the output.   Returns a tuple
+        of (files replaced, files not replaced, stale vector count). """
+
+        counters = {"added_docs": 0, "added_blocks": 0, "added_images": 0, "added_pages": 0, "added_tables": 0}
+
+        replaced = []
+        not_replaced = []
+        embedded_block_ids = []
+
+        for fn, doc_id in self.replaced_docs.items():
+
+            file_type = fn.split(".")[-1].lower()
+
+            #   zip archives have no doc_ID - parsed as the files extracted from the archive
+            if file_type not in self.zip_types and fn not in new_doc_ids:
+                not_replaced.append(fn)
+                logger.warning(f"warning: Parser - modified file could not be parsed - {fn} - keeping prior "
+                               f"version - doc_ID {doc_id}")
+                continue
+
+            replaced.append(fn)
+
+            if self.copy_files_to_library and os.path.exists(os.path.join(input_folder_path, fn)):
+                library_copy = os.path.join(self.library.file_copy_path, fn)
+                if os.path.lexists(library_copy):
+                    os.remove(library_copy)
+                self._stage_file(os.path.join(input_folder_path, fn), library_copy, to_library=True)
+
+            if doc_id is None:
+                continue
+
+            blocks = list(CollectionRetrieval(self.library_name,
+                                              account_name=self.account_name).filter_by_key_dict({"doc_ID": doc_id}))
+
+            if not blocks:
+                continue
+
+            CollectionWriter(self.library_name, account_name=self.account_name).delete_records_by_key("doc_ID",
+                                                                                                      doc_id)
+
+            counters["added_docs"] -= 1
+            counters["added_blocks"] -= len(blocks)
+
+            if file_type in self.office_types or file_type in self.pdf_types:
+                counters["added_images"] -= sum(1 for b in blocks if b.get("content_type") == "image")
+                counters["added_tables"] -= sum(1 for b in blocks if b.get("content_type") == "table")
+                pages = [int(b["master_index"]) for b in blocks if str(b.get("master_index", "")).isdigit()]
+                counters["added_pages"] -= max(pages, default=0)
+
+            if file_type in self.text_types or file_type in self.ocr_types:
+                counters["added_pages"] -= 1
+
+            embedded_block_ids += [b["_id"] for b in blocks if b.get("embedding_flags") not in (None, "", {}, "{}")]
+
+            logger.info(f"update: Parser - replaced prior version of modified file - {fn} - doc_ID {doc_id} - "
+                        f"{len(blocks)} blocks removed")
+
+        if counters["added_docs"]:
+            self.library.set_incremental_docs_blocks_images(**counters)
+
+        stale_vectors = 0
+
+        if embedded_block_ids:
+
+            not_deleted = EmbeddingHandler(self.library).delete_vectors(embedded_block_ids)
+
+            if not_deleted:
+                stale_vectors = len(embedded_block_ids)
+                logger.warning(f"warning: Parser - vectors of the replaced blocks could not be deleted from "
+                               f"{not_deleted} - they are skipped in search - to remove, delete and re-install the "
+                               f"embedding")
+
+        return replaced, not_replaced, stale_vectors
+
+    def _update_file_manifest(self, new_doc_ids):
+
+        """ Internal method - records the files parsed by ingest in the library file manifest, with the doc_ID
+        assigned to each file.   Files that were rejected by the parsers are not recorded, and will be tried again
+        on the next ingest. """
+
+        if not self.manifest_entries:
+            return 0
+
+        entries = []
+
+        for fn, entry in self.manifest_entries.items():
+
+            if fn in new_doc_ids:
+                entry["doc_ID"] = new_doc_ids[fn]
+                entries.append(entry)
+
+            elif fn.split(".")[-1].lower() in self.zip_types:
+                entry["doc_ID"] = None
+                entries.append(entry)
+
+        manifest = FileManifest(self.library.library_main_path)
+
+        try:
+            manifest.update(entries)
+        finally:
+            manifest.close()
+
+        return len(entries)
+
+    def ingest (self, input_folder_path, dupe_check=True, workers=None, type_workers=None, start_method="spawn"):
 
         """ Main method for large-scale parsing. Takes only a single input which is the local input folder path
          containing the files to be parsed.
 
-         Optional dupe_check parameter set to True to restrict ingesting a file with the same name as a file
-         already in the library. """
+         Optional dupe_check parameter set to True to skip files that are unchanged since they were ingested into
+         the library, or identical in content to a file already in the library - files with the same name as a
+         file in the library, but modified content, are parsed again, and replace the blocks of the prior version.
+
+         Optional workers > 1 parses the files in parallel in a pool of worker processes, one file per task -
+         type_workers caps the number of files of a type parsed at the same time, e.g., {"voice": 1, "ocr": 2}
+         (by default, voice files are parsed one at a time, as each worker loads its own whisper model).
+         Note: with the default 'spawn' start method, calling scripts should be run under
+         if __name__ == "__main__".  The 'fork' start method is not supported, as forked workers would
+         inherit the pooled SQLite connections of this process. """
 
         # input_folder_path = where the input files are located
 
+        if workers and workers > 1:
+            self._check_parallel_ingest_options(type_workers, start_method)
+
         # first - confirm that library and connection to collection db are in place
         if not self.library or not self.parse_to_db:
 
@@ -391,7 +845,8 @@ class Parser:
                          "try Parse().parse_one set of methods to parse a document of any type directly into "
                          "list of dictionaries in memory, and written to /parser_history as a .json file")
 
-            parsing_results = {"processed_files": 0, "rejected_files": 0, "duplicate_files": []}
+            parsing_results = {"processed_files": 0, "rejected_files": 0, "duplicate_files": [],
+                               "modified_files": [], "identical_files": {}, "stale_vectors": 0}
             return parsing_results
 
         # prepares workspace for individual parsers
@@ -403,6 +858,42 @@ class Parser:
         #   write to db - True only if library loaded + collection connect in place
         write_to_db = self.parse_to_db
 
+        #   doc_IDs assigned in this job are greater than the library counter at the start
+        min_doc_id = self.library.get_library_card()["unique_doc_id"]
+
+        if workers and workers > 1:
+            self._parallel_ingest(workers, type_workers=type_workers, start_method=start_method)
+        else:
+            self._sequential_ingest(work_order)
+
+        # need to systematically capture list of rejected docs
+
+        processed, not_processed = self.input_ingestion_comparison(work_order["file_list"])
+
+        #   modified files replace the blocks of their prior version, only once the new version is parsed
+        new_doc_ids = self._new_doc_ids(min_doc_id)
+        replaced, not_replaced, stale_vectors = self._replace_documents(input_folder_path, new_doc_ids)
+
+        #   the blocks of the prior version are still in the library, so are found by input_ingestion_comparison
+        processed = [fn for fn in processed if fn not in not_replaced]
+        not_processed += not_replaced
+
+        self._update_file_manifest(new_doc_ids)
+
+        parsing_results = {"processed_files": processed,
+                           "rejected_files": not_processed,
+                           "duplicate_files": work_order["duplicate_files"],
+                           "modified_files": replaced,
+                           "identical_files": work_order["identical_files"],
+                           "stale_vectors": stale_vectors}
+
+        return parsing_results
+
+    def _sequential_ingest(self, work_order):
+
+        """ Internal method - parses the files in the work folders prepared by _collator, by file type, in the
+        order office, pdf, text, ocr, voice. """
+
         if work_order["office"] > 0:
             self.parse_office(self.office_work_folder, save_history=False)
 
@@ -433,15 +924,181 @@ class Parser:
             if self.copy_files_to_library:
                 self.uploads(self.voice_work_folder)
 
-        # need to systematically capture list of rejected docs
+        return 0
 
-        processed, not_processed = self.input_ingestion_comparison(work_order["file_list"])
+    @staticmethod
+    def _check_parallel_ingest_options(type_workers, start_method):
 
-        parsing_results = {"processed_files": processed,
-                           "rejected_files": not_processed,
-                           "duplicate_files": work_order["duplicate_files"]}
+        """ Internal method - raises an exception if the type_workers limits or the start method can not be used
+        by _parallel_ingest - a limit of 0 would leave files of that type that are never submitted. """
 
-        return parsing_results
+        if start_method not in ("spawn", "forkserver"):
+            raise LLMWareException(message=f"Exception: Parser - ingest - start_method '{start_method}' not "
+                                           f"supported with workers > 1 - select 'spawn' or 'forkserver'.")
+
+        for parser_type, limit in (type_workers or {}).items():
+            if not isinstance(limit, int) or limit < 1:
+                raise LLMWareException(message=f"Exception: Parser - ingest - type_workers limit for "
+                                               f"'{parser_type}' must be an integer >= 1 - found {limit}.")
+
+        return True
+
+    def _parallel_ingest(self, workers, type_workers=None, start_method="spawn"):
+
+        """ Internal method - parses the files in the work folders prepared by _collator in a pool of worker
+        processes, with one file per task, in the same order as the sequential ingest (office, pdf, text, ocr,
+        voice).   doc_IDs are reserved for all of the files in a single update at the start, and the parsing
+        output returned by the workers is written to the db in task order by this process, in batches of
+        db_write_batch_size - at most workers * 4 tasks are in flight ahead of the writer. """
+
+        type_folders = [("office", self.office_work_folder), ("pdf", self.pdf_work_folder),
+                        ("text", self.text_work_folder), ("ocr", self.ocr_work_folder),
+                        ("voice", self.voice_work_folder)]
+
+        tasks = []
+        for parser_type, folder in type_folders:
+            for fn in os.listdir(folder):
+                if os.path.isfile(os.path.join(folder, fn)):
+                    tasks.append((parser_type, folder, fn))
+
+        if not tasks:
+            return 0
+
+        type_limits = {"voice": 1}
+        if type_workers:
+            type_limits.update(type_workers)
+
+        first_doc_id = self.library.reserve_doc_ids(len(tasks))
+
+        task_path = os.path.join(self.parser_tmp_folder, "parallel_tasks")
+        if os.path.exists(task_path):
+            shutil.rmtree(task_path, ignore_errors=True)
+        os.mkdir(task_path)
+
+        #   workers receive a copy of the parser, without the in-memory state
+        worker_parser = copy.copy(self)
+        worker_parser.parser_output = []
+        worker_parser.parser_index = None
+        worker_parser.write_buffer = None
+        worker_parser.speech_model = None
+
+        writer = BufferedCollectionWriter(self.library_name, account_name=self.account_name,
+                                          flush_size=self.db_write_batch_size)
+
+        counters = {"added_docs": 0, "added_blocks": 0, "added_images": 0, "added_pages": 0, "added_tables": 0}
+
+        t0 = time.time()
+
+        max_ahead = workers * 4
+        futures = {}
+        active = set()
+        running = {}
+        next_write = 0
+
+        ctx = multiprocessing.get_context(start_method)
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_ingest_worker_init,
+                                 initargs=(worker_parser,)) as executor:
+
+            while next_write < len(tasks):
+
+                #   submit tasks in order, within the per-type limits, up to max_ahead tasks ahead of the writer
+                for i in range(next_write, min(len(tasks), next_write + max_ahead)):
+
+                    parser_type, folder, fn = tasks[i]
+
+                    if i in futures or running.get(parser_type, 0) >= type_limits.get(parser_type, workers):
+                        continue
+
+                    futures[i] = executor.submit(_ingest_worker_run, parser_type, folder, fn, first_doc_id + i,
+                                                 os.path.join(task_path, str(i)))
+
+                    active.add(i)
+                    running[parser_type] = running.get(parser_type, 0) + 1
+
+                wait([futures[i] for i in active], return_when=FIRST_COMPLETED)
+
+                for i in [i for i in active if futures[i].done()]:
+                    active.discard(i)
+                    running[tasks[i][0]] -= 1
+
+                #   write the output of completed tasks in task order
+                while next_write in futures and next_write not in active:
+                    self._write_parallel_output(tasks[next_write], futures.pop(next_write),
+                                                first_doc_id + next_write, writer, counters)
+                    next_write += 1
+
+        writer.flush()
+
+        shutil.rmtree(task_path, ignore_errors=True)
+
+        self.library.set_incremental_docs_blocks_images(**counters)
+
+        logger.info(f"update: Parser - parallel ingest - {len(tasks)} files - {workers} workers - "
+                    f"{counters} - time taken: {time.time() - t0}")
+
+        if self.copy_files_to_library:
+            for parser_type, folder in type_folders:
+                if os.listdir(folder):
+                    self.uploads(folder)
+
+        return len(tasks)
+
+    def _write_parallel_output(self, task, future, doc_id, writer, counters):
+
+        """ Internal method - adds the parsing output of one file from _parallel_ingest to the db write buffer,
+        with its reserved doc_ID, and updates the library card counters. """
+
+        parser_type, folder, fn = task
+
+        try:
+            output = future.result()
+        except Exception as e:
+            logger.warning(f"warning: Parser - parallel ingest - could not parse file - {fn} - {e}")
+            return 0
+
+        if not output:
+            return 0
+
+        for block in output:
+
+            new_entry = dict(block)
+
+            if "_id" in new_entry:
+                del new_entry["_id"]
+
+            #   the pdf and office parsers output all values as strings
+            for key in ["block_ID", "master_index", "master_index2", "coords_x", "coords_y", "coords_cx",
+                        "coords_cy"]:
+                if isinstance(new_entry.get(key), str):
+                    try:
+                        new_entry[key] = int(new_entry[key])
+                    except ValueError:
+                        pass
+
+            new_entry["doc_ID"] = doc_id
+            new_entry["embedding_flags"] = {}
+
+            #   python-based parsers number blocks with the library block_ID counter, as in the sequential ingest
+            if parser_type in ["text", "ocr", "voice"]:
+                new_entry["block_ID"] = self.library.block_ID
+                self.library.block_ID += 1
+
+            writer.add(new_entry)
+
+        counters["added_docs"] += 1
+        counters["added_blocks"] += len(output)
+
+        if parser_type in ["office", "pdf"]:
+            counters["added_images"] += sum(1 for b in output if b.get("content_type") == "image")
+            counters["added_tables"] += sum(1 for b in output if b.get("content_type") == "table")
+            pages = [int(b["master_index"]) for b in output if str(b.get("master_index", "")).isdigit()]
+            counters["added_pages"] += max(pages, default=0)
+
+        if parser_type in ["text", "ocr"]:
+            counters["added_pages"] += 1
+
+        return len(output)
 
     def ingest_to_json(self, input_folder_path):
 
@@ -568,28 +1225,28 @@ class Parser:
                     if success_code == 1:
 
                         if ext in self.office_types:
-                            shutil.copy(os.path.join(self.zip_work_folder,"tmp" + os.sep,f),
-                                        os.path.join(self.office_work_folder,fn))
+                            self._stage_file(os.path.join(self.zip_work_folder,"tmp" + os.sep,f),
+                                             os.path.join(self.office_work_folder,fn), extracted=True)
                             office_found += 1
 
                         if ext in self.pdf_types:
-                            shutil.copy(os.path.join(self.zip_work_folder, "tmp" + os.sep, f),
-                                        os.path.join(self.pdf_work_folder,fn))
+                            self._stage_file(os.path.join(self.zip_work_folder, "tmp" + os.sep, f),
+                                             os.path.join(self.pdf_work_folder,fn), extracted=True)
                             pdf_found += 1
 
                         if ext in self.text_types:
-                            shutil.copy(os.path.join(self.zip_work_folder, "tmp" + os.sep, f),
-                                        os.path.join(self.text_work_folder,fn))
+                            self._stage_file(os.path.join(self.zip_work_folder, "tmp" + os.sep, f),
+                                             os.path.join(self.text_work_folder,fn), extracted=True)
                             text_found += 1
 
                         if ext in self.ocr_types:
-                            shutil.copy(os.path.join(self.zip_work_folder,"tmp" + os.sep,f),
-                                        os.path.join(self.ocr_work_folder,fn))
+                            self._stage_file(os.path.join(self.zip_work_folder,"tmp" + os.sep,f),
+                                             os.path.join(self.ocr_work_folder,fn), extracted=True)
                             ocr_found += 1
 
                         if ext in self.voice_types:
-                            shutil.copy(os.path.join(self.zip_work_folder,"tmp" + os.sep,f),
-                                        os.path.join(self.voice_work_folder, fn))
+                            self._stage_file(os.path.join(self.zip_work_folder,"tmp" + os.sep,f),
+                                             os.path.join(self.voice_work_folder, fn), extracted=True)
                             voice_found += 1
 
         work_order = {"pdf": pdf_found, "office": office_found, "text": text_found, "ocr": ocr_found, "voice": voice_found}
@@ -1988,6 +2645,7 @@ class Parser:
 
         return output
 
+    @_flush_write_buffer_on_exit
     def parse_text(self, input_fp, write_to_db=True, save_history=True, dupe_check=False,copy_to_library=False,
                    text_chunk_size=None, key_list=None, interpret_as_table=False,delimiter=",", separator="\n",
                    batch_size=1, encoding="utf-8-sig", errors="ignore"):
@@ -2096,7 +2754,8 @@ class Parser:
                 blocks_created += new_blocks
                 pages_added += new_pages
 
-        # update overall library counter at end of parsing
+        # write any buffered records, then update overall library counter at end of parsing
+        self.flush_write_buffer()
 
         if len(output) > 0:
             if write_to_db_on == 1:
@@ -2111,10 +2770,14 @@ class Parser:
 
         return output
 
+    @_flush_write_buffer_on_exit
     def parse_pdf_by_ocr_images(self, input_fp, write_to_db=True, save_history=True,
-                                dupe_check=False,copy_to_library=False):
+                                dupe_check=False,copy_to_library=False, workers=None, page_chunk_size=None):
+
+        """ Alternative PDF parser option for scanned 'image-based' PDFs where digital parsing is not an option.
 
-        """ Alternative PDF parser option for scanned 'image-based' PDFs where digital parsing is not an option. """
+        Pages are rendered in chunks of page_chunk_size pages, and OCR'd across a pool of workers, and the text
+        of each page is written, in page order, as the pages complete - defaults set in OCRConfig. """
 
         output = []
 
@@ -2168,7 +2831,8 @@ class Parser:
 
                     docs_added += 1
 
-                    output_by_page = ImageParser(self).process_pdf_by_ocr(input_fp, file)
+                    output_by_page = ImageParser(self).iter_pdf_by_ocr(input_fp, file, workers=workers,
+                                                                       page_chunk_size=page_chunk_size)
 
                     for j, blocks in enumerate(output_by_page):
 
@@ -2183,7 +2847,8 @@ class Parser:
 
                         logger.info(f"update: writing doc - page - {file} - {j} - {len(blocks)}")
 
-        # update overall library counter at end of parsing
+        # write any buffered records, then update overall library counter at end of parsing
+        self.flush_write_buffer()
 
         if write_to_db_on == 1:
             dummy = self.library.set_incremental_docs_blocks_images(added_docs=docs_added,added_blocks=blocks_added,
@@ -2331,8 +2996,16 @@ class Parser:
 
         if write_to_db:
             # registry_id = library.collection.insert_one(new_entry).inserted_id
-            registry_id = CollectionWriter(library.library_name,
-                                           account_name=library.account_name).write_new_parsing_record(new_entry)
+            # new records are buffered and written in batches - see flush_write_buffer
+            if not self.write_buffer or self.write_buffer.library_name != library.library_name or \
+                    self.write_buffer.account_name != library.account_name:
+
+                self.flush_write_buffer()
+                self.write_buffer = BufferedCollectionWriter(library.library_name,
+                                                             account_name=library.account_name,
+                                                             flush_size=self.db_write_batch_size)
+
+            self.write_buffer.add(new_entry)
 
         return new_entry
 
@@ -2383,6 +3056,7 @@ class Parser:
 
         return new_entry
 
+    @_flush_write_buffer_on_exit
     def parse_wiki(self, topic_list, write_to_db=True, save_history=False, target_results=10):
 
         """ Main entry point to parse a Wikipedia article. """
@@ -2458,6 +3132,8 @@ class Parser:
                 art.write(articles["text"])
                 art.close()
 
+        self.flush_write_buffer()
+
         if write_to_db_on == 1:
             dummy = self.library.set_incremental_docs_blocks_images(added_docs=docs_added, added_blocks=blocks_added,
                                                                     added_images=0, added_pages=pages_added)
@@ -2467,9 +3143,12 @@ class Parser:
 
         return output
 
-    def parse_image(self, input_folder, write_to_db=True, save_history=True, dupe_check=False,copy_to_library=False):
+    @_flush_write_buffer_on_exit
+    def parse_image(self, input_folder, write_to_db=True, save_history=True, dupe_check=False,copy_to_library=False,
+                    workers=None):
 
-        """ Main entry point for OCR based parsing of image files. """
+        """ Main entry point for OCR based parsing of image files - the files are OCR'd across a pool of workers,
+        and the output of each file is written, in order, as it completes. """
 
         output = []
 
@@ -2496,37 +3175,36 @@ class Parser:
         docs_added = 0
         pages_added = 0
 
+        # by default, will process all files in the folder, skipping duplicates if dupe_check
+        files = []
         for file in os.listdir(input_folder):
 
-            # by default, will process all files with text file extensions
-            go_ahead = True
-
-            if dupe_check:
+            #   basic_library_duplicate_check returns TRUE if it finds the file
+            if dupe_check and self.basic_library_duplicate_check(file):
+                continue
 
-                #   basic_library_duplicate_check returns TRUE if it finds the file
-                if self.basic_library_duplicate_check(file):
-                    go_ahead = False
+            files.append(file)
 
-            if go_ahead:
+        for file, ip_output in ImageParser(self).process_ocr_files(input_folder, files, workers=workers):
 
-                # increment and get new doc_id
-                if write_to_db_on == 1:
-                    self.library.doc_ID = self.library.get_and_increment_doc_id()
+            # increment and get new doc_id
+            if write_to_db_on == 1:
+                self.library.doc_ID = self.library.get_and_increment_doc_id()
 
-                ip_output = ImageParser(self).process_ocr(input_folder, file)
+            if write_to_db_on == 1:
+                new_output, new_blocks, new_pages = self._write_output_to_db(ip_output,file,content_type="text",
+                                                                             file_type="ocr")
+            else:
+                new_output, new_blocks, new_pages = self._write_output_to_dict(ip_output,file, content_type="text",
+                                                                               file_type="ocr")
+            # return output value in either case
+            output += new_output
 
-                if write_to_db_on == 1:
-                    new_output, new_blocks, new_pages = self._write_output_to_db(ip_output,file,content_type="text",
-                                                                                 file_type="ocr")
-                else:
-                    new_output, new_blocks, new_pages = self._write_output_to_dict(ip_output,file, content_type="text",
-                                                                                   file_type="ocr")
-                # return output value in either case
-                output += new_output
+            docs_added += 1
+            blocks_added += new_blocks
+            pages_added += new_pages
 
-                docs_added += 1
-                blocks_added += new_blocks
-                pages_added += new_pages
+        self.flush_write_buffer()
 
         if write_to_db_on == 1:
             dummy = self.library.set_incremental_docs_blocks_images(added_docs=docs_added, added_blocks=blocks_added,
@@ -2540,10 +3218,13 @@ class Parser:
 
         return output
 
+    @_flush_write_buffer_on_exit
     def parse_voice(self, input_folder, write_to_db=True, save_history=True, dupe_check=False,copy_to_library=False,
-                    chunk_by_segment=True, remove_segment_markers=True, real_time_progress=True):
+                    chunk_by_segment=True, remove_segment_markers=True, real_time_progress=True, batch_size=1):
 
-        """ Main entry point for parsing voice wav files. """
+        """ Main entry point for parsing voice wav files.   The speech model is loaded once and kept resident for
+        all of the files in the folder - or borrowed from self.speech_model, if set - and released at the end of
+        the job.   With batch_size > 1, files are transcribed in batches in a single pass through the model. """
 
         output = []
 
@@ -2570,90 +3251,112 @@ class Parser:
         docs_added = 0
         pages_added = 0
 
+        # by default, will process all files in the folder, skipping duplicates if dupe_check
+        files = []
         for file in os.listdir(input_folder):
 
-            # by default, will process all files with text file extensions
-            go_ahead = True
+            #   basic_library_duplicate_check returns TRUE if it finds the file
+            if dupe_check and self.basic_library_duplicate_check(file):
+                continue
 
-            if dupe_check:
+            files.append(file)
 
-                #   basic_library_duplicate_check returns TRUE if it finds the file
-                if self.basic_library_duplicate_check(file):
-                    go_ahead = False
+        voice_parser = VoiceParser(self,
+                                   chunk_size=self.chunk_size,
+                                   max_chunk_size=self.max_chunk_size,
+                                   chunk_by_segment=chunk_by_segment,
+                                   remove_segment_markers=remove_segment_markers,
+                                   real_time_progress=real_time_progress,
+                                   speech_model=self.speech_model,
+                                   keep_model_loaded=True)
 
-            if go_ahead:
+        try:
 
-                #   increment and get new doc_id
-                if write_to_db_on == 1:
-                    self.library.doc_ID = self.library.get_and_increment_doc_id()
+            for j in range(0, len(files), max(batch_size, 1)):
 
-                logger.info(f"update: parse_voice file - processing - {file}")
+                batch = files[j:j + max(batch_size, 1)]
 
-                vp_output = VoiceParser(self,
-                                        chunk_size=self.chunk_size,
-                                        max_chunk_size=self.max_chunk_size,
-                                        chunk_by_segment=chunk_by_segment,
-                                        remove_segment_markers=remove_segment_markers,
-                                        real_time_progress=real_time_progress).add_voice_file(input_folder, file)
+                logger.info(f"update: parse_voice file - processing - {batch}")
 
-                if not chunk_by_segment:
-                    text_chunks_only = []
-                    for chunks in vp_output:
-                        text_chunks_only.append(chunks["text"])
+                if len(batch) > 1:
+                    batch_output = voice_parser.add_voice_files(input_folder, batch)
+                else:
+                    batch_output = [voice_parser.add_voice_file(input_folder, batch[0])]
 
+                for file, vp_output in zip(batch, batch_output):
+
+                    #   increment and get new doc_id
                     if write_to_db_on == 1:
-                        new_output, new_blocks, new_pages = self._write_output_to_db(text_chunks_only, file,
-                                                                                     content_type="text",
-                                                                                     file_type="voice-wav")
+                        self.library.doc_ID = self.library.get_and_increment_doc_id()
+
+                    if not chunk_by_segment:
+                        text_chunks_only = []
+                        for chunks in vp_output:
+                            text_chunks_only.append(chunks["text"])
+
+                        if write_to_db_on == 1:
+                            new_output, new_blocks, new_pages = self._write_output_to_db(text_chunks_only, file,
+                                                                                         content_type="text",
+                                                                                         file_type="voice-wav")
+                        else:
+                            new_output, new_blocks, new_pages = self._write_output_to_dict(text_chunks_only, file,
+                                                                                           content_type="text",
+                                                                                           file_type="voice-wav")
+
+                        output += new_output
+                        docs_added += 1
+                        blocks_added += new_blocks
+                        pages_added += new_pages
+                        self.file_counter += 1
+
                     else:
-                        new_output, new_blocks, new_pages = self._write_output_to_dict(text_chunks_only, file,
-                                                                                       content_type="text",
-                                                                                       file_type="voice-wav")
 
-                    output += new_output
-                    docs_added += 1
-                    blocks_added += new_blocks
-                    pages_added += new_pages
-                    self.file_counter += 1
+                        for i, blocks in enumerate(vp_output):
 
-                else:
+                            # iterate thru each block -> add to metadata
+                            speaker_name = blocks["speaker"]
 
-                    for i, blocks in enumerate(vp_output):
+                            meta = {"author": speaker_name, "modified_date": "", "created_date": "", "creator_tool": ""}
 
-                        # iterate thru each block -> add to metadata
-                        speaker_name = blocks["speaker"]
+                            coords_dict = {"coords_x": blocks["start_time"], "coords_y": blocks["end_time"],
+                                           "coords_cx": blocks["start_segment"], "coords_cy": blocks["end_segment"]}
 
-                        meta = {"author": speaker_name, "modified_date": "", "created_date": "", "creator_tool": ""}
+                            text_entry = blocks["text"]
 
-                        coords_dict = {"coords_x": blocks["start_time"], "coords_y": blocks["end_time"],
-                                       "coords_cx": blocks["start_segment"], "coords_cy": blocks["end_segment"]}
+                            format_type = "voice-wav"
 
-                        text_entry = blocks["text"]
+                            new_entry = ("text", format_type, (1, 0), i, "", "", file,
+                                         "", text_entry, "", "", text_entry, text_entry, "", text_entry,
+                                         "", "", "", "", "")
 
-                        format_type = "voice-wav"
+                            #TODO: adding dialog and diarization roles in speech parsing
 
-                        new_entry = ("text", format_type, (1, 0), i, "", "", file,
-                                     "", text_entry, "", "", text_entry, text_entry, "", text_entry,
-                                     "", "", "", "", "")
+                            if write_to_db_on == 1:
+                                entry_output = self.add_create_new_record(self.library, new_entry, meta, coords_dict,
+                                                                          dialog_value="false")
+                                self.library.block_ID += 1
+                            else:
+                                entry_output = self.create_one_parsing_output_dict(i,new_entry,meta,coords_dict,
+                                                                                   dialog_value="false")
+                                self.parser_output.append(entry_output)
 
-                        #TODO: adding dialog and diarization roles in speech parsing
+                            # return output in either case
+                            output.append(entry_output)
 
-                        if write_to_db_on == 1:
-                            entry_output = self.add_create_new_record(self.library, new_entry, meta, coords_dict,
-                                                                      dialog_value="false")
-                            self.library.block_ID += 1
-                        else:
-                            entry_output = self.create_one_parsing_output_dict(i,new_entry,meta,coords_dict,
-                                                                               dialog_value="false")
-                            self.parser_output.append(entry_output)
+                        blocks_added += len(vp_output)
+                        pages_added += 0
+                        docs_added += 1
+                        self.file_counter += 1
 
-                        # return output in either case
-                        output.append(entry_output)
+        finally:
+            voice_parser.release()
 
-                    blocks_added += len(vp_output)
-                    pages_added += 0
-                    docs_added += 1
-                    self.file_counter += 1
+        if voice_parser.transcribe_seconds > 0:
+            logger.info(f"update: parse_voice - {round(voice_parser.audio_seconds / 60, 2)} minutes of audio in "
+                        f"{round(voice_parser.transcribe_seconds / 60, 2)} minutes - "
+                        f"{round(voice_parser.get_throughput(), 1)} minutes of audio per minute")
+
+        self.flush_write_buffer()
 
         if write_to_db_on == 1:
             dummy = self.library.set_incremental_docs_blocks_images(added_docs=docs_added, added_blocks=blocks_added,
@@ -2667,6 +3370,7 @@ class Parser:
 
         return output
 
+    @_flush_write_buffer_on_exit
     def parse_dialog(self, input_folder, write_to_db=True, save_history=True, dupe_check=False,copy_to_library=True):
 
         """ Main entry point for parsing AWS dialog transcripts. """
@@ -2762,6 +3466,8 @@ class Parser:
 
         pages_added = dialog_transcripts_added
 
+        self.flush_write_buffer()
+
         if write_to_db_on == 1:
             dummy = self.library.set_incremental_docs_blocks_images(added_docs=dialog_transcripts_added,
                                                                     added_blocks=conversation_turns,
@@ -2777,6 +3483,7 @@ class Parser:
 
         return output
 
+    @_flush_write_buffer_on_exit
     def parse_website(self, url_base, write_to_db=True, save_history=True, get_links=True, max_links=10):
 
         """ Main entrypoint for parsing a website. """
@@ -2946,6 +3653,8 @@ class Parser:
         docs_created = 1
         self.file_counter += 1
 
+        self.flush_write_buffer()
+
         if write_to_db_on == 1:
             dummy = self.library.set_incremental_docs_blocks_images(added_docs=docs_created,
                                                                     added_blocks=entries_created,
@@ -2997,7 +3706,8 @@ class Parser:
 
                 #   will not over-write an existing file unless overwrite flag set
                 if overwrite or files[x] not in library_files:
-                    shutil.copy(os.path.join(tmp_dir, files[x]), os.path.join(upload_fp, files[x]))
+                    self._stage_file(os.path.join(tmp_dir, files[x]), os.path.join(upload_fp, files[x]),
+                                     to_library=True)
 
         return len(files)
 
@@ -3641,16 +4351,91 @@ class Parser:
 
         return output
 
-    def query_parser_state(self, query, results=None, remove_stop_words=True):
+    def query_parser_state(self, query, results=None, remove_stop_words=True, use_index=False, ranked=False,
+                           result_count=None):
 
-        """ Runs an in-memory 'fast search' against a set of parsed output json dictionaries. """
+        """ Runs an in-memory 'fast search' against a set of parsed output json dictionaries - by default, with
+        Utilities().fast_search_dicts, which returns the dicts with an exact match of the query in the text, in
+        parsing order.
 
-        if not results:
-            results = self.parser_output
+        Opt-in search index (BM25Index) - with use_index=True, runs against an index of the results, or if no
+        results are passed, of the parser_output, which is built on the first query, and updated with any new
+        parser output on later queries - and if ranked=True, returns the dicts ranked by BM25 score, across the
+        text, header_text and file_source fields.   Note: results from the index are copies of the dicts, with a
+        "score" key, and matching is case-insensitive. """
 
-        output = Utilities().fast_search_dicts(query,results, text_key="text",remove_stop_words=remove_stop_words)
+        if not use_index and not ranked:
 
-        return output
+            if not results:
+                results = self.parser_output
+
+            return Utilities().fast_search_dicts(query,results, text_key="text",remove_stop_words=remove_stop_words)
+
+        if results:
+            index = BM25Index(remove_stop_words=remove_stop_words).add(results)
+        else:
+            index = self.build_parser_index(remove_stop_words=remove_stop_words)
+
+        if ranked:
+            return index.search(query, result_count=result_count)
+
+        return index.search(query, result_count=result_count, exact_match=True, ranked=False, fields=["text"])
+
+    def build_parser_index(self, field_weights=None, remove_stop_words=None):
+
+        """ Builds the in-memory search index (BM25Index) over parser_output, or adds any new parser output to
+        the existing index - returns the index.   If field_weights or remove_stop_words are not set, then the
+        settings of the existing index are kept. """
+
+        index = self.parser_index
+
+        if remove_stop_words is None:
+            remove_stop_words = index.remove_stop_words if index is not None else True
+
+        if index is not None:
+
+            indexed = len(index.docs)
+
+            # rebuild if settings changed, or if the parser output is no longer the output that was indexed
+            if (field_weights and field_weights != index.field_weights) or \
+                    remove_stop_words != index.remove_stop_words or indexed > len(self.parser_output) or \
+                    (indexed and index.docs[-1] is not self.parser_output[indexed - 1]):
+                index = None
+
+        if index is None:
+            index = BM25Index(field_weights=field_weights, remove_stop_words=remove_stop_words)
+
+        index.add(self.parser_output[len(index.docs):])
+
+        self.parser_index = index
+
+        return index
+
+    def save_parser_index(self):
+
+        """ Saves the search index of the parser output to parser history, next to the parser output jsonl, so
+        that it can be re-loaded with load_parser_index without re-building. """
+
+        self.save_state()
+
+        fn = ParserState().save_parser_index(self.parser_job_id, self.build_parser_index().to_dict())
+
+        return fn
+
+    def load_parser_index(self, parser_job_id):
+
+        """ Loads the parser output and search index of a prior parser job from parser history into the parser
+        state - if no saved index found, then builds the index from the parser output. """
+
+        self.parser_output = ParserState().lookup_by_parser_job_id(parser_job_id)
+        self.parser_index = None
+
+        index_dict = ParserState().load_parser_index(parser_job_id)
+
+        if index_dict:
+            self.parser_index = BM25Index.from_dict(index_dict, docs=self.parser_output)
+
+        return self.build_parser_index()
 
     # update 012924 - new methods start here for duplicate checking
 
@@ -3740,6 +4525,9 @@ class Parser:
         existing_docs_in_collection = CollectionRetrieval(self.library_name,
                                                           account_name=self.account_name).get_distinct_list("file_source")
 
+        # split to get base file name
+        existing_files = set(str(existing_file).split(os.sep)[-1] for existing_file in existing_docs_in_collection)
+
         input_files = os.listdir(fp)
 
         no_dupes_list = []
@@ -3747,20 +4535,9 @@ class Parser:
 
         for file in input_files:
 
-            match_found = 0
-
-            for existing_file in existing_docs_in_collection:
-
-                if os.sep in existing_file:
-                    # split to get base file name
-                    existing_file = existing_file.split(os.sep)[-1]
-
-                if file == existing_file:
-                    matching_file_names.append(file)
-                    match_found = 1
-                    break
-
-            if match_found == 0:
+            if file in existing_files:
+                matching_file_names.append(file)
+            else:
                 no_dupes_list.append(file)
 
         duplicate_check = {"not_in_library": no_dupes_list, "in_library": matching_file_names}
@@ -3784,6 +4561,7 @@ class Parser:
 
         return in_library
 
+    @_flush_write_buffer_on_exit
     def parse_csv_config(self,fp, fn, cols=None, mapping_dict=None, delimiter=","):
 
         """ Designed for intake of a 'pseudo-db csv table' and will add rows to library with mapped keys.
@@ -3904,7 +4682,8 @@ class Parser:
 
             total_row_count += 1
 
-        # update overall library counter at end of parsing
+        # write any buffered records, then update overall library counter at end of parsing
+        self.flush_write_buffer()
 
         if len(output) > 0:
 
@@ -3919,6 +4698,7 @@ class Parser:
 
         return output
 
+    @_flush_write_buffer_on_exit
     def parse_json_config(self,fp, fn, mapping_dict=None):
 
         """ Designed for intake of a 'pseudo-db json/jsonl table' and will add rows to library with mapped keys.
@@ -4037,7 +4817,8 @@ class Parser:
 
             total_row_count += 1
 
-        # update overall library counter at end of parsing
+        # write any buffered records, then update overall library counter at end of parsing
+        self.flush_write_buffer()
 
         if len(output) > 0:
 
@@ -4053,7 +4834,7 @@ class Parser:
         return output
 
     def ocr_images_in_library(self, add_to_library=False, chunk_size=400, min_size=10,
-                              realtime_progress=True):
+                              realtime_progress=True, workers=None):
 
         """ Assumes that a Library is passed in the Parser constructor, and that the Library already contains
         some parsed content with at least some images found.   This method will identify the images extracted
@@ -4062,7 +4843,10 @@ class Parser:
 
         Output, by default, is verbose and displays real-time progress from the OCR to be able to evaluate the
         quality before confirming `add_to_library = True`.   To remove the verbose screen output, set
-        `realtime_progress = False`. """
+        `realtime_progress = False`.
+
+        The images are OCR'd across a pool of workers, and the new text blocks of each image are written, in
+        order, as the OCR of the image completes. """
 
         if not self.library:
             raise LLMWareException(message="Exception: Parser - ocr_images_in_library - is intended to be used "
@@ -4088,15 +4872,21 @@ class Parser:
             logger.info(f"update: image source file path: {image_path}")
 
         #   query the collection DB by content_type == "image"
-        image_blocks = CollectionRetrieval(library_name).filter_by_key("content_type", "image")
+        image_blocks = list(CollectionRetrieval(library_name).filter_by_key("content_type", "image"))
         doc_update_list = {}
         new_text_created = 0
 
-        #   iterate through the image blocks found
-        for i, block in enumerate(image_blocks):
+        #   "external_files" points to the image name that will be found in the image_path above for the library
+        img_names = [block["external_files"] for block in image_blocks]
+
+        #   preserve_spacing == True will keep \n \r \t and other white space
+        #   preserve_spacing == False collapses the white space into a single space for 'more dense' text only
+        ocr_output = ImageParser(text_chunk_size=chunk_size).process_ocr_files(image_path, img_names,
+                                                                               preserve_spacing=False,
+                                                                               workers=workers)
 
-            #   "external_files" points to the image name that will be found in the image_path above for the library
-            img_name = block["external_files"]
+        #   iterate through the image blocks found, with the ocr output of each image, as it completes
+        for block, (img_name, output) in zip(image_blocks, ocr_output):
 
             #   each doc_ID is unique for the library collection
             doc_id = block["doc_ID"]
@@ -4107,58 +4897,57 @@ class Parser:
             #   note: _id not used, but it is a good lookup key that can be easily inserted in special_field1 below
             bid = block["_id"]
 
-            #   preserve_spacing == True will keep \n \r \t and other white space
-            #   preserve_spacing == False collapses the white space into a single space for 'more dense' text only
-            output = ImageParser(text_chunk_size=chunk_size).process_ocr(image_path, img_name, preserve_spacing=False)
-
             if realtime_progress:
                 logger.info(f"update: realtime progress- ocr output: {output}")
 
             #   good to do a test run with 'add_to_library' == False before writing to the collection
             if add_to_library:
 
-                for text_chunk in output:
+                #   new blocks for the image are written in a single transaction, if supported by the db
+                with CollectionWriter(library_name).write_batch():
 
-                    if text_chunk.strip():
+                    for text_chunk in output:
 
-                        # optional to keep only more substantial chunks of text
-                        if len(text_chunk) > min_size:
+                        if text_chunk.strip():
 
-                            #   ad hoc tracker to keep incrementing the block_id for every new image in a particular doc
-                            if doc_id in doc_update_list:
-                                new_block_id = doc_update_list[doc_id]
-                                doc_update_list.update({doc_id: new_block_id + 1})
-                            else:
-                                new_block_id = 100000
-                                doc_update_list.update({doc_id: new_block_id + 1})
+                            # optional to keep only more substantial chunks of text
+                            if len(text_chunk) > min_size:
 
-                            new_block = block
+                                #   ad hoc tracker to keep incrementing the block_id for every new image in a particular doc
+                                if doc_id in doc_update_list:
+                                    new_block_id = doc_update_list[doc_id]
+                                    doc_update_list.update({doc_id: new_block_id + 1})
+                                else:
+                                    new_block_id = 100000
+                                    doc_update_list.update({doc_id: new_block_id + 1})
 
-                            #   feel free to adapt these attributes to fit for purpose
-                            new_block.update({"block_ID": new_block_id})
-                            new_block.update({"content_type": "text"})
-                            new_block.update({"embedding_flags": {}})
-                            new_block.update({"text_search": text_chunk})
+                                new_block = block
 
-                            #   writes a special entry in 'special_field1' of the database
-                            #   this special entry captures the link back to the original 'image' block
-                            #   it can be unpacked by splitting on '&' and '-' to retrieve the doc_id and block_id
+                                #   feel free to adapt these attributes to fit for purpose
+                                new_block.update({"block_ID": new_block_id})
+                                new_block.update({"content_type": "text"})
+                                new_block.update({"embedding_flags": {}})
+                                new_block.update({"text_search": text_chunk})
 
-                            output = f"document-{doc_id}&block-{block_id}"
-                            new_block.update({"special_field1": output})
+                                #   writes a special entry in 'special_field1' of the database
+                                #   this special entry captures the link back to the original 'image' block
+                                #   it can be unpacked by splitting on '&' and '-' to retrieve the doc_id and block_id
 
-                            #   new _id will be assigned by the database directly
-                            if "_id" in new_block:
-                                del new_block["_id"]
+                                output = f"document-{doc_id}&block-{block_id}"
+                                new_block.update({"special_field1": output})
 
-                            if realtime_progress:
-                                logger.info(f"update: writing new text block - {new_text_created} - "
-                                            f"{doc_id} - {block_id} - {text_chunk} - {new_block}")
+                                #   new _id will be assigned by the database directly
+                                if "_id" in new_block:
+                                    del new_block["_id"]
 
-                            #   creates the new record
-                            CollectionWriter(library_name).write_new_parsing_record(new_block)
+                                if realtime_progress:
+                                    logger.info(f"update: writing new text block - {new_text_created} - "
+                                                f"{doc_id} - {block_id} - {text_chunk} - {new_block}")
 
-                            new_text_created += 1
+                                #   creates the new record
+                                CollectionWriter(library_name).write_new_parsing_record(new_block)
+
+                                new_text_created += 1
 
         return new_text_created
 
@@ -4188,6 +4977,39 @@ class ImageParser:
 
         """ Process a single OCR file in 'dir_fp' and with filename 'fn'. """
 
+        text_out = self._image_to_text(os.path.join(dir_fp,fn))
+
+        return self._chunk_ocr_text(text_out, preserve_spacing=preserve_spacing)
+
+    def process_ocr_files(self, dir_fp, files, preserve_spacing=False, workers=None):
+
+        """ Runs OCR on a list of image files in 'dir_fp' across a pool of workers - generator that yields
+        (fn, text_chunks) for each file, in the order of the list, as the OCR of each file completes. """
+
+        images = (os.path.join(dir_fp, fn) for fn in files)
+
+        for fn, text_out in zip(files, self._stream_ocr(images, workers=workers)):
+            yield fn, self._chunk_ocr_text(text_out, preserve_spacing=preserve_spacing)
+
+    def _chunk_ocr_text(self, text_out, preserve_spacing=False):
+
+        """ Chops up the OCR text of an image into text chunks. """
+
+        if not preserve_spacing:
+            text_out = text_out.replace("\n", " ")
+
+        # will chop up the long text into individual blocks
+        text_chunks = TextChunker(text_chunk=text_out,
+                                  max_char_size=self.text_chunk_size,
+                                  look_back_char_range=self.look_back_range).convert_text_to_chunks()
+
+        return text_chunks
+
+    @staticmethod
+    def _image_to_text(image):
+
+        """ Runs tesseract on an image - either a file path or a PIL image. """
+
         try:
             import pytesseract
             from pytesseract.pytesseract import TesseractNotFoundError
@@ -4195,19 +5017,87 @@ class ImageParser:
             raise DependencyNotInstalledException("pytesseract")
 
         try:
-            text_out = pytesseract.image_to_string(os.path.join(dir_fp,fn))
+            text_out = pytesseract.image_to_string(image)
         except TesseractNotFoundError as e:
             raise OCRDependenciesNotFoundException("tesseract")
 
-        if not preserve_spacing:
-            text_out = text_out.replace("\n", " ")
+        return text_out
 
-        # will chop up the long text into individual blocks
-        text_chunks = TextChunker(text_chunk=text_out,
-                                  max_char_size=self.text_chunk_size,
-                                  look_back_char_range=self.look_back_range).convert_text_to_chunks()
+    def _stream_ocr(self, images, workers=None):
 
-        return text_chunks
+        """ Runs OCR over an iterable of images across a pool of worker threads - each image is OCR'd in a separate
+        tesseract process, so the threads run concurrently.   Yields the text of each image in the order of the
+        input, and pulls the next images from the iterable only as results are consumed, so that at most
+        2 x workers images are held pending at any time. """
+
+        if not workers:
+            workers = OCRConfig.get_config("ocr_workers") or os.cpu_count() or 1
+
+        workers = max(int(workers), 1)
+
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            for image in images:
+
+                pending.append(executor.submit(self._image_to_text, image))
+
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+    def _render_pdf_pages(self, fp, page_chunk_size, dpi):
+
+        """ Renders the pages of a pdf file into images, lazily, page_chunk_size pages at a time - generator that
+        yields one page image at a time, and drops each page from the chunk as it is yielded. """
+
+        try:
+            from pdf2image import convert_from_path, pdfinfo_from_path
+            from pdf2image.exceptions import PDFInfoNotInstalledError
+        except ImportError:
+            raise DependencyNotInstalledException("pdf2image")
+
+        try:
+            page_count = pdfinfo_from_path(fp)["Pages"]
+        except PDFInfoNotInstalledError as e:
+            raise OCRDependenciesNotFoundException("poppler")
+
+        for first_page in range(1, page_count + 1, page_chunk_size):
+
+            last_page = min(first_page + page_chunk_size - 1, page_count)
+
+            images = convert_from_path(fp, dpi=dpi, first_page=first_page, last_page=last_page)
+            images.reverse()
+
+            while images:
+                yield images.pop()
+
+    def iter_pdf_by_ocr(self, input_fp, file, workers=None, page_chunk_size=None, dpi=None):
+
+        """ Streaming page-by-page OCR of a scanned PDF document - pages are rendered in chunks of page_chunk_size
+        pages, and OCR'd across a pool of workers.   Generator that yields the text chunks of each page, in page
+        order, as the pages complete - memory is bounded by the page chunk and the pages pending OCR, regardless
+        of the number of pages in the document. """
+
+        if not page_chunk_size:
+            page_chunk_size = OCRConfig.get_config("ocr_page_chunk_size")
+
+        if not dpi:
+            dpi = OCRConfig.get_config("ocr_dpi")
+
+        pages = self._render_pdf_pages(os.path.join(input_fp, file), max(int(page_chunk_size), 1), dpi)
+
+        for text in self._stream_ocr(pages, workers=workers):
+
+            # will chop up the long text into individual blocks
+            text_chunks = TextChunker(text_chunk=text,
+                                      max_char_size=self.text_chunk_size,
+                                      look_back_char_range=self.look_back_range).convert_text_to_chunks()
+
+            yield text_chunks
 
     def ocr_to_single_text_file(self,fp):
 
@@ -4239,42 +5129,10 @@ class ImageParser:
 
     def process_pdf_by_ocr(self, input_fp, file):
 
-        """ Handles special case of running page-by-page OCR on a scanned PDF document. """
+        """ Handles special case of running page-by-page OCR on a scanned PDF document - returns the list of
+        text chunks of each page - see iter_pdf_by_ocr to stream the pages as they complete. """
 
-        text_output_by_page = []
-
-        try:
-            import pytesseract
-            from pytesseract.pytesseract import TesseractNotFoundError
-        except ImportError:
-            raise DependencyNotInstalledException("pytesseract")
-
-        try:
-            from pdf2image import convert_from_path
-            from pdf2image.exceptions import PDFInfoNotInstalledError
-        except ImportError:
-            raise DependencyNotInstalledException("pdf2image")
-
-        # decompose pdf into set of images by page
-        try:
-            images = convert_from_path(os.path.join(input_fp,file))
-        except PDFInfoNotInstalledError as e:
-            raise OCRDependenciesNotFoundException("poppler")
-        for j, image in enumerate(images):
-
-            # run ocr over page image
-            try:
-                text = pytesseract.image_to_string(image)
-            except TesseractNotFoundError as e:
-                raise OCRDependenciesNotFoundException("tesseract")
-            # will chop up the long text into individual blocks
-            text_chunks = TextChunker(text_chunk=text,
-                                      max_char_size=self.text_chunk_size,
-                                      look_back_char_range=self.look_back_range).convert_text_to_chunks()
-
-            text_output_by_page.append(text_chunks)
-
-        return text_output_by_page
+        return list(self.iter_pdf_by_ocr(input_fp, file))
 
     def exif_extractor(self, fp):
 
@@ -4393,11 +5251,16 @@ class ImageParser:
 
 class VoiceParser:
 
-    """ VoiceParser handles wav files to convert into text blocks. """
+    """ VoiceParser handles wav files to convert into text blocks.
+
+    The speech model is loaded on first use - by default, it is released after each file.   With
+    keep_model_loaded=True, the model stays loaded across files until release() is called, and a loaded
+    speech_model (e.g., held by a Parser, or a worker process) can be passed to borrow it, in which case it is
+    not released by the VoiceParser. """
 
     def __init__(self, parser=None, library=None, text_chunk_size=600, look_back_range=300,
                  chunk_size=400, max_chunk_size=600, chunk_by_segment=True, remove_segment_markers=True,
-                 real_time_progress=True):
+                 real_time_progress=True, speech_model=None, keep_model_loaded=False):
 
         self.parser = parser
 
@@ -4421,7 +5284,14 @@ class VoiceParser:
                 self.text_chunk_size = parser.library.block_size_target_characters + 200
                 self.look_back_range = 300
 
-        self.speech_model = None
+        #   borrowed model is not released by the VoiceParser
+        self.speech_model = speech_model
+        self.owns_speech_model = False
+        self.keep_model_loaded = keep_model_loaded or speech_model is not None
+
+        #   throughput trackers - seconds of audio transcribed, and wall-clock seconds in the model
+        self.audio_seconds = 0.0
+        self.transcribe_seconds = 0.0
 
         from llmware.gguf_configs import GGUFConfigs
 
@@ -4431,36 +5301,108 @@ class VoiceParser:
         #   will update global GGUFConfigs based on real_time_progress preference
         GGUFConfigs().set_config("whisper_cpp_realtime_display", self.real_time_progress)
 
+    def load_speech_model(self):
+
+        """ Loads the speech model, if not already loaded - returns the model """
+
+        if self.speech_model is None:
+
+            from llmware.models import ModelCatalog
+
+            self.speech_model = ModelCatalog().load_model(self.selected_speech_model_name)
+            self.owns_speech_model = True
+
+        return self.speech_model
+
+    def release(self):
+
+        """ Releases the speech model, if loaded by this VoiceParser - a borrowed model is left loaded """
+
+        if self.speech_model is not None and self.owns_speech_model:
+            self.speech_model.__dealloc__()
+
+        self.speech_model = None
+        self.owns_speech_model = False
+
+        return True
+
     def voice_to_text(self,fp_input, fn, sr_input=16000):
 
         """Voice to text parsing conversion - looks up and calls the Model and gets inference response. """
 
-        from llmware.models import ModelCatalog
-
-        self.speech_model = ModelCatalog().load_model(self.selected_speech_model_name)
+        self.load_speech_model()
 
         inference_dict = {"remove_segment_markers": self.remove_segment_markers}
 
+        t0 = time.time()
+
         response = self.speech_model.inference(os.path.join(fp_input,fn),inference_dict=inference_dict)
 
+        self.transcribe_seconds += time.time() - t0
+        self.audio_seconds += response.get("usage", {}).get("duration-seconds", 0)
+
         #   response dictionary has several keys - "llm_response" | "segments" | "usage"
 
-        #   still exploring the best way to release memory once processing completed
-        self.speech_model.__dealloc__()
-        del self.speech_model
-        self.speech_model = None
+        if not self.keep_model_loaded:
+            self.release()
 
         return response
 
+    def voice_to_text_batch(self, fp_input, fn_list, gap_seconds=1.0):
+
+        """ Batched voice to text conversion of a list of files in a single pass through the model context -
+        returns a list of inference responses, one per file. """
+
+        self.load_speech_model()
+
+        inference_dict = {"remove_segment_markers": self.remove_segment_markers}
+
+        t0 = time.time()
+
+        responses = self.speech_model.inference_batch([os.path.join(fp_input, fn) for fn in fn_list],
+                                                      inference_dict=inference_dict, gap_seconds=gap_seconds)
+
+        self.transcribe_seconds += time.time() - t0
+        self.audio_seconds += sum(r["usage"]["duration-seconds"] for r in responses)
+
+        if not self.keep_model_loaded:
+            self.release()
+
+        return responses
+
+    def get_throughput(self):
+
+        """ Returns minutes of audio transcribed per wall-clock minute in the speech model """
+
+        if self.transcribe_seconds <= 0:
+            return 0.0
+
+        return self.audio_seconds / self.transcribe_seconds
+
     def add_voice_file(self, input_fp, fn):
 
         """ Parse voice file. """
 
-        output = []
-
         #   16000 is standard default encoding rate for .wav -> may need further test/experiment
         response = self.voice_to_text(input_fp, fn, 16000)
 
+        return self._chunk_response(response)
+
+    def add_voice_files(self, input_fp, fn_list, gap_seconds=1.0):
+
+        """ Parse a batch of voice files, transcribed in a single pass through the model context - returns a list
+        with the parsed output of each file. """
+
+        responses = self.voice_to_text_batch(input_fp, fn_list, gap_seconds=gap_seconds)
+
+        return [self._chunk_response(response) for response in responses]
+
+    def _chunk_response(self, response):
+
+        """ Aggregates the transcription response into text blocks. """
+
+        output = []
+
         if not self.chunk_by_segment:
 
             # this is initial strategy- deprecating for chunk_by_segment
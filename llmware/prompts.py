@@ -362,12 +362,19 @@ class Prompt:
 
     # prepare sources
 
-    def add_source_new_query(self, library, query=None, query_type="semantic", result_count=10):
+    def add_source_new_query(self, library, query=None, query_type="semantic", result_count=10,
+                             expand_window_size=0):
 
-        """ Attach a new source to a prompt object by running a new query against a library. """
+        """ Attach a new source to a prompt object by running a new query against a library - if
+        expand_window_size is set, then the text of each result is expanded with up to expand_window_size
+        characters of the neighboring blocks before and after the result. """
 
         # step 1 - run selected query against library
-        query_results = Query(library).query(query,query_type=query_type, result_count=result_count, results_only=True)
+        library_query = Query(library)
+        query_results = library_query.query(query,query_type=query_type, result_count=result_count,
+                                            results_only=True)
+
+        query_results = self._expand_source_results(query_results, expand_window_size, query=library_query)
 
         # step 2 - package query_results directly as source, loaded to prompt, and packaged as 'llm context'
         sources = Sources(self).package_source(query_results,aggregate_source=True)
@@ -378,15 +385,26 @@ class Prompt:
 
         return sources
 
-    def add_source_query_results(self, query_results):
+    def add_source_query_results(self, query_results, expand_window_size=0, library=None):
 
-        """ Attach a new source to a prompt object by passing directly the query results from a previous query. """
+        """ Attach a new source to a prompt object by passing directly the query results from a previous query -
+        if expand_window_size is set, then the text of each result is expanded with up to expand_window_size
+        characters of the neighboring blocks before and after the result, looked up in the library of the
+        query results (or the library passed). """
 
         #       example use - run a query directly, and then 'add' the query results to a prompt
         #       query_results = Query(self.library).semantic_query("what is the duration of the non-compete clause?")
         #       prompter = Prompt().load_model("claude-instant-v1",api_key="my_api_key")
         #       sources = prompter.add_source_query_results(query_results["results"])
 
+        if expand_window_size and query_results:
+            if not library:
+                library = Library().load_library(query_results[0]["library_name"],
+                                                 account_name=query_results[0]["account_name"])
+
+            query_results = self._expand_source_results(query_results, expand_window_size,
+                                                        query=Query(library, save_history=False))
+
         sources = Sources(self).package_source(query_results,aggregate_source=True)
 
         # enables use of 'prompt_with_sources'
@@ -395,6 +413,27 @@ class Prompt:
 
         return sources
 
+    def _expand_source_results(self, query_results, window_size, query):
+
+        """ Internal helper - returns copies of the query results from the library of query, with the text of
+        each result expanded by the neighboring blocks, fetched for all of the results in one call. """
+
+        if not window_size:
+            return query_results
+
+        targets = [i for i, result in enumerate(query_results)
+                   if "doc_ID" in result and "block_ID" in result
+                   and result.get("library_name", query.library_name) == query.library_name]
+
+        expanded = query.expand_text_results([query_results[i] for i in targets], window_size=window_size)
+
+        output = list(query_results)
+        for i, expanded_result in zip(targets, expanded):
+            output[i] = dict(query_results[i])
+            output[i].update({"text": expanded_result["expanded_text"]})
+
+        return output
+
     def add_source_library(self, library_name):
 
         """ Attach a new source to a prompt object by passing an entire library - note: only recommended if the library
@@ -25,6 +25,7 @@ Postgres and SQLIte for creation of custom (SQL) tables.
 
 import platform
 import os
+import atexit
 import ast
 import json
 import csv
@@ -32,8 +33,12 @@ import uuid
 import re
 from datetime import datetime
 import random
+import itertools
 import logging
 import sys
+import threading
+import hashlib
+from contextlib import contextmanager, nullcontext
 
 try:
     from pymongo import MongoClient, ReturnDocument
@@ -122,36 +127,66 @@ class CollectionRetrieval:
     def embedding_key_lookup(self, key, value):
         return self._retriever.embedding_key_lookup(key,value)
 
+    def lookup_id_list(self, id_list):
+        """Batch lookup of a list of _id values in a single query - returns a list of dictionary entries"""
+        return self._retriever.lookup_id_list(id_list)
+
+    def lookup_ids_by_filter(self, filter_dict):
+        """Returns the list of _id values (as strings) of entries matching all key:value pairs in filter_dict -
+        a list value matches any of the values in the list"""
+        return self._retriever.lookup_ids_by_filter(filter_dict)
+
+    def lookup_block_ranges(self, block_ranges):
+        """Batch lookup of blocks in a list of (doc_ID, low block_ID, high block_ID) ranges in a single query -
+        returns a list of dictionary entries, sorted by doc_ID and block_ID"""
+        return self._retriever.lookup_block_ranges(block_ranges)
+
     def get_whole_collection(self):
         """Retrieves whole collection, e.g., filter {} or SELECT * FROM {table}- will return a Cursor object"""
         return self._retriever.get_whole_collection()
 
-    def basic_query(self, query):
-        """Simple text query passed to the text index"""
-        return self._retriever.basic_query(query)
+    def stream_collection(self, filter_dict=None, fetch_size=1000):
+        """Generator over the entries of the collection, optionally matching all key:value pairs in filter_dict
+        (a list value matches any of the values in the list) - entries are read off a server-side cursor
+        fetch_size at a time, so memory use does not grow with the size of the collection"""
+        return self._retriever.stream_collection(filter_dict=filter_dict, fetch_size=fetch_size)
+
+    def basic_query(self, query, limit=None, stream=False):
+        """Simple text query passed to the text index - optional limit is pushed down to the db, and stream=True
+        returns an iterator that unpacks rows lazily off the db cursor"""
+        return self._retriever.basic_query(query, limit=limit, stream=stream)
 
     def filter_by_key(self, key, value):
         """Filter_by_key accepts a key string, corresponding to a column in the DB, and matches to a value"""
         return self._retriever.filter_by_key(key, value)
 
-    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None):
+    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None, limit=None,
+                                            stream=False):
         """Text search with a key, such as page or document number, and matches entries in a range of 'low' to 'high'"""
-        return self._retriever.text_search_with_key_low_high_range(query, key, low, high, key_value_dict=key_value_dict)
+        return self._retriever.text_search_with_key_low_high_range(query, key, low, high, key_value_dict=key_value_dict,
+                                                                   limit=limit, stream=stream)
 
-    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None):
+    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None, limit=None,
+                                         stream=False):
         """Text search with added filter of confirming that a key is in the selected value_range list
         with option for any number of further constraints passed as optional key_value_dict"""
         return self._retriever.text_search_with_key_value_range(query, key, value_range_list,
-                                                                key_value_dict=key_value_dict)
+                                                                key_value_dict=key_value_dict, limit=limit,
+                                                                stream=stream)
 
-    def text_search_with_key_value_dict_filter(self, query, key_value_dict):
+    def text_search_with_key_value_dict_filter(self, query, key_value_dict, limit=None, stream=False):
         """Text search with with {key:value} filter added"""
-        return self._retriever.text_search_with_key_value_dict_filter(query, key_value_dict)
+        return self._retriever.text_search_with_key_value_dict_filter(query, key_value_dict, limit=limit,
+                                                                      stream=stream)
 
     def get_distinct_list(self, key):
         """Returns distinct list of elements in collection by key"""
         return self._retriever.get_distinct_list(key)
 
+    def get_file_source_doc_ids(self, min_doc_id=0):
+        """Returns dict of file_source -> doc_ID for the documents in the collection with doc_ID > min_doc_id"""
+        return self._retriever.get_file_source_doc_ids(min_doc_id=min_doc_id)
+
     def filter_by_key_dict(self, key_dict):
         """Filters by key dictionary"""
         return self._retriever.filter_by_key_dict(key_dict)
@@ -256,6 +291,10 @@ class CollectionWriter:
         """Inserts new parsing record to the DB resource """
         return self._writer.write_new_parsing_record(new_record)
 
+    def write_new_parsing_records_bulk(self, new_records):
+        """Inserts a batch of new parsing records to the DB resource in a single write """
+        return self._writer.write_new_parsing_records_bulk(new_records)
+
     def destroy_collection(self, confirm_destroy=False):
         """Drops the collection associated with the library"""
         return self._writer.destroy_collection(confirm_destroy=confirm_destroy)
@@ -288,6 +327,10 @@ class CollectionWriter:
         """Deletes single record by key and matching value"""
         return self._writer.delete_record_by_key(key, value)
 
+    def delete_records_by_key(self, key, value):
+        """Deletes all records with key matching value - returns the number of records deleted"""
+        return self._writer.delete_records_by_key(key, value)
+
     def update_library_card(self, library_name, update_dict, lib_card, delete_record=False):
 
         """Special update method to handle library card updates"""
@@ -300,6 +343,12 @@ class CollectionWriter:
 
         return self._writer.get_and_increment_doc_id(library_name)
 
+    def reserve_doc_ids(self, library_name, count):
+
+        """Reserves a block of count unique doc_ids in a single update - returns the first doc_id in the block"""
+
+        return self._writer.reserve_doc_ids(library_name, count)
+
     def set_incremental_docs_blocks_images(self, library_name, added_docs=0, added_blocks=0, added_images=0,
                                            added_pages=0, added_tables=0):
 
@@ -314,14 +363,64 @@ class CollectionWriter:
         """Updates JSON column of one record by adding new key:value"""
         return self._writer.add_new_embedding_flag(_id, embedding_key,value)
 
+    def add_new_embedding_flag_bulk(self, id_value_list, embedding_key):
+        """Updates embedding flag for a batch of records in a single write - id_value_list is a list of
+        (_id, value) tuples"""
+        return self._writer.add_new_embedding_flag_bulk(id_value_list, embedding_key)
+
     def unset_embedding_flag(self, embedding_key):
         return self._writer.unset_embedding_flag(embedding_key)
 
+    def write_batch(self):
+        """Context manager - groups the writes made on this thread into a single transaction, committed at the end
+        of the batch, if supported by the DB resource (SQLite) - otherwise, each write is committed as made"""
+        if self.active_db == "sqlite":
+            return self._writer.write_batch()
+        return nullcontext()
+
     def close(self):
         """Close connection to underlying DB resource"""
         return self._writer.close()
 
 
+class BufferedCollectionWriter:
+
+    """BufferedCollectionWriter collects new parsing records in memory and writes them to the text collection
+    in batches of flush_size, using the bulk insert path of the underlying DB resource.   Callers must call
+    flush() at the end of a job to write any remaining records."""
+
+    def __init__(self, library_name, account_name="llmware", flush_size=500):
+
+        self.library_name = library_name
+        self.account_name = account_name
+        self.flush_size = max(1, int(flush_size))
+        self.buffer = []
+        self.records_written = 0
+
+    def add(self, new_record):
+        """Adds record to the buffer, and flushes if buffer has reached flush_size"""
+        self.buffer.append(new_record)
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Writes all buffered records in a single bulk insert - returns number of records written"""
+
+        if not self.buffer:
+            return 0
+
+        records = self.buffer
+        self.buffer = []
+
+        CollectionWriter(self.library_name,
+                         account_name=self.account_name).write_new_parsing_records_bulk(records)
+
+        self.records_written += len(records)
+
+        return len(records)
+
+
 class MongoWriter:
 
     """MongoWriter is main class abstraction for writes, edits and deletes to a Mongo text index collection"""
@@ -365,6 +464,12 @@ class MongoWriter:
         """ Writes new parsing record into Mongo DB """
         return self.write_new_record(new_record)
 
+    def write_new_parsing_records_bulk(self, new_records):
+        """ Writes batch of new parsing records into Mongo DB with insert_many """
+        if new_records:
+            self.collection.insert_many(new_records, ordered=True)
+        return True
+
     def destroy_collection(self, confirm_destroy=False):
 
         """Drops collection for library"""
@@ -447,6 +552,17 @@ class MongoWriter:
 
         return 1
 
+    def delete_records_by_key(self, key, value):
+
+        """Deletes all records with key matching value"""
+
+        if key == "_id":
+            value = ObjectId(value)
+
+        result = self.collection.delete_many({key: value})
+
+        return result.deleted_count
+
     def update_library_card(self, library_name, update_dict,lib_card, delete_record=False):
 
         """Updates library card in Mongo Library Catalog"""
@@ -521,6 +637,21 @@ class MongoWriter:
 
         return unique_doc_id
 
+    def reserve_doc_ids(self, library_name, count):
+
+        """reserves a block of count doc_ids -> returns the first doc_id in the block"""
+
+        library_counts = self.collection.find_one_and_update(
+            {"library_name": library_name},
+            {"$inc": {"unique_doc_id": count}},
+            return_document=ReturnDocument.AFTER
+        )
+
+        if not library_counts:
+            return -1
+
+        return library_counts.get("unique_doc_id") - count + 1
+
     def set_incremental_docs_blocks_images(self, library_name, added_docs=0, added_blocks=0, added_images=0,
                                            added_pages=0, added_tables=0):
 
@@ -541,6 +672,20 @@ class MongoWriter:
 
         return 0
 
+    def add_new_embedding_flag_bulk(self, id_value_list, embedding_key):
+
+        """Updates embedding flag on a batch of records with a single bulk_write"""
+
+        if not id_value_list:
+            return 0
+
+        operations = [pymongo.UpdateOne({"_id": ObjectId(_id)}, {"$set": {embedding_key: value}})
+                      for _id, value in id_value_list]
+
+        self.collection.bulk_write(operations, ordered=False)
+
+        return 0
+
     def unset_embedding_flag(self, embedding_key):
 
         update = {"$unset": {embedding_key: ""}}
@@ -646,6 +791,53 @@ class MongoRetrieval:
     def embedding_key_lookup(self, key, value):
         return self.lookup(key,value)
 
+    def lookup_id_list(self, id_list):
+
+        """Returns list of dictionary entries matching any _id in id_list, using a single $in query"""
+
+        if not id_list:
+            return []
+
+        object_ids = []
+        for _id in id_list:
+            try:
+                object_ids.append(ObjectId(_id))
+            except:
+                logger.debug(f"update: mongo lookup_id_list - could not convert _id into ObjectID - {_id}")
+                object_ids.append(_id)
+
+        return list(self.collection.find({"_id": {"$in": object_ids}}))
+
+    def lookup_ids_by_filter(self, filter_dict):
+
+        """Returns list of _id strings of entries matching filter_dict - list values are interpreted as $in"""
+
+        d = []
+        for key, value in filter_dict.items():
+            if isinstance(value, list):
+                d.append({key: {"$in": value}})
+            else:
+                d.append({key: value})
+
+        f = {}
+        if len(d) == 1: f = d[0]
+        if len(d) >= 2: f = {"$and": d}
+
+        return [str(entry["_id"]) for entry in self.collection.find(f, {"_id": 1})]
+
+    def lookup_block_ranges(self, block_ranges):
+
+        """Returns list of dictionary entries in any of the (doc_ID, low, high) block_ID ranges, using a single
+        $or query, sorted by doc_ID and block_ID"""
+
+        if not block_ranges:
+            return []
+
+        f = {"$or": [{"doc_ID": doc_id, "block_ID": {"$gte": low, "$lte": high}}
+                     for doc_id, low, high in block_ranges]}
+
+        return list(self.collection.find(f).sort([("doc_ID", 1), ("block_ID", 1)]))
+
     def get_whole_collection(self):
 
         """Retrieves whole collection in Mongo- will return as a Cursor object"""
@@ -658,7 +850,46 @@ class MongoRetrieval:
 
         return cursor
 
-    def basic_query(self, query):
+    def stream_collection(self, filter_dict=None, fetch_size=1000):
+
+        """Generator over entries matching filter_dict - list values are interpreted as $in - read off the
+        cursor in batches of fetch_size"""
+
+        d = []
+        for key, value in (filter_dict or {}).items():
+            if isinstance(value, list):
+                d.append({key: {"$in": value}})
+            else:
+                d.append({key: value})
+
+        f = {}
+        if len(d) == 1: f = d[0]
+        if len(d) >= 2: f = {"$and": d}
+
+        cursor = self.collection.find(f, batch_size=fetch_size)
+
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def _text_search_cursor(self, f, limit=None, stream=False):
+
+        """Runs text search with filter f, sorted by text score, with optional limit - returns the cursor if
+        stream=True, or otherwise a list of the results"""
+
+        results_cursor = self.collection.find(f, {"score": {"$meta": "textScore"}}).\
+            sort([('score', {'$meta': 'textScore'})]).allow_disk_use(True)
+
+        if limit:
+            results_cursor = results_cursor.limit(limit)
+
+        if stream:
+            return results_cursor
+
+        return list(results_cursor)
+
+    def basic_query(self, query, limit=None, stream=False):
 
         """Basic text index query in MongoDB"""
 
@@ -666,6 +897,9 @@ class MongoRetrieval:
             {"$text": {"$search": query}},
             {"score": {"$meta": "textScore"}}).sort([('score', {'$meta': 'textScore'})]).allow_disk_use(True)
 
+        if limit:
+            match_results_cursor = match_results_cursor.limit(limit)
+
         return match_results_cursor
 
     def filter_by_key(self, key, value):
@@ -675,7 +909,8 @@ class MongoRetrieval:
         match_results_cursor = list(self.collection.find({key:value}))
         return match_results_cursor
 
-    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None):
+    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None, limit=None,
+                                            stream=False):
 
         """Accepts key with low & high value + optional key_value_dict with additional parameters"""
 
@@ -698,13 +933,12 @@ class MongoRetrieval:
         if len(d) >= 2:
             f = {"$and": d}
 
-        results = list(self.collection.find(f,
-                                            {"score": {"$meta": "textScore"}}).
-                       sort([('score', {'$meta': 'textScore'})]).allow_disk_use(True))
+        results = self._text_search_cursor(f, limit=limit, stream=stream)
 
         return results
 
-    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None):
+    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None, limit=None,
+                                         stream=False):
 
         """Text search with additional constraint of key in provided value_range list"""
 
@@ -726,13 +960,11 @@ class MongoRetrieval:
         if len(d) >= 2:
             f = {"$and": d}
 
-        results = list(self.collection.find(f,
-                                            {"score": {"$meta": "textScore"}}).
-                       sort([('score', {'$meta': 'textScore'})]).allow_disk_use(True))
+        results = self._text_search_cursor(f, limit=limit, stream=stream)
 
         return results
 
-    def text_search_with_key_value_dict_filter(self, query, key_value_dict):
+    def text_search_with_key_value_dict_filter(self, query, key_value_dict, limit=None, stream=False):
 
         """Text search with additional key_value filter dictionary applied"""
 
@@ -756,9 +988,7 @@ class MongoRetrieval:
         if len(d) >= 2:
             f = {"$and": d}
 
-        results = list(self.collection.find(f,
-                                            {"score": {"$meta": "textScore"}}).
-                       sort([('score', {'$meta': 'textScore'})]).allow_disk_use(True))
+        results = self._text_search_cursor(f, limit=limit, stream=stream)
 
         return results
 
@@ -778,6 +1008,15 @@ class MongoRetrieval:
 
         return distinct_list
 
+    def get_file_source_doc_ids(self, min_doc_id=0):
+
+        """Returns dict of file_source -> doc_ID for documents with doc_ID > min_doc_id"""
+
+        group = self.collection.aggregate([{"$match": {"doc_ID": {"$gt": min_doc_id}}},
+                                           {"$group": {"_id": "$file_source", "doc_ID": {"$min": "$doc_ID"}}}])
+
+        return {entry["_id"]: entry["doc_ID"] for entry in group}
+
     def filter_by_key_dict (self, key_dict):
 
         """Filters collection by key-value dictionary"""
@@ -996,6 +1235,40 @@ class PGRetrieval:
 
         return output
 
+    def _execute_search(self, sql_query, params=None, limit=None, stream=False):
+
+        """Executes text search sql_query, with optional LIMIT - if stream=True, returns a generator that unpacks
+        rows lazily off the cursor with fetchmany, and otherwise unpacks + returns all rows as a list"""
+
+        if limit:
+            sql_query += f" LIMIT {int(limit)}"
+
+        sql_query += ";"
+
+        results = self.conn.cursor().execute(sql_query, params)
+
+        if stream:
+            return self._stream_search_result(results)
+
+        output = self.unpack_search_result(results)
+
+        self.conn.close()
+
+        return output
+
+    def _stream_search_result(self, results_cursor, fetch_size=1000):
+
+        """Generator over unpacked search result rows - closes the connection when exhausted or closed"""
+
+        try:
+            while True:
+                rows = results_cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from self.unpack_search_result(rows)
+        finally:
+            self.conn.close()
+
     def lookup(self, key, value):
 
         """Lookup returns entry with key (column) with matching value - returns as unpacked dict entry"""
@@ -1031,6 +1304,82 @@ class PGRetrieval:
 
         return output
 
+    def lookup_id_list(self, id_list):
+
+        """Returns list of unpacked dict entries matching any _id in id_list, using a single query"""
+
+        output = []
+
+        if not id_list:
+            return output
+
+        insert_array = ([int(_id) for _id in id_list],)
+
+        sql_query = f"SELECT * FROM {self.library_name} WHERE _id = ANY(%s);"
+
+        results = list(self.conn.cursor().execute(sql_query, insert_array))
+
+        if results:
+            output = self.unpack(results)
+
+        self.conn.close()
+
+        return output
+
+    def lookup_ids_by_filter(self, filter_dict):
+
+        """Returns list of _id strings of rows matching filter_dict - list values are interpreted as IN"""
+
+        conditions = []
+        insert_array = []
+
+        for key, value in filter_dict.items():
+            if isinstance(value, list):
+                # empty list matches nothing - IN () is not valid sql
+                placeholders = ", ".join(["%s"] * len(value)) or "NULL"
+                conditions.append(f"{key} IN ({placeholders})")
+                insert_array += value
+            else:
+                conditions.append(f"{key} = %s")
+                insert_array.append(value)
+
+        sql_query = f"SELECT _id FROM {self.library_name}"
+        if conditions:
+            sql_query += " WHERE " + " AND ".join(conditions)
+        sql_query += ";"
+
+        results = self.conn.cursor().execute(sql_query, tuple(insert_array))
+
+        output = [str(row[0]) for row in results]
+
+        self.conn.close()
+
+        return output
+
+    def lookup_block_ranges(self, block_ranges):
+
+        """Returns list of unpacked dict entries in any of the (doc_ID, low, high) block_ID ranges, using a
+        single query, sorted by doc_ID and block_ID"""
+
+        output = []
+
+        if not block_ranges:
+            return output
+
+        conditions = " OR ".join(["(doc_ID = %s AND block_ID BETWEEN %s AND %s)"] * len(block_ranges))
+        insert_array = tuple(int(v) for block_range in block_ranges for v in block_range)
+
+        sql_query = f"SELECT * FROM {self.library_name} WHERE {conditions} ORDER BY doc_ID, block_ID;"
+
+        results = list(self.conn.cursor().execute(sql_query, insert_array))
+
+        if results:
+            output = self.unpack(results)
+
+        self.conn.close()
+
+        return output
+
     def get_whole_collection(self):
 
         """Returns whole collection - as a Cursor object"""
@@ -1044,6 +1393,44 @@ class PGRetrieval:
 
         return cursor
 
+    def stream_collection(self, filter_dict=None, fetch_size=1000):
+
+        """Generator over unpacked rows matching filter_dict - list values are interpreted as IN - read off a
+        named (server-side) cursor with fetchmany, fetch_size rows at a time - closes the connection when
+        exhausted or closed"""
+
+        conditions = []
+        insert_array = []
+
+        for key, value in (filter_dict or {}).items():
+            if isinstance(value, list):
+                # empty list matches nothing - IN () is not valid sql
+                placeholders = ", ".join(["%s"] * len(value)) or "NULL"
+                conditions.append(f"{key} IN ({placeholders})")
+                insert_array += value
+            else:
+                conditions.append(f"{key} = %s")
+                insert_array.append(value)
+
+        sql_query = f"SELECT * FROM {self.library_name}"
+        if conditions:
+            sql_query += " WHERE " + " AND ".join(conditions)
+        sql_query += ";"
+
+        results_cursor = self.conn.cursor(name=f"llmware_stream_{uuid.uuid4().hex}")
+
+        try:
+            results_cursor.execute(sql_query, tuple(insert_array))
+
+            while True:
+                rows = results_cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from self.unpack(rows)
+        finally:
+            results_cursor.close()
+            self.conn.close()
+
     def _prep_query(self, query):
 
         """ Simple query text preparation - will add more options over time """
@@ -1078,7 +1465,7 @@ class PGRetrieval:
 
         return q_string
 
-    def basic_query(self, query):
+    def basic_query(self, query, limit=None, stream=False):
 
         """Basic Postgres tsquery text query"""
 
@@ -1087,15 +1474,13 @@ class PGRetrieval:
         sql_query = f"SELECT ts_rank_cd (ts, to_tsquery('english', '{search_string}')) as rank, * " \
                     f"FROM {self.library_name} " \
                     f"WHERE ts @@ to_tsquery('english', '{search_string}') " \
-                    f"ORDER BY rank DESC LIMIT 100 ;"
-
-        results = self.conn.cursor().execute(sql_query)
+                    f"ORDER BY rank DESC"
 
-        output_results = self.unpack_search_result(results)
-
-        self.conn.close()
+        # prior default cap of 100 results, unless streaming the full result set
+        if not limit and not stream:
+            limit = 100
 
-        return output_results
+        return self._execute_search(sql_query, limit=limit, stream=stream)
 
     def filter_by_key(self, key, value):
 
@@ -1113,7 +1498,8 @@ class PGRetrieval:
 
         return output
 
-    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None):
+    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None, limit=None,
+                                            stream=False):
 
         """Text search with additional constraint of matching column with value in specified range"""
 
@@ -1128,18 +1514,12 @@ class PGRetrieval:
             for key, value in key_value_dict.items():
                 sql_query += f" AND {key} = {value}"
 
-        sql_query += " ORDER by rank"
-        sql_query += ";"
-
-        results = self.conn.cursor().execute(sql_query)
+        sql_query += " ORDER BY rank DESC"
 
-        output_results = self.unpack_search_result(results)
-
-        self.conn.close()
+        return self._execute_search(sql_query, limit=limit, stream=stream)
 
-        return output_results
-
-    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None):
+    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None, limit=None,
+                                         stream=False):
 
         """Text search with additional constraint(s) of keys matching values in value_range list and
             optional key_value_dict"""
@@ -1168,18 +1548,11 @@ class PGRetrieval:
             for key, value in key_value_dict.items():
                 sql_query += f" AND {key} = {value}"
 
-        sql_query += " ORDER BY rank"
-        sql_query += ";"
-
-        results = self.conn.cursor().execute(sql_query)
-
-        output_results = self.unpack_search_result(results)
-
-        self.conn.close()
+        sql_query += " ORDER BY rank DESC"
 
-        return output_results
+        return self._execute_search(sql_query, limit=limit, stream=stream)
 
-    def text_search_with_key_value_dict_filter(self, query, key_value_dict):
+    def text_search_with_key_value_dict_filter(self, query, key_value_dict, limit=None, stream=False):
 
         """Text search with additional "AND" constraints of key value dict with key = value"""
 
@@ -1203,15 +1576,9 @@ class PGRetrieval:
                 else:
                     sql_query += f" AND {key} = '{value}'"
 
-        sql_query += " ORDER BY rank"
-        sql_query += ";"
-
-        results = self.conn.cursor().execute(sql_query)
-        output_results = self.unpack_search_result(results)
+        sql_query += " ORDER BY rank DESC"
 
-        self.conn.close()
-
-        return output_results
+        return self._execute_search(sql_query, limit=limit, stream=stream)
 
     def get_distinct_list(self, key):
 
@@ -1230,6 +1597,20 @@ class PGRetrieval:
 
         return output
 
+    def get_file_source_doc_ids(self, min_doc_id=0):
+
+        """Returns dict of file_source -> doc_ID for documents with doc_ID > min_doc_id"""
+
+        sql_query = f"SELECT file_source, MIN(doc_ID) FROM {self.library_name} WHERE doc_ID > %s " \
+                    f"GROUP BY file_source;"
+
+        output = {file_source: doc_id for file_source, doc_id in
+                  self.conn.cursor().execute(sql_query, (min_doc_id,))}
+
+        self.conn.close()
+
+        return output
+
     def filter_by_key_dict (self, key_dict):
 
         """Returns rows selected by where conditions set forth in key-value dictionary"""
@@ -1628,6 +2009,39 @@ class PGWriter:
 
         return True
 
+    def write_new_parsing_records_bulk(self, new_records):
+
+        """ Writes batch of new parsing record dictionaries into Postgres using COPY """
+
+        if not new_records:
+            return True
+
+        sql_string = f"COPY {self.library_name}"
+        sql_string += " (block_ID, doc_ID, content_type, file_type, master_index, master_index2, " \
+                      "coords_x, coords_y, coords_cx, coords_cy, author_or_speaker, added_to_collection, " \
+                      "file_source, table_block, modified_date, created_date, creator_tool, external_files, " \
+                      "text_block, header_text, text_search, user_tags, special_field1, special_field2, " \
+                      "special_field3, graph_status, dialog, embedding_flags) FROM STDIN"
+
+        with self.conn.cursor() as cursor:
+            with cursor.copy(sql_string) as copy:
+                for rec in new_records:
+                    copy.write_row((rec["block_ID"], rec["doc_ID"],rec["content_type"], rec["file_type"],
+                                    rec["master_index"], rec["master_index2"], rec["coords_x"], rec["coords_y"],
+                                    rec["coords_cx"], rec["coords_cy"], rec["author_or_speaker"],
+                                    rec["added_to_collection"], rec["file_source"], rec["table"],
+                                    rec["modified_date"], rec["created_date"], rec["creator_tool"],
+                                    rec["external_files"], rec["text"], rec["header_text"], rec["text_search"],
+                                    rec["user_tags"], rec["special_field1"], rec["special_field2"],
+                                    rec["special_field3"], rec["graph_status"], rec["dialog"],
+                                    str(rec["embedding_flags"])))
+
+        self.conn.commit()
+
+        self.conn.close()
+
+        return True
+
     def destroy_collection(self, confirm_destroy=False):
 
         """Drops table from database"""
@@ -1747,6 +2161,16 @@ class PGWriter:
         self.conn.close()
         return 0
 
+    def delete_records_by_key(self, key, value):
+
+        """Deletes all records matching key = value - returns the number of records deleted"""
+
+        sql_command = f"DELETE FROM {self.library_name} WHERE {key} = %s;"
+        deleted = self.conn.cursor().execute(sql_command, (value,)).rowcount
+        self.conn.commit()
+        self.conn.close()
+        return deleted
+
     def update_library_card(self, library_name, update_dict, lib_card, delete_record=False):
 
         """Updates library card"""
@@ -1869,6 +2293,27 @@ class PGWriter:
 
         return val_out
 
+    def reserve_doc_ids(self, library_name, count):
+
+        """Reserves a block of count unique doc IDs - returns the first doc ID in the block"""
+
+        val_out = -1
+
+        sql_instruction = f"UPDATE library " \
+                          f"SET unique_doc_id = unique_doc_id + %s " \
+                          f"WHERE library_name = %s " \
+                          f"RETURNING unique_doc_id"
+
+        output = list(self.conn.cursor().execute(sql_instruction, (count, str(library_name))))
+
+        if output and len(output[0]) > 0:
+            val_out = output[0][0] - count + 1
+
+        self.conn.commit()
+        self.conn.close()
+
+        return val_out
+
     def set_incremental_docs_blocks_images(self, library_name, added_docs=0, added_blocks=0, added_images=0,
                                            added_pages=0, added_tables=0):
 
@@ -1916,6 +2361,34 @@ class PGWriter:
 
         return 0
 
+    def add_new_embedding_flag_bulk(self, id_value_list, embedding_key):
+
+        """Merges embedding flag into the json column for a batch of records, using a single
+        UPDATE ... FROM (VALUES ...) statement"""
+
+        if not id_value_list:
+            return 0
+
+        insert_array = ()
+        values_clause = ""
+
+        for _id, value in id_value_list:
+            values_clause += "(%s::bigint, %s::jsonb), "
+            insert_array += (int(_id), json.dumps({embedding_key: value}))
+
+        values_clause = values_clause[:-2]
+
+        sql_command = f"UPDATE {self.library_name} AS t " \
+                      f"SET embedding_flags = coalesce(t.embedding_flags, '{{}}'::jsonb) || v.flag " \
+                      f"FROM (VALUES {values_clause}) AS v(_id, flag) " \
+                      f"WHERE t._id = v._id"
+
+        self.conn.cursor().execute(sql_command, insert_array)
+        self.conn.commit()
+        self.conn.close()
+
+        return 0
+
     def unset_embedding_flag(self, embedding_key):
 
         """To complete deletion of an embedding, remove the json embedding_key from the text collection"""
@@ -2062,52 +2535,170 @@ class SQLiteRetrieval:
                         if key == "table_block":
                             key = "table"
 
-                        new_dict.update({key: row[counter]})
-                        counter += 1
+                        new_dict.update({key: row[counter]})
+                        counter += 1
+
+                    else:
+                        logger.warning(f"update: sqlite_retriever - outputs not matching - {counter}")
+
+            output.append(new_dict)
+
+        return output
+
+    def _execute_search(self, sql_query, params=(), limit=None, stream=False):
+
+        """Executes text search sql_query, with optional LIMIT - if stream=True, returns a generator that unpacks
+        rows lazily off the cursor with fetchmany, and otherwise unpacks + returns all rows as a list"""
+
+        if limit:
+            sql_query += f" LIMIT {int(limit)}"
+
+        sql_query += ";"
+
+        results = self.conn.cursor().execute(sql_query, params)
+
+        if stream:
+            return self._stream_search_result(results)
+
+        output = self.unpack_search_result(results)
+
+        self.conn.close()
+
+        return output
+
+    def _stream_search_result(self, results_cursor, fetch_size=1000):
+
+        """Generator over unpacked search result rows - closes the connection when exhausted or closed"""
+
+        try:
+            while True:
+                rows = results_cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from self.unpack_search_result(rows)
+        finally:
+            self.conn.close()
+
+    def lookup(self, key, value):
+
+        """Lookup of col (key) matching to value - returns unpacked dictionary result"""
+
+        output = {}
+
+        if key == "_id":
+            key = "rowid"
+
+        sql_query = f"SELECT rowid, * FROM {self.library_name} WHERE {key} = '{value}';"
+
+        results = list(self.conn.cursor().execute(sql_query))
+
+        if results:
+            if len(results) >= 1:
+                output = self.unpack(results)
+
+        self.conn.close()
+
+        return output
+
+    def embedding_key_lookup(self, key, value):
+
+        output = {}
+
+        value = str(value)
+
+        # lookup embedding_flag = value and value in special_field1
+        sql_command = (f"SELECT rowid, * FROM {self.library_name} WHERE embedding_flags = '{key}' AND "
+                       f"special_field1 = '{value}'")
+
+        results = list(self.conn.cursor().execute(sql_command))
+
+        if len(results) > 0:
+            output = self.unpack(results)
+
+        return output
+
+    def lookup_id_list(self, id_list):
+
+        """Returns list of unpacked dict entries matching any rowid in id_list, using a single query"""
+
+        output = []
+
+        if not id_list:
+            return output
+
+        insert_array = tuple(int(_id) for _id in id_list)
+        placeholders = ", ".join(["?"] * len(insert_array))
+
+        sql_query = f"SELECT rowid, * FROM {self.library_name} WHERE rowid IN ({placeholders});"
 
-                    else:
-                        logger.warning(f"update: sqlite_retriever - outputs not matching - {counter}")
+        results = list(self.conn.cursor().execute(sql_query, insert_array))
 
-            output.append(new_dict)
+        if results:
+            output = self.unpack(results)
+
+        self.conn.close()
 
         return output
 
-    def lookup(self, key, value):
+    def lookup_ids_by_filter(self, filter_dict):
 
-        """Lookup of col (key) matching to value - returns unpacked dictionary result"""
+        """Returns list of _id strings of rows matching filter_dict - list values are interpreted as IN"""
 
-        output = {}
+        conditions = []
+        insert_array = []
 
-        if key == "_id":
-            key = "rowid"
+        for key, value in filter_dict.items():
+            if isinstance(value, list):
+                # empty list matches nothing - IN () is not valid sql
+                placeholders = ", ".join(["?"] * len(value)) or "NULL"
+                conditions.append(f"{key} IN ({placeholders})")
+                insert_array += value
+            else:
+                conditions.append(f"{key} = ?")
+                insert_array.append(value)
 
-        sql_query = f"SELECT rowid, * FROM {self.library_name} WHERE {key} = '{value}';"
+        sql_query = f"SELECT rowid FROM {self.library_name}"
+        if conditions:
+            sql_query += " WHERE " + " AND ".join(conditions)
+        sql_query += ";"
 
-        results = list(self.conn.cursor().execute(sql_query))
+        results = self.conn.cursor().execute(sql_query, tuple(insert_array))
 
-        if results:
-            if len(results) >= 1:
-                output = self.unpack(results)
+        output = [str(row[0]) for row in results]
 
         self.conn.close()
 
         return output
 
-    def embedding_key_lookup(self, key, value):
+    def lookup_block_ranges(self, block_ranges, ranges_per_query=250):
 
-        output = {}
+        """Returns list of unpacked dict entries in any of the (doc_ID, low, high) block_ID ranges, sorted by
+        doc_ID and block_ID - one scan of the table for up to ranges_per_query ranges, within the sqlite
+        limit on the number of query parameters"""
 
-        value = str(value)
+        output = []
 
-        # lookup embedding_flag = value and value in special_field1
-        sql_command = (f"SELECT rowid, * FROM {self.library_name} WHERE embedding_flags = '{key}' AND "
-                       f"special_field1 = '{value}'")
+        if not block_ranges:
+            return output
 
-        results = list(self.conn.cursor().execute(sql_command))
+        results = []
 
-        if len(results) > 0:
+        for i in range(0, len(block_ranges), ranges_per_query):
+
+            chunk = block_ranges[i:i+ranges_per_query]
+
+            conditions = " OR ".join(["(doc_ID = ? AND block_ID BETWEEN ? AND ?)"] * len(chunk))
+            insert_array = tuple(int(v) for block_range in chunk for v in block_range)
+
+            sql_query = f"SELECT rowid, * FROM {self.library_name} WHERE {conditions} ORDER BY doc_ID, block_ID;"
+
+            results += list(self.conn.cursor().execute(sql_query, insert_array))
+
+        if results:
             output = self.unpack(results)
 
+        self.conn.close()
+
         return output
 
     def get_whole_collection(self):
@@ -2121,6 +2712,40 @@ class SQLiteRetrieval:
 
         return cursor
 
+    def stream_collection(self, filter_dict=None, fetch_size=1000):
+
+        """Generator over unpacked rows matching filter_dict - list values are interpreted as IN - read off the
+        db cursor with fetchmany, fetch_size rows at a time - closes the connection when exhausted or closed"""
+
+        conditions = []
+        insert_array = []
+
+        for key, value in (filter_dict or {}).items():
+            if isinstance(value, list):
+                # empty list matches nothing - IN () is not valid sql
+                placeholders = ", ".join(["?"] * len(value)) or "NULL"
+                conditions.append(f"{key} IN ({placeholders})")
+                insert_array += value
+            else:
+                conditions.append(f"{key} = ?")
+                insert_array.append(value)
+
+        sql_query = f"SELECT rowid, * FROM {self.library_name}"
+        if conditions:
+            sql_query += " WHERE " + " AND ".join(conditions)
+        sql_query += ";"
+
+        try:
+            results_cursor = self.conn.cursor().execute(sql_query, tuple(insert_array))
+
+            while True:
+                rows = results_cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from self.unpack(rows)
+        finally:
+            self.conn.close()
+
     def _prep_query(self, query):
 
         """ Basic preparation of text search query for SQLite - will evolve over time. """
@@ -2154,7 +2779,7 @@ class SQLiteRetrieval:
 
         return q_string
 
-    def basic_query(self, query):
+    def basic_query(self, query, limit=None, stream=False):
 
         """Basic text query on SQLite using FTS5 index"""
 
@@ -2163,13 +2788,7 @@ class SQLiteRetrieval:
         sql_query = f"SELECT rank, rowid, * FROM {self.library_name} " \
                     f"WHERE text_search MATCH '{query_str}' ORDER BY rank"
 
-        results = self.conn.cursor().execute(sql_query)
-
-        output = self.unpack_search_result(results)
-
-        self.conn.close()
-
-        return output
+        return self._execute_search(sql_query, limit=limit, stream=stream)
 
     def filter_by_key(self, key, value):
 
@@ -2185,7 +2804,8 @@ class SQLiteRetrieval:
 
         return output
 
-    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None):
+    def text_search_with_key_low_high_range(self, query, key, low, high, key_value_dict=None, limit=None,
+                                            stream=False):
 
         """Text search with additional filter of col (key) in low to high value range specified"""
 
@@ -2199,17 +2819,11 @@ class SQLiteRetrieval:
                 sql_query += f" AND {key} = {value}"
 
         sql_query += " ORDER BY rank"
-        sql_query += ";"
-
-        results = self.conn.cursor().execute(sql_query)
-
-        output = self.unpack_search_result(results)
 
-        self.conn.close()
-
-        return output
+        return self._execute_search(sql_query, limit=limit, stream=stream)
 
-    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None):
+    def text_search_with_key_value_range(self, query, key, value_range_list, key_value_dict=None, limit=None,
+                                         stream=False):
 
         """Text search with additional filter of key in value_range list with optional further key=value pairs
         in key_value_dict"""
@@ -2242,16 +2856,9 @@ class SQLiteRetrieval:
 
         sql_query += " ORDER BY rank"
 
-        sql_query += ";"
-
-        results = self.conn.cursor().execute(sql_query)
-        output = self.unpack_search_result(results)
-
-        self.conn.close()
-
-        return output
+        return self._execute_search(sql_query, limit=limit, stream=stream)
 
-    def text_search_with_key_value_dict_filter(self, query, key_value_dict):
+    def text_search_with_key_value_dict_filter(self, query, key_value_dict, limit=None, stream=False):
 
         """Text search with additional 'AND' filter of key=value for all keys in key_value_dict"""
 
@@ -2285,14 +2892,8 @@ class SQLiteRetrieval:
                         sql_query += f" AND {key} = {value}"
 
         sql_query += " ORDER BY rank"
-        sql_query += ";"
-
-        results = self.conn.cursor().execute(sql_query, insert_array)
-        output = self.unpack_search_result(results)
-
-        self.conn.close()
 
-        return output
+        return self._execute_search(sql_query, insert_array, limit=limit, stream=stream)
 
     def get_distinct_list(self, key):
 
@@ -2311,6 +2912,20 @@ class SQLiteRetrieval:
 
         return output
 
+    def get_file_source_doc_ids(self, min_doc_id=0):
+
+        """Returns dict of file_source -> doc_ID for documents with doc_ID > min_doc_id"""
+
+        sql_query = f"SELECT file_source, MIN(doc_ID) FROM {self.library_name} WHERE doc_ID > ? " \
+                    f"GROUP BY file_source;"
+
+        output = {file_source: doc_id for file_source, doc_id in
+                  self.conn.cursor().execute(sql_query, (min_doc_id,))}
+
+        self.conn.close()
+
+        return output
+
     def filter_by_key_dict (self, key_dict):
 
         """Filters and returns elements where key=value as specified by the key_dict"""
@@ -2734,6 +3349,41 @@ class SQLiteWriter:
 
         return True
 
+    def write_new_parsing_records_bulk(self, new_records):
+
+        """ Writes batch of new parsing record dictionaries into SQLite with executemany in a single
+        transaction """
+
+        if not new_records:
+            return True
+
+        sql_string = f"INSERT INTO {self.library_name}"
+        sql_string += " (block_ID, doc_ID, content_type, file_type, master_index, master_index2, " \
+                      "coords_x, coords_y, coords_cx, coords_cy, author_or_speaker, added_to_collection, " \
+                      "file_source, table_block, modified_date, created_date, creator_tool, external_files, " \
+                      "text_block, header_text, text_search, user_tags, special_field1, special_field2, " \
+                      "special_field3, graph_status, dialog, embedding_flags) "
+        sql_string += " VALUES (" + ", ".join(["?"] * 28) + ");"
+
+        insert_rows = []
+        for rec in new_records:
+            insert_rows.append((rec["block_ID"], rec["doc_ID"],rec["content_type"], rec["file_type"],
+                                rec["master_index"], rec["master_index2"], rec["coords_x"], rec["coords_y"],
+                                rec["coords_cx"], rec["coords_cy"], rec["author_or_speaker"],
+                                rec["added_to_collection"], rec["file_source"], rec["table"],
+                                rec["modified_date"], rec["created_date"], rec["creator_tool"],
+                                rec["external_files"], rec["text"], rec["header_text"], rec["text_search"],
+                                rec["user_tags"], rec["special_field1"], rec["special_field2"],
+                                rec["special_field3"], rec["graph_status"], rec["dialog"], ""))
+
+        self.conn.cursor().executemany(sql_string, insert_rows)
+
+        self.conn.commit()
+
+        self.conn.close()
+
+        return True
+
     def destroy_collection(self, confirm_destroy=False):
 
         """Drops table"""
@@ -2770,11 +3420,12 @@ class SQLiteWriter:
         if key in default_keys:
 
             sql_instruction = f"UPDATE {self.library_name} "\
-                              f"SET {key} = {new_value} " \
-                              f"WHERE doc_ID = {doc_id} AND block_ID = {block_id};"
+                              f"SET {key} = ? " \
+                              f"WHERE doc_ID = ? AND block_ID = ?;"
 
             completed = True
-            results = self.conn.cursor().execute(sql_instruction)
+            results = self.conn.cursor().execute(sql_instruction, (new_value, doc_id, block_id))
+            self.conn.commit()
 
         self.conn.close()
 
@@ -2851,6 +3502,16 @@ class SQLiteWriter:
         self.conn.close()
         return 0
 
+    def delete_records_by_key(self, key, value):
+
+        """Deletes all records matching key = value - returns the number of records deleted"""
+
+        sql_command = f"DELETE FROM {self.library_name} WHERE {key} = ?;"
+        deleted = self.conn.execute(sql_command, (value,)).rowcount
+        self.conn.commit()
+        self.conn.close()
+        return deleted
+
     def update_library_card(self, library_name, update_dict, lib_card, delete_record=False):
 
         """Updates library card"""
@@ -2965,6 +3626,27 @@ class SQLiteWriter:
 
         return val_out
 
+    def reserve_doc_ids(self, library_name, count):
+
+        """Reserves a block of count unique doc IDs - returns the first doc ID in the block"""
+
+        val_out = -1
+
+        sql_instruction = f"UPDATE library " \
+                          f"SET unique_doc_id = unique_doc_id + ? " \
+                          f"WHERE library_name = ? " \
+                          f"RETURNING unique_doc_id"
+
+        output = list(self.conn.cursor().execute(sql_instruction, (count, str(library_name))))
+
+        if output and len(output[0]) > 0:
+            val_out = output[0][0] - count + 1
+
+        self.conn.commit()
+        self.conn.close()
+
+        return val_out
+
     def set_incremental_docs_blocks_images(self, library_name, added_docs=0, added_blocks=0, added_images=0,
                                            added_pages=0, added_tables=0):
 
@@ -3010,6 +3692,26 @@ class SQLiteWriter:
 
         return 0
 
+    def add_new_embedding_flag_bulk(self, id_value_list, embedding_key):
+
+        """Saves embedding flag for a batch of records with executemany inside a single transaction"""
+
+        if not id_value_list:
+            return 0
+
+        sql_command = f"UPDATE {self.library_name} " \
+                      f"SET embedding_flags = ?, special_field1 = ? " \
+                      f"WHERE rowid = ?"
+
+        rows = [(embedding_key, str(value), int(_id)) for _id, value in id_value_list]
+
+        self.conn.cursor().executemany(sql_command, rows)
+        self.conn.commit()
+
+        self.conn.close()
+
+        return 0
+
     def unset_embedding_flag(self, embedding_key):
 
         """To complete deletion of an embedding, remove the json embedding_key from the text collection"""
@@ -3024,6 +3726,14 @@ class SQLiteWriter:
 
         return 0
 
+    @contextmanager
+    def write_batch(self):
+        """Context manager - writes on this thread are committed in a single explicit transaction"""
+        self.conn.close()
+        with _SQLiteConnect.write_batch():
+            self.conn = _SQLiteConnect().connect(self.library_name)
+            yield self
+
     def close(self):
         """Closes SQLite connection"""
         self.conn.close()
@@ -3066,13 +3776,106 @@ class _PGConnect:
         return self.conn
 
 
+class _PooledSQLiteConnection:
+
+    """_PooledSQLiteConnection wraps a sqlite3 connection handed out by _SQLiteConnect - calls are passed through
+    to the connection, except close(), which returns the connection to the per-thread pool of idle connections
+    (rolling back any uncommitted writes, as closing the connection would) - and while a write batch is open on
+    the thread, commit() and close() are deferred to the end of the batch."""
+
+    def __init__(self, conn, db_file, batch=False):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_db_file", db_file)
+        object.__setattr__(self, "_batch", batch)
+
+    def _active(self):
+        conn = object.__getattribute__(self, "_conn")
+        if object.__getattribute__(self, "_batch") and conn is not None:
+            #   a batch connection is usable until the end of the batch
+            if _SQLiteConnect._thread_state().batch.get(object.__getattribute__(self, "_db_file")) is not conn:
+                conn = None
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self._active(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._active(), name, value)
+
+    def commit(self):
+        """Commits, unless a write batch is open - in which case the batch is committed at its end"""
+        conn = self._active()
+        if not self._batch:
+            conn.commit()
+
+    def close(self):
+        """Returns the connection to the pool - safe to call more than once - no-op within a write batch"""
+        if self._batch:
+            return
+        conn = self._conn
+        if conn is None:
+            return
+        object.__setattr__(self, "_conn", None)
+        _SQLiteConnect.release(conn, self._db_file)
+
+
 class _SQLiteConnect:
 
-    """_SQLiteConnect returns a connection to a SQLite DB running locally"""
+    """_SQLiteConnect returns a connection to a SQLite DB running locally.
+
+    Connections are opened with the pragmas in SQLiteConfig (by default, WAL journal mode, so readers are not
+    blocked by an ongoing ingestion, with synchronous=normal, and mmap and page cache sizes), and, if
+    'connection_pool' is set in SQLiteConfig, re-used per thread - sqlite3 connections may only be used by the
+    thread that opened them - rather than opened and closed by each CollectionRetrieval and CollectionWriter.
+
+    WAL mode is persistent in the db file - an existing db file is converted to WAL the first time it is opened,
+    and has -wal and -shm files alongside while connections are open.   Idle pooled connections are closed with
+    close_all, which is called by Library.delete_library, and at exit, so that the last connection
+    checkpoints the -wal file into the db file."""
+
+    _local = threading.local()
 
     def __init__(self):
         self.conn = None
 
+    @staticmethod
+    def _open(db_file):
+
+        """Opens a new connection and applies the pragmas in SQLiteConfig"""
+
+        busy_timeout = SQLiteConfig.get_config("busy_timeout")
+        timeout = busy_timeout / 1000 if busy_timeout is not None else 5.0
+
+        conn = sqlite3.connect(db_file, timeout=timeout)
+
+        for pragma in ["journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout"]:
+            value = SQLiteConfig.get_config(pragma)
+            if value is None:
+                continue
+
+            if pragma == "journal_mode":
+                #   journal mode is persistent in the db file, and can only be changed with no other connections open
+                if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == str(value).lower():
+                    continue
+                try:
+                    conn.execute(f"PRAGMA journal_mode = {value}")
+                except sqlite3.OperationalError as e:
+                    logger.warning(f"update: _SQLiteConnect - could not set journal_mode to {value} - {e}")
+                continue
+
+            conn.execute(f"PRAGMA {pragma} = {value}")
+
+        return conn
+
+    @classmethod
+    def _thread_state(cls):
+        if not hasattr(cls._local, "idle"):
+            cls._local.idle = {}
+            cls._local.batch = {}
+        return cls._local
+
     def connect(self, db_name=None, collection_name=None):
 
         """Connect to SQLite DB - using configuration parameters in SQLiteConfig"""
@@ -3080,10 +3883,87 @@ class _SQLiteConnect:
         # db_file = os.path.join(SQLiteConfig.get_db_fp(), "sqlite_llmware.db")
         db_file = SQLiteConfig.get_uri_string()
 
-        self.conn = sqlite3.connect(db_file)
+        if not SQLiteConfig.get_config("connection_pool"):
+            self.conn = self._open(db_file)
+            return self.conn
+
+        state = self._thread_state()
+
+        if db_file in state.batch:
+            self.conn = _PooledSQLiteConnection(state.batch[db_file], db_file, batch=True)
+            return self.conn
+
+        idle = state.idle.get(db_file)
+        conn = idle.pop() if idle else self._open(db_file)
+
+        self.conn = _PooledSQLiteConnection(conn, db_file)
 
         return self.conn
 
+    @classmethod
+    def release(cls, conn, db_file):
+
+        """Returns a connection to the idle pool of the current thread - or closes it, if the pool is full"""
+
+        if conn.in_transaction:
+            conn.rollback()
+
+        conn.text_factory = str
+
+        idle = cls._thread_state().idle.setdefault(db_file, [])
+
+        if len(idle) < SQLiteConfig.get_config("pool_size"):
+            idle.append(conn)
+        else:
+            conn.close()
+
+    @classmethod
+    @contextmanager
+    def write_batch(cls):
+
+        """Context manager - all connections to the SQLite DB opened on this thread within the batch share one
+        connection, and the writes are committed once, in a single explicit transaction, at the end of the batch -
+        or rolled back, if an exception is raised."""
+
+        db_file = SQLiteConfig.get_uri_string()
+        state = cls._thread_state()
+
+        if not SQLiteConfig.get_config("connection_pool") or db_file in state.batch:
+            yield
+            return
+
+        idle = state.idle.get(db_file)
+        conn = idle.pop() if idle else cls._open(db_file)
+
+        conn.execute("BEGIN")
+        state.batch[db_file] = conn
+
+        try:
+            yield
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            del state.batch[db_file]
+            cls.release(conn, db_file)
+
+    @classmethod
+    def close_all(cls):
+
+        """Closes the idle connections of the current thread"""
+
+        state = cls._thread_state()
+        for conns in state.idle.values():
+            for conn in conns:
+                conn.close()
+        state.idle = {}
+
+        return True
+
+
+atexit.register(_SQLiteConnect.close_all)
+
 
 class _MongoConnect:
 
@@ -3138,6 +4018,8 @@ class DBCursor:
     def __init__(self, cursor, collection_retriever, db_name, close_when_exhausted=True, return_dict=True, schema=None):
 
         self.cursor = iter(cursor)
+        # keeps the underlying db cursor, if any, for bulk reads with fetchmany
+        self.db_cursor = cursor if hasattr(cursor, "fetchmany") else None
         self.collection_retriever = collection_retriever
         self.db_name = db_name
         self.close_when_exhausted = close_when_exhausted
@@ -3162,6 +4044,26 @@ class DBCursor:
 
         return new_row
 
+    def pull_many(self, count):
+
+        """Pulls up to count rows off the cursor in a single read (fetchmany, if supported by the underlying
+        db cursor) - returns an empty list once the cursor is exhausted"""
+
+        if self.db_cursor is not None:
+            new_rows = self.db_cursor.fetchmany(count)
+        else:
+            new_rows = list(itertools.islice(self.cursor, count))
+
+        if not new_rows:
+            if self.close_when_exhausted:
+                self.collection_retriever.close()
+            return []
+
+        if self.return_dict and not isinstance(new_rows[0], dict):
+            return self.collection_retriever.unpack(list(new_rows))
+
+        return list(new_rows)
+
     def pull_all(self):
 
         """Exhausts remaining cursor and returns to calling function"""
@@ -4273,6 +5175,94 @@ class CloudBucketManager:
         return files_copied
 
 
+class FileManifest:
+
+    """ FileManifest is a per-library record of the files ingested into the library - with the content hash, size,
+    modification time and doc_ID of each file - used by Parser.ingest to skip unchanged files, including renamed
+    copies of a file already in the library, and to identify modified files to re-parse.
+
+    The manifest is a sqlite db file in the library folder, with indexed lookups by file name and content hash, and
+    is independent of the text collection db. """
+
+    def __init__(self, library_path, manifest_fn="file_manifest.db"):
+
+        self.manifest_fp = os.path.join(library_path, manifest_fn)
+        self.conn = None
+
+    def _connect(self):
+
+        if self.conn is None:
+
+            os.makedirs(os.path.dirname(self.manifest_fp), exist_ok=True)
+
+            self.conn = sqlite3.connect(self.manifest_fp, timeout=30)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS file_manifest (file_name TEXT PRIMARY KEY, "
+                              "content_hash TEXT, size INTEGER, mtime REAL, doc_ID INTEGER, updated REAL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS file_manifest_hash ON file_manifest (content_hash)")
+
+        return self.conn
+
+    def close(self):
+
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def file_hash(fp, chunk_size=1048576):
+
+        """ sha256 hash of the file content, read in chunks """
+
+        h = hashlib.sha256()
+
+        with open(fp, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+
+        return h.hexdigest()
+
+    def lookup_file(self, file_name):
+
+        """ Returns the manifest entry for the file name, or None if not found """
+
+        row = self._connect().execute("SELECT file_name, content_hash, size, mtime, doc_ID FROM file_manifest "
+                                      "WHERE file_name = ?", (file_name,)).fetchone()
+
+        return self._to_dict(row)
+
+    def lookup_hash(self, content_hash):
+
+        """ Returns a manifest entry with the content hash, or None if not found """
+
+        row = self._connect().execute("SELECT file_name, content_hash, size, mtime, doc_ID FROM file_manifest "
+                                      "WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone()
+
+        return self._to_dict(row)
+
+    @staticmethod
+    def _to_dict(row):
+
+        if not row:
+            return None
+
+        return {"file_name": row[0], "content_hash": row[1], "size": row[2], "mtime": row[3], "doc_ID": row[4]}
+
+    def update(self, entries):
+
+        """ Adds or replaces manifest entries - list of dicts with file_name, content_hash, size, mtime, doc_ID """
+
+        now = datetime.now().timestamp()
+
+        conn = self._connect()
+
+        conn.executemany("INSERT OR REPLACE INTO file_manifest VALUES (?, ?, ?, ?, ?, ?)",
+                         [(e["file_name"], e["content_hash"], e["size"], e["mtime"], e["doc_ID"], now)
+                          for e in entries])
+        conn.commit()
+
+        return len(entries)
+
+
 class ParserState:
 
     """ ParserState is the main class abstraction to manage and persist Parser State """
@@ -4283,6 +5273,7 @@ class ParserState:
         self.parsing_output = parsing_output
         self.parser_job_output_base_name = "parser_job_"
         self.parser_output_format = ".jsonl"
+        self.parser_index_format = ".index.json"
         self.parser_output_fp = LLMWareConfig.get_parser_path()
 
         # check for llmware path & create if not already set up
@@ -4331,6 +5322,35 @@ class ParserState:
 
         return fn
 
+    def save_parser_index(self, parser_job_id, index_dict):
+
+        """ Saves the exported in-memory search index of the parser output (BM25Index.to_dict) to a json file in
+        parser history, next to the parser output jsonl """
+
+        fn = self.parser_job_output_base_name + str(parser_job_id) + self.parser_index_format
+        fp = os.path.join(self.parser_output_fp, fn)
+
+        with open(fp, "w", encoding="utf-8") as outfile:
+            json.dump(index_dict, outfile, separators=(",", ":"))
+
+        return fn
+
+    def load_parser_index(self, parser_job_id):
+
+        """ Loads the exported in-memory search index of the parser output - returns None if not found """
+
+        fn = self.parser_job_output_base_name + str(parser_job_id) + self.parser_index_format
+        fp = os.path.join(self.parser_output_fp, fn)
+
+        if not os.path.exists(fp):
+            logger.warning(f"update: ParserState - could not find saved parser index - {parser_job_id}")
+            return None
+
+        with open(fp, "r", encoding="utf-8") as infile:
+            index_dict = json.load(infile)
+
+        return index_dict
+
     def issue_new_parse_job_id(self, custom_id=None, mode="uuid"):
 
         """ Issues new parse_job_id """
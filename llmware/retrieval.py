@@ -21,13 +21,24 @@ embeddings were previously created for the Library.  There are also a number of
 'hybrid' strategies combining elements of semantic and text querying."""
 
 
+import copy
+import functools
+import hashlib
+import heapq
+import json
 import logging
 import os
-from collections import Counter
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from bson.objectid import ObjectId
+import numpy as np
 
-from llmware.configs import LLMWareConfig
+from llmware.configs import LLMWareConfig, EmbeddingConfig, QueryConfig
 from llmware.embeddings import EmbeddingHandler
 from llmware.resources import CollectionRetrieval, QueryState
 from llmware.util import Utilities, CorpTokenizer
@@ -38,6 +49,271 @@ from llmware.exceptions import LibraryObjectNotFoundException,UnsupportedEmbeddi
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_query_match(query):
+
+    """ Compiles the query terms for Query.locate_query_match once per query string - returns a case-insensitive
+    lookahead regex that finds the offsets where any term starts, and the list of (term, pattern) pairs, in
+    order of first appearance in the query. """
+
+    b = CorpTokenizer(one_letter_removal=False, remove_stop_words=False, remove_punctuation=False,
+                      remove_numbers=False)
+
+    key_terms = []
+    for key_term in b.tokenize(query):
+
+        if key_term.startswith('"'):
+            key_term = key_term[1:-1]
+
+        if key_term and key_term not in key_terms:
+            key_terms.append(key_term)
+
+    if not key_terms:
+        return None, []
+
+    alternation = "|".join(re.escape(key_term) for key_term in key_terms)
+    candidates = re.compile(f"(?=(?:{alternation}))", re.IGNORECASE)
+
+    term_patterns = [(key_term, re.compile(re.escape(key_term), re.IGNORECASE)) for key_term in key_terms]
+
+    return candidates, term_patterns
+
+
+class _QueryResultCache:
+
+    """Process-wide cache of packaged query results, shared by all Query instances - e.g., dashboards that issue
+    the same query strings repeatedly against libraries that change only at ingest time.
+
+    Entries are keyed by a hash of (account_name, library_name, library version, query type, output keys, query
+    parameters), so that any change to the library - which increments the library version - invalidates all
+    prior results for the library.   Entries are evicted in least-recently-used order over QueryConfig
+    'query_cache_max_entries', and expire after 'query_cache_ttl' seconds.   If 'query_cache_disk' is set,
+    results are also saved in a sqlite db file in the llmware_data path, and looked up on a miss in memory - saved
+    as json, with Mongo ObjectId _ids as {"$oid": str} and numpy values as python types.   Hit/miss counts are
+    kept for the process."""
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(account_name, library_name, library_version, query_type, output_keys, params):
+
+        """ Hash of the query parameters - params is a dict of json-serializable values """
+
+        key = json.dumps([account_name, library_name, library_version, query_type, list(output_keys), params],
+                         sort_keys=True, default=str)
+
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _json_default(obj):
+
+        """ Serializes values in query results that are not json types """
+
+        if isinstance(obj, ObjectId):
+            return {"$oid": str(obj)}
+
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+
+        if isinstance(obj, np.generic):
+            return obj.item()
+
+        return str(obj)
+
+    @staticmethod
+    def _json_object_hook(obj):
+
+        if len(obj) == 1 and "$oid" in obj:
+            return ObjectId(obj["$oid"])
+
+        return obj
+
+    def _dumps(self, qr_dict):
+        return json.dumps(qr_dict, default=self._json_default)
+
+    def _loads(self, result):
+
+        """ Returns the saved result, or None if it can not be read, e.g., an entry saved in a prior format """
+
+        try:
+            return json.loads(result, object_hook=self._json_object_hook)
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def get_cache_fp():
+        return os.path.join(LLMWareConfig.get_llmware_path(), QueryConfig.get_config("query_cache_file"))
+
+    def _connect(self):
+
+        fp = self.get_cache_fp()
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+
+        conn = sqlite3.connect(fp, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS query_cache (cache_key TEXT PRIMARY KEY, account_name TEXT, "
+                     "library_name TEXT, result TEXT, expires REAL, last_used REAL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS query_cache_last_used ON query_cache (last_used)")
+
+        return conn
+
+    @staticmethod
+    def _expires():
+        ttl = QueryConfig.get_config("query_cache_ttl")
+        return time.time() + ttl if ttl and ttl > 0 else 0.0
+
+    def get(self, key):
+
+        """ Returns a copy of the cached result, or None if not found or expired """
+
+        now = time.time()
+
+        with self._lock:
+
+            entry = self._cache.get(key)
+
+            if entry is not None:
+                library_key, expires, qr_dict = entry
+
+                if not expires or expires > now:
+                    self._cache.move_to_end(key)
+                    self.memory_hits += 1
+                    return copy.deepcopy(qr_dict)
+
+                del self._cache[key]
+
+        if QueryConfig.get_config("query_cache_disk"):
+
+            conn = self._connect()
+            row = conn.execute("SELECT account_name, library_name, result, expires FROM query_cache "
+                               "WHERE cache_key = ?", (key,)).fetchone()
+
+            qr_dict = self._loads(row[2]) if row and (not row[3] or row[3] > now) else None
+
+            if qr_dict is not None:
+                conn.execute("UPDATE query_cache SET last_used = ? WHERE cache_key = ?", (now, key))
+                conn.commit()
+                conn.close()
+
+                self._put_memory(key, (row[0], row[1]), row[3], qr_dict)
+
+                with self._lock:
+                    self.disk_hits += 1
+
+                return copy.deepcopy(qr_dict)
+
+            conn.close()
+
+        with self._lock:
+            self.misses += 1
+
+        return None
+
+    def _put_memory(self, key, library_key, expires, qr_dict):
+
+        max_entries = QueryConfig.get_config("query_cache_max_entries")
+
+        if not max_entries or max_entries <= 0:
+            return False
+
+        with self._lock:
+            self._cache[key] = (library_key, expires, qr_dict)
+            self._cache.move_to_end(key)
+
+            while len(self._cache) > max_entries:
+                self._cache.popitem(last=False)
+
+        return True
+
+    def put(self, key, account_name, library_name, qr_dict):
+
+        """ Adds a copy of the result to the cache, and evicts least recently used entries over the size cap """
+
+        qr_dict = copy.deepcopy(qr_dict)
+        expires = self._expires()
+
+        self._put_memory(key, (account_name, library_name), expires, qr_dict)
+
+        if QueryConfig.get_config("query_cache_disk"):
+
+            now = time.time()
+
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, account_name, library_name, self._dumps(qr_dict), expires, now))
+
+            conn.execute("DELETE FROM query_cache WHERE expires > 0 AND expires <= ?", (now,))
+
+            max_entries = QueryConfig.get_config("query_cache_disk_max_entries")
+            entries = conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+
+            if max_entries and entries > max_entries:
+                conn.execute("DELETE FROM query_cache WHERE rowid IN (SELECT rowid FROM query_cache "
+                             "ORDER BY last_used LIMIT ?)", (entries - max_entries,))
+
+            conn.commit()
+            conn.close()
+
+        return True
+
+    def clear(self, library_name=None, account_name=None):
+
+        """ Removes all entries, or only the entries for library_name and/or account_name, if provided """
+
+        with self._lock:
+            for key in list(self._cache.keys()):
+                entry_account, entry_library = self._cache[key][0]
+                if (account_name is None or entry_account == account_name) and \
+                        (library_name is None or entry_library == library_name):
+                    del self._cache[key]
+
+        if os.path.exists(self.get_cache_fp()):
+
+            conditions, params = [], []
+
+            if account_name is not None:
+                conditions.append("account_name = ?")
+                params.append(account_name)
+
+            if library_name is not None:
+                conditions.append("library_name = ?")
+                params.append(library_name)
+
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            conn = self._connect()
+            conn.execute(f"DELETE FROM query_cache{where}", params)
+            conn.commit()
+            conn.close()
+
+        return True
+
+    def get_stats(self):
+
+        """ Returns hit/miss counts and hit rate for the process, and number of entries in memory + on disk """
+
+        disk_entries = 0
+
+        if QueryConfig.get_config("query_cache_disk") and os.path.exists(self.get_cache_fp()):
+            conn = self._connect()
+            disk_entries = conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+            conn.close()
+
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+
+        return {"hits": hits, "misses": self.misses, "memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._cache), "disk_entries": disk_entries}
+
+
+_query_result_cache = _QueryResultCache()
+
+
 class Query:
 
     """Implements the query capabilities against a ``Library` object`.
@@ -80,6 +356,10 @@ class Query:
         The name of the vector store to be queried against. If it is not set, then this is determined by the
         given ``embedding_model``.
 
+    query_cache : bool, default=None
+        Sets whether query results are looked up in and added to the query result cache.  If it is not set, then
+        this is determined by QueryConfig 'query_cache'.
+
 
     Examples
     ----------
@@ -113,7 +393,7 @@ class Query:
 
     def __init__(self, library, embedding_model=None, tokenizer=None, vector_db_api_key=None,
                  query_id=None, from_hf=False, from_sentence_transformer=False,embedding_model_name=None,
-                 save_history=True, query_mode=None, vector_db=None, model_api_key=None):
+                 save_history=True, query_mode=None, vector_db=None, model_api_key=None, query_cache=None):
 
         # load user profile & instantiate core library assets linked to profile
 
@@ -250,6 +530,9 @@ class Query:
 
         self.save_history = save_history
 
+        # if None, then set by QueryConfig 'query_cache'
+        self.query_cache = query_cache
+
         if query_mode:
             self.search_mode = query_mode
 
@@ -286,6 +569,16 @@ class Query:
 
         return self
 
+    def _create_query_embedding(self, text):
+
+        """ Creates the query embedding - repeated query strings are looked up in the embedding cache, if
+        EmbeddingConfig 'embedding_cache' is set. """
+
+        if EmbeddingConfig.get_config("embedding_cache"):
+            return EmbeddingHandler.cached_embedding(self.embedding_model, text)
+
+        return self.embedding_model.embedding(text)
+
     def get_output_keys(self):
 
         """ Returns list of keys that will be provided in each query_result. """
@@ -423,12 +716,18 @@ class Query:
         if exact_mode:
             query = self.exact_query_prep(query)
 
-        # query the text collection
-        cursor = CollectionRetrieval(self.library_name,account_name=self.account_name).basic_query(query)
+        def run_query():
 
-        # package results, with correct sample counts and output keys requested
-        results_dict = self._cursor_to_qr(query, cursor,result_count=result_count,exhaust_full_cursor=
-                                          exhaust_full_cursor)
+            # query the text collection - result_count pushed down to the db, unless exhausting the full cursor
+            cursor = CollectionRetrieval(self.library_name,account_name=self.account_name).\
+                basic_query(query, **self._text_search_limits(result_count, exhaust_full_cursor))
+
+            # package results, with correct sample counts and output keys requested
+            return self._cursor_to_qr(query, cursor,result_count=result_count,exhaust_full_cursor=
+                                      exhaust_full_cursor)
+
+        results_dict = self._cached_query("text", {"query": query, "result_count": result_count,
+                                                   "exhaust_full_cursor": exhaust_full_cursor}, run_query)
 
         if results_only:
             return results_dict["results"]
@@ -459,15 +758,25 @@ class Query:
             logger.warning("warning: Query - expected to receive document filter with keys of 'doc_ID' or "
                            "'file_source' - as a safe fall-back - will run the requested query without a filter.")
 
-        if key:
-            cursor = CollectionRetrieval(self.library_name, account_name=self.account_name). \
-                    text_search_with_key_value_range(query, key, value_range)
-        else:
-            # as fallback, if no key found, then run query without filter
-            cursor = CollectionRetrieval(self.library_name, account_name=self.account_name).basic_query(query)
+        limits = self._text_search_limits(result_count, exhaust_full_cursor)
+
+        def run_query():
 
-        result_dict = self._cursor_to_qr(query, cursor, result_count=result_count,
-                                         exhaust_full_cursor=exhaust_full_cursor)
+            if key:
+                cursor = CollectionRetrieval(self.library_name, account_name=self.account_name). \
+                        text_search_with_key_value_range(query, key, value_range, **limits)
+            else:
+                # as fallback, if no key found, then run query without filter
+                cursor = CollectionRetrieval(self.library_name, account_name=self.account_name).basic_query(query,
+                                                                                                           **limits)
+
+            return self._cursor_to_qr(query, cursor, result_count=result_count,
+                                      exhaust_full_cursor=exhaust_full_cursor)
+
+        result_dict = self._cached_query("text_document_filter",
+                                         {"query": query, "key": key, "value_range": value_range,
+                                          "result_count": result_count,
+                                          "exhaust_full_cursor": exhaust_full_cursor}, run_query)
 
         if results_only:
             return result_dict["results"]
@@ -517,7 +826,7 @@ class Query:
             page_num = [page_num]
 
         cursor_results = CollectionRetrieval(self.library_name, account_name=self.account_name).\
-            text_search_with_key_value_range(query, key, page_num)
+            text_search_with_key_value_range(query, key, page_num, **self._text_search_limits(20, False))
 
         retrieval_dict = self._cursor_to_qr(query, cursor_results)
 
@@ -550,8 +859,12 @@ class Query:
                     validated_filter_dict.update({key:values})
 
         if validated_filter_dict:
-            cursor = CollectionRetrieval(self.library_name, account_name=self.account_name).\
-                text_search_with_key_value_dict_filter(query,validated_filter_dict)
+
+            # limit is safe to push down only if the secondary filter will not remove any further results
+            if len(validated_filter_dict) == len(filter_dict):
+                limits = self._text_search_limits(result_count, exhaust_full_cursor)
+            else:
+                limits = self._text_search_limits(result_count, True)
 
         else:
             logger.error("error: Query text_query_with_custom_filter - keys in filter_dict are not"
@@ -559,15 +872,82 @@ class Query:
 
             return -1
 
-        result_dict = self._cursor_to_qr_with_secondary_filter(query, cursor,filter_dict,
-                                                               result_count=result_count,
-                                                               exhaust_full_cursor=exhaust_full_cursor)
+        def run_query():
+
+            cursor = CollectionRetrieval(self.library_name, account_name=self.account_name).\
+                text_search_with_key_value_dict_filter(query,validated_filter_dict, **limits)
+
+            return self._cursor_to_qr_with_secondary_filter(query, cursor,filter_dict,
+                                                            result_count=result_count,
+                                                            exhaust_full_cursor=exhaust_full_cursor)
+
+        result_dict = self._cached_query("text_custom_filter",
+                                         {"query": query, "filter_dict": filter_dict, "result_count": result_count,
+                                          "exhaust_full_cursor": exhaust_full_cursor}, run_query)
 
         if results_only:
             return result_dict["results"]
 
         return result_dict
 
+    @staticmethod
+    def _text_search_limits(result_count, exhaust_full_cursor):
+
+        """ Internal helper - text search options to push result_count down to the db as a limit, or if
+        exhausting the full cursor, to stream the results off the db cursor without a limit. """
+
+        if exhaust_full_cursor:
+            return {"limit": None, "stream": True}
+
+        return {"limit": result_count, "stream": False}
+
+    def _cached_query(self, query_type, params, run_query):
+
+        """ Internal helper - if the query result cache is enabled, looks up the result of the query in the cache,
+        and on a miss, runs run_query and adds the result to the cache - the library version is read on each
+        lookup, so a change to the library invalidates all prior results.   Queries that exhaust the full
+        cursor are not cached. """
+
+        use_cache = self.query_cache if self.query_cache is not None else QueryConfig.get_config("query_cache")
+
+        if not use_cache or params.get("exhaust_full_cursor"):
+            return run_query()
+
+        key = _query_result_cache.make_key(self.account_name, self.library_name,
+                                           self.library.get_library_version(), query_type,
+                                           self.query_result_return_keys, params)
+
+        qr_dict = _query_result_cache.get(key)
+
+        if qr_dict is not None:
+            if self.save_history:
+                self.register_query(qr_dict)
+
+            return qr_dict
+
+        qr_dict = run_query()
+
+        if isinstance(qr_dict, dict):
+            _query_result_cache.put(key, self.account_name, self.library_name, qr_dict)
+
+        return qr_dict
+
+    @staticmethod
+    def clear_query_cache(library_name=None, account_name=None):
+
+        """ Removes all entries in the query result cache, or only the entries for library_name and/or
+        account_name, if provided """
+
+        return _query_result_cache.clear(library_name=library_name, account_name=account_name)
+
+    @staticmethod
+    def get_query_cache_stats():
+
+        """ Returns hit/miss counts and hit rate for the process, and number of entries in the query result
+        cache """
+
+        return _query_result_cache.get_stats()
+
     def _cursor_to_qr_with_secondary_filter(self, query, cursor_results, filter_dict,
                                             result_count=20, exhaust_full_cursor=False):
 
@@ -707,20 +1087,83 @@ class Query:
         if not embedding_distance_threshold:
             embedding_distance_threshold = self.semantic_distance_threshold
 
+        def run_query():
+
+            self.load_embedding_model()
+
+            # confirm that embedding model exists, or catch and raise error
+            if self.embedding_model:
+                self.query_embedding = self._create_query_embedding(query)
+            else:
+                raise EmbeddingModelNotFoundException(self.library_name)
+
+            if self.embedding_db and self.embedding_model:
+
+                semantic_block_results = self.embeddings.search_index(self.query_embedding,
+                                                                      embedding_db=self.embedding_db,
+                                                                      model=self.embedding_model,
+                                                                      sample_count=result_count,
+                                                                      filter_dict=self._vector_search_filter(
+                                                                          custom_filter))
+
+            else:
+                logger.error(f"error: Query - embedding record does not indicate embedding db - "
+                             f"{self.embedding_db} and/or embedding model - {self.embedding_model}")
+
+                raise UnsupportedEmbeddingDatabaseException(self.embedding_db)
+
+            qr_raw = []
+
+            # Collecting semantic results
+            for i, blocks in enumerate(semantic_block_results):
+                if blocks[1] < embedding_distance_threshold:
+                    block_data = blocks[0]
+                    block_data["distance"] = blocks[1]
+                    block_data["semantic"] = "semantic"
+                    block_data["score"] = 0.0
+                    qr_raw.append(block_data)
+
+            # Applying custom filter if provided
+            if custom_filter:
+                qr_raw = self.apply_custom_filter(qr_raw, custom_filter)
+
+            # Processing results
+            return self._cursor_to_qr(query, qr_raw, result_count=result_count)
+
+        results_dict = self._cached_query("semantic", {"query": query, "result_count": result_count,
+                                                       "embedding_distance_threshold": embedding_distance_threshold,
+                                                       "custom_filter": custom_filter,
+                                                       "embedding_model": self.embedding_model_name,
+                                                       "embedding_db": self.embedding_db}, run_query)
+
+        return results_dict["results"] if results_only else results_dict
+
+    def semantic_query_batch(self, queries, result_count=20, embedding_distance_threshold=None, results_only=True):
+
+        """ Executes a list of semantic queries in one call - embeds all of the queries in a single model batch,
+        and runs one multi-vector search on the vector db - returns a list with the results of each query, in
+        the order of the queries. """
+
+        if not embedding_distance_threshold:
+            embedding_distance_threshold = self.semantic_distance_threshold
+
+        if not queries:
+            return []
+
         self.load_embedding_model()
 
         # confirm that embedding model exists, or catch and raise error
         if self.embedding_model:
-            self.query_embedding = self.embedding_model.embedding(query)
+            query_embeddings = self._create_query_embedding(list(queries))
         else:
             raise EmbeddingModelNotFoundException(self.library_name)
 
         if self.embedding_db and self.embedding_model:
 
-            semantic_block_results = self.embeddings.search_index(self.query_embedding,
-                                                                  embedding_db=self.embedding_db,
-                                                                  model=self.embedding_model,
-                                                                  sample_count=result_count)
+            semantic_block_results = self.embeddings.search_index_batch(query_embeddings,
+                                                                        embedding_db=self.embedding_db,
+                                                                        model=self.embedding_model,
+                                                                        sample_count=result_count)
 
         else:
             logger.error(f"error: Query - embedding record does not indicate embedding db - "
@@ -728,25 +1171,34 @@ class Query:
 
             raise UnsupportedEmbeddingDatabaseException(self.embedding_db)
 
-        qr_raw = []
+        output = []
 
-        # Collecting semantic results
-        for i, blocks in enumerate(semantic_block_results):
-            if blocks[1] < embedding_distance_threshold:
-                block_data = blocks[0]
-                block_data["distance"] = blocks[1]
-                block_data["semantic"] = "semantic"
-                block_data["score"] = 0.0
-                qr_raw.append(block_data)
+        for query, block_results in zip(queries, semantic_block_results):
 
-        # Applying custom filter if provided
-        if custom_filter:
-            qr_raw = self.apply_custom_filter(qr_raw, custom_filter)
+            qr_raw = []
+            for blocks in block_results:
+                if blocks[1] < embedding_distance_threshold:
+                    block_data = blocks[0]
+                    block_data["distance"] = blocks[1]
+                    block_data["semantic"] = "semantic"
+                    block_data["score"] = 0.0
+                    qr_raw.append(block_data)
 
-        # Processing results
-        results_dict = self._cursor_to_qr(query, qr_raw, result_count=result_count)
+            results_dict = self._cursor_to_qr(query, qr_raw, result_count=result_count)
 
-        return results_dict["results"] if results_only else results_dict
+            output.append(results_dict["results"] if results_only else results_dict)
+
+        return output
+
+    def _vector_search_filter(self, filter_dict):
+
+        """ Internal helper - the part of filter_dict on text collection keys, which is pushed down into the
+        vector search - the full filter is still applied on the results. """
+
+        if not filter_dict:
+            return None
+
+        return {key: value for key, value in filter_dict.items() if key in self.library.default_keys} or None
 
     def apply_custom_filter(self, results, custom_filter):
 
@@ -771,38 +1223,48 @@ class Query:
 
         th = self.semantic_distance_threshold
 
-        # confirm that embedding model exists, or catch and raise error
-        if self.embedding_model:
-            self.query_embedding = self.embedding_model.embedding(query)
-        else:
-            raise EmbeddingModelNotFoundException(self.library_name)
+        def run_query():
 
-        if self.embedding_db and self.embedding_model:
-            semantic_block_results = self.embeddings.search_index(self.query_embedding,
-                                                                  embedding_db=self.embedding_db,
-                                                                  model=self.embedding_model,
-                                                                  sample_count=result_count)
+            # confirm that embedding model exists, or catch and raise error
+            if self.embedding_model:
+                self.query_embedding = self._create_query_embedding(query)
+            else:
+                raise EmbeddingModelNotFoundException(self.library_name)
 
-        else:
-            logger.error(f"error: Query - embedding record does not indicate embedding db- {self.embedding_db} "
-                         f"and/or an embedding_model - {self.embedding_model}")
+            if self.embedding_db and self.embedding_model:
+                semantic_block_results = self.embeddings.search_index(self.query_embedding,
+                                                                      embedding_db=self.embedding_db,
+                                                                      model=self.embedding_model,
+                                                                      sample_count=result_count,
+                                                                      filter_dict=self._vector_search_filter(
+                                                                          filter_dict))
 
-            raise UnsupportedEmbeddingDatabaseException(self.embedding_db)
+            else:
+                logger.error(f"error: Query - embedding record does not indicate embedding db- {self.embedding_db} "
+                             f"and/or an embedding_model - {self.embedding_model}")
 
-        qr_raw = []
+                raise UnsupportedEmbeddingDatabaseException(self.embedding_db)
 
-        # may need to conform the output structure of semantic_block_results
-        for i, blocks in enumerate(semantic_block_results):
-            # assume that each block has at least two components:  [0] core mongo block, and [1] distance metric
-            if blocks[1] < embedding_distance_threshold:
+            qr_raw = []
 
-                blocks[0].update({"distance": blocks[1]})
-                blocks[0].update({"semantic": "semantic"})
-                blocks[0].update({"score": 0.0})
+            # may need to conform the output structure of semantic_block_results
+            for i, blocks in enumerate(semantic_block_results):
+                # assume that each block has at least two components:  [0] core mongo block, and [1] distance metric
+                if blocks[1] < embedding_distance_threshold:
 
-                qr_raw.append(blocks[0])
+                    blocks[0].update({"distance": blocks[1]})
+                    blocks[0].update({"semantic": "semantic"})
+                    blocks[0].update({"score": 0.0})
+
+                    qr_raw.append(blocks[0])
 
-        result_output = self._cursor_to_qr_with_secondary_filter(query,qr_raw,filter_dict,result_count=result_count)
+            return self._cursor_to_qr_with_secondary_filter(query,qr_raw,filter_dict,result_count=result_count)
+
+        result_output = self._cached_query("semantic_document_filter",
+                                           {"query": query, "filter_dict": filter_dict, "result_count": result_count,
+                                            "embedding_distance_threshold": embedding_distance_threshold,
+                                            "embedding_model": self.embedding_model_name,
+                                            "embedding_db": self.embedding_db}, run_query)
 
         if results_only:
             return result_output["results"]
@@ -819,7 +1281,7 @@ class Query:
         # will use embedding to find similar blocks from a given block
         # confirm that embedding model exists, or catch and raise error
         if self.embedding_model:
-            self.query_embedding = self.embedding_model.embedding(block["text"])
+            self.query_embedding = self._create_query_embedding(block["text"])
         else:
             raise EmbeddingModelNotFoundException(self.library_name)
 
@@ -950,6 +1412,151 @@ class Query:
 
         return retrieval_dict
 
+    def hybrid_query(self, query, result_count=20, fusion="rrf", text_weight=1.0, semantic_weight=1.0,
+                     rrf_k=60, candidate_count=None, custom_filter=None, results_only=True):
+
+        """ Executes text and semantic queries concurrently, and fuses the two ranked lists by _id - either with
+        reciprocal rank fusion (fusion='rrf'), in which each result scores weight / (rrf_k + rank) in each list,
+        or with weighted score normalization (fusion='weighted'), in which the text score + semantic distance are
+        min-max normalized within each list, and combined as weighted sum.   Merging is linear in the number of
+        results, so result_count can run into the thousands.   Each query retrieves candidate_count results
+        (default: result_count) before fusion. """
+
+        if fusion not in ["rrf", "weighted"]:
+            logger.warning(f"warning: Query().hybrid_query - fusion '{fusion}' not recognized - options are "
+                           f"'rrf' and 'weighted' - will use 'rrf'")
+            fusion = "rrf"
+
+        candidate_count = max(candidate_count or result_count, result_count)
+
+        # following keys are required for hybrid query to work, add them if user has omitted them
+        for key in ['_id', 'doc_ID', 'file_source', 'score', 'distance']:
+            if key not in self.query_result_return_keys:
+                self.query_result_return_keys.append(key)
+
+        # load model in calling thread, before starting the semantic query
+        self.load_embedding_model()
+
+        # each concurrent query runs on its own copy of the query, so that neither updates the query state -
+        # which is updated once, with the fused results
+        text_leg_query, semantic_leg_query = self._leg_query(), self._leg_query()
+
+        def text_leg():
+            if custom_filter:
+                results = text_leg_query.text_query_with_custom_filter(query, custom_filter,
+                                                                       result_count=candidate_count,
+                                                                       results_only=True)
+                # invalid filter keys return -1
+                return results if isinstance(results, list) else []
+
+            return text_leg_query.text_query(query, result_count=candidate_count, results_only=True)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            text_future = executor.submit(text_leg)
+            semantic_future = executor.submit(semantic_leg_query.semantic_query, query,
+                                              result_count=candidate_count, custom_filter=custom_filter,
+                                              results_only=True)
+
+            text_results = text_future.result()
+            semantic_results = semantic_future.result()
+
+        fused = self._fuse_ranked_results([("text", text_results, text_weight),
+                                           ("semantic", semantic_results, semantic_weight)],
+                                          fusion=fusion, rrf_k=rrf_k)
+
+        merged_results = []
+        doc_id_list = []
+        doc_fn_list = []
+
+        for hybrid_score, entry, legs in heapq.nlargest(result_count, fused.values(), key=lambda x: x[0]):
+
+            entry.update({"hybrid_score": hybrid_score})
+
+            if len(legs) > 1:
+                entry.update({"match_status": "matched"})
+            else:
+                entry.update({"match_status": f"{legs[0]}_only"})
+
+            merged_results.append(entry)
+
+            if entry["doc_ID"] not in doc_id_list:
+                doc_id_list.append(entry["doc_ID"])
+            if entry["file_source"] not in doc_fn_list:
+                doc_fn_list.append(entry["file_source"])
+
+        retrieval_dict = {"query": query,
+                          "results": merged_results,
+                          "text_results": text_results,
+                          "semantic_results": semantic_results,
+                          "doc_ID": doc_id_list,
+                          "file_source": doc_fn_list}
+
+        if self.save_history:
+            self.register_query(retrieval_dict)
+
+        if results_only:
+            return merged_results
+
+        return retrieval_dict
+
+    def _leg_query(self):
+
+        """ Internal helper method for hybrid_query - returns a shallow copy of the query, with its own query
+        state and history off - the library, settings and loaded embedding model are shared. """
+
+        leg = copy.copy(self)
+        leg.results = []
+        leg.query_history = []
+        leg.save_history = False
+        leg.query_result_return_keys = list(self.query_result_return_keys)
+
+        return leg
+
+    @staticmethod
+    def _fuse_ranked_results(ranked_lists, fusion="rrf", rrf_k=60):
+
+        """ Internal helper method for hybrid_query - takes a list of (name, results, weight) tuples, each list
+        sorted best first, and returns a dict of _id -> [fused score, result, names of lists with the result]. """
+
+        fused = {}
+
+        for name, results, weight in ranked_lists:
+
+            if not results:
+                continue
+
+            if fusion == "rrf":
+                scores = [weight / (rrf_k + rank + 1) for rank in range(len(results))]
+
+            else:
+                # text score is 'higher is better' on some dbs, and 'lower is better' on others (e.g., sqlite
+                # bm25 rank), and distance is 'lower is better' - as each list is sorted best first, the direction
+                # is taken from the first and last results
+                score_key = "distance" if name == "semantic" else "score"
+                values = [float(r.get(score_key, 0.0)) for r in results]
+                low, high = min(values), max(values)
+
+                if high == low:
+                    scores = [weight] * len(values)
+                elif values[0] <= values[-1]:
+                    scores = [weight * (high - v) / (high - low) for v in values]
+                else:
+                    scores = [weight * (v - low) / (high - low) for v in values]
+
+            for result, score in zip(results, scores):
+
+                entry = fused.get(result["_id"])
+
+                if entry:
+                    entry[0] += score
+                    entry[2].append(name)
+                    if name == "semantic" and "distance" in result:
+                        entry[1].update({"distance": result["distance"]})
+                else:
+                    fused[result["_id"]] = [score, dict(result), [name]]
+
+        return fused
+
     def augment_qr (self, query_result, query_topic, augment_query="semantic"):
 
         """ Augments the set of query results using alternative retrieval strategy. """
@@ -1078,20 +1685,24 @@ class Query:
 
     def get_whole_library(self, selected_keys=None):
 
-        """ Gets the whole library - and will return as a list in-memory. """
+        """ Gets the whole library - and will return as a list in-memory - for large libraries, use
+        stream_whole_library to iterate over the blocks without holding the whole library in memory. """
 
-        match_results_cursor = CollectionRetrieval(self.library_name,
-                                                   account_name=self.account_name).get_whole_collection()
+        return list(self.stream_whole_library(selected_keys=selected_keys))
 
-        match_results = match_results_cursor.pull_all()
+    def stream_whole_library(self, selected_keys=None, fetch_size=1000):
 
-        qr = []
+        """ Generator over the whole library - the blocks are read off a server-side db cursor, fetch_size at a
+        time, and yielded one at a time, with the same keys as get_whole_library. """
 
         # option to retrieve only user selected keys
         if not selected_keys:
             selected_keys = self.library.default_keys
 
-        for i, block in enumerate(match_results):
+        blocks = CollectionRetrieval(self.library_name,
+                                     account_name=self.account_name).stream_collection(fetch_size=fetch_size)
+
+        for block in blocks:
 
             new_row = {}
             new_row.update({"_id": str(block["_id"])})
@@ -1106,9 +1717,7 @@ class Query:
                     if keys not in new_row:
                         new_row.update({keys:block[keys]})
 
-            qr.append(new_row)
-
-        return qr
+            yield new_row
 
     def export_all_tables(self, query="", output_fp=None):
 
@@ -1493,41 +2102,28 @@ class Query:
 
     def locate_query_match (self, query, core_text):
 
-        """ Utility function to locate the character-level match of a query inside a core_text. """
+        """ Utility function to locate the character-level match of a query inside a core_text - returns a list of
+        [char_offset, term] for each case-insensitive match of each query term, in order of offset. """
 
         matches_found = []
-        
+
         # edge case - but return empty match if query is null
-        if not query:
+        if not query or not core_text:
             return matches_found
-            
-        b = CorpTokenizer(one_letter_removal=False, remove_stop_words=False, remove_punctuation=False,
-                          remove_numbers=False)
 
-        query_tokens = b.tokenize(query)
+        candidates, term_patterns = _compile_query_match(query)
 
-        for x in range(0, len(core_text)):
-            match = 0
-            for key_term in query_tokens:
-                if len(key_term) == 0:
-                    continue
-                
-                if key_term.startswith('"'):
-                    key_term = key_term[1:-1]
+        if candidates is None:
+            return matches_found
 
-                if core_text[x].lower() == key_term[0].lower():
-                    match += 1
-                    if (x + len(key_term)) <= len(core_text):
-                        for y in range(1, len(key_term)):
-                            if key_term[y].lower() == core_text[x + y].lower():
-                                match += 1
-                            else:
-                                match = -1
-                                break
+        # candidates finds each offset where any term starts - each term is then confirmed at the offset
+        for candidate in candidates.finditer(core_text):
 
-                        if match == len(key_term):
-                            new_entry = [x, key_term]
-                            matches_found.append(new_entry)
+            x = candidate.start()
+
+            for key_term, pattern in term_patterns:
+                if pattern.match(core_text, x):
+                    matches_found.append([x, key_term])
 
         return matches_found
 
@@ -1682,47 +2278,145 @@ class Query:
 
     def expand_text_result_before(self, block, window_size=400):
 
-        """ Expands text result before. """
+        """ Expands text result before - returns the text of the preceding blocks in the document, in document
+        order, up to window_size characters. """
 
-        block_id = block["block_ID"] -1
-        doc_id = block["doc_ID"]
+        expanded = self.expand_text_results([block], window_size=window_size, after=False)[0]
 
-        before_text = ""
-        pre_blocks = []
+        output = {"expanded_text": expanded["before_text"], "results": expanded["before_results"]}
 
-        while len(before_text) < window_size and block_id >= 0:
+        return output
 
-            before_block = self.block_lookup(block_id, doc_id)
+    def expand_text_result_after(self, block, window_size=400):
 
-            if before_block:
-                before_text += before_block["text"]
-                pre_blocks.append(before_block)
+        """ Expands text result after - returns the text of the following blocks in the document, up to
+        window_size characters. """
 
-        output = {"expanded_text": before_text, "results": pre_blocks}
+        expanded = self.expand_text_results([block], window_size=window_size, before=False)[0]
+
+        output = {"expanded_text": expanded["after_text"], "results": expanded["after_results"]}
 
         return output
 
-    def expand_text_result_after(self, block, window_size=400):
+    def expand_text_results(self, results, window_size=400, before=True, after=True):
 
-        """ Expands text result after. """
+        """ Expands each result in a list of query results with the text of the neighboring blocks in the same
+        document, up to window_size characters before and/or after the result.
 
-        block_id = block["block_ID"] + 1
-        doc_id = block["doc_ID"]
+        The neighboring blocks of all of the results are fetched with a single query of block_ID ranges, with
+        the ranges of results in the same document merged - if a window is not filled, e.g., the blocks are
+        shorter than the library block size target, a further query is run for the unfilled windows only.
 
-        after_text = ""
-        post_blocks = []
+        Returns a list with a dict for each result, with keys "before_text", "after_text", "expanded_text"
+        (before_text + text of the result + after_text), "before_results" and "after_results" (the neighboring
+        blocks, in document order). """
 
-        while len(after_text) < window_size:
-            after_block = self.block_lookup(block_id, doc_id)
-            if not after_block:
-                break  # Break if no block is found
+        blocks = {}
+        doc_max_block = {}
 
-            after_text += after_block["text"]
-            post_blocks.append(after_block)
-            block_id += 1  # Increment block_id for next iteration
+        # state per result - [doc_id, block_id, low + high block_ID fetched, before done, after done]
+        windows = []
+        for result in results:
+            windows.append({"doc_ID": result["doc_ID"], "block_ID": result["block_ID"],
+                            "low": result["block_ID"], "high": result["block_ID"],
+                            "before_done": not before or result["block_ID"] <= 0, "after_done": not after})
 
-        output = {"expanded_text": after_text, "results": post_blocks}
-        return output
+        # initial estimate of the number of blocks in the window, doubled on each further query
+        span = 2 * (window_size // max(1, self.result_text_chunk_size or 1)) + 2
+
+        def collect(window, direction):
+
+            text = ""
+            neighbors = []
+
+            if direction == "before":
+                block_ids = range(window["block_ID"] - 1, window["low"] - 1, -1)
+            else:
+                block_ids = range(window["block_ID"] + 1, window["high"] + 1)
+
+            for block_id in block_ids:
+                if len(text) >= window_size:
+                    break
+
+                neighbor = blocks.get((window["doc_ID"], block_id))
+                if neighbor:
+                    text += neighbor["text"]
+                    neighbors.append(neighbor)
+
+            return text, neighbors
+
+        while True:
+
+            block_ranges = {}
+
+            for window in windows:
+
+                if not window["before_done"]:
+                    low = max(0, window["block_ID"] - span)
+                    block_ranges.setdefault(window["doc_ID"], []).append([low, window["low"] - 1])
+                    window["low"] = low
+
+                if not window["after_done"]:
+                    high = window["block_ID"] + span
+                    block_ranges.setdefault(window["doc_ID"], []).append([window["high"] + 1, high])
+                    window["high"] = high
+
+            if not block_ranges:
+                break
+
+            # merge overlapping + adjacent ranges in each document
+            merged_ranges = []
+            for doc_id in sorted(block_ranges):
+                doc_ranges = sorted(block_ranges[doc_id])
+                current = doc_ranges[0]
+                for low, high in doc_ranges[1:]:
+                    if low <= current[1] + 1:
+                        current[1] = max(current[1], high)
+                    else:
+                        merged_ranges.append((doc_id, current[0], current[1]))
+                        current = [low, high]
+                merged_ranges.append((doc_id, current[0], current[1]))
+
+            output = CollectionRetrieval(self.library_name,
+                                         account_name=self.account_name).lookup_block_ranges(merged_ranges)
+
+            for neighbor in output:
+                neighbor.update({"matches": []})
+                neighbor.update({"page_num": neighbor["master_index"]})
+                blocks[(neighbor["doc_ID"], neighbor["block_ID"])] = neighbor
+
+                if neighbor["block_ID"] > doc_max_block.get(neighbor["doc_ID"], -1):
+                    doc_max_block[neighbor["doc_ID"]] = neighbor["block_ID"]
+
+            for window in windows:
+
+                # done if the window is filled, or has reached the start or end of the document
+                if not window["before_done"]:
+                    if window["low"] <= 0 or len(collect(window, "before")[0]) >= window_size:
+                        window["before_done"] = True
+
+                if not window["after_done"]:
+                    if doc_max_block.get(window["doc_ID"], -1) < window["high"] or \
+                            len(collect(window, "after")[0]) >= window_size:
+                        window["after_done"] = True
+
+            span *= 2
+
+        expanded_results = []
+
+        for result, window in zip(results, windows):
+
+            before_results = list(reversed(collect(window, "before")[1])) if before else []
+            after_results = collect(window, "after")[1] if after else []
+
+            before_text = "".join(neighbor["text"] for neighbor in before_results)
+            after_text = "".join(neighbor["text"] for neighbor in after_results)
+
+            expanded_results.append({"before_text": before_text, "after_text": after_text,
+                                     "expanded_text": before_text + result["text"] + after_text,
+                                     "before_results": before_results, "after_results": after_results})
+
+        return expanded_results
 
     def generate_csv_report(self):
 
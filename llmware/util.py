@@ -15,7 +15,8 @@
 
 
 """The util module implements general helper functions that are used across LLMWare, primarily within the Utilities
-class, along with a whole word (white space) tokenizer (CorpTokenizer) class, TextChunker and AgentWriter classes. """
+class, along with a whole word (white space) tokenizer (CorpTokenizer) class, an in-memory BM25 search index
+(BM25Index) class, TextChunker and AgentWriter classes. """
 
 
 import csv
@@ -23,6 +24,8 @@ from collections import Counter
 import sys
 import os
 import random
+import math
+import heapq
 
 import platform
 from pathlib import Path
@@ -34,7 +37,8 @@ import logging
 
 from llmware.resources import CloudBucketManager
 from llmware.configs import LLMWareConfig
-from llmware.exceptions import ModelNotFoundException, DependencyNotInstalledException, ModuleNotFoundException
+from llmware.exceptions import ModelNotFoundException, DependencyNotInstalledException, ModuleNotFoundException, \
+    LLMWareException
 
 logger = logging.getLogger(__name__)
 
@@ -1008,6 +1012,245 @@ class CorpTokenizer:
         return text2
 
 
+class BM25Index:
+
+    """ In-memory inverted index over a list of dicts, e.g., parser output or in-memory sources - built once, with
+    the positions of each token in each field, and queried with BM25 ranking, with a weight per field.
+
+    -- field_weights: dict of field -> weight - the score of a dict is the weighted sum of the BM25 score of
+        each field, with the term frequency and length statistics of each field kept separately
+    -- k1, b: BM25 parameters
+    -- remove_stop_words: tokenizer setting, applied to both the indexed fields and the query
+
+    Query terms in double quotes are phrase queries, matched on consecutive token positions, and required in
+    any of the fields - other terms are optional and add to the score.   Dicts can be added incrementally, and
+    the index can be exported with to_dict and re-loaded with from_dict, without re-tokenizing the dicts. """
+
+    def __init__(self, field_weights=None, k1=1.2, b=0.75, remove_stop_words=True):
+
+        if not field_weights:
+            field_weights = {"text": 1.0, "header_text": 1.5, "file_source": 0.5}
+
+        self.field_weights = dict(field_weights)
+        self.k1 = k1
+        self.b = b
+        self.remove_stop_words = remove_stop_words
+
+        # same tokenizer settings as Utilities().fast_search_dicts
+        self.tokenizer = CorpTokenizer(remove_stop_words=remove_stop_words, remove_numbers=False,
+                                       one_letter_removal=True, remove_punctuation=True)
+
+        self.docs = []
+
+        # field -> token -> {doc index: [positions]}
+        self.postings = {field: {} for field in self.field_weights}
+
+        # field -> list of token count of the field in each doc
+        self.field_lengths = {field: [] for field in self.field_weights}
+        self.total_lengths = {field: 0 for field in self.field_weights}
+
+    def add(self, dicts):
+
+        """ Adds a list of dicts to the index - returns the index """
+
+        for entry in dicts:
+
+            doc = len(self.docs)
+            self.docs.append(entry)
+
+            for field in self.field_weights:
+
+                value = entry.get(field, "")
+                tokens = self.tokenizer.tokenize(value if isinstance(value, str) else str(value))
+
+                postings = self.postings[field]
+                for position, token in enumerate(tokens):
+                    postings.setdefault(token, {}).setdefault(doc, []).append(position)
+
+                self.field_lengths[field].append(len(tokens))
+                self.total_lengths[field] += len(tokens)
+
+        return self
+
+    def _parse_query(self, query, exact_match=False):
+
+        """ Returns the list of phrases (token lists) and list of optional terms in the query """
+
+        if exact_match:
+            tokens = self.tokenizer.tokenize(query)
+            return ([tokens] if tokens else []), []
+
+        phrases = []
+        for phrase in re.findall(r'"([^"]*)"', query):
+            tokens = self.tokenizer.tokenize(phrase)
+            if tokens:
+                phrases.append(tokens)
+
+        terms = self.tokenizer.tokenize(re.sub(r'"[^"]*"', " ", query))
+
+        return phrases, list(dict.fromkeys(terms))
+
+    def _phrase_counts(self, field, tokens):
+
+        """ Returns dict of doc index -> count of occurrences of the phrase in the field """
+
+        postings = self.postings[field]
+
+        if any(token not in postings for token in tokens):
+            return {}
+
+        # start from the least frequent token of the phrase
+        anchor = min(range(len(tokens)), key=lambda i: len(postings[tokens[i]]))
+
+        counts = {}
+        for doc, anchor_positions in postings[tokens[anchor]].items():
+
+            position_sets = []
+            for i, token in enumerate(tokens):
+                positions = postings[token].get(doc)
+                if positions is None:
+                    break
+                position_sets.append(set(positions) if i != anchor else None)
+            else:
+                count = 0
+                for p in anchor_positions:
+                    start = p - anchor
+                    if all(i == anchor or (start + i) in position_sets[i] for i in range(len(tokens))):
+                        count += 1
+
+                if count:
+                    counts[doc] = count
+
+        return counts
+
+    def _bm25(self, field, counts, scores):
+
+        """ Adds the weighted BM25 score of a term (or phrase) with counts of doc index -> frequency to scores """
+
+        doc_count = len(self.docs)
+
+        if not counts or not doc_count:
+            return scores
+
+        weight = self.field_weights[field]
+        lengths = self.field_lengths[field]
+        avg_length = self.total_lengths[field] / doc_count or 1.0
+
+        idf = math.log(1.0 + (doc_count - len(counts) + 0.5) / (len(counts) + 0.5))
+
+        for doc, tf in counts.items():
+            norm = tf + self.k1 * (1.0 - self.b + self.b * lengths[doc] / avg_length)
+            scores[doc] = scores.get(doc, 0.0) + weight * idf * tf * (self.k1 + 1.0) / norm
+
+        return scores
+
+    def search(self, query, result_count=20, exact_match=False, ranked=True, fields=None):
+
+        """ Runs a query against the index - returns a list of copies of the matching dicts, with "score",
+        "page_num" and "query" keys added.
+
+        -- result_count: max number of results - if None, then all matches are returned
+        -- exact_match: if True, then the whole query is matched as a phrase, as in fast_search_dicts
+        -- ranked: if True, then sorted by score, otherwise in the order that the dicts were added
+        -- fields: optional subset of the indexed fields to search """
+
+        if not fields:
+            fields = list(self.field_weights.keys())
+
+        phrases, terms = self._parse_query(query, exact_match=exact_match)
+
+        scores = {}
+        required = None
+
+        if not phrases and not terms:
+            # edge case - as with fast_search_dicts, empty query returns all dicts
+            required = set(range(len(self.docs)))
+
+        for tokens in phrases:
+
+            matched = set()
+            for field in fields:
+                counts = self._phrase_counts(field, tokens)
+                matched.update(counts)
+                self._bm25(field, counts, scores)
+
+            required = matched if required is None else required & matched
+
+        for term in terms:
+            for field in fields:
+                self._bm25(field, {doc: len(positions) for doc, positions in
+                                   self.postings[field].get(term, {}).items()}, scores)
+
+        candidates = required if required is not None else set(scores.keys())
+
+        if ranked:
+            if result_count is None:
+                selected = sorted(candidates, key=lambda doc: (-scores.get(doc, 0.0), doc))
+            else:
+                selected = heapq.nsmallest(result_count, candidates, key=lambda doc: (-scores.get(doc, 0.0), doc))
+        else:
+            selected = sorted(candidates)[:result_count]
+
+        results = []
+        for doc in selected:
+
+            entry = dict(self.docs[doc])
+            entry.update({"score": scores.get(doc, 0.0)})
+
+            if "page_num" not in entry:
+                entry.update({"page_num": entry.get("master_index", 0)})
+
+            if "query" not in entry:
+                entry.update({"query": query})
+
+            results.append(entry)
+
+        return results
+
+    def to_dict(self, include_docs=False):
+
+        """ Exports the index as a json-serializable dict - the dicts themselves are included only if
+        include_docs=True, e.g., for parser output, which is already saved in the parser_history jsonl """
+
+        index_dict = {"field_weights": self.field_weights, "k1": self.k1, "b": self.b,
+                      "remove_stop_words": self.remove_stop_words, "doc_count": len(self.docs),
+                      "field_lengths": self.field_lengths,
+                      "postings": {field: {token: [[doc, positions] for doc, positions in docs.items()]
+                                           for token, docs in postings.items()}
+                                   for field, postings in self.postings.items()}}
+
+        if include_docs:
+            index_dict.update({"docs": self.docs})
+
+        return index_dict
+
+    @classmethod
+    def from_dict(cls, index_dict, docs=None):
+
+        """ Loads an index exported with to_dict - docs is the list of dicts that were indexed, if not included
+        in index_dict - any dicts in docs beyond those indexed are added to the index """
+
+        index = cls(field_weights=index_dict["field_weights"], k1=index_dict["k1"], b=index_dict["b"],
+                    remove_stop_words=index_dict["remove_stop_words"])
+
+        if docs is None:
+            docs = index_dict.get("docs", [])
+
+        doc_count = index_dict["doc_count"]
+
+        if len(docs) < doc_count:
+            raise LLMWareException(message=f"BM25Index - {len(docs)} docs passed for index of {doc_count} docs")
+
+        index.docs = list(docs[:doc_count])
+        index.field_lengths = {field: list(lengths) for field, lengths in index_dict["field_lengths"].items()}
+        index.total_lengths = {field: sum(lengths) for field, lengths in index.field_lengths.items()}
+        index.postings = {field: {token: {doc: positions for doc, positions in entries}
+                                  for token, entries in postings.items()}
+                          for field, postings in index_dict["postings"].items()}
+
+        return index.add(docs[doc_count:])
+
+
 class TextChunker:
 
     """ Text Chunker - input is a big chunk of text and output is a chunked set of smaller text chunks. """
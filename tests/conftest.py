@@ -0,0 +1,12 @@
+
+""" Puts the tests folder on sys.path, so that tests in the sub-folders can import the shared helpers in
+    tests/utils.py, as tests run from run-tests.py do """
+
+
+import os
+import sys
+
+tests_folder = os.path.dirname(os.path.abspath(__file__))
+
+if tests_folder not in sys.path:
+    sys.path.insert(0, tests_folder)
@@ -0,0 +1,63 @@
+
+""" Tests the persistent embedding cache - repeated texts are returned from the cache in the original order,
+    without running the model again, and entries are evicted over the size cap.
+
+    Uses a stand-in model with deterministic vectors, so no model download is required.
+ """
+
+
+import numpy as np
+
+from llmware.configs import EmbeddingConfig
+from llmware.embeddings import EmbeddingHandler
+
+
+class CountingEmbeddingModel:
+
+    """ Stand-in embedding model that counts the number of texts embedded """
+
+    model_name = "test-embedding-cache-model"
+    embedding_dims = 8
+
+    def __init__(self):
+        self.texts_embedded = 0
+
+    def embedding(self, sentences):
+        self.texts_embedded += len(sentences)
+        return np.array([np.full(self.embedding_dims, len(s), dtype=np.float32) for s in sentences])
+
+
+def test_embedding_cache():
+
+    model = CountingEmbeddingModel()
+    EmbeddingHandler.clear_embedding_cache(model_name=model.model_name)
+
+    texts = [f"text number {i}" + " x" * i for i in range(50)]
+
+    first = EmbeddingHandler.cached_embedding(model, texts)
+    assert model.texts_embedded == 50
+
+    #   same texts, with different whitespace and in reverse order - no new model calls
+    second = EmbeddingHandler.cached_embedding(model, ["  " + t.replace(" ", "  ") for t in reversed(texts)])
+    assert model.texts_embedded == 50
+    assert np.array_equal(second, first[::-1])
+
+    #   repeats within a call are embedded once
+    EmbeddingHandler.cached_embedding(model, ["new text", "new text", texts[0]])
+    assert model.texts_embedded == 51
+
+    stats = EmbeddingHandler.get_embedding_cache_stats()
+    print("\nembedding cache stats: ", stats)
+    assert stats["hits"] >= 52
+
+    #   size cap
+    max_entries = EmbeddingConfig.get_config("embedding_cache_max_entries")
+    EmbeddingConfig.set_config("embedding_cache_max_entries", 20)
+
+    try:
+        EmbeddingHandler.cached_embedding(model, ["one more text"])
+        assert EmbeddingHandler.get_embedding_cache_stats()["entries"] <= 20
+    finally:
+        EmbeddingConfig.set_config("embedding_cache_max_entries", max_entries)
+
+    EmbeddingHandler.clear_embedding_cache(model_name=model.model_name)
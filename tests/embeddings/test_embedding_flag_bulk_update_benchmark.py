@@ -0,0 +1,122 @@
+""" Benchmark of the embedding flag update step that runs after each batch of vectors is written to a vector db.
+
+    Compares the legacy path (one CollectionWriter + one update per block) with the bulk path used by
+    _EmbeddingUtils.update_text_index (one bulk write per batch) - on each text collection db: SQLite, and Mongo
+    and Postgres, which are skipped if not available.
+
+    Does not require an embedding model or vector db - synthetic blocks are written directly into a new library.
+    By default, the bulk path is timed on 100K blocks, while the legacy path is timed on a smaller sample and
+    extrapolated, as it is ~2 orders of magnitude slower.
+ """
+
+
+import time
+
+import pytest
+
+from llmware.configs import LLMWareConfig
+from llmware.embeddings import _EmbeddingUtils
+from llmware.library import Library
+from llmware.resources import CollectionRetrieval, CollectionWriter
+
+from utils import synthetic_block, write_synthetic_blocks
+
+
+def collection_db_available(db):
+
+    """ Sets db as the active collection db, and pings it - returns False if not available """
+
+    LLMWareConfig().set_active_db(db)
+
+    #   runs in the file system
+    if db == "sqlite":
+        return True
+
+    try:
+        return bool(CollectionRetrieval("library").test_connection())
+    except Exception:
+        return False
+
+
+def create_synthetic_blocks(library, block_count):
+
+    """ Writes block_count synthetic blocks into the library text collection. """
+
+    return write_synthetic_blocks(library, [synthetic_block(i, 1, f"synthetic block {i} for embedding flag benchmark",
+                                                            file_source="bench.txt") for i in range(block_count)])
+
+
+def block_ids_to_embed(utils, fetch_size=10000):
+
+    """ Returns the _ids of the blocks to be embedded, in cursor order - as read by the embedding job """
+
+    cursor, num_of_blocks = utils.get_blocks_cursor()
+
+    ids = []
+    while len(ids) < num_of_blocks:
+        blocks = cursor.pull_many(fetch_size)
+        if not blocks:
+            break
+        ids += [block["_id"] for block in blocks]
+
+    return ids
+
+
+@pytest.mark.parametrize("db", ["sqlite", "mongo", "postgres"])
+def test_embedding_flag_bulk_update_benchmark(db, block_count=100000, legacy_sample=2000, batch_size=500):
+
+    active_db = LLMWareConfig().get_active_db()
+
+    if not collection_db_available(db):
+        LLMWareConfig().set_active_db(active_db)
+        pytest.skip(f"{db} is not available")
+
+    try:
+        library = Library().create_new_library(f"bench_emb_flags_{db}_1001")
+        library_name = library.library_name
+
+        create_synthetic_blocks(library, block_count)
+
+        utils = _EmbeddingUtils(library_name=library_name, model_name="bench-model",
+                                account_name=library.account_name, db_name="faiss", embedding_dims=384)
+        key = utils.create_db_specific_key()
+
+        block_ids = block_ids_to_embed(utils)
+        assert len(block_ids) == block_count
+
+        #   legacy path - one writer per block
+        t0 = time.time()
+        for i, _id in enumerate(block_ids[:legacy_sample]):
+            CollectionWriter(library_name, account_name=library.account_name).add_new_embedding_flag(_id, key, i)
+        legacy_time = time.time() - t0
+        legacy_rate = legacy_sample / legacy_time
+
+        #   bulk path - one write per batch
+        t1 = time.time()
+        current_index = 0
+        for j in range(0, len(block_ids), batch_size):
+            current_index = utils.update_text_index(block_ids[j:j+batch_size], current_index)
+        bulk_time = time.time() - t1
+        bulk_rate = len(block_ids) / bulk_time
+
+        print(f"\n{db}")
+        print(f"legacy per-block update: {legacy_sample} blocks in {round(legacy_time, 3)}s - "
+              f"{round(legacy_rate)} blocks/sec - est. {round(block_count / legacy_rate, 1)}s for {block_count}")
+        print(f"bulk batch update:       {len(block_ids)} blocks in {round(bulk_time, 3)}s - "
+              f"{round(bulk_rate)} blocks/sec - speedup: {round(bulk_rate / legacy_rate, 1)}x")
+
+        assert current_index == block_count
+        assert bulk_rate > legacy_rate
+
+        #   confirm flags are in place, with the index of each block
+        assert utils.generate_embedding_summary(current_index)["embedded_blocks"] == block_count
+
+        for i in [0, legacy_sample, block_count // 2, block_count - 1]:
+            blocks = CollectionRetrieval(library_name,
+                                         account_name=library.account_name).embedding_key_lookup(key, i)
+            assert [str(block["_id"]) for block in blocks] == [str(block_ids[i])]
+
+        library.delete_library(confirm_delete=True)
+
+    finally:
+        LLMWareConfig().set_active_db(active_db)
@@ -0,0 +1,92 @@
+
+""" Benchmark of length-bucketed batching in the HF embedding model, on the text chunks of a realistic library -
+    the sample agreements, parsed with tables, and exported from the library text collection.
+
+    Embeds the exported chunks in batches of 50 (the install_new_embedding batch size for HF models) with
+    token_budget=None (the default), in which every sequence in the batch is padded to the longest in the batch, and
+    then with a token budget of 16384, in which each batch is sorted by token length and run in buckets within the
+    budget - and checks that both produce the same vectors, in the same order.
+
+    Requires torch and transformers, and pulls down the sample files and the model on first use.
+ """
+
+
+import os
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.library import Library
+from llmware.models import ModelCatalog
+from llmware.retrieval import Query
+from llmware.setup import Setup
+
+
+def export_library_text(library_name):
+
+    """ Parses the sample agreements into a new library, and exports the text chunks """
+
+    library = Library().create_new_library(library_name)
+
+    sample_files_path = Setup().load_sample_files(over_write=False)
+    library.add_files(input_folder_path=os.path.join(sample_files_path, "Agreements"), chunk_size=400,
+                      max_chunk_size=600, smart_chunking=1, get_tables=True)
+
+    blocks = Query(library).get_whole_library(selected_keys=["text_search"])
+    library.delete_library(confirm_delete=True)
+
+    return [b["text_search"] for b in blocks if b["text_search"].strip()]
+
+
+def embed_all(model, sentences, batch_size):
+
+    t0 = time.time()
+    vectors = [model.embedding(sentences[i:i+batch_size]) for i in range(0, len(sentences), batch_size)]
+
+    return np.concatenate(vectors), time.time() - t0
+
+
+def padded_tokens(model, sentences, batch_size):
+
+    """ Total padded tokens (sequences x longest sequence) in each forward pass, with and without bucketing """
+
+    from llmware.models import _token_budget_buckets
+
+    unbucketed, bucketed = 0, 0
+
+    for i in range(0, len(sentences), batch_size):
+
+        lengths = [len(x) for x in model.tokenizer(sentences[i:i+batch_size], truncation=True,
+                                                   max_length=model.max_len)["input_ids"]]
+        unbucketed += len(lengths) * max(lengths)
+
+        for bucket in _token_budget_buckets(lengths, model.token_budget):
+            bucketed += len(bucket) * max(lengths[j] for j in bucket)
+
+    return unbucketed, bucketed
+
+
+def test_embedding_length_bucketing_benchmark(model_name="mini-lm-sbert", batch_size=50, token_budget=16384):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    sentences = export_library_text("bench_emb_bucketing_1008")
+
+    model = ModelCatalog().load_model(model_name, use_gpu=False)
+
+    model.token_budget = None
+    baseline, base_time = embed_all(model, sentences, batch_size)
+
+    model.token_budget = token_budget
+    vectors, bucketed_time = embed_all(model, sentences, batch_size)
+
+    unbucketed_tokens, bucketed_tokens = padded_tokens(model, sentences, batch_size)
+
+    print(f"\nchunks: {len(sentences)} - batch size: {batch_size} - token budget: {model.token_budget}")
+    print(f"padded to batch max:  {round(base_time, 2)}s - {unbucketed_tokens} padded tokens")
+    print(f"length bucketed:      {round(bucketed_time, 2)}s - {bucketed_tokens} padded tokens - "
+          f"speedup: {round(base_time / bucketed_time, 2)}x")
+
+    assert vectors.shape == baseline.shape
+    assert np.allclose(vectors, baseline, atol=1e-4)
@@ -0,0 +1,109 @@
+
+""" Benchmark of the pipelined embedding mode in EmbeddingHandler.create_new_embedding, which overlaps reading
+    blocks from the text collection, running the embedding model, and writing vectors + embedding flags.
+
+    Embeds the same synthetic SQLite library into FAISS sequentially, and then in pipeline mode with 1 and 4 model
+    workers, and checks that all runs write the same embedding flags.   Uses a stand-in model that projects
+    hashed token features through a dense matrix (numpy, which releases the GIL like a torch forward pass), so no
+    model download is required.
+
+    Requires faiss:  `pip3 install faiss-cpu`
+ """
+
+
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig, SQLiteConfig
+from llmware.embeddings import EmbeddingHandler
+from llmware.library import Library
+
+from utils import synthetic_block, write_synthetic_blocks
+
+
+class SyntheticEmbeddingModel:
+
+    """ Stand-in embedding model - deterministic vectors with a compute cost proportional to batch size """
+
+    model_name = "synthetic-embedding-model"
+    embedding_dims = 384
+
+    def __init__(self, hidden_dims=1024, layers=4):
+        rng = np.random.default_rng(0)
+        self.layers = [rng.normal(size=(hidden_dims, hidden_dims)).astype(np.float32) / np.sqrt(hidden_dims)
+                       for _ in range(layers)]
+        self.output = rng.normal(size=(hidden_dims, self.embedding_dims)).astype(np.float32)
+        self.hidden_dims = hidden_dims
+
+    def embedding(self, sentences):
+
+        x = np.zeros((len(sentences), self.hidden_dims), dtype=np.float32)
+        for i, s in enumerate(sentences):
+            for token in s.split():
+                x[i, zlib.crc32(token.encode()) % self.hidden_dims] += 1.0
+
+        for w in self.layers:
+            x = np.tanh(x @ w)
+
+        return x @ self.output
+
+
+def create_library(library_name, block_count):
+
+    library = Library().create_new_library(library_name)
+
+    blocks = [synthetic_block(i, 1, f"block {i} of the synthetic library used to benchmark pipelined embedding jobs",
+                              file_source="bench.txt") for i in range(block_count)]
+
+    write_synthetic_blocks(library, blocks)
+
+    return library
+
+
+def embedding_flags(library_name):
+
+    conn = sqlite3.connect(SQLiteConfig.get_uri_string())
+    rows = conn.execute(f"SELECT rowid, embedding_flags FROM {library_name} WHERE embedding_flags != '' "
+                        f"ORDER BY rowid").fetchall()
+    conn.close()
+
+    return rows
+
+
+def test_embedding_pipeline_benchmark(block_count=20000, batch_size=250):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    model = SyntheticEmbeddingModel()
+
+    results = []
+
+    for pipeline, model_workers in [(False, 1), (True, 1), (True, 4)]:
+
+        library = create_library("bench_emb_pipeline_1006", block_count)
+
+        t0 = time.time()
+        summary = EmbeddingHandler(library).create_new_embedding("faiss", model, batch_size=batch_size,
+                                                                 pipeline=pipeline, model_workers=model_workers)
+        elapsed = time.time() - t0
+
+        flags = embedding_flags(library.library_name)
+        library.delete_library(confirm_delete=True)
+
+        results.append((pipeline, model_workers, elapsed, flags))
+
+        assert summary["embeddings_created"] == block_count
+
+    base_time = results[0][2]
+
+    print(f"\npipeline   model_workers   time(s)   blocks/sec   speedup")
+    for pipeline, model_workers, elapsed, flags in results:
+        print(f"{str(pipeline):<10} {model_workers:<15} {round(elapsed, 2):<9} {round(block_count / elapsed):<12} "
+              f"{round(base_time / elapsed, 2)}x")
+
+    # same blocks embedded, in the same order, in every mode
+    assert len(results[0][3]) == block_count
+    assert results[0][3] == results[1][3] == results[2][3]
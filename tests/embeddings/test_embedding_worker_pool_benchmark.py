@@ -0,0 +1,65 @@
+
+""" Benchmark of data-parallel cpu embedding with EmbeddingWorkerPool - sentences/sec for an HF embedding model
+    run in the current process, and then sharded across an increasing number of worker processes, each pinned
+    to its own set of cores.
+
+    Best run on a multi-core cpu machine, with the same model used for install_new_embedding.   Requires torch
+    and transformers, and will pull down the model from the model catalog on first use.
+ """
+
+
+import os
+import time
+
+import numpy as np
+
+from llmware.models import ModelCatalog, EmbeddingWorkerPool
+
+
+def create_sentences(count):
+
+    """ Synthetic text chunks of mixed lengths, in the range of typical parsed text blocks """
+
+    rng = np.random.default_rng(0)
+    words = ["revenue", "agreement", "quarter", "employee", "termination", "liability", "shall", "company",
+             "the", "of", "and", "to", "in", "pursuant", "section", "effective", "date", "party", "fiscal", "year"]
+
+    return [" ".join(rng.choice(words, size=rng.integers(20, 200))) for _ in range(count)]
+
+
+def test_embedding_worker_pool_benchmark(model_name="mini-lm-sbert", sentence_count=4000, batch_size=500):
+
+    model = ModelCatalog().load_model(model_name, use_gpu=False)
+    sentences = create_sentences(sentence_count)
+
+    def run(embedding_model):
+        t0 = time.time()
+        vectors = [embedding_model.embedding(sentences[i:i+batch_size])
+                   for i in range(0, sentence_count, batch_size)]
+        return np.concatenate(vectors), time.time() - t0
+
+    baseline, base_time = run(model)
+
+    print(f"\nworkers   time(s)   sentences/sec   speedup")
+    print(f"{'-':<9} {round(base_time, 2):<9} {round(sentence_count / base_time):<15} 1.0x")
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+    workers = 2
+    while workers <= cores:
+
+        with EmbeddingWorkerPool(model, workers=workers) as pool:
+
+            # start workers + load model copies before timing
+            pool.embedding(sentences[:workers])
+
+            vectors, elapsed = run(pool)
+
+        print(f"{workers:<9} {round(elapsed, 2):<9} {round(sentence_count / elapsed):<15} "
+              f"{round(base_time / elapsed, 2)}x")
+
+        # same vectors, in the same order
+        assert vectors.shape == baseline.shape
+        assert np.allclose(vectors, baseline, atol=1e-4)
+
+        workers *= 2
@@ -0,0 +1,84 @@
+
+""" Recall@k and latency benchmark of the approximate FAISS index types (hnsw, ivf_flat, ivf_pq) against the exact
+    flat index, on a synthetic clustered corpus.   Uses the same index builder as EmbeddingFAISS, with the
+    default FAISSConfig parameters, so results reflect what a new library embedding would get.
+
+    Note: ivf_pq stores product-quantized (compressed) vectors, so its recall is expected to be well below the
+    other index types without re-ranking - it is the option for memory-constrained, very large libraries.
+
+    Requires faiss:  `pip3 install faiss-cpu`
+ """
+
+
+import time
+import numpy as np
+
+from llmware.configs import FAISSConfig
+from llmware.embeddings import EmbeddingFAISS
+
+
+def synthetic_corpus(n, dims, n_clusters=200, seed=42):
+
+    """ Clustered gaussian vectors - closer to real embedding distributions than uniform noise. """
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dims)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(n, dims)).astype(np.float32)
+
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def search_timed(index, queries, k):
+
+    t0 = time.time()
+    _, ids = index.search(queries, k)
+    elapsed_ms = (time.time() - t0) * 1000 / len(queries)
+
+    return ids, elapsed_ms
+
+
+def test_faiss_index_types_benchmark(n=100000, dims=384, n_queries=200, k=10):
+
+    corpus = synthetic_corpus(n, dims)
+
+    # queries drawn near corpus points, as for a query that matches indexed content
+    rng = np.random.default_rng(7)
+    queries = corpus[rng.integers(0, n, size=n_queries)] + 0.1 * rng.normal(size=(n_queries, dims))
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    base_config = FAISSConfig.get_index_config()
+    train_sample = corpus[:FAISSConfig.get_config("train_sample_size")]
+
+    flat, _ = EmbeddingFAISS.build_faiss_index(dims, dict(base_config, index_type="flat"))
+    flat.add(corpus)
+    truth, flat_ms = search_timed(flat, queries, k)
+
+    print(f"\nindex_type   build(s)   query(ms)   recall@{k}")
+    print(f"flat         -          {round(flat_ms, 3):<11} 1.0")
+
+    for index_type in ["hnsw", "ivf_flat", "ivf_pq"]:
+
+        t0 = time.time()
+        index, config = EmbeddingFAISS.build_faiss_index(dims, dict(base_config, index_type=index_type),
+                                                         training_vectors=train_sample)
+        index.add(corpus)
+        build_time = time.time() - t0
+
+        # search-time parameters, as applied by EmbeddingFAISS on load
+        if hasattr(index, "nprobe"):
+            index.nprobe = config["nprobe"]
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = config["efSearch"]
+
+        ids, query_ms = search_timed(index, queries, k)
+
+        recall = np.mean([len(set(ids[i]) & set(truth[i])) / k for i in range(n_queries)])
+
+        print(f"{index_type:<12} {round(build_time, 2):<10} {round(query_ms, 3):<11} {round(recall, 3)}")
+
+        assert index.ntotal == n
+
+        # ivf_pq trades recall for memory (lossy compressed vectors) - only graph / ivf_flat held to high recall
+        if index_type in ["hnsw", "ivf_flat"]:
+            assert recall > 0.9
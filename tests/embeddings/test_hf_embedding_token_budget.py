@@ -0,0 +1,41 @@
+
+""" Tests that HFEmbeddingModel.embedding returns the same vectors, in the same order, with the token budget off
+    (the default EmbeddingConfig 'embedding_token_budget') and with a token budget that splits the texts into
+    several length buckets.   Requires torch and transformers, and pulls down the model on first use.
+ """
+
+
+import numpy as np
+
+from llmware.configs import EmbeddingConfig
+from llmware.models import ModelCatalog, HFEmbeddingModel
+
+
+def test_hf_embedding_token_budget(model_name="mini-lm-sbert"):
+
+    texts = ["Short text.",
+             "A somewhat longer text sample, with a few more tokens than the first one in the list.",
+             "Mid-sized text for the embedding test.",
+             " ".join(["A very long text sample that is repeated to fill up the context window."] * 20),
+             "Another short one."]
+
+    model = ModelCatalog().load_model(model_name, use_gpu=False)
+
+    assert isinstance(model, HFEmbeddingModel)
+    assert model.token_budget == EmbeddingConfig.get_config("embedding_token_budget")
+    assert model.token_budget is None
+
+    #   token budget off - single text and a list of texts, each padded to the longest in the list
+    single = model.embedding(texts[0])
+    baseline = model.embedding(texts)
+
+    assert single.shape == (1, model.embedding_dims)
+    assert baseline.shape == (len(texts), model.embedding_dims)
+
+    #   token budget small enough that the texts run in several buckets
+    model.token_budget = 256
+    bucketed = model.embedding(texts)
+
+    assert bucketed.shape == baseline.shape
+    assert np.allclose(bucketed, baseline, atol=1e-4)
+    assert np.allclose(model.embedding(texts[0]), single, atol=1e-4)
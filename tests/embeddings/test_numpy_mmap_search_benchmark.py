@@ -0,0 +1,104 @@
+
+""" Benchmark of exact search in the built-in numpy_mmap vector store against the FAISS flat index, at 100K and
+    1M vectors.   Uses the same top-k search as EmbeddingNumpyMMap, over vectors memory-mapped from a file, and
+    times single queries and a batch of queries in one pass - also reports recall@k for float16 + int8 storage.
+
+    The vectors are random normalized vectors written directly to the files, so no embedding model is required.
+
+    Requires faiss (for comparison only):  `pip3 install faiss-cpu`
+ """
+
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from llmware.configs import NumpyMMapConfig
+from llmware.embeddings import EmbeddingNumpyMMap
+
+
+def write_vectors(fp, count, dims, dtype, seed=42, chunk_size=100000):
+
+    """ Writes count normalized random vectors to fp in chunks - returns read-only memory-map """
+
+    rng = np.random.default_rng(seed)
+
+    with open(fp, "wb") as f:
+        for start in range(0, count, chunk_size):
+            v = EmbeddingNumpyMMap._normalize(rng.normal(size=(min(chunk_size, count - start), dims)))
+            f.write(EmbeddingNumpyMMap._encode(v, dtype).tobytes())
+
+    return np.memmap(fp, dtype=np.dtype(dtype), mode="r", shape=(count, dims))
+
+
+def run_benchmark(count, dims=384, n_queries=20, k=10):
+
+    import faiss
+
+    tmp_path = tempfile.mkdtemp()
+    block_size = NumpyMMapConfig.get_config("search_block_size")
+
+    try:
+        vectors = write_vectors(os.path.join(tmp_path, "float32.vec"), count, dims, "float32")
+
+        rng = np.random.default_rng(7)
+        queries = EmbeddingNumpyMMap._normalize(vectors[rng.integers(0, count, size=n_queries)] +
+                                                0.05 * rng.normal(size=(n_queries, dims)))
+
+        index = faiss.IndexFlatL2(dims)
+        for start in range(0, count, 100000):
+            index.add(np.ascontiguousarray(vectors[start:start+100000]))
+
+        t0 = time.time()
+        for q in queries:
+            index.search(q.reshape(1, -1), k)
+        faiss_ms = (time.time() - t0) * 1000 / n_queries
+
+        t0 = time.time()
+        _, truth = index.search(queries, k)
+        faiss_batch_ms = (time.time() - t0) * 1000 / n_queries
+
+        del index
+
+        print(f"\nvectors: {count} x {dims} - k={k}")
+        print(f"store          query(ms)   batch query(ms)   recall@{k}")
+        print(f"faiss flat     {round(faiss_ms, 2):<11} {round(faiss_batch_ms, 2):<17} 1.0")
+
+        for dtype in ["float32", "float16", "int8"]:
+
+            if dtype != "float32":
+                vectors = write_vectors(os.path.join(tmp_path, f"{dtype}.vec"), count, dims, dtype)
+
+            t0 = time.time()
+            for q in queries:
+                EmbeddingNumpyMMap.top_k_search(vectors, q.reshape(1, -1), k, block_size=block_size)
+            single_ms = (time.time() - t0) * 1000 / n_queries
+
+            t0 = time.time()
+            _, ids = EmbeddingNumpyMMap.top_k_search(vectors, queries, k, block_size=block_size)
+            batch_ms = (time.time() - t0) * 1000 / n_queries
+
+            recall = np.mean([len(set(ids[i]) & set(truth[i])) / k for i in range(n_queries)])
+
+            print(f"numpy {dtype:<8} {round(single_ms, 2):<11} {round(batch_ms, 2):<17} {round(recall, 3)}")
+
+            if dtype == "float32":
+                assert recall > 0.99
+            else:
+                assert recall >= 0.85
+
+            del vectors
+
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def test_numpy_mmap_search_benchmark_100k():
+    run_benchmark(100000)
+
+
+def test_numpy_mmap_search_benchmark_1m():
+    run_benchmark(1000000)
@@ -0,0 +1,160 @@
+
+""" Tests that the vectors of the blocks of a modified file, replaced by Library.add_files, are deleted from the
+    installed embeddings - a flat FAISS index (vectors removed), an hnsw FAISS index (positions marked as deleted)
+    and numpy_mmap (files rewritten) - so that vector search returns full result counts from the current blocks
+    only, and the embedded block counts in the library card match the text collection.
+
+    Builds a small SQLite library with a stand-in model that hashes tokens into a dense vector, so no model
+    download is required.
+
+    Requires faiss:  `pip3 install faiss-cpu`
+ """
+
+
+import os
+import shutil
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig, FAISSConfig
+from llmware.embeddings import EmbeddingHandler, EmbeddingFAISS, EmbeddingNumpyMMap
+from llmware.library import Library
+from llmware.resources import CollectionRetrieval
+
+from utils import HashedTokenEmbeddingModel, synthetic_texts
+
+
+def write_text_file(fp, seed):
+
+    texts = synthetic_texts(40, vocab_size=300, words_per_block=12, zipf=False, seed=seed)
+
+    with open(fp, "w") as f:
+        f.write("\n".join(t + "." for t in texts))
+
+
+def text_blocks(library):
+    return list(CollectionRetrieval(library.library_name,
+                                    account_name=library.account_name).filter_by_key("content_type", "text"))
+
+
+def embedded_blocks(library, embedding_db, model_name):
+    for emb in library.get_embedding_status():
+        if emb["embedding_db"] == embedding_db and emb["embedding_model"] == model_name:
+            return emb["embedded_blocks"]
+    return None
+
+
+def install_embedding(library, embedding_db, model, index_type):
+
+    prior_index_type = FAISSConfig.get_config("index_type")
+    FAISSConfig.set_config("index_type", index_type)
+
+    try:
+        EmbeddingHandler(library).create_new_embedding(embedding_db, model, batch_size=50)
+    finally:
+        FAISSConfig.set_config("index_type", prior_index_type)
+
+
+def check_index(library, embedding_db, model, index_type, block_ids, prior_block_count):
+
+    """ Checks that the index holds the vectors of the current blocks only """
+
+    if embedding_db == "numpy_mmap":
+
+        numpy_db = EmbeddingNumpyMMap(library, model=model)
+        numpy_db._load()
+
+        assert numpy_db.header["count"] == len(block_ids)
+        assert set(str(_id) for _id in numpy_db.ids) == block_ids
+
+        numpy_db.vectors, numpy_db.ids = None, None
+        return True
+
+    faiss_db = EmbeddingFAISS(library, model=model)
+    id_map = np.array(faiss_db._load_id_map())
+
+    if index_type == "flat":
+
+        #   vectors removed, and the embedding flag of each block is its new index position
+        assert len(id_map) == len(block_ids) and set(str(_id) for _id in id_map) == block_ids
+
+        for position in range(len(id_map)):
+            flagged = CollectionRetrieval(library.library_name,
+                                          account_name=library.account_name).embedding_key_lookup(
+                faiss_db.collection_key, position)
+            assert [str(b["_id"]) for b in flagged] == [str(id_map[position])]
+
+    else:
+        #   vectors kept, with their positions marked as deleted in the id map
+        assert np.count_nonzero(id_map == -1) == prior_block_count
+        assert set(str(_id) for _id in id_map if _id != -1) == block_ids
+
+    return True
+
+
+def test_replaced_block_vectors(file_count=20, result_count=10):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    model = HashedTokenEmbeddingModel(embedding_dims=64)
+
+    for embedding_db, index_type in [("faiss", "flat"), ("faiss", "hnsw"), ("numpy_mmap", "flat")]:
+
+        input_fp = os.path.join(LLMWareConfig.get_tmp_path(), "test_replaced_block_vectors_input")
+        if os.path.exists(input_fp):
+            shutil.rmtree(input_fp)
+        os.makedirs(input_fp)
+
+        for i in range(file_count):
+            write_text_file(os.path.join(input_fp, f"replace_{i}.txt"), i)
+
+        library = Library().create_new_library("test_replaced_block_vectors_1024")
+        library.add_files(input_fp)
+
+        install_embedding(library, embedding_db, model, index_type)
+
+        #   modified file replaces the blocks of its prior version
+        prior_blocks = [b for b in text_blocks(library) if b["file_source"] == "replace_1.txt"]
+
+        write_text_file(os.path.join(input_fp, "replace_1.txt"), 1000)
+
+        output = library.add_files(input_fp)
+
+        assert output["modified_files"] == ["replace_1.txt"]
+        assert output["stale_vectors"] == 0
+
+        blocks = text_blocks(library)
+        block_ids = set(str(b["_id"]) for b in blocks)
+        new_blocks = [b for b in blocks if b["file_source"] == "replace_1.txt"]
+
+        #   embedded block count in the library card no longer includes the replaced blocks
+        assert len(prior_blocks) > 1 and not set(str(b["_id"]) for b in prior_blocks) & block_ids
+        assert embedded_blocks(library, embedding_db, model.model_name) == len(blocks) - len(new_blocks)
+
+        #   new blocks are embedded incrementally
+        install_embedding(library, embedding_db, model, index_type)
+
+        assert embedded_blocks(library, embedding_db, model.model_name) == len(blocks)
+        assert check_index(library, embedding_db, model, index_type, block_ids, len(prior_blocks))
+
+        #   search for the text of a replaced block returns full result counts from the current blocks - for the
+        #   exact indexes, the same distances as a brute-force ranking over the current blocks
+        EmbeddingHandler.clear_index_cache()
+
+        query_vector = model.embedding(prior_blocks[0]["text"])[0]
+
+        results = EmbeddingHandler(library).search_index(query_vector, embedding_db, model,
+                                                         sample_count=result_count)
+
+        assert len(results) == result_count
+        assert all(str(block["_id"]) in block_ids for block, distance in results)
+
+        if index_type == "flat":
+            current_vectors = model.embedding([b["text"] for b in blocks])
+            brute_force = np.sort(np.sum((current_vectors - query_vector) ** 2, axis=1))[:result_count]
+            assert np.allclose([float(distance) for block, distance in results], brute_force, atol=1e-4)
+
+        EmbeddingHandler.clear_index_cache()
+        library.delete_library(confirm_delete=True)
+
+        shutil.rmtree(input_fp)
@@ -0,0 +1,62 @@
+
+""" Tests the process-wide vector index cache used by EmbeddingHandler.search_index - two searches in a row from
+    new Query instances on the same library re-use the cached handler and return the same results, and handlers for
+    vector db servers (which close their connection after each call) and lancedb are not cached.
+
+    Builds a small SQLite library, embedded into the built-in numpy_mmap vector store with a stand-in model that
+    hashes tokens into a dense vector, so no model download or external vector db is required.
+ """
+
+
+from llmware.configs import LLMWareConfig
+from llmware.embeddings import EmbeddingHandler, _vector_index_cache
+from llmware.library import Library
+from llmware.retrieval import Query
+
+from utils import HashedTokenEmbeddingModel, synthetic_block, synthetic_texts, write_synthetic_blocks
+
+
+def create_library(library_name, block_count=200):
+
+    library = Library().create_new_library(library_name)
+
+    texts = synthetic_texts(block_count, vocab_size=300, words_per_block=12, zipf=False)
+    write_synthetic_blocks(library, [synthetic_block(i, 1, text, file_source="cache_test.txt")
+                                     for i, text in enumerate(texts)])
+
+    return library
+
+
+def test_vector_index_cache_repeated_search():
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = create_library("test_vector_index_cache_1005")
+
+    model = HashedTokenEmbeddingModel(embedding_dims=64)
+    EmbeddingHandler(library).create_new_embedding("numpy_mmap", model, batch_size=100)
+
+    EmbeddingHandler.clear_index_cache()
+    stats = EmbeddingHandler.get_index_cache_stats()
+
+    results = []
+
+    for i in range(2):
+        query = Query(library, save_history=False)
+        query.embedding_model = model
+        results.append([r["_id"] for r in query.semantic_query("term3 term40 term7", result_count=10)])
+
+    after = EmbeddingHandler.get_index_cache_stats()
+
+    assert results[0] and results[0] == results[1]
+    assert after["entries"] == 1
+    assert after["hits"] == stats["hits"] + 1
+
+    #   handlers for vector db servers, and lancedb handlers (no index file mtime to detect writes), are not cached
+    for vector_db in ["pg_vector", "lancedb"]:
+        key = (library.account_name, library.library_name, model.model_name, vector_db)
+        assert not _vector_index_cache.put(key, object())
+        assert _vector_index_cache.get(key) == (None, None)
+
+    EmbeddingHandler.clear_index_cache()
+    library.delete_library(confirm_delete=True)
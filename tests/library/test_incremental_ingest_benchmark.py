@@ -0,0 +1,120 @@
+
+""" Benchmark of incremental ingestion with the library file manifest - re-running Library.add_files on a folder
+    already in the library, with a renamed copy of one file, and one modified file - against the first ingest.
+
+    Checks that unchanged files and renamed copies are skipped, that a modified file is parsed again with its prior
+    blocks replaced, that a modified file that cannot be parsed keeps its prior version, and that the library card
+    counters match a fresh ingest of the same content.   Runs against
+    SQLite, and does not require a model.
+ """
+
+
+import filecmp
+import os
+import shutil
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.library import Library
+from llmware.resources import CollectionRetrieval
+
+
+def write_text_file(fp, seed, words=4000, vocab_size=5000):
+
+    rng = np.random.default_rng(seed)
+    words = [f"term{j}" for j in rng.integers(0, vocab_size, size=words)]
+    sentences = [" ".join(words[k:k+12]) + "." for k in range(0, len(words), 12)]
+
+    with open(fp, "w") as f:
+        f.write("\n".join(sentences))
+
+
+def library_texts(library):
+    blocks = CollectionRetrieval(library.library_name).filter_by_key("content_type", "text")
+    return sorted((b["file_source"], b["text"]) for b in blocks)
+
+
+def card_counts(library):
+    card = library.get_library_card()
+    return {key: card[key] for key in ["documents", "blocks", "pages"]}
+
+
+def test_incremental_ingest_benchmark(file_count=100):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    input_fp = os.path.join(LLMWareConfig.get_tmp_path(), "bench_incremental_input")
+    if os.path.exists(input_fp):
+        shutil.rmtree(input_fp)
+    os.makedirs(input_fp)
+
+    for i in range(file_count):
+        write_text_file(os.path.join(input_fp, f"bench_{i}.txt"), i)
+
+    library = Library().create_new_library("bench_incremental_1024")
+
+    t0 = time.time()
+    first = library.add_files(input_fp)
+    first_time = time.time() - t0
+
+    assert first["docs_added"] == file_count and first["duplicate_files"] == []
+
+    #   unchanged folder - all files skipped by manifest lookup
+    t1 = time.time()
+    again = library.add_files(input_fp)
+    again_time = time.time() - t1
+
+    assert again["docs_added"] == 0 and again["blocks_added"] == 0
+    assert sorted(again["duplicate_files"]) == sorted(os.listdir(input_fp))
+
+    #   renamed copy of an existing file is skipped, and a modified file replaces its prior blocks
+    shutil.copy(os.path.join(input_fp, "bench_0.txt"), os.path.join(input_fp, "bench_0_copy.txt"))
+    write_text_file(os.path.join(input_fp, "bench_1.txt"), 100000, words=2000)
+
+    t2 = time.time()
+    changed = library.add_files(input_fp)
+    changed_time = time.time() - t2
+
+    assert changed["modified_files"] == ["bench_1.txt"]
+    assert "bench_0_copy.txt" in changed["duplicate_files"]
+    assert changed["docs_added"] == 0
+    assert filecmp.cmp(os.path.join(input_fp, "bench_1.txt"), os.path.join(library.file_copy_path, "bench_1.txt"),
+                       shallow=False)
+
+    print(f"\n{file_count} files")
+    print(f"ingest                              files/sec")
+    print(f"first ingest                        {round(file_count / first_time, 1)}")
+    print(f"re-ingest, unchanged                {round(file_count / again_time, 1)}")
+    print(f"re-ingest, 1 modified + 1 renamed   {round((file_count + 1) / changed_time, 1)}")
+
+    #   modified file that cannot be parsed (no text) - prior version kept, with its blocks and library copy
+    prior_texts = library_texts(library)
+    prior_counts = card_counts(library)
+
+    with open(os.path.join(input_fp, "bench_2.txt"), "w") as f:
+        f.write("")
+
+    failed = library.add_files(input_fp)
+
+    assert failed["modified_files"] == [] and failed["rejected_files"] == ["bench_2.txt"]
+    assert library_texts(library) == prior_texts
+    assert card_counts(library) == prior_counts
+    assert os.path.getsize(os.path.join(library.file_copy_path, "bench_2.txt")) > 0
+
+    #   same blocks and counters as a fresh ingest of the current content (without the renamed copy), with the
+    #   prior version of the file that could not be parsed
+    os.remove(os.path.join(input_fp, "bench_0_copy.txt"))
+    write_text_file(os.path.join(input_fp, "bench_2.txt"), 2)
+
+    fresh = Library().create_new_library("bench_incremental_fresh_1024")
+    fresh.add_files(input_fp)
+
+    assert library_texts(library) == library_texts(fresh)
+    assert card_counts(library) == card_counts(fresh)
+
+    library.delete_library(confirm_delete=True)
+    fresh.delete_library(confirm_delete=True)
+
+    shutil.rmtree(input_fp)
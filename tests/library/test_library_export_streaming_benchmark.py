@@ -0,0 +1,125 @@
+
+""" Benchmark of peak memory of Library.export_library_to_jsonl_file and Query.get_whole_library, with the blocks
+    streamed off the db cursor with fetchmany, against the prior path, which pulled the whole collection into a
+    list before writing - measured with tracemalloc at increasing library sizes.   Peak memory of the streaming
+    export should stay flat as the library grows.
+
+    Also checks that the streamed export matches the prior export, and the gzip, zstd (if zstandard installed)
+    and sharded outputs.   Runs against a synthetic SQLite library, and does not require a model.
+ """
+
+
+import gzip
+import json
+import os
+import sqlite3
+import time
+import tracemalloc
+from importlib import util
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig, SQLiteConfig
+from llmware.library import Library
+from llmware.resources import CollectionRetrieval
+from llmware.retrieval import Query
+
+
+def add_synthetic_blocks(library_name, start, count, words_per_block=80, chunk_size=50000):
+
+    rng = np.random.default_rng(start)
+
+    conn = sqlite3.connect(SQLiteConfig.get_uri_string())
+    placeholders = ", ".join(["?"] * 28)
+
+    for chunk_start in range(start, start + count, chunk_size):
+
+        rows = []
+        for i in range(chunk_start, min(chunk_start + chunk_size, start + count)):
+            text = " ".join(f"term{j}" for j in rng.integers(0, 5000, size=words_per_block))
+            rows.append((i, 1 + i // 1000, "text", "txt", 1 + i % 10, 0, 0, 0, 0, 0, "", "",
+                         f"bench_{i // 1000}.txt", "", "", "", "", "", text, "", text,
+                         "", "", "", "", "", "", ""))
+
+        conn.executemany(f"INSERT INTO {library_name} VALUES ({placeholders})", rows)
+        conn.commit()
+
+    conn.close()
+
+
+def legacy_export(library, fp):
+
+    """ Prior path - whole collection pulled into a list, then written """
+
+    results = CollectionRetrieval(library.library_name,
+                                  account_name=library.account_name).filter_by_key_value_range("content_type",
+                                                                                               ["text", "table"])
+    with open(fp, "w", encoding="utf-8") as f:
+        for elements in results:
+            entry = {key: elements[key] for key in library.default_keys if key in elements}
+            f.write(json.dumps(entry) + "\n")
+
+
+def peak_mb(run):
+    tracemalloc.start()
+    t0 = time.time()
+    run()
+    elapsed = time.time() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(peak / 1e6, 1), round(elapsed, 1)
+
+
+def test_library_export_streaming_benchmark(sizes=(10000, 20000, 40000)):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = Library().create_new_library("bench_export_stream_1019")
+    out = library.output_path
+
+    print(f"\nblocks     legacy export(MB, s)   streaming export(MB, s)   get_whole_library(MB)   "
+          f"stream_whole_library(MB)")
+
+    streaming_peaks = []
+    block_count = 0
+
+    for size in sizes:
+
+        add_synthetic_blocks(library.library_name, block_count, size - block_count)
+        block_count = size
+
+        legacy = peak_mb(lambda: legacy_export(library, os.path.join(out, "legacy.jsonl")))
+        streaming = peak_mb(lambda: library.export_library_to_jsonl_file(out, "streamed"))
+
+        query = Query(library, save_history=False)
+        whole = peak_mb(lambda: query.get_whole_library())
+        streamed_whole = peak_mb(lambda: sum(1 for _ in query.stream_whole_library()))
+
+        print(f"{size:<10} {str(legacy):<22} {str(streaming):<25} {whole[0]:<23} {streamed_whole[0]}")
+
+        streaming_peaks.append(streaming[0])
+
+        with open(os.path.join(out, "legacy.jsonl")) as f1, open(os.path.join(out, "streamed.jsonl")) as f2:
+            assert f1.read() == f2.read()
+
+    #   flat peak memory - does not grow with the number of blocks
+    assert streaming_peaks[-1] < 1.5 * streaming_peaks[0] + 1
+
+    with open(os.path.join(out, "streamed.jsonl")) as f:
+        expected = f.read()
+
+    fp = library.export_library_to_jsonl_file(out, "streamed", compression="gzip")
+    with gzip.open(fp, "rt", encoding="utf-8") as f:
+        assert f.read() == expected
+
+    shards = library.export_library_to_jsonl_file(out, "sharded", shard_size=15000)
+    assert len(shards) == -(-block_count // 15000)
+    assert "".join(open(shard).read() for shard in shards) == expected
+
+    if util.find_spec("zstandard"):
+        import zstandard
+        fp = library.export_library_to_jsonl_file(out, "streamed", compression="zstd")
+        with open(fp, "rb") as f:
+            assert zstandard.ZstdDecompressor().stream_reader(f).read().decode("utf-8") == expected
+
+    library.delete_library(confirm_delete=True)
@@ -0,0 +1,139 @@
+
+""" Benchmark of the streaming OCR pipeline on a synthetic scanned PDF - pages rendered in chunks and OCR'd across
+    a pool of workers, against a single worker - in pages per second.
+
+    Checks that the pages are returned in page order with the same text for any number of workers and page chunk
+    size, and that Library.add_pdf_by_ocr writes the pages in order.   Requires pytesseract + tesseract,
+    pdf2image + poppler, and PIL.   Runs against SQLite, and does not require a model.
+
+    The order of the OCR output, and the bound on the images held pending OCR, are also checked without any of the
+    OCR dependencies, with a stand-in for the tesseract call.
+ """
+
+
+import os
+import random
+import shutil
+import threading
+import time
+
+import pytest
+
+from llmware.configs import LLMWareConfig
+from llmware.library import Library
+from llmware.parsers import ImageParser
+from llmware.resources import CollectionRetrieval
+
+
+def create_scanned_pdf(fp, fn, page_count):
+
+    from PIL import Image, ImageDraw
+
+    if os.path.exists(fp):
+        shutil.rmtree(fp)
+    os.makedirs(fp)
+
+    pages = []
+    for i in range(page_count):
+        page = Image.new("RGB", (1240, 1754), "white")
+        draw = ImageDraw.Draw(page)
+        for line in range(20):
+            draw.text((100, 100 + line * 60), f"Page {i + 1} line {line + 1} of the scanned benchmark document",
+                      fill="black")
+        pages.append(page)
+
+    pages[0].save(os.path.join(fp, fn), save_all=True, append_images=pages[1:])
+
+
+def test_ocr_pipeline_benchmark(page_count=24, workers=4):
+
+    for module in ["PIL", "pytesseract", "pdf2image"]:
+        pytest.importorskip(module)
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    input_fp = os.path.join(LLMWareConfig.get_tmp_path(), "bench_ocr_input")
+    fn = "scanned_bench.pdf"
+    create_scanned_pdf(input_fp, fn, page_count)
+
+    print(f"\n{page_count} pages - {os.cpu_count()} cores")
+    print(f"path                            pages/sec")
+
+    results = {}
+
+    for label, w, chunk in [("1 worker", 1, 8),
+                            (f"{workers} workers, chunk 8", workers, 8),
+                            (f"{workers} workers, chunk 2", workers, 2)]:
+
+        t0 = time.time()
+        results[label] = list(ImageParser().iter_pdf_by_ocr(input_fp, fn, workers=w, page_chunk_size=chunk))
+        elapsed = time.time() - t0
+
+        print(f"{label:<31} {round(page_count / elapsed, 1)}")
+
+    outputs = list(results.values())
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert len(outputs[0]) == page_count
+
+    #   pages in order
+    for i, page in enumerate(outputs[0]):
+        assert f"Page {i + 1} " in " ".join(page)
+
+    library = Library().create_new_library("bench_ocr_1023")
+    library.add_pdf_by_ocr(input_fp, workers=workers, page_chunk_size=4)
+
+    blocks = CollectionRetrieval(library.library_name).filter_by_key("content_type", "text")
+    pages = sorted((int(b["block_ID"]), int(b["master_index"]), b["text"]) for b in blocks)
+
+    assert [p for _, p, _ in pages] == sorted(p for _, p, _ in pages)
+    assert set(p for _, p, _ in pages) == set(range(1, page_count + 1))
+    assert library.get_library_card()["pages"] == page_count
+
+    library.delete_library(confirm_delete=True)
+    shutil.rmtree(input_fp)
+
+
+
+def test_stream_ocr_order_and_pending_bound(monkeypatch, image_count=50, workers=3):
+
+    lock = threading.Lock()
+    state = {"pulled": 0, "consumed": 0, "max_pending": 0, "running": 0, "max_running": 0}
+
+    def image_to_text(image):
+
+        with lock:
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+
+        #   OCR time varies by page, so that the pages complete out of order
+        time.sleep(random.uniform(0.0, 0.01))
+
+        with lock:
+            state["running"] -= 1
+
+        return f"text of {image}"
+
+    monkeypatch.setattr(ImageParser, "_image_to_text", staticmethod(image_to_text))
+
+    def images():
+        for i in range(image_count):
+            state["pulled"] += 1
+            state["max_pending"] = max(state["max_pending"], state["pulled"] - state["consumed"])
+            yield f"page_{i}"
+
+    output = []
+    for text in ImageParser()._stream_ocr(images(), workers=workers):
+        state["consumed"] += 1
+        output.append(text)
+
+    #   text of each image in input order, with at most 2 x workers images pulled ahead of the consumer
+    assert output == [f"text of page_{i}" for i in range(image_count)]
+    assert state["max_pending"] <= 2 * workers
+    assert 1 < state["max_running"] <= workers
+
+    #   files yielded in list order, with their text chunks
+    files = [f"image_{i}.png" for i in range(10)]
+    results = list(ImageParser().process_ocr_files("/ocr_input", files, workers=workers))
+
+    assert [fn for fn, chunks in results] == files
+    assert all(" ".join(chunks).strip() == f"text of {os.path.join('/ocr_input', fn)}" for fn, chunks in results)
@@ -0,0 +1,125 @@
+
+""" Benchmark of Library.add_files with workers - files parsed in parallel in a pool of worker processes, with the
+    doc_IDs reserved in a single update at the start, and the parsing output written to the db in batches by the
+    main process - against the sequential ingest, on a folder of synthetic txt, md and csv files.
+
+    Checks that the parallel ingest writes the same blocks as the sequential ingest, with the same doc_ID for
+    each file, and the same library card counters and processed / rejected accounting - and that type_workers
+    limits below 1 and the 'fork' start method are rejected before any file is parsed.   Speed-up depends on the
+    number of cores available.   Runs against SQLite, and does not require a model.
+ """
+
+
+import os
+import shutil
+import time
+
+import numpy as np
+import pytest
+
+from llmware.configs import LLMWareConfig
+from llmware.exceptions import LLMWareException
+from llmware.library import Library
+from llmware.parsers import Parser
+from llmware.resources import CollectionRetrieval
+
+
+def create_input_folder(fp, file_count, words_per_file=4000, vocab_size=5000):
+
+    if os.path.exists(fp):
+        shutil.rmtree(fp)
+    os.makedirs(fp)
+
+    rng = np.random.default_rng(0)
+
+    for i in range(file_count):
+
+        words = [f"term{j}" for j in rng.integers(0, vocab_size, size=words_per_file)]
+
+        if i % 3 == 2:
+            rows = [",".join(words[k:k+8]) for k in range(0, len(words), 8)]
+            with open(os.path.join(fp, f"bench_{i}.csv"), "w") as f:
+                f.write("\n".join(rows))
+        else:
+            ext = "md" if i % 3 == 1 else "txt"
+            sentences = [" ".join(words[k:k+12]) + "." for k in range(0, len(words), 12)]
+            with open(os.path.join(fp, f"bench_{i}.{ext}"), "w") as f:
+                f.write("\n".join(sentences))
+
+
+def library_blocks(library):
+    blocks = CollectionRetrieval(library.library_name,
+                                 account_name=library.account_name).filter_by_key_value_range("content_type",
+                                                                                              ["text", "table"])
+    return sorted((b["file_source"], b["doc_ID"], b["block_ID"], b["text"]) for b in blocks)
+
+
+def test_parallel_ingest_benchmark(file_count=120, workers=2):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    input_fp = os.path.join(LLMWareConfig.get_tmp_path(), "bench_parallel_ingest_input")
+    create_input_folder(input_fp, file_count)
+
+    sequential_lib = Library().create_new_library("bench_ingest_seq_1021")
+    parallel_lib = Library().create_new_library("bench_ingest_par_1021")
+
+    t0 = time.time()
+    sequential = sequential_lib.add_files(input_fp)
+    sequential_time = time.time() - t0
+
+    t1 = time.time()
+    parallel = parallel_lib.add_files(input_fp, workers=workers)
+    parallel_time = time.time() - t1
+
+    print(f"\n{file_count} files - {sequential['blocks_added']} blocks - {os.cpu_count()} cores")
+    print(f"path                    files/sec")
+    print(f"sequential              {round(file_count / sequential_time, 1)}")
+    print(f"parallel ({workers} workers)    {round(file_count / parallel_time, 1)}")
+
+    #   same output, doc_IDs and accounting as the sequential ingest
+    assert parallel == sequential
+    assert parallel["docs_added"] == file_count and parallel["rejected_files"] == []
+
+    assert library_blocks(parallel_lib) == library_blocks(sequential_lib)
+
+    card = parallel_lib.get_library_card()
+    assert card["unique_doc_id"] == sequential_lib.get_library_card()["unique_doc_id"] == file_count
+
+    assert sorted(os.listdir(parallel_lib.file_copy_path)) == sorted(os.listdir(input_fp))
+
+    #   duplicate files are skipped, and the next doc_IDs follow the reserved block
+    assert parallel_lib.add_files(input_fp, workers=workers)["docs_added"] == 0
+
+    assert parallel_lib.reserve_doc_ids(10) == file_count + 1
+    assert parallel_lib.get_and_increment_doc_id() == file_count + 11
+
+    sequential_lib.delete_library(confirm_delete=True)
+    parallel_lib.delete_library(confirm_delete=True)
+
+    shutil.rmtree(input_fp)
+
+
+def test_parallel_ingest_rejects_invalid_options(file_count=3):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    input_fp = os.path.join(LLMWareConfig.get_tmp_path(), "bench_parallel_ingest_options")
+    create_input_folder(input_fp, file_count)
+
+    library = Library().create_new_library("test_ingest_options_1021")
+
+    #   a limit of 0 would leave the files of that type unsubmitted, with the writer waiting on them
+    with pytest.raises(LLMWareException):
+        Parser(library=library).ingest(input_fp, workers=2, type_workers={"text": 0})
+
+    #   forked workers would inherit the pooled SQLite connections of this process
+    with pytest.raises(LLMWareException):
+        Parser(library=library).ingest(input_fp, workers=2, start_method="fork")
+
+    card = library.get_library_card()
+    assert card["documents"] == 0 and card["unique_doc_id"] == 0
+
+    library.delete_library(confirm_delete=True)
+
+    shutil.rmtree(input_fp)
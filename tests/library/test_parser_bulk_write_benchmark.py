@@ -0,0 +1,117 @@
+
+""" Benchmark of the buffered write path used by the python-based parsers (text, csv, jsonl, voice, dialog, wiki).
+
+    Parses a synthetic JSONL corpus into a SQLite library twice - once with db_write_batch_size=1, which writes
+    each record in its own insert + commit (the previous behavior), and once with the default batch size, which
+    flushes records with a single executemany per batch.   The unbatched run is timed on a smaller corpus and
+    extrapolated.
+
+    Also checks that the records buffered before a file raises an exception are written to the library.
+ """
+
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pytest
+
+from llmware.configs import LLMWareConfig
+from llmware.library import Library
+from llmware.parsers import Parser
+from llmware.resources import CollectionRetrieval
+
+
+def create_jsonl_corpus(fp, line_count):
+
+    """ Writes a synthetic jsonl file with line_count entries. """
+
+    os.makedirs(fp, exist_ok=True)
+
+    with open(os.path.join(fp, f"corpus_{line_count}.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(line_count):
+            f.write(json.dumps({"text": f"line {i} of the synthetic corpus used to benchmark parser writes"}) + "\n")
+
+    return fp
+
+
+def parse_corpus(library_name, fp, batch_size):
+
+    library = Library().create_new_library(library_name)
+
+    t0 = time.time()
+    output = Parser(library=library, db_write_batch_size=batch_size).parse_text(fp, write_to_db=True)
+    elapsed = time.time() - t0
+
+    block_count = library.get_library_card()["blocks"]
+    library.delete_library(confirm_delete=True)
+
+    return len(output), block_count, elapsed
+
+
+def test_parser_bulk_write_benchmark(line_count=50000, unbatched_sample=2000):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    tmp_path = tempfile.mkdtemp()
+
+    try:
+        small_fp = create_jsonl_corpus(os.path.join(tmp_path, "small"), unbatched_sample)
+        large_fp = create_jsonl_corpus(os.path.join(tmp_path, "large"), line_count)
+
+        n1, blocks1, unbatched_time = parse_corpus("bench_parse_unbatched_1002", small_fp, batch_size=1)
+        n2, blocks2, batched_time = parse_corpus("bench_parse_batched_1002", large_fp, batch_size=500)
+
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    unbatched_rate = n1 / unbatched_time
+    batched_rate = n2 / batched_time
+
+    print(f"\nunbatched writes: {n1} records in {round(unbatched_time, 3)}s - {round(unbatched_rate)} records/sec - "
+          f"est. {round(line_count / unbatched_rate, 1)}s for {line_count}")
+    print(f"batched writes:   {n2} records in {round(batched_time, 3)}s - {round(batched_rate)} records/sec - "
+          f"speedup: {round(batched_rate / unbatched_rate, 1)}x")
+
+    assert n1 == blocks1 == unbatched_sample
+    assert n2 == blocks2 == line_count
+
+
+def test_parser_write_buffer_flushed_on_exception(lines_per_file=50, file_count=5):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    tmp_path = tempfile.mkdtemp()
+
+    try:
+        for i in range(file_count):
+            with open(os.path.join(tmp_path, f"good_{i}.jsonl"), "w", encoding="utf-8") as f:
+                for j in range(lines_per_file):
+                    f.write(json.dumps({"text": f"line {j} of good file {i}"}) + "\n")
+
+        #   malformed file, placed after at least one good file in the folder listing
+        for k in range(file_count + 1):
+            bad_fn = f"bad_{k}.jsonl"
+            with open(os.path.join(tmp_path, bad_fn), "w", encoding="utf-8") as f:
+                f.write('{"text": "not closed\n')
+            if os.listdir(tmp_path).index(bad_fn) > 0:
+                break
+            os.remove(os.path.join(tmp_path, bad_fn))
+
+        files_before_bad = os.listdir(tmp_path).index(bad_fn)
+
+        library = Library().create_new_library("test_parse_flush_on_exception_1002")
+
+        with pytest.raises(json.JSONDecodeError):
+            Parser(library=library, db_write_batch_size=500).parse_text(tmp_path, write_to_db=True)
+
+        #   all of the records of the files parsed before the exception are in the library
+        written = CollectionRetrieval(library.library_name).count_documents({})[0]
+        assert written == files_before_bad * lines_per_file > 0
+
+        library.delete_library(confirm_delete=True)
+
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
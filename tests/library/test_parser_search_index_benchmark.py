@@ -0,0 +1,108 @@
+
+""" Benchmark of the in-memory BM25 search index over parser output (Parser.query_parser_state with
+    use_index=True) against Utilities().fast_search_dicts (the default), which re-tokenizes every dict on every
+    query - latency per query on a synthetic parser output, with the index built once.
+
+    Checks that the default query_parser_state is unchanged, that the exact match mode of the index returns the
+    same dicts as fast_search_dicts (which does not find a
+    multi-token match in the last tokens of the text - these are returned by the index), and checks BM25
+    ranking with field weights, phrase queries, incremental add, and that the index saved next to the parser
+    history jsonl is re-loaded without re-building.   Does not require a library or model.
+ """
+
+
+import time
+
+import numpy as np
+
+from llmware.parsers import Parser
+from llmware.util import Utilities, BM25Index, CorpTokenizer
+
+
+def create_parser_output(block_count, vocab_size=3000, words_per_block=60):
+
+    rng = np.random.default_rng(0)
+    p = 1.0 / np.arange(1, vocab_size + 1)
+    p /= p.sum()
+
+    output = []
+    for i, ids in enumerate(rng.choice(vocab_size, size=(block_count, words_per_block), p=p)):
+        output.append({"block_ID": i, "doc_ID": 1 + i // 100, "master_index": 1 + (i % 100) // 10,
+                       "file_source": f"bench_{i // 100}.pdf", "header_text": f"section term{i % 50}",
+                       "text": " ".join(f"term{j}" for j in ids)})
+
+    return output
+
+
+def test_parser_search_index_benchmark(block_count=5000, runs=2):
+
+    parser = Parser()
+    parser.parser_output = create_parser_output(block_count)
+
+    queries = ["term5", "term10 term20", "term100 term3", "term1500", "term7 term8 term9"]
+
+    t0 = time.time()
+    parser.build_parser_index()
+    build_time = time.time() - t0
+
+    legacy_times, index_times = [], []
+    tokenizer = CorpTokenizer(remove_stop_words=True, remove_numbers=False, one_letter_removal=True)
+
+    for _ in range(runs):
+        for q in queries:
+
+            t1 = time.time()
+            legacy = Utilities().fast_search_dicts(q, [dict(d) for d in parser.parser_output])
+            legacy_times.append((time.time() - t1) * 1000)
+
+            t2 = time.time()
+            results = parser.query_parser_state(q, use_index=True)
+            index_times.append((time.time() - t2) * 1000)
+
+            #   default - fast_search_dicts, as before
+            assert [r["block_ID"] for r in parser.query_parser_state(q)] == [r["block_ID"] for r in legacy]
+
+            legacy_ids = [r["block_ID"] for r in legacy]
+            index_ids = [r["block_ID"] for r in results]
+
+            #   same matches, in parsing order - plus any multi-token matches in the last tokens of the text
+            assert [i for i in index_ids if i in set(legacy_ids)] == legacy_ids
+            key_terms = tokenizer.tokenize(q)
+            for i in set(index_ids) - set(legacy_ids):
+                assert tokenizer.tokenize(parser.parser_output[i]["text"])[-len(key_terms):] == key_terms
+
+    print(f"\nparser output: {block_count} blocks - index built in {round(build_time, 2)}s")
+    print(f"path                   p50 per query(ms)")
+    print(f"fast_search_dicts      {round(float(np.median(legacy_times)), 2)}")
+    print(f"query_parser_state     {round(float(np.median(index_times)), 2)}    (use_index=True)")
+
+    #   ranked - header_text match is weighted above the same term in the text only
+    ranked = parser.query_parser_state("term42", ranked=True, result_count=10)
+    assert all(r["score"] >= s["score"] for r, s in zip(ranked, ranked[1:]))
+    assert ranked[0]["header_text"] == "section term42"
+
+    #   phrase queries are required in any field, and other terms add to the score
+    phrase = parser.parser_index.search('"section term42" term3', result_count=None)
+    assert phrase and all(r["header_text"] == "section term42" for r in phrase)
+
+    #   incremental add - new parser output is indexed on the next query
+    parser.parser_output.append({"block_ID": block_count, "doc_ID": 0, "master_index": 1, "file_source": "new.pdf",
+                                 "header_text": "", "text": "quarterly revenue increased"})
+    assert [r["block_ID"] for r in parser.query_parser_state("quarterly revenue", use_index=True)] == [block_count]
+    assert len(parser.parser_index.docs) == block_count + 1
+
+    #   saved next to the parser history jsonl, and re-loaded without re-building
+    parser.save_parser_index()
+
+    t3 = time.time()
+    reloaded = Parser().load_parser_index(parser.parser_job_id)
+    print(f"index re-loaded in {round(time.time() - t3, 2)}s")
+
+    for q in queries + ['"section term42" term3']:
+        assert [r["block_ID"] for r in reloaded.search(q, result_count=None)] == \
+            [r["block_ID"] for r in parser.parser_index.search(q, result_count=None)]
+
+    #   export with the dicts included, for any list of dicts
+    index = BM25Index().add(parser.parser_output[:100])
+    copy = BM25Index.from_dict(index.to_dict(include_docs=True))
+    assert copy.search("term5 term10") == index.search("term5 term10")
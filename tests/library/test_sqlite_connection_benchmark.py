@@ -0,0 +1,154 @@
+
+""" Benchmark of mixed read/write throughput on the SQLite text collection - with the prior settings (a new
+    connection opened and closed by each CollectionRetrieval and CollectionWriter, rollback journal, no mmap or
+    cache pragmas, one commit per write), against the connections re-used per thread, with WAL, mmap and cache
+    pragmas from SQLiteConfig, and the writes grouped with CollectionWriter.write_batch.
+
+    Also checks concurrent readers while a write batch is open on another thread (not blocked in WAL mode), that
+    the reads return the same results with both settings, and that an uncommitted write is not carried over when
+    a connection is returned to the pool.   Runs against a synthetic SQLite library, and does not require a model.
+ """
+
+
+import gc
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig, SQLiteConfig
+from llmware.library import Library
+from llmware.resources import CollectionRetrieval, CollectionWriter, _SQLiteConnect
+
+from utils import synthetic_block
+
+
+def new_record(i, rng, words_per_block=40):
+    text = " ".join(f"term{j}" for j in rng.integers(0, 2000, size=words_per_block))
+    return synthetic_block(i, 1 + i // 100, text)
+
+
+def mixed_workload(library_name, start, ops, write_every=4, batch=False):
+
+    """ One write for every write_every ops, and block lookups in between - returns the lookups """
+
+    rng = np.random.default_rng(start)
+    lookups = []
+
+    def run():
+        for i in range(start, start + ops):
+            if i % write_every == 0:
+                CollectionWriter(library_name).write_new_parsing_record(new_record(i, rng))
+            else:
+                doc_id = 1 + int(rng.integers(0, 50))
+                lookups.append(CollectionRetrieval(library_name).filter_by_key_dict({"doc_ID": doc_id,
+                                                                                     "block_ID": doc_id * 100}))
+
+    if batch:
+        with CollectionWriter(library_name).write_batch():
+            run()
+    else:
+        run()
+
+    return lookups
+
+
+def apply_settings(pooled):
+
+    #   journal mode can only be changed with no other connections open
+    _SQLiteConnect.close_all()
+    gc.collect()
+
+    if pooled:
+        for key, value in {"connection_pool": True, "journal_mode": "wal", "synchronous": "normal",
+                           "mmap_size": 268435456, "cache_size": -65536}.items():
+            SQLiteConfig.set_config(key, value)
+    else:
+        for key, value in {"connection_pool": False, "journal_mode": "delete", "synchronous": None,
+                           "mmap_size": None, "cache_size": None}.items():
+            SQLiteConfig.set_config(key, value)
+
+    conn = _SQLiteConnect()._open(SQLiteConfig.get_uri_string())
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == SQLiteConfig.get_config("journal_mode")
+    conn.close()
+
+
+def test_sqlite_connection_benchmark(block_count=1000, ops=2000):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    defaults = {key: SQLiteConfig.get_config(key) for key in ["connection_pool", "journal_mode", "synchronous",
+                                                               "mmap_size", "cache_size"]}
+
+    library = Library().create_new_library("bench_sqlite_conn_1020")
+    name = library.library_name
+
+    rng = np.random.default_rng(0)
+    CollectionWriter(name).write_new_parsing_records_bulk([new_record(i, rng) for i in range(block_count)])
+
+    print(f"\nlibrary: {block_count} blocks - {ops} ops, 1 write : 3 reads")
+    print(f"settings                                  ops/sec")
+
+    try:
+        results = {}
+
+        for label, pooled, batch in [("new connection per call, rollback journal", False, False),
+                                     ("pooled, wal + pragmas", True, False),
+                                     ("pooled, wal + pragmas, write_batch", True, True)]:
+
+            apply_settings(pooled)
+
+            t0 = time.time()
+            results[label] = mixed_workload(name, block_count, ops, batch=batch)
+            elapsed = time.time() - t0
+
+            print(f"{label:<41} {round(ops / elapsed)}")
+
+            #   same library size for each run
+            assert CollectionRetrieval(name).count_documents({})[0] == block_count + ops // 4
+            conn = sqlite3.connect(SQLiteConfig.get_uri_string())
+            conn.execute(f"DELETE FROM {name} WHERE block_ID >= {block_count}")
+            conn.commit()
+            conn.close()
+
+        assert results["new connection per call, rollback journal"] == \
+            results["pooled, wal + pragmas"] == results["pooled, wal + pragmas, write_batch"]
+
+        count = CollectionRetrieval(name).count_documents({})[0]
+        offset = block_count + ops
+
+        #   readers on other threads are not blocked by an open write batch (WAL)
+        read_counts = []
+        reader_errors = []
+
+        def reader():
+            try:
+                read_counts.append(CollectionRetrieval(name).count_documents({})[0])
+            except Exception as e:
+                reader_errors.append(e)
+
+        with CollectionWriter(name).write_batch():
+            CollectionWriter(name).write_new_parsing_record(new_record(offset, rng))
+            t = threading.Thread(target=reader)
+            t.start()
+            t.join()
+
+        assert not reader_errors and read_counts == [count]
+        assert CollectionRetrieval(name).count_documents({})[0] == count + 1
+
+        #   an uncommitted write is rolled back when the connection is returned to the pool
+        cw = CollectionWriter(name)
+        cw._writer.conn.execute(f"DELETE FROM {name} WHERE doc_ID = 1")
+        cw.close()
+        assert CollectionRetrieval(name).count_documents({})[0] == count + 1
+
+    finally:
+        for key, value in defaults.items():
+            SQLiteConfig.set_config(key, value)
+        _SQLiteConnect.close_all()
+
+    library.delete_library(confirm_delete=True)
+
+    #   pooled connections are closed when the library is deleted
+    assert not _SQLiteConnect._thread_state().idle
@@ -0,0 +1,139 @@
+
+""" Benchmark of Parser staging of input files in the ingest work folders, and in the library uploads folder -
+    with a copy of each file (prior behavior), against hardlinks, symlinks and "auto" (reflink where the file
+    system supports copy-on-write clones, then hardlink) - on a folder of large files.
+
+    Checks that Library.add_files writes the same blocks with each staging method, on a folder with text files and
+    a zip archive, that the library uploads are never symlinks, and that hardlinked uploads share the input file.
+    Runs against SQLite, and does not require a model.
+ """
+
+
+import os
+import shutil
+import time
+from zipfile import ZipFile
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.library import Library
+from llmware.parsers import Parser
+from llmware.resources import CollectionRetrieval
+
+
+def create_large_files(fp, file_count, size_mb):
+
+    if os.path.exists(fp):
+        shutil.rmtree(fp)
+    os.makedirs(fp)
+
+    rng = np.random.default_rng(0)
+
+    for i in range(file_count):
+        with open(os.path.join(fp, f"large_{i}.pdf"), "wb") as f:
+            f.write(rng.bytes(size_mb * 1048576))
+
+
+def create_mixed_folder(fp, file_count=20):
+
+    if os.path.exists(fp):
+        shutil.rmtree(fp)
+    os.makedirs(fp)
+
+    rng = np.random.default_rng(1)
+
+    for i in range(file_count):
+        words = [f"term{j}" for j in rng.integers(0, 5000, size=2000)]
+        sentences = [" ".join(words[k:k+12]) + "." for k in range(0, len(words), 12)]
+        with open(os.path.join(fp, f"doc_{i}.txt"), "w") as f:
+            f.write("\n".join(sentences))
+
+    with ZipFile(os.path.join(fp, "archive.zip"), "w") as z:
+        for i in range(3):
+            z.writestr(f"zipped_{i}.txt", f"zipped document {i} with some text for the zip staging test.")
+
+
+def library_texts(library):
+    blocks = CollectionRetrieval(library.library_name).filter_by_key("content_type", "text")
+    return sorted((b["file_source"], b["text"]) for b in blocks)
+
+
+def test_zero_copy_staging_benchmark(file_count=10, size_mb=16):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    large_fp = os.path.join(LLMWareConfig.get_tmp_path(), "bench_staging_large")
+    create_large_files(large_fp, file_count, size_mb)
+
+    print(f"\n{file_count} files x {size_mb} MB")
+    print(f"staging       work folders MB/sec    uploads MB/sec    methods")
+
+    library = Library().create_new_library("bench_staging_1025")
+
+    for staging in ["copy", "hardlink", "symlink", "auto"]:
+
+        library_parser = Parser(library=library, staging=staging)
+
+        #   staging in the work folders only - without a library, the files are not hashed for the file manifest
+        parser = Parser(staging=staging)
+        parser._setup_workspace(parser.parser_tmp_folder)
+
+        t0 = time.time()
+        work_order = parser._collator(large_fp, dupe_check=False)
+        collate_time = time.time() - t0
+
+        assert work_order["pdf"] == file_count
+
+        for fn in os.listdir(library.file_copy_path):
+            os.remove(os.path.join(library.file_copy_path, fn))
+
+        t1 = time.time()
+        library_parser.uploads(parser.pdf_work_folder)
+        upload_time = time.time() - t1
+
+        total_mb = file_count * size_mb
+        print(f"{staging:<13} {round(total_mb / collate_time):<22} {round(total_mb / upload_time):<17} "
+              f"{parser.staging_counts} {library_parser.staging_counts}")
+
+        for fn in os.listdir(library.file_copy_path):
+            upload = os.path.join(library.file_copy_path, fn)
+            assert not os.path.islink(upload)
+            assert os.path.getsize(upload) == size_mb * 1048576
+
+        if staging == "symlink":
+            assert all(os.path.islink(os.path.join(parser.pdf_work_folder, fn))
+                       for fn in os.listdir(parser.pdf_work_folder))
+
+        if staging == "hardlink":
+            assert os.path.samefile(os.path.join(library.file_copy_path, "large_0.pdf"),
+                                    os.path.join(large_fp, "large_0.pdf"))
+
+    library.delete_library(confirm_delete=True)
+    shutil.rmtree(large_fp)
+
+    #   same library output with each staging method, including files extracted from a zip archive
+    mixed_fp = os.path.join(LLMWareConfig.get_tmp_path(), "bench_staging_mixed")
+    create_mixed_folder(mixed_fp)
+
+    results = {}
+
+    for staging in ["copy", "hardlink", "symlink", "auto"]:
+
+        lib = Library().create_new_library(f"bench_staging_{staging}_1025")
+        output = lib.add_files(mixed_fp, staging=staging)
+
+        assert output["docs_added"] == 23 and output["rejected_files"] == []
+
+        results[staging] = (library_texts(lib), sorted(os.listdir(lib.file_copy_path)))
+
+        assert not any(os.path.islink(os.path.join(lib.file_copy_path, fn)) for fn in os.listdir(lib.file_copy_path))
+
+        lib.delete_library(confirm_delete=True)
+
+    assert results["copy"] == results["hardlink"] == results["symlink"] == results["auto"]
+
+    #   input files are untouched
+    assert len(os.listdir(mixed_fp)) == 21
+
+    shutil.rmtree(mixed_fp)
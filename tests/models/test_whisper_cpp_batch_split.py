@@ -0,0 +1,116 @@
+
+""" Tests the split of a batched WhisperCPPModel transcription back into one response per file - with
+    _load_audio and _generate stubbed out, so that neither the whisper model nor librosa is required.
+
+    Checks that a segment that runs across the start of the next file is split between the files by the start time
+    of its tokens, that times are relative to the start of each file, that the decoder runs with no_context and
+    token timestamps, and that the initial prompt is only set from inference_dict.
+ """
+
+
+import numpy as np
+
+from llmware.gguf_configs import whisper_full_params
+from llmware.models import WhisperCPPModel
+
+
+SR = 16000
+
+#   file durations in seconds - with a 1 second gap, the files start at 0.0, 3.0 and 7.0 in the batch
+DURATIONS = {"a.wav": 2.0, "b.wav": 3.0, "c.wav": 1.5}
+
+
+def token(text, t0, t1):
+    return {"id": 0, "prob": 1.0, "logprob": 0.0, "pt": 1.0, "pt_sum": 1.0, "t0": t0, "t1": t1, "text": text}
+
+
+def batch_segments():
+
+    """ Whisper output for the batch - the second segment runs from the end of a.wav into b.wav """
+
+    return [{"start": 0.2, "end": 1.8, "text": " Hello from a.",
+             "tokens": [token("[_BEG_]", 0.2, 0.2), token(" Hello", 0.2, 0.6), token(" from", 0.6, 1.0),
+                        token(" a.", 1.0, 1.8)]},
+            {"start": 1.9, "end": 5.0, "text": " End of a. Start of b.",
+             "tokens": [token(" End", 1.9, 2.2), token(" of", 2.2, 2.4), token(" a.", 2.4, 2.8),
+                        token(" Start", 3.2, 3.6), token(" of", 3.6, 3.8), token(" b.", 3.8, 5.0),
+                        token("[_TT_250]", 5.0, 5.0)]},
+            {"start": 7.2, "end": 8.4, "text": " Only c.",
+             "tokens": [token(" Only", 7.2, 7.6), token(" c.", 7.6, 8.4)]}]
+
+
+def stub_model():
+
+    model = WhisperCPPModel(model_name="whisper-cpp-base-english", use_gpu_if_available=False)
+
+    model.WHISPER_SR = SR
+    model.params = whisper_full_params()
+    model.format = "text"
+    model.register = lambda: True
+
+    model.calls = []
+
+    def load_audio(file):
+        return np.zeros(int(DURATIONS[file] * SR), dtype=np.float32)
+
+    def generate(data):
+        model.calls.append({"samples": len(data), "no_context": model.params.no_context,
+                            "token_timestamps": model.params.token_timestamps,
+                            "initial_prompt": model.params.initial_prompt})
+        segments = batch_segments()
+        return {"text": "".join(s["text"] for s in segments).strip(), "segments": segments}
+
+    model._load_audio = load_audio
+    model._generate = generate
+
+    return model
+
+
+def test_whisper_cpp_batch_split():
+
+    model = stub_model()
+    files = list(DURATIONS.keys())
+
+    responses = model.inference_batch(files)
+
+    assert len(model.calls) == 1
+    assert model.calls[0]["samples"] == int((sum(DURATIONS.values()) + len(files)) * SR)
+
+    #   no decoder context across files, token timestamps on, no prompt from the file path - restored after
+    assert model.calls[0]["no_context"] and model.calls[0]["token_timestamps"]
+    assert model.calls[0]["initial_prompt"] is None
+    assert not model.params.no_context and not model.params.token_timestamps
+
+    assert [r["llm_response"] for r in responses] == ["Hello from a. End of a.", "Start of b.", "Only c."]
+
+    a_segments, b_segments, c_segments = [r["segments"] for r in responses]
+
+    assert [(s["start"], s["end"]) for s in a_segments] == [(0.2, 1.8), (1.9, 2.0)]
+    assert [(s["start"], s["end"]) for s in b_segments] == [(0.0, 2.0)]
+    assert [(s["start"], s["end"]) for s in c_segments] == [(0.2, 1.4)]
+
+    assert [t["text"] for t in b_segments[0]["tokens"]] == [" Start", " of", " b."]
+    assert [r["usage"]["duration-seconds"] for r in responses] == list(DURATIONS.values())
+
+    #   initial prompt only from inference_dict
+    model.inference_batch(files, inference_dict={"initial_prompt": "Glossary: llmware."})
+    assert model.calls[-1]["initial_prompt"] == b"Glossary: llmware."
+
+
+def test_whisper_cpp_split_batch_segments():
+
+    offsets = [0.0, 3.0, 7.0]
+
+    #   segment within one file is kept whole
+    segment = batch_segments()[0]
+    assert WhisperCPPModel._split_batch_segments([segment], offsets) == [(0, segment)]
+
+    #   segment that starts in the gap, with all of its text tokens in the next file, goes to the next file
+    segment = {"start": 2.5, "end": 4.0, "text": " Next.", "tokens": [token(" Next.", 3.1, 4.0)]}
+    assert WhisperCPPModel._split_batch_segments([segment], offsets) == [(1, segment)]
+
+    #   segment across a file start is split by the token start times
+    parts = WhisperCPPModel._split_batch_segments([batch_segments()[1]], offsets)
+
+    assert [(i, s["text"], s["start"], s["end"]) for i, s in parts] == [(0, " End of a.", 1.9, 3.0),
+                                                                         (1, " Start of b.", 3.0, 5.0)]
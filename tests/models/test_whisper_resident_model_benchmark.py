@@ -0,0 +1,91 @@
+
+""" Benchmark of voice file parsing throughput, in minutes of audio per wall-clock minute - with the whisper model
+    loaded and released for each file (prior VoiceParser behavior), against a single model kept resident for the
+    whole job, and against batched transcription with several files in a single pass through the model context.
+
+    Checks that the resident model is loaded only once, that a borrowed model is not released by the VoiceParser,
+    and that the batched output has one response per file.   Requires the whisper-cpp-base-english model, and the
+    librosa library to load the audio files.
+ """
+
+
+import os
+import time
+
+from llmware.gguf_configs import GGUFConfigs
+from llmware.models import ModelCatalog
+from llmware.parsers import Parser, VoiceParser
+from llmware.setup import Setup
+
+GGUFConfigs().set_config("whisper_cpp_verbose", "OFF")
+GGUFConfigs().set_config("whisper_cpp_realtime_display", False)
+
+
+def audio_minutes_per_minute(audio_seconds, elapsed):
+    return round(audio_seconds / elapsed, 1)
+
+
+def test_whisper_resident_model_benchmark(batch_size=4):
+
+    voice_samples = Setup().load_voice_sample_files(small_only=True)
+
+    fp = os.path.join(voice_samples, "famous_quotes")
+    files = sorted(f for f in os.listdir(fp) if f.endswith(".wav"))
+
+    print(f"\n{len(files)} files")
+    print(f"mode                          audio min / wall min")
+
+    #   prior behavior - model loaded and released for each file
+    audio_seconds = 0.0
+    t0 = time.time()
+    for f in files:
+        vp = VoiceParser(real_time_progress=False)
+        vp.add_voice_file(fp, f)
+        assert vp.speech_model is None
+        audio_seconds += vp.audio_seconds
+    per_file_time = time.time() - t0
+
+    print(f"load per file                 {audio_minutes_per_minute(audio_seconds, per_file_time)}")
+
+    #   single model held for the whole job, released explicitly at the end
+    vp = VoiceParser(real_time_progress=False, keep_model_loaded=True)
+    t1 = time.time()
+    model = vp.load_speech_model()
+    resident_output = []
+    for f in files:
+        resident_output.append(vp.add_voice_file(fp, f))
+        assert vp.speech_model is model
+    resident_time = time.time() - t1
+    vp.release()
+    assert vp.speech_model is None
+
+    print(f"resident model                {audio_minutes_per_minute(vp.audio_seconds, resident_time)}")
+
+    assert round(vp.audio_seconds, 2) == round(audio_seconds, 2)
+
+    #   batched transcription with a borrowed model - not released by the VoiceParser
+    model = ModelCatalog().load_model("whisper-cpp-base-english")
+    vp = VoiceParser(real_time_progress=False, speech_model=model)
+    t2 = time.time()
+    batched_output = []
+    for i in range(0, len(files), batch_size):
+        batched_output += vp.add_voice_files(fp, files[i:i+batch_size])
+    batched_time = time.time() - t2
+    vp.release()
+    assert vp.speech_model is None
+
+    print(f"resident model, batch of {batch_size}    {audio_minutes_per_minute(vp.audio_seconds, batched_time)}")
+
+    assert len(batched_output) == len(resident_output) == len(files)
+    assert all(blocks for blocks in batched_output)
+
+    #   parse_voice borrows the parser model for all of the files in the folder
+    parser = Parser()
+    parser.speech_model = model
+    output = parser.parse_voice(fp, write_to_db=False, save_history=False, real_time_progress=False,
+                                batch_size=batch_size)
+    assert sorted(set(block["file_source"] for block in output)) == files
+
+    model.__dealloc__()
+
+    return 0
@@ -0,0 +1,110 @@
+
+""" Benchmark of Query.expand_text_results - expands a list of query results with the text of the neighboring
+    blocks in each document, fetched with a single query of merged block_ID ranges, against the prior path, which
+    looked up the neighbors one block at a time (one query per block) - and checks that both return the same
+    neighboring blocks.
+
+    The prior expand_text_result_before did not step back through the blocks, and did not return - the reference
+    below walks back one block at a time, as intended.
+
+    Runs against a synthetic SQLite library with blocks of varying length, and does not require a model.
+ """
+
+
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.library import Library
+from llmware.retrieval import Query
+
+from utils import synthetic_block, write_synthetic_blocks
+
+
+def create_library(library_name, doc_count, blocks_per_doc, vocab_size=2000):
+
+    library = Library().create_new_library(library_name)
+
+    rng = np.random.default_rng(0)
+
+    blocks = []
+    for doc_id in range(1, doc_count + 1):
+        for block_id in range(blocks_per_doc):
+            text = " ".join(f"term{j}" for j in rng.integers(0, vocab_size, size=rng.integers(5, 80)))
+            blocks.append(synthetic_block(block_id, doc_id, text, page_num=1 + block_id // 10))
+
+    write_synthetic_blocks(library, blocks)
+
+    return library
+
+
+def legacy_expand(query, block, window_size):
+
+    """ Prior path - one block_lookup per neighboring block, before and after """
+
+    before_text, before_blocks = "", []
+    block_id = block["block_ID"] - 1
+    while len(before_text) < window_size and block_id >= 0:
+        before_block = query.block_lookup(block_id, block["doc_ID"])
+        if before_block:
+            before_text += before_block["text"]
+            before_blocks.insert(0, before_block)
+        block_id -= 1
+
+    after_text, after_blocks = "", []
+    block_id = block["block_ID"] + 1
+    while len(after_text) < window_size:
+        after_block = query.block_lookup(block_id, block["doc_ID"])
+        if not after_block:
+            break
+        after_text += after_block["text"]
+        after_blocks.append(after_block)
+        block_id += 1
+
+    return before_blocks, after_blocks
+
+
+def test_expand_text_results_benchmark(doc_count=20, blocks_per_doc=500, result_count=20, window_size=400):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = create_library("bench_expand_text_1017", doc_count, blocks_per_doc)
+
+    query = Query(library, save_history=False)
+
+    #   results spread across documents, incl. adjacent results + the first and last blocks of a document
+    rng = np.random.default_rng(1)
+    block_ids = [(int(d), int(b)) for d, b in zip(rng.integers(1, doc_count + 1, size=result_count - 4),
+                                                  rng.integers(0, blocks_per_doc, size=result_count - 4))]
+    block_ids += [(1, 0), (1, 1), (2, blocks_per_doc - 1), (2, blocks_per_doc - 2)]
+
+    results = [query.block_lookup(b, d) for d, b in block_ids]
+
+    t0 = time.time()
+    legacy = [legacy_expand(query, r, window_size) for r in results]
+    legacy_time = time.time() - t0
+
+    t1 = time.time()
+    expanded = query.expand_text_results(results, window_size=window_size)
+    batch_time = time.time() - t1
+
+    lookups = sum(len(before) + len(after) for before, after in legacy)
+
+    print(f"\nlibrary: {doc_count * blocks_per_doc} blocks - {result_count} results - window_size: {window_size}")
+    print(f"path                      lookups   latency(ms)")
+    print(f"block_lookup per block    {lookups:<9} {round(legacy_time * 1000, 1)}")
+    print(f"expand_text_results       -         {round(batch_time * 1000, 1)}")
+
+    for (before, after), e in zip(legacy, expanded):
+        assert [b["block_ID"] for b in e["before_results"]] == [b["block_ID"] for b in before]
+        assert [b["block_ID"] for b in e["after_results"]] == [b["block_ID"] for b in after]
+        assert e["before_text"] == "".join(b["text"] for b in before)
+
+    #   single result wrappers - first block has no text before, and returns
+    assert query.expand_text_result_before(results[-4], window_size=window_size)["results"] == []
+    assert query.expand_text_result_after(results[-2], window_size=window_size)["results"] == []
+    assert query.expand_text_result_before(results[0], window_size=window_size)["expanded_text"] == \
+        expanded[0]["before_text"]
+
+    library.delete_library(confirm_delete=True)
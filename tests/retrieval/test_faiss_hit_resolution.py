@@ -0,0 +1,112 @@
+
+""" Tests that FAISS semantic query hits are resolved to the right blocks through the index position -> block _id
+    map saved next to the FAISS index, with one batch lookup in the text collection - results are in distance
+    order and match a brute-force ranking, match the per-hit lookup used when the map is not found, and hits for
+    blocks deleted from the text collection are skipped.
+
+    Builds a small SQLite library with a stand-in model that hashes tokens into a dense vector, so no model
+    download is required.
+
+    Requires faiss:  `pip3 install faiss-cpu`
+ """
+
+
+import os
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.embeddings import EmbeddingHandler, EmbeddingFAISS
+from llmware.library import Library
+from llmware.resources import CollectionRetrieval, CollectionWriter
+from llmware.retrieval import Query
+
+from utils import HashedTokenEmbeddingModel, synthetic_block, synthetic_texts, write_synthetic_blocks
+
+
+def create_library(library_name, block_count=300):
+
+    library = Library().create_new_library(library_name)
+
+    texts = synthetic_texts(block_count, vocab_size=300, words_per_block=12, zipf=False)
+    write_synthetic_blocks(library, [synthetic_block(i, 1, text, file_source="faiss_test.txt")
+                                     for i, text in enumerate(texts)])
+
+    return library
+
+
+def semantic_results(library, model, query_text, result_count=10):
+
+    """ Runs a semantic query from a new Query instance, with the vector index loaded from disk """
+
+    EmbeddingHandler.clear_index_cache()
+
+    query = Query(library, save_history=False)
+    query.embedding_model = model
+
+    return [(str(r["_id"]), r["text"], float(r["distance"]))
+            for r in query.semantic_query(query_text, result_count=result_count)]
+
+
+def test_faiss_hit_resolution(block_count=300, result_count=10):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = create_library("test_faiss_hit_resolution_1003", block_count=block_count)
+
+    model = HashedTokenEmbeddingModel(embedding_dims=64)
+    EmbeddingHandler(library).create_new_embedding("faiss", model, batch_size=100)
+
+    #   id map has one block _id per index position, and each matches the embedding flag written on the block
+    faiss_db = EmbeddingFAISS(library, model=model)
+    id_map = faiss_db._load_id_map()
+
+    assert id_map is not None and len(id_map) == block_count
+
+    for position in [0, 1, block_count // 2, block_count - 1]:
+        blocks = CollectionRetrieval(library.library_name,
+                                     account_name=library.account_name).embedding_key_lookup(
+            faiss_db.collection_key, position)
+        assert [str(block["_id"]) for block in blocks] == [str(id_map[position])]
+
+    id_map = None
+
+    query_text = "term3 term40 term7 term120"
+    results = semantic_results(library, model, query_text, result_count=result_count)
+
+    assert len(results) == result_count
+
+    #   results in distance order, and each distance is the distance to the block text - so hits resolve to the
+    #   right blocks - with the same distances as a brute-force ranking over all of the blocks
+    distances = [r[2] for r in results]
+    assert distances == sorted(distances)
+
+    query_vector = model.embedding(query_text)[0]
+    result_vectors = model.embedding([r[1] for r in results])
+    assert np.allclose(np.sum((result_vectors - query_vector) ** 2, axis=1), distances, atol=1e-4)
+
+    all_texts = [b["text"] for b in CollectionRetrieval(library.library_name,
+                                                          account_name=library.account_name).filter_by_key(
+        "content_type", "text")]
+    assert len(all_texts) == block_count
+
+    brute_force = np.sort(np.sum((model.embedding(all_texts) - query_vector) ** 2, axis=1))[:result_count]
+    assert np.allclose(brute_force, distances, atol=1e-4)
+
+    #   same results with the per-hit lookup by embedding flag, used if the id map is not found
+    os.rename(faiss_db.id_map_file_path, faiss_db.id_map_file_path + ".bak")
+    assert semantic_results(library, model, query_text, result_count=result_count) == results
+    os.rename(faiss_db.id_map_file_path + ".bak", faiss_db.id_map_file_path)
+
+    #   hits for blocks deleted from the text collection are skipped, and the other hits keep their order
+    deleted_block = CollectionRetrieval(library.library_name,
+                                        account_name=library.account_name).lookup("_id", results[0][0])[0]
+    CollectionWriter(library.library_name,
+                     account_name=library.account_name).delete_records_by_key("block_ID", deleted_block["block_ID"])
+
+    after_delete = semantic_results(library, model, query_text, result_count=result_count)
+
+    assert after_delete == results[1:]
+
+    EmbeddingHandler.clear_index_cache()
+    library.delete_library(confirm_delete=True)
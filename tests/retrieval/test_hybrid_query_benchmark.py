@@ -0,0 +1,102 @@
+
+""" Benchmark of Query.hybrid_query against dual_pass_query - latency at increasing result counts, with text and
+    semantic queries run concurrently + fused by _id in linear time in hybrid_query, compared with the sequential
+    queries + nested loop merge in dual_pass_query (run with safety_check=False above 100 results).
+
+    Builds a synthetic SQLite library, embedded into the built-in numpy_mmap vector store with a stand-in model
+    that hashes tokens into a dense vector, so no model download or external vector db is required.
+ """
+
+
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.embeddings import EmbeddingHandler
+from llmware.library import Library
+from llmware.retrieval import Query
+
+from utils import HashedTokenEmbeddingModel, synthetic_block, synthetic_texts, write_synthetic_blocks
+
+
+def create_library(library_name, block_count, vocab_size=2000, words_per_block=30):
+
+    library = Library().create_new_library(library_name)
+
+    texts = synthetic_texts(block_count, vocab_size=vocab_size, words_per_block=words_per_block)
+    write_synthetic_blocks(library, [synthetic_block(i, 1 + i // 1000, text) for i, text in enumerate(texts)])
+
+    return library
+
+
+def test_hybrid_query_benchmark(block_count=20000, runs=5):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = create_library("bench_hybrid_query_1012", block_count)
+
+    model = HashedTokenEmbeddingModel()
+    EmbeddingHandler(library).create_new_embedding("numpy_mmap", model, batch_size=1000)
+
+    query = Query(library, save_history=False)
+    query.embedding_model = model
+
+    queries = ["term3 term40", "term12 term150 term7", "term500 term2", "term1 term90"]
+
+    print(f"\nlibrary: {block_count} blocks - {len(queries)} queries x {runs} runs - p50 latency (ms)")
+    print(f"result_count   dual_pass   hybrid(rrf)   hybrid(weighted)")
+
+    for result_count in [20, 100, 1000, 2000]:
+
+        latencies = {"dual_pass": [], "rrf": [], "weighted": []}
+
+        for _ in range(runs):
+            for q in queries:
+
+                t0 = time.time()
+                query.dual_pass_query(q, result_count=result_count, safety_check=False)
+                latencies["dual_pass"].append((time.time() - t0) * 1000)
+
+                for fusion in ["rrf", "weighted"]:
+
+                    t1 = time.time()
+                    results = query.hybrid_query(q, result_count=result_count, fusion=fusion)
+                    latencies[fusion].append((time.time() - t1) * 1000)
+
+                    ids = [r["_id"] for r in results]
+                    assert len(ids) == len(set(ids))
+                    assert len(ids) >= min(result_count, 1)
+
+        p50 = {k: round(float(np.percentile(v, 50)), 1) for k, v in latencies.items()}
+        print(f"{result_count:<14} {p50['dual_pass']:<11} {p50['rrf']:<13} {p50['weighted']}")
+
+    #   fused results are the top results by reciprocal rank fusion of the text and semantic results, with the
+    #   results found by both queries marked as matched
+    output = query.hybrid_query(queries[0], result_count=50, results_only=False)
+
+    expected = {}
+    for leg in ["text_results", "semantic_results"]:
+        for rank, r in enumerate(output[leg]):
+            expected[r["_id"]] = expected.get(r["_id"], 0.0) + 1.0 / (60 + rank + 1)
+
+    text_ids = set(r["_id"] for r in output["text_results"])
+    semantic_ids = set(r["_id"] for r in output["semantic_results"])
+
+    scores = [r["hybrid_score"] for r in output["results"]]
+
+    assert len(output["results"]) == min(50, len(expected))
+    assert np.allclose(scores, sorted(expected.values(), reverse=True)[:len(scores)])
+    assert np.allclose(scores, [expected[r["_id"]] for r in output["results"]])
+    assert all((r["match_status"] == "matched") == (r["_id"] in text_ids and r["_id"] in semantic_ids)
+               for r in output["results"])
+
+    #   query state is updated once, with the fused results - not by the concurrent text and semantic queries
+    history_query = Query(library, save_history=True)
+    history_query.embedding_model = model
+    fused = history_query.hybrid_query(queries[1], result_count=30)
+
+    assert [r["_id"] for r in history_query.results] == [r["_id"] for r in fused]
+    assert history_query.query_history == [queries[1]]
+
+    library.delete_library(confirm_delete=True)
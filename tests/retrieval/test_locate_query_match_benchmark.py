@@ -0,0 +1,99 @@
+
+""" Micro-benchmark of Query.locate_query_match, which runs on every result packaged by a query - the matcher
+    compiled once per query (a case-insensitive regex of the query terms) against the prior character-by-character
+    loop, on text blocks of typical parsed length, and checks that both return the same [char_offset, term] list.
+
+    The prior loop carried its match count over from one query term to the next at the same offset, and so
+    dropped a match when two terms start at the same character (e.g., 'the' + 'then') - these cases are checked
+    separately.   Does not require a library or model.
+ """
+
+
+import time
+
+import numpy as np
+
+from llmware.retrieval import Query
+from llmware.util import CorpTokenizer
+
+
+def legacy_locate_query_match(query, core_text):
+
+    """ Prior implementation of Query.locate_query_match, for comparison """
+
+    matches_found = []
+
+    if not query:
+        return matches_found
+
+    b = CorpTokenizer(one_letter_removal=False, remove_stop_words=False, remove_punctuation=False,
+                      remove_numbers=False)
+
+    query_tokens = b.tokenize(query)
+
+    for x in range(0, len(core_text)):
+        match = 0
+        for key_term in query_tokens:
+            if len(key_term) == 0:
+                continue
+
+            if key_term.startswith('"'):
+                key_term = key_term[1:-1]
+
+            if core_text[x].lower() == key_term[0].lower():
+                match += 1
+                if (x + len(key_term)) <= len(core_text):
+                    for y in range(1, len(key_term)):
+                        if key_term[y].lower() == core_text[x + y].lower():
+                            match += 1
+                        else:
+                            match = -1
+                            break
+
+                    if match == len(key_term):
+                        new_entry = [x, key_term]
+                        matches_found.append(new_entry)
+
+    return matches_found
+
+
+def create_texts(count, words_per_text=250):
+
+    rng = np.random.default_rng(0)
+    words = ["Revenue", "agreement", "quarter", "Employee", "termination", "liability", "shall", "company",
+             "the", "of", "and", "to", "in", "pursuant", "Section", "effective", "date", "party", "fiscal", "year",
+             "base", "salary", "bonus", "COMPENSATION", "executive", "notice", "period", "days", "written"]
+
+    return [" ".join(rng.choice(words, size=words_per_text)) for _ in range(count)]
+
+
+def test_locate_query_match_benchmark(text_count=500):
+
+    query = Query.__new__(Query)
+
+    texts = create_texts(text_count)
+    queries = ["base salary", "termination notice period", "Executive Compensation", '"fiscal year"',
+               "revenue quarter liability"]
+
+    print(f"\n{text_count} texts of ~{round(np.mean([len(t) for t in texts]))} chars")
+    print(f"query                          legacy(ms/text)   compiled(ms/text)   speedup")
+
+    for q in queries:
+
+        t0 = time.time()
+        legacy = [legacy_locate_query_match(q, t) for t in texts]
+        legacy_time = (time.time() - t0) * 1000 / text_count
+
+        t1 = time.time()
+        compiled = [query.locate_query_match(q, t) for t in texts]
+        compiled_time = (time.time() - t1) * 1000 / text_count
+
+        print(f"{q:<30} {round(legacy_time, 3):<17} {round(compiled_time, 4):<19} "
+              f"{round(legacy_time / compiled_time)}x")
+
+        assert compiled == legacy
+
+    #   terms starting at the same character - each match is returned
+    assert query.locate_query_match("the then", "Then the") == [[0, "the"], [0, "then"], [5, "the"]]
+    assert query.locate_query_match("", "text") == []
+    assert query.locate_query_match('"', "text") == []
@@ -0,0 +1,136 @@
+
+""" Benchmark of the Query result cache - latency of repeated text and semantic queries, as issued by a dashboard,
+    with the cache off, served from memory, and served from the on-disk tier, and checks that cached results match
+    the results of the query, and that the on-disk entries are saved as json.
+
+    Also checks that a change to the library (update_block, which increments the library version) invalidates the
+    prior results, and that entries expire after the ttl.
+
+    Builds a synthetic SQLite library, embedded into the built-in numpy_mmap vector store with a stand-in model
+    that hashes tokens into a dense vector, so no model download or external vector db is required.
+ """
+
+
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig, QueryConfig
+from llmware.embeddings import EmbeddingHandler
+from llmware.library import Library
+from llmware.retrieval import Query, _query_result_cache
+
+from utils import HashedTokenEmbeddingModel, synthetic_block, synthetic_texts, write_synthetic_blocks
+
+
+def create_library(library_name, block_count, vocab_size=2000, words_per_block=30):
+
+    library = Library().create_new_library(library_name)
+
+    texts = synthetic_texts(block_count, vocab_size=vocab_size, words_per_block=words_per_block)
+    write_synthetic_blocks(library, [synthetic_block(i, 1 + i // 1000, text) for i, text in enumerate(texts)])
+
+    return library
+
+
+def test_query_cache_benchmark(block_count=20000, runs=20, result_count=20):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = create_library("bench_query_cache_1016", block_count)
+
+    model = HashedTokenEmbeddingModel()
+    EmbeddingHandler(library).create_new_embedding("numpy_mmap", model, batch_size=1000)
+
+    queries = ["term3 term40", "term12 term150 term7", "term500 term2", "term1 term90"]
+
+    query = Query(library, save_history=False)
+    query.embedding_model = model
+
+    Query.clear_query_cache()
+
+    runs_by_type = {"text_query": lambda q: query.text_query(q, result_count=result_count),
+                    "semantic_query": lambda q: query.semantic_query(q, result_count=result_count)}
+
+    def p50(run):
+        latencies = []
+        for _ in range(runs):
+            for q in queries:
+                t0 = time.time()
+                run(q)
+                latencies.append((time.time() - t0) * 1000)
+        return round(float(np.percentile(latencies, 50)), 3)
+
+    print(f"\nlibrary: {block_count} blocks - {len(queries)} queries x {runs} runs - p50 latency (ms)")
+    print(f"query type       no cache   memory    disk")
+
+    try:
+        for query_type, run in runs_by_type.items():
+
+            query.query_cache = False
+            uncached = p50(run)
+            expected = [run(q) for q in queries]
+
+            query.query_cache = True
+            memory = p50(run)
+
+            assert [run(q) for q in queries] == expected
+
+            QueryConfig.set_config("query_cache_disk", True)
+            run(queries[0])
+
+            def from_disk(q):
+                _query_result_cache._cache.clear()
+                return run(q)
+
+            disk = p50(from_disk)
+
+            assert [from_disk(q) for q in queries] == expected
+
+            QueryConfig.set_config("query_cache_disk", False)
+
+            print(f"{query_type:<16} {uncached:<10} {memory:<9} {disk}")
+
+        stats = Query.get_query_cache_stats()
+        print(f"cache stats: {stats}")
+
+        assert stats["memory_hits"] > 0 and stats["disk_hits"] > 0
+
+        #   on-disk entries are saved as json
+        conn = sqlite3.connect(_query_result_cache.get_cache_fp())
+        saved = [json.loads(row[0]) for row in conn.execute("SELECT result FROM query_cache")]
+        conn.close()
+
+        assert saved and all("results" in qr_dict for qr_dict in saved)
+
+        #   a change to the library invalidates the prior results
+        query.query_cache = True
+        first = query.text_query(queries[0], result_count=result_count)[0]
+
+        version = library.get_library_version()
+        library.update_block(first["doc_ID"], first["block_ID"], "master_index", 99)
+        assert library.get_library_version() == version + 1
+
+        misses = Query.get_query_cache_stats()["misses"]
+        updated = query.text_query(queries[0], result_count=result_count)[0]
+
+        assert Query.get_query_cache_stats()["misses"] == misses + 1
+        assert updated["_id"] == first["_id"] and updated["page_num"] == 99
+
+        #   entries expire after the ttl
+        QueryConfig.set_config("query_cache_ttl", 0.5)
+        query.text_query(queries[1], result_count=result_count)
+        time.sleep(0.6)
+
+        misses = Query.get_query_cache_stats()["misses"]
+        query.text_query(queries[1], result_count=result_count)
+        assert Query.get_query_cache_stats()["misses"] == misses + 1
+
+    finally:
+        QueryConfig.set_config("query_cache_disk", False)
+        QueryConfig.set_config("query_cache_ttl", 300)
+        Query.clear_query_cache()
+
+    library.delete_library(confirm_delete=True)
@@ -0,0 +1,102 @@
+
+""" Benchmark of filter pushdown in semantic_query_with_document_filter, on FAISS and the built-in numpy_mmap
+    vector store, with a selective doc_ID filter (1 document of 50).
+
+    Compares the prior approach - nearest neighbours of the whole library, filtered afterwards, with result_count
+    of 10, and with result_count inflated 100x - against the search restricted to the vectors of the filtered
+    blocks, and reports latency and the number of results returned.
+
+    Builds a synthetic SQLite library with a stand-in model that hashes tokens into a dense vector, so no model
+    download is required.
+
+    Requires faiss:  `pip3 install faiss-cpu`
+ """
+
+
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.embeddings import EmbeddingHandler
+from llmware.library import Library
+from llmware.retrieval import Query
+
+from utils import HashedTokenEmbeddingModel, synthetic_block, synthetic_texts, write_synthetic_blocks
+
+
+def create_library(library_name, block_count, doc_count, vocab_size=2000, words_per_block=30):
+
+    library = Library().create_new_library(library_name)
+
+    blocks_per_doc = block_count // doc_count
+
+    texts = synthetic_texts(block_count, vocab_size=vocab_size, words_per_block=words_per_block)
+    write_synthetic_blocks(library, [synthetic_block(i % blocks_per_doc, 1 + i // blocks_per_doc, text)
+                                     for i, text in enumerate(texts)])
+
+    return library
+
+
+def test_semantic_filter_pushdown_benchmark(block_count=50000, doc_count=50, result_count=10, runs=10):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = create_library("bench_semantic_filter_1013", block_count, doc_count)
+    model = HashedTokenEmbeddingModel()
+
+    queries = ["term3 term40", "term12 term150 term7", "term500 term2", "term1 term90", "term77 term8"]
+    doc_filter = {"doc_ID": [doc_count // 2]}
+
+    print(f"\nlibrary: {block_count} blocks in {doc_count} docs - filter: {doc_filter} - "
+          f"result_count: {result_count}")
+    print(f"vector db    search                      latency(ms)   avg results")
+
+    for vector_db in ["faiss", "numpy_mmap"]:
+
+        EmbeddingHandler(library).create_new_embedding(vector_db, model, batch_size=1000)
+
+        query = Query(library, save_history=False, vector_db=vector_db,
+                      embedding_model_name=model.model_name)
+        query.embedding_model = model
+
+        handler = EmbeddingHandler(library)
+
+        def post_filtered(q, sample_count):
+            vector = model.embedding(q)
+            hits = handler.search_index(vector, vector_db, model, sample_count=sample_count)
+            return [h for h in hits if h[0]["doc_ID"] in doc_filter["doc_ID"]][:result_count]
+
+        runs_by_path = {"post-filter": lambda q: post_filtered(q, result_count),
+                        f"post-filter x100": lambda q: post_filtered(q, result_count * 100),
+                        "pushdown": lambda q: query.semantic_query_with_document_filter(q, doc_filter,
+                                                                                        result_count=result_count)}
+
+        for path, run in runs_by_path.items():
+
+            latencies, counts = [], []
+            for _ in range(runs):
+                for q in queries:
+                    t0 = time.time()
+                    results = run(q)
+                    latencies.append((time.time() - t0) * 1000)
+                    counts.append(len(results))
+
+            print(f"{vector_db:<12} {path:<27} {round(float(np.median(latencies)), 2):<13} "
+                  f"{round(float(np.mean(counts)), 1)}")
+
+            #   nearest neighbours of the whole library, filtered afterwards, fall short of result_count
+            if path == "post-filter":
+                assert np.mean(counts) < result_count
+
+            if path == "pushdown":
+                assert min(counts) == result_count
+
+        #   filtered results are the nearest neighbours within the document - same as exhaustive search
+        results = query.semantic_query_with_document_filter(queries[0], doc_filter, result_count=result_count)
+        assert all(r["doc_ID"] in doc_filter["doc_ID"] for r in results)
+
+        exhaustive = post_filtered(queries[0], block_count)
+        assert np.allclose([r["distance"] for r in results], [h[1] for h in exhaustive], atol=1e-5)
+
+    library.delete_library(confirm_delete=True)
@@ -0,0 +1,102 @@
+
+""" Benchmark of Query.semantic_query_batch against a loop of semantic_query calls, on FAISS and the built-in
+    numpy_mmap vector store - queries/sec for a batch of queries, embedded in one model batch and searched with
+    one multi-vector search, with the blocks for all queries looked up in one read of the text collection.
+
+    Builds a synthetic SQLite library with a stand-in model that hashes tokens and runs a dense projection (numpy),
+    so there is a per-call cost as with a transformer model, and no model download is required.
+
+    Requires faiss:  `pip3 install faiss-cpu`
+ """
+
+
+import time
+import zlib
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig
+from llmware.embeddings import EmbeddingHandler
+from llmware.library import Library
+from llmware.retrieval import Query
+
+from utils import synthetic_block, synthetic_texts, write_synthetic_blocks
+
+
+class ProjectedTokenEmbeddingModel:
+
+    """ Stand-in embedding model - bag of hashed tokens through a dense projection """
+
+    model_name = "projected-token-embedding-model"
+    embedding_dims = 256
+
+    def __init__(self, hidden_dims=1024):
+        rng = np.random.default_rng(0)
+        self.projection = rng.normal(size=(hidden_dims, self.embedding_dims)).astype(np.float32)
+        self.hidden_dims = hidden_dims
+
+    def embedding(self, sentences):
+
+        if isinstance(sentences, str):
+            sentences = [sentences]
+
+        x = np.zeros((len(sentences), self.hidden_dims), dtype=np.float32)
+        for i, s in enumerate(sentences):
+            for token in s.split():
+                x[i, zlib.crc32(token.encode()) % self.hidden_dims] += 1.0
+
+        return x @ self.projection
+
+
+def create_library(library_name, block_count, vocab_size=2000, words_per_block=30):
+
+    library = Library().create_new_library(library_name)
+
+    texts = synthetic_texts(block_count, vocab_size=vocab_size, words_per_block=words_per_block)
+    write_synthetic_blocks(library, [synthetic_block(i, 1 + i // 1000, text) for i, text in enumerate(texts)])
+
+    return library
+
+
+def test_semantic_query_batch_benchmark(block_count=20000, query_count=500, result_count=10):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = create_library("bench_semantic_batch_1014", block_count)
+    model = ProjectedTokenEmbeddingModel()
+
+    rng = np.random.default_rng(1)
+    queries = [" ".join(f"term{j}" for j in rng.integers(0, 500, size=3)) for _ in range(query_count)]
+
+    print(f"\nlibrary: {block_count} blocks - {query_count} queries - result_count: {result_count}")
+    print(f"vector db    semantic_query loop   semantic_query_batch   speedup")
+
+    for vector_db in ["faiss", "numpy_mmap"]:
+
+        EmbeddingHandler(library).create_new_embedding(vector_db, model, batch_size=1000)
+
+        query = Query(library, save_history=False, vector_db=vector_db, embedding_model_name=model.model_name)
+        query.embedding_model = model
+
+        #   load the index before timing
+        query.semantic_query(queries[0], result_count=result_count)
+
+        t0 = time.time()
+        single = [query.semantic_query(q, result_count=result_count) for q in queries]
+        loop_time = time.time() - t0
+
+        t1 = time.time()
+        batch = query.semantic_query_batch(queries, result_count=result_count)
+        batch_time = time.time() - t1
+
+        print(f"{vector_db:<12} {round(query_count / loop_time):<9} q/sec         "
+              f"{round(query_count / batch_time):<9} q/sec          {round(loop_time / batch_time, 1)}x")
+
+        assert len(batch) == query_count
+
+        for single_results, batch_results in zip(single, batch):
+            assert [r["query"] for r in batch_results] == [r["query"] for r in single_results]
+            assert np.allclose([r["distance"] for r in batch_results], [r["distance"] for r in single_results],
+                               atol=1e-3)
+
+    library.delete_library(confirm_delete=True)
@@ -0,0 +1,112 @@
+
+""" Benchmark of text_query latency on a 1M block SQLite library, with result_count pushed down to the text index
+    as a LIMIT, against the prior path, which unpacked every matching row before taking the top result_count.
+
+    Reports p50 + p99 latency over a mix of queries, from rare terms to terms that match a large share of the
+    library, and checks that both paths return the same top results.   Also checks that exhaust_full_cursor=True
+    streams the full result set off the db cursor.
+
+    Runs against the SQLite text collection, and does not require a model - synthetic blocks are written directly
+    into a new library.   Building the 1M block index takes a few minutes on first run.
+ """
+
+
+import sqlite3
+import time
+
+import numpy as np
+
+from llmware.configs import LLMWareConfig, SQLiteConfig
+from llmware.library import Library
+from llmware.resources import CollectionRetrieval
+from llmware.retrieval import Query
+
+
+def create_synthetic_blocks(library_name, block_count, vocab_size=5000, words_per_block=40, chunk_size=100000):
+
+    """ Inserts block_count synthetic blocks, with words drawn from a zipf-like distribution over vocab_size
+    terms, into the library text collection - returns the vocabulary ordered from most to least common """
+
+    rng = np.random.default_rng(0)
+    vocab = [f"term{i}" for i in range(vocab_size)]
+
+    p = 1.0 / np.arange(1, vocab_size + 1)
+    p /= p.sum()
+
+    conn = sqlite3.connect(SQLiteConfig.get_uri_string())
+    placeholders = ", ".join(["?"] * 28)
+
+    for start in range(0, block_count, chunk_size):
+
+        word_ids = rng.choice(vocab_size, size=(min(chunk_size, block_count - start), words_per_block), p=p)
+
+        rows = []
+        for i, ids in enumerate(word_ids):
+            text = " ".join(vocab[j] for j in ids)
+            rows.append((start + i, 1 + (start + i) // 1000, "text", "txt", 1 + i % 10, 0, 0, 0, 0, 0, "", "",
+                         f"bench_{(start + i) // 1000}.txt", "", "", "", "", "", text, "", text,
+                         "", "", "", "", "", "", ""))
+
+        conn.executemany(f"INSERT INTO {library_name} VALUES ({placeholders})", rows)
+        conn.commit()
+
+    conn.close()
+
+    return vocab
+
+
+def percentiles(latencies):
+    return round(float(np.percentile(latencies, 50)), 2), round(float(np.percentile(latencies, 99)), 2)
+
+
+def test_text_query_limit_benchmark(block_count=1000000, result_count=20, runs=3):
+
+    LLMWareConfig().set_active_db("sqlite")
+
+    library = Library().create_new_library("bench_text_limit_1011")
+    library_name = library.library_name
+
+    t0 = time.time()
+    vocab = create_synthetic_blocks(library_name, block_count)
+    print(f"\ncreated {block_count} blocks in {round(time.time() - t0, 1)}s")
+
+    #   mix of common, mid-frequency + rare terms
+    queries = [vocab[i] for i in [0, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 2000, 4000]]
+
+    query = Query(library)
+
+    legacy, pushdown = [], []
+
+    for _ in range(runs):
+        for q in queries:
+
+            #   prior path - all matching rows unpacked, then top result_count taken
+            t1 = time.time()
+            all_results = CollectionRetrieval(library_name, account_name=library.account_name).basic_query(q)
+            legacy_results = query._cursor_to_qr(q, all_results, result_count=result_count)["results"]
+            legacy.append((time.time() - t1) * 1000)
+
+            t2 = time.time()
+            results = query.text_query(q, result_count=result_count)
+            pushdown.append((time.time() - t2) * 1000)
+
+            assert [r["_id"] for r in results] == [r["_id"] for r in legacy_results]
+
+    print(f"text_query - {len(queries)} queries x {runs} runs - result_count={result_count}")
+    print(f"path              p50(ms)   p99(ms)")
+    print(f"unpack all        {percentiles(legacy)[0]:<9} {percentiles(legacy)[1]}")
+    print(f"limit pushdown    {percentiles(pushdown)[0]:<9} {percentiles(pushdown)[1]}")
+
+    #   exhaust_full_cursor streams every match
+    t3 = time.time()
+    results = query.text_query(vocab[500], exhaust_full_cursor=True)
+    conn = sqlite3.connect(SQLiteConfig.get_uri_string())
+    match_count = conn.execute(f"SELECT COUNT(*) FROM {library_name} WHERE text_search MATCH ?",
+                               (vocab[500],)).fetchone()[0]
+    conn.close()
+
+    print(f"exhaust_full_cursor - {len(results)} results streamed in {round(time.time() - t3, 2)}s")
+
+    assert len(results) == match_count
+
+    library.delete_library(confirm_delete=True)
@@ -1,4 +1,7 @@
-from tabulate import tabulate
+import zlib
+
+import numpy as np
+
 
 class Logger():
     def __init__(self):
@@ -11,4 +14,75 @@ class Logger():
         print (self.MAGENTA + message + self.END)
 
     def log_table(self, headers, data):
+        from tabulate import tabulate
         self.log(tabulate(data, headers=headers, tablefmt="grid"))
+
+
+class HashedTokenEmbeddingModel:
+
+    """ Stand-in embedding model - normalized bag of hashed tokens, so texts with shared terms are close """
+
+    model_name = "hashed-token-embedding-model"
+
+    def __init__(self, embedding_dims=256):
+        self.embedding_dims = embedding_dims
+
+    def embedding(self, sentences):
+
+        if isinstance(sentences, str):
+            sentences = [sentences]
+
+        x = np.zeros((len(sentences), self.embedding_dims), dtype=np.float32)
+        for i, s in enumerate(sentences):
+            for token in s.split():
+                x[i, zlib.crc32(token.encode()) % self.embedding_dims] += 1.0
+
+        return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def synthetic_texts(count, vocab_size=2000, words_per_block=30, zipf=True, seed=0):
+
+    """ Returns count texts of words_per_block terms, e.g., 'term3 term40 ...' - with zipf=True, the terms follow
+    a zipf distribution over the vocabulary, as in natural text, and otherwise are drawn uniformly """
+
+    rng = np.random.default_rng(seed)
+
+    if zipf:
+        p = 1.0 / np.arange(1, vocab_size + 1)
+        p /= p.sum()
+        term_ids = rng.choice(vocab_size, size=(count, words_per_block), p=p)
+    else:
+        term_ids = rng.integers(0, vocab_size, size=(count, words_per_block))
+
+    return [" ".join(f"term{j}" for j in ids) for ids in term_ids]
+
+
+def synthetic_block(block_id, doc_id, text, file_source=None, page_num=1):
+
+    """ Returns a text block in the format of the parser output, with all of the keys of the library text
+    collection, e.g., to write directly into a library with write_new_parsing_records_bulk """
+
+    if file_source is None:
+        file_source = f"bench_{doc_id}.txt"
+
+    return {"block_ID": block_id, "doc_ID": doc_id, "content_type": "text", "file_type": "txt",
+            "master_index": page_num, "master_index2": 0, "coords_x": 0, "coords_y": 0, "coords_cx": 0,
+            "coords_cy": 0, "author_or_speaker": "", "modified_date": "", "created_date": "", "creator_tool": "",
+            "added_to_collection": "", "file_source": file_source, "table": "", "external_files": "",
+            "text": text, "header_text": "", "text_search": text, "user_tags": "", "special_field1": "",
+            "special_field2": "", "special_field3": "", "graph_status": "", "dialog": "false",
+            "embedding_flags": {}}
+
+
+def write_synthetic_blocks(library, blocks, batch_size=10000):
+
+    """ Writes the blocks into the library text collection, in bulk writes of batch_size blocks """
+
+    from llmware.resources import CollectionWriter
+
+    for start in range(0, len(blocks), batch_size):
+        CollectionWriter(library.library_name,
+                         account_name=library.account_name).write_new_parsing_records_bulk(
+            blocks[start:start + batch_size])
+
+    return len(blocks)